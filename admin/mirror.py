@@ -0,0 +1,44 @@
+"""
+Réplica local compartida por todas las sesiones del panel.
+
+st.cache_resource guarda un único LocalMirror por proceso de Streamlit; las
+páginas llaman a load_tables() y reciben DataFrames ya sincronizados.
+"""
+
+import os
+from typing import Dict
+
+import pandas as pd
+import streamlit as st
+
+from config.database import get_supabase
+from app.services.local_mirror import LocalMirror
+
+MIRROR_DIR = os.getenv(
+    "ADMIN_MIRROR_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "mirror")
+)
+
+
+@st.cache_resource
+def get_mirror() -> LocalMirror:
+    """Una réplica por proceso, compartida entre sesiones."""
+    return LocalMirror(get_supabase(), MIRROR_DIR)
+
+
+def load_tables(*names: str) -> Dict[str, pd.DataFrame]:
+    """Sincroniza (si hace falta) y retorna las tablas pedidas."""
+    mirror = get_mirror()
+    mirror.sync()
+    return {name: mirror.frame(name) for name in names}
+
+
+def data_version(*names: str) -> str:
+    """Versión de los datos de las tablas, para llaves de st.cache_data."""
+    mirror = get_mirror()
+    return "/".join(mirror.version(name) for name in names)
+
+
+def rebuild_mirror() -> Dict[str, int]:
+    """Descarta la réplica y la vuelve a cargar completa desde Supabase."""
+    return get_mirror().rebuild()
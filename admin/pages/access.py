@@ -6,6 +6,7 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 from config.database import get_supabase
+from app.utils.keyset import fetch_all
 
 try:
     import bcrypt
@@ -54,13 +55,13 @@ def show_access_management():
         st.markdown("#### Usuarios Administradores")
         
         try:
-            admins = supabase.table("admin_users")\
-                .select("admin_id, email, name, role, active, last_login, created_at")\
-                .order("created_at", desc=True)\
-                .execute()
+            admins = fetch_all(supabase, "admin_users", key="admin_id",
+                               columns="admin_id, email, name, role, active, last_login, created_at")
+            # El cursor es admin_id (único); la lista se muestra como antes, por created_at desc
+            admins.sort(key=lambda a: (a.get('created_at') or '', a['admin_id']), reverse=True)
             
-            if admins.data:
-                for admin in admins.data:
+            if admins:
+                for admin in admins:
                     role = admin.get('role', 'viewer')
                     role_colors = {
                         'super_admin': ('linear-gradient(135deg, #667EEA 0%, #764BA2 100%)', 'white'),
@@ -2,13 +2,68 @@
 Analytics page con métricas avanzadas y exportación.
 """
 
+import os
+import tempfile
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
+from admin.mirror import data_version, load_tables
+from app.services.analytics import compute_range, top_products
+from app.services.export import FORMATS, export_range
 from config.database import get_supabase
 
+# Filas por archivo descargable; rangos más grandes salen en varias partes
+EXPORT_CHUNK_ROWS = 200_000
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def range_analytics(start_date, end_date, version: str, _orders: pd.DataFrame) -> dict:
+    """Métricas del rango; se reutilizan entre gráficas, reruns y sesiones mientras la versión no cambie."""
+    return compute_range(_orders, start_date, end_date)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def range_top_products(start_date, end_date, version: str, _items, _products, _order_ids) -> pd.DataFrame:
+    """Top de productos del rango, memoizado igual que range_analytics."""
+    return top_products(_items, _products, _order_ids)
+
+
+def show_export(start_date, end_date):
+    """Exportación del rango por páginas, partida en archivos de EXPORT_CHUNK_ROWS filas."""
+    st.markdown("###### 📥 Descargar Datos")
+    kind = st.radio("Datos", ["orders", "items"], horizontal=True,
+                    format_func=lambda k: "Pedidos" if k == "orders" else "Productos")
+    fmt = st.selectbox("Formato", list(FORMATS), format_func=str.upper)
+
+    if st.button("📤 Generar exportación", use_container_width=True):
+        # Las partes quedan en disco; en la sesión solo rutas y tamaños
+        previous = st.session_state.pop('analytics_export', None)
+        if previous:
+            previous['directory'].cleanup()
+        directory = tempfile.TemporaryDirectory(prefix="analytics_export_")
+        with st.spinner("Exportando..."):
+            paths = export_range(get_supabase(), kind, fmt, start_date, end_date, directory.name,
+                                 chunk_rows=EXPORT_CHUNK_ROWS)
+        # Si la sesión termina, su estado se libera y el finalizador de
+        # TemporaryDirectory borra la carpeta
+        st.session_state['analytics_export'] = {
+            'directory': directory,
+            'files': [(path, os.path.getsize(path)) for path in paths],
+            'fmt': fmt,
+        }
+
+    export = st.session_state.get('analytics_export')
+    if export:
+        mime = FORMATS[export['fmt']][0]
+        for i, (path, size) in enumerate(export['files'], 1):
+            name = os.path.basename(path)
+            with open(path, 'rb') as f:
+                st.download_button(f"📥 {name} ({size / 1024:,.0f} KB)", f, name, mime,
+                                   key=f"analytics_export_{i}", use_container_width=True)
+
 
 def show_analytics():
     """Página de analytics avanzados con diseño mejorado."""
@@ -17,8 +72,6 @@ def show_analytics():
     st.markdown('<p class="greeting-subtitle">Consulta el rendimiento detallado de Milhojaldres</p>', unsafe_allow_html=True)
     st.markdown("<br>", unsafe_allow_html=True)
     
-    supabase = get_supabase()
-    
     # ============================================
     # DATE RANGE SELECTOR
     # ============================================
@@ -63,29 +116,21 @@ def show_analytics():
         # ============================================
         # FETCH DATA FOR RANGE
         # ============================================
-        orders = supabase.table("orders")\
-            .select("*")\
-            .gte("fecha_orden", f"{start_date}T00:00:00")\
-            .lte("fecha_orden", f"{end_date}T23:59:59")\
-            .execute()
+        tables = load_tables("orders", "order_items", "products")
+        orders_version = data_version("orders")
+        result = range_analytics(start_date, end_date, orders_version, tables["orders"])
         
-        if not orders.data:
+        if result['total_orders'] == 0:
             st.warning(f"📊 No hay datos para el rango seleccionado ({start_date} - {end_date})")
             return
         
-        df_orders = pd.DataFrame(orders.data)
-        df_orders['fecha'] = pd.to_datetime(df_orders['fecha_orden']).dt.date
-        df_orders['hora'] = pd.to_datetime(df_orders['fecha_orden']).dt.hour
-        df_orders['dia_semana'] = pd.to_datetime(df_orders['fecha_orden']).dt.day_name()
-        
         # ============================================
         # SUMMARY METRICS - Use custom cards or improved metrics
         # ============================================
-        total_revenue = df_orders['total'].sum()
-        total_orders = len(df_orders)
-        avg_order = total_revenue / total_orders if total_orders > 0 else 0
-        delivered = len(df_orders[df_orders['estado'] == 'delivered'])
-        conversion_rate = (delivered / total_orders * 100) if total_orders > 0 else 0
+        total_revenue = result['total_revenue']
+        total_orders = result['total_orders']
+        avg_order = result['avg_ticket']
+        conversion_rate = result['delivery_rate']
 
         metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
         
@@ -108,7 +153,7 @@ def show_analytics():
         with chart_row1_col1:
             st.markdown('<div class="chart-container">', unsafe_allow_html=True)
             st.markdown('<p class="chart-title">📈 Ingresos por Día</p>', unsafe_allow_html=True)
-            daily = df_orders.groupby('fecha')['total'].sum().reset_index()
+            daily = result['daily']
             fig = px.line(daily, x='fecha', y='total', markers=True, color_discrete_sequence=['#00B4D8'])
             fig.update_layout(
                 margin=dict(l=0, r=0, t=10, b=0), height=300,
@@ -124,7 +169,7 @@ def show_analytics():
         with chart_row1_col2:
             st.markdown('<div class="chart-container">', unsafe_allow_html=True)
             st.markdown('<p class="chart-title">📊 Distribución de Estados</p>', unsafe_allow_html=True)
-            status_counts = df_orders['estado'].value_counts().reset_index()
+            status_counts = result['status_counts'].reset_index()
             status_counts.columns = ['estado', 'count']
             colors = {'pending': '#F39C12', 'confirmed': '#3498DB', 'preparing': '#9B59B6', 
                       'ready': '#2ECC71', 'delivered': '#27AE60', 'cancelled': '#E74C3C'}
@@ -155,12 +200,7 @@ def show_analytics():
         with chart_row2_col1:
             st.markdown('<div class="chart-container">', unsafe_allow_html=True)
             st.markdown('<p class="chart-title">📅 Pedidos por Día de la Semana</p>', unsafe_allow_html=True)
-            day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            day_names_es = {'Monday': 'Lun', 'Tuesday': 'Mar', 'Wednesday': 'Mie', 
-                          'Thursday': 'Jue', 'Friday': 'Vie', 'Saturday': 'Sab', 'Sunday': 'Dom'}
-            by_day = df_orders['dia_semana'].value_counts().reindex(day_order).reset_index()
-            by_day.columns = ['dia', 'count']
-            by_day['dia_es'] = by_day['dia'].map(day_names_es)
+            by_day = result['by_weekday'].rename_axis('dia_es').reset_index(name='count')
             fig = px.bar(by_day, x='dia_es', y='count', color_discrete_sequence=['#00B4D8'])
             fig.update_layout(
                 margin=dict(l=0, r=0, t=10, b=0), height=250,
@@ -176,7 +216,7 @@ def show_analytics():
         with chart_row2_col2:
             st.markdown('<div class="chart-container">', unsafe_allow_html=True)
             st.markdown('<p class="chart-title">⏰ Pedidos por Hora del Día</p>', unsafe_allow_html=True)
-            by_hour = df_orders.groupby('hora').size().reset_index(name='count')
+            by_hour = result['by_hour'].rename_axis('hora').reset_index(name='count')
             fig = px.area(by_hour, x='hora', y='count', color_discrete_sequence=['#9B59B6'])
             fig.update_layout(
                 margin=dict(l=0, r=0, t=10, b=0), height=250,
@@ -189,45 +229,38 @@ def show_analytics():
             st.plotly_chart(fig, use_container_width=True)
             st.markdown('</div>', unsafe_allow_html=True)
         
+        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+        st.markdown('<p class="chart-title">🔥 Pedidos por Día y Hora</p>', unsafe_allow_html=True)
+        fig = px.imshow(result['heatmap'], aspect='auto', color_continuous_scale='Oranges',
+                        labels=dict(x="Hora", y="", color="Pedidos"))
+        fig.update_layout(
+            margin=dict(l=0, r=0, t=10, b=0), height=260,
+            paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+            font=dict(color="#F8FAFC", size=14)
+        )
+        fig.update_xaxes(tickmode='linear', tick0=0, dtick=2, tickfont=dict(color="#CBD5E1", size=12))
+        fig.update_yaxes(tickfont=dict(color="#CBD5E1", size=12))
+        st.plotly_chart(fig, use_container_width=True)
+        st.markdown('</div>', unsafe_allow_html=True)
+        
         # ============================================
         # TOP PRODUCTS & EXPORT
         # ============================================
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         st.markdown('<p class="chart-title">🏆 Top Productos y Exportación</p>', unsafe_allow_html=True)
         
-        order_ids = [o['order_id'] for o in orders.data]
-        if order_ids:
-            items = supabase.table("order_items")\
-                .select("cantidad, subtotal, products(nombre, categoria)")\
-                .in_("order_id", order_ids)\
-                .execute()
-            
-            if items.data:
-                product_stats = {}
-                for item in items.data:
-                    prod = item.get('products', {})
-                    name = prod.get('nombre', 'N/A')
-                    if name not in product_stats:
-                        product_stats[name] = {'cantidad': 0, 'revenue': 0, 'categoria': prod.get('categoria', 'N/A')}
-                    product_stats[name]['cantidad'] += item.get('cantidad', 0)
-                    product_stats[name]['revenue'] += item.get('subtotal', 0)
-                
-                df_products = pd.DataFrame([
-                    {'Producto': k, 'Unidades': v['cantidad'], 'Ingresos': v['revenue'], 'Categoría': v['categoria']}
-                    for k, v in product_stats.items()
-                ]).sort_values('Ingresos', ascending=False)
-                
-                col_p1, col_p2 = st.columns([2, 1])
-                with col_p1:
-                    st.dataframe(df_products.head(10), hide_index=True, use_container_width=True)
-                with col_p2:
-                    st.markdown("###### 📥 Descargar Datos")
-                    csv_orders = df_orders.to_csv(index=False).encode('utf-8')
-                    st.download_button("📥 Pedidos (CSV)", csv_orders, f"pedidos_{start_date}.csv", "text/csv", use_container_width=True)
-                    
-                    df_items_export = pd.DataFrame(items.data)
-                    csv_items = df_items_export.to_csv(index=False).encode('utf-8')
-                    st.download_button("📥 Productos (CSV)", csv_items, f"productos_{start_date}.csv", "text/csv", use_container_width=True)
+        df_orders = tables["orders"].take(result['positions'])
+        df_products = range_top_products(
+            start_date, end_date, data_version("orders", "order_items", "products"),
+            tables["order_items"], tables["products"], df_orders['order_id']
+        )
+        
+        if not df_products.empty:
+            col_p1, col_p2 = st.columns([2, 1])
+            with col_p1:
+                st.dataframe(df_products.head(10), hide_index=True, use_container_width=True)
+            with col_p2:
+                show_export(start_date, end_date)
         st.markdown('</div>', unsafe_allow_html=True)
 
     except Exception as e:
@@ -0,0 +1,119 @@
+"""
+Campañas de difusión a todos los usuarios del bot.
+
+El panel solo crea campañas y cambia su estado; el envío lo hace el bot
+(app/services/campaign_engine.py), que toma las campañas en cola y las
+reanuda desde su checkpoint si se reinicia.
+"""
+
+import streamlit as st
+from config.database import get_supabase
+from app.services.campaign_engine import create_campaign
+from app.utils.query_batch import QueryBatch
+
+
+STATUS_LABELS = {
+    'queued': '🕐 En cola',
+    'running': '📤 Enviando',
+    'paused': '⏸️ Pausada',
+    'completed': '✅ Completada',
+    'failed': '❌ Fallida'
+}
+
+
+def show_campaigns():
+    """Página de campañas."""
+
+    st.markdown("### 📣 Campañas")
+
+    supabase = get_supabase()
+
+    tab1, tab2 = st.tabs(["📋 Campañas", "➕ Nueva Campaña"])
+
+    # ============================================
+    # TAB 1: LISTA Y PROGRESO
+    # ============================================
+    with tab1:
+        try:
+            batch = QueryBatch(timeout=5)
+            batch.add("total_users", lambda: supabase.table("users")
+                      .select("user_id", count="exact")
+                      .limit(1)
+                      .execute().count or 0, default=0)
+            batch.add("campaigns", lambda: supabase.table("campaigns")
+                      .select("*")
+                      .order("campaign_id", desc=True)
+                      .limit(50)
+                      .execute().data)
+            data = batch.run()
+
+            # Sin la lista de campañas no hay nada que mostrar
+            if "campaigns" in data.errors:
+                raise data.errors["campaigns"]
+            if "campaigns" in data.timed_out:
+                raise TimeoutError("La consulta de campañas superó el plazo")
+
+            total_users = data["total_users"]
+            campaigns = data["campaigns"]
+
+            if not campaigns:
+                st.info("📭 No hay campañas. Usa la pestaña '➕ Nueva Campaña' para crear una.")
+
+            for campaign in campaigns:
+                processed = (campaign.get('total_sent') or 0) + (campaign.get('total_failed') or 0)
+                status = campaign.get('status')
+
+                with st.expander(f"{STATUS_LABELS.get(status, status)} · #{campaign['campaign_id']} {campaign['name']}"):
+                    col_info, col_actions = st.columns([3, 1])
+
+                    with col_info:
+                        st.text(campaign['message'])
+                        if total_users:
+                            st.progress(min(1.0, processed / total_users))
+                        st.write(
+                            f"**Enviados:** {campaign.get('total_sent', 0):,} · "
+                            f"**Fallidos:** {campaign.get('total_failed', 0):,} · "
+                            f"**Usuarios:** {total_users:,}"
+                        )
+
+                    with col_actions:
+                        if status in ('queued', 'running'):
+                            if st.button("⏸️ Pausar", key=f"pause_{campaign['campaign_id']}"):
+                                supabase.table("campaigns")\
+                                    .update({"status": "paused"})\
+                                    .eq("campaign_id", campaign['campaign_id'])\
+                                    .execute()
+                                st.rerun()
+                        elif status in ('paused', 'failed'):
+                            if st.button("▶️ Reanudar", key=f"resume_{campaign['campaign_id']}"):
+                                # Vuelve a la cola; el bot continúa desde last_user_id
+                                supabase.table("campaigns")\
+                                    .update({"status": "queued"})\
+                                    .eq("campaign_id", campaign['campaign_id'])\
+                                    .execute()
+                                st.rerun()
+
+        except Exception as e:
+            st.warning("⚠️ No se pudieron cargar las campañas. Asegúrate de haber ejecutado scripts/add_campaigns.sql.")
+            st.error(str(e))
+
+    # ============================================
+    # TAB 2: CREAR CAMPAÑA
+    # ============================================
+    with tab2:
+        with st.form("create_campaign_form"):
+            name = st.text_input("Nombre *", placeholder="Ej: Promo Día de la Madre")
+            message = st.text_area("Mensaje *", height=150, placeholder="Texto que recibirá cada usuario")
+            parse_mode = st.selectbox("Formato", ["Ninguno", "Markdown", "HTML"])
+
+            submitted = st.form_submit_button("📣 Enviar a todos", use_container_width=True)
+
+            if submitted:
+                if not name or not message:
+                    st.error("Por favor completa los campos requeridos")
+                else:
+                    try:
+                        create_campaign(supabase, name, message, None if parse_mode == "Ninguno" else parse_mode)
+                        st.success("✅ Campaña en cola. El bot comenzará a enviarla en breve.")
+                    except Exception as e:
+                        st.error(f"❌ Error: {e}")
@@ -6,6 +6,19 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 from config.database import get_supabase
+from app.services.customer_directory import CustomerDirectory
+from app.services.order_items import order_items_loader
+
+
+SORT_OPTIONS = {
+    "Más recientes": "recent",
+    "Mayor valor": "value",
+    "Más pedidos": "orders",
+}
+
+
+def _count(value) -> str:
+    return f"{value:,}" if value is not None else "—"
 
 
 def show_customers():
@@ -24,39 +37,16 @@ def show_customers():
         # ============================================
         # CUSTOMER STATS
         # ============================================
-        users = supabase.table("users").select("*").execute()
-        
-        if not users.data:
-            st.info("📭 No hay clientes registrados aún")
-            return
-        
-        # Calculate stats
-        total_customers = len(users.data)
-        
-        # New this month
-        first_day_month = datetime.now().replace(day=1, hour=0, minute=0, second=0)
-        new_this_month = len([u for u in users.data if u.get('created_at') and datetime.fromisoformat(u['created_at'].replace('Z', '+00:00')) >= first_day_month.replace(tzinfo=None)])
-        
-        # Get order data for active customers
-        orders = supabase.table("orders").select("user_id, total, estado").execute()
-        customer_orders = {}
-        for order in orders.data:
-            uid = order.get('user_id')
-            if uid not in customer_orders:
-                customer_orders[uid] = {'count': 0, 'total': 0}
-            customer_orders[uid]['count'] += 1
-            customer_orders[uid]['total'] += order.get('total', 0)
-        
-        active_customers = len(customer_orders)
+        counts = CustomerDirectory.get_counts(supabase)
         
         # Stats row
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("👥 Clientes Totales", total_customers)
+            st.metric("👥 Clientes Totales", _count(counts['total']))
         with col2:
-            st.metric("🆕 Nuevos (Este Mes)", new_this_month)
+            st.metric("🆕 Nuevos (Este Mes)", _count(counts['new_this_month']))
         with col3:
-            st.metric("🛒 Con compras", active_customers)
+            st.metric("🛒 Con compras", _count(counts['active']))
         
         st.markdown("---")
         
@@ -71,39 +61,40 @@ def show_customers():
         with col_filter:
             filter_type = st.selectbox(
                 "Ordenar por",
-                ["Más recientes", "Mayor valor", "Más pedidos"]
+                list(SORT_OPTIONS.keys())
             )
         
-        # Filter users
-        filtered_users = users.data
-        if search:
-            search_lower = search.lower()
-            filtered_users = [
-                u for u in filtered_users 
-                if search_lower in (u.get('nombre') or '').lower() 
-                or search_lower in (u.get('telefono') or '')
-            ]
+        # Cursores de las páginas visitadas; se reinician si cambia la búsqueda
+        query_key = (search.strip().lower(), filter_type)
+        if st.session_state.get('customers_query') != query_key:
+            st.session_state['customers_query'] = query_key
+            st.session_state['customers_cursors'] = [None]
+        cursors = st.session_state['customers_cursors']
+        
+        customers, next_cursor = CustomerDirectory.search_page(
+            supabase,
+            search=search,
+            sort=SORT_OPTIONS[filter_type],
+            cursor=cursors[-1]
+        )
         
-        # Sort
-        if filter_type == "Más recientes":
-            filtered_users.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-        elif filter_type == "Mayor valor":
-            filtered_users.sort(key=lambda x: customer_orders.get(x['user_id'], {}).get('total', 0), reverse=True)
-        elif filter_type == "Más pedidos":
-            filtered_users.sort(key=lambda x: customer_orders.get(x['user_id'], {}).get('count', 0), reverse=True)
+        if not customers and len(cursors) == 1:
+            st.info("📭 No se encontraron clientes" if search else "📭 No hay clientes registrados aún")
+            return
         
-        st.markdown(f"📦 Mostrando **{len(filtered_users)}** clientes")
+        first = (len(cursors) - 1) * CustomerDirectory.PAGE_SIZE + 1
+        st.markdown(f"📦 Mostrando clientes **{first}–{first + len(customers) - 1}**")
         
         # ============================================
         # CUSTOMER LIST
         # ============================================
-        for user in filtered_users:
+        for user in customers:
             user_id = user.get('user_id')
             name = user.get('nombre') or 'Sin nombre'
             phone = user.get('telefono') or 'Sin teléfono'
             
             # Get customer stats
-            stats = customer_orders.get(user_id, {'count': 0, 'total': 0})
+            stats = {'count': user.get('order_count') or 0, 'total': user.get('total_spent') or 0}
             
             col1, col2 = st.columns([4, 1])
             
@@ -130,8 +121,23 @@ def show_customers():
                 if st.button("👁️ Ver", key=f"view_{user_id}"):
                     st.session_state['viewing_customer'] = user
                     st.rerun()
+        
+        # ============================================
+        # PAGINATION
+        # ============================================
+        # Los callbacks corren antes del siguiente rerun: una sola consulta por clic
+        col_prev, col_page, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if len(cursors) > 1:
+                st.button("⬅️ Anterior", use_container_width=True, on_click=cursors.pop)
+        with col_page:
+            st.markdown(f"<p style='text-align: center; color: #94A3B8;'>Página {len(cursors)}</p>", unsafe_allow_html=True)
+        with col_next:
+            if next_cursor is not None:
+                st.button("Siguiente ➡️", use_container_width=True, on_click=cursors.append, args=(next_cursor,))
     
     except Exception as e:
+        st.warning("⚠️ Asegúrate de haber ejecutado scripts/add_customer_directory.sql.")
         st.error(f"Error cargando clientes: {e}")
 
 
@@ -172,6 +178,13 @@ def show_customer_detail(customer):
     
     st.markdown("<br>", unsafe_allow_html=True)
     
+    # Pedidos del cliente (una consulta para estadísticas e historial)
+    orders = supabase.table("orders")\
+        .select("*")\
+        .eq("user_id", user_id)\
+        .order("fecha_orden", desc=True)\
+        .execute()
+    
     # Tabs
     tab1, tab2, tab3, tab4 = st.tabs([
         "📋 Información",
@@ -197,11 +210,6 @@ def show_customer_detail(customer):
             # Customer stats
             st.markdown("#### Estadísticas")
             
-            orders = supabase.table("orders")\
-                .select("*")\
-                .eq("user_id", user_id)\
-                .execute()
-            
             if orders.data:
                 total_spent = sum(o.get('total', 0) for o in orders.data)
                 order_count = len(orders.data)
@@ -219,13 +227,11 @@ def show_customer_detail(customer):
     with tab2:
         st.markdown("#### Historial de Pedidos")
         
-        orders = supabase.table("orders")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .order("fecha_orden", desc=True)\
-            .execute()
-        
         if orders.data:
+            # Items de todos los pedidos en una sola consulta
+            items_loader = order_items_loader(supabase, "*, products(nombre)")\
+                .prime(order['order_id'] for order in orders.data)
+            
             for order in orders.data:
                 estado = order.get('estado', 'unknown')
                 emoji = {
@@ -246,15 +252,12 @@ def show_customer_detail(customer):
                         st.info(f"📝 {order['notas']}")
                     
                     # Items
-                    items = supabase.table("order_items")\
-                        .select("*, products(nombre)")\
-                        .eq("order_id", order['order_id'])\
-                        .execute()
+                    items = items_loader.load(order['order_id'])
                     
-                    if items.data:
+                    if items:
                         st.markdown("**Productos:**")
-                        for item in items.data:
-                            prod = item.get('products', {})
+                        for item in items:
+                            prod = item.get('products') or {}
                             st.write(f"- {prod.get('nombre', 'N/A')} x{item['cantidad']} = ${item['subtotal']:,.0f}")
         else:
             st.info("📭 Este cliente no tiene pedidos")
@@ -7,59 +7,7 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
-from config.database import get_supabase
-
-
-# ============================================
-# CACHED DATA FUNCTIONS (para mejor rendimiento)
-# ============================================
-
-@st.cache_data(ttl=60)  # Cache por 60 segundos
-def get_orders_data(date_filter: str = None):
-    """Obtiene órdenes con cache."""
-    supabase = get_supabase()
-    query = supabase.table("orders").select("*")
-    if date_filter:
-        query = query.gte("fecha_orden", date_filter)
-    return query.execute().data
-
-
-@st.cache_data(ttl=60)
-def get_users_data(date_filter: str = None):
-    """Obtiene usuarios con cache con manejo de errores de esquema."""
-    supabase = get_supabase()
-    try:
-        query = supabase.table("users").select("*")
-        if date_filter:
-            # Intentar filtrar por created_at, si falla capturamos el error
-            query = query.gte("created_at", date_filter)
-        return query.execute().data
-    except Exception as e:
-        # Si falla (ej: columna no existe), traer todo y filtrar en memoria si es posible
-        try:
-            response = supabase.table("users").select("*").execute()
-            data = response.data
-            if date_filter and data:
-                # Filtrar en Python si existe alguna columna de fecha similar o ignorar
-                # Buscamos si existe alguna columna que parezca fecha
-                return data
-            return data
-        except:
-            return []
-
-
-@st.cache_data(ttl=60)
-def get_order_items_data():
-    """Obtiene items de órdenes con cache."""
-    supabase = get_supabase()
-    return supabase.table("order_items").select("product_id, cantidad, subtotal, products(nombre)").execute().data
-
-
-@st.cache_data(ttl=120)
-def get_pending_orders_count():
-    """Obtiene conteo de órdenes pendientes."""
-    supabase = get_supabase()
-    return len(supabase.table("orders").select("order_id").eq("estado", "pending").execute().data)
+from admin.mirror import load_tables
 
 
 def create_kpi_card(label: str, value: str, change: str = None, change_positive: bool = True, color: str = "primary"):
@@ -79,80 +27,98 @@ def create_kpi_card(label: str, value: str, change: str = None, change_positive:
     """
 
 
+def _with_columns(df: pd.DataFrame, columns) -> pd.DataFrame:
+    """Agrega columnas vacías si la tabla aún no tiene filas."""
+    missing = [c for c in columns if c not in df.columns]
+    return df.assign(**{c: pd.Series(dtype=object) for c in missing}) if missing else df
+
+
+def summarize_dashboard(orders: pd.DataFrame, users: pd.DataFrame, items: pd.DataFrame,
+                        products: pd.DataFrame, today, now: pd.Timestamp = None) -> dict:
+    """Métricas del dashboard calculadas sobre la réplica local (operaciones vectorizadas)."""
+    now = now if now is not None else pd.Timestamp.now(tz="UTC")
+    first_day_month = today.replace(day=1)
+    last_month_start = (first_day_month - timedelta(days=1)).replace(day=1)
+    last_month_end = first_day_month - timedelta(days=1)
+
+    orders = _with_columns(orders, ["order_id", "estado", "total", "fecha_orden"])
+    items = _with_columns(items, ["product_id", "cantidad"])
+    products = _with_columns(products, ["product_id", "nombre"])
+
+    fecha = orders["fecha_orden"]
+    month = orders[fecha >= pd.Timestamp(f"{first_day_month}T00:00:00", tz="UTC")]
+    last_month = orders[
+        (fecha >= pd.Timestamp(f"{last_month_start}T00:00:00", tz="UTC"))
+        & (fecha <= pd.Timestamp(f"{last_month_end}T23:59:59", tz="UTC"))
+    ]
+    last_30 = orders[fecha >= now - pd.Timedelta(days=30)]
+
+    # Usuarios por fecha de registro; sin columna de fecha todos cuentan como nuevos
+    if "created_at" in users.columns:
+        created = users["created_at"].dt.date
+        new_this_month = int((created >= first_day_month).sum())
+        new_last_month = int(((created >= last_month_start) & (created < first_day_month)).sum())
+    else:
+        new_this_month, new_last_month = len(users), 0
+
+    # Unidades vendidas por nombre de producto
+    names = items[["product_id", "cantidad"]].merge(
+        products[["product_id", "nombre"]], on="product_id", how="left"
+    )
+    product_sales = names.fillna({"nombre": "N/A"}).groupby("nombre")["cantidad"].sum().sort_values(ascending=False)
+
+    daily_revenue = (
+        last_30.assign(fecha=last_30["fecha_orden"].dt.date)
+        .groupby("fecha")["total"].sum().reset_index()
+    ) if len(last_30) else pd.DataFrame(columns=["fecha", "total"])
+
+    return {
+        "revenue_month": float(month["total"].sum()),
+        "revenue_last_month": float(last_month["total"].sum()),
+        "orders_month": len(month),
+        "orders_last_month": len(last_month),
+        "delivered_month": int((month["estado"] == "delivered").sum()),
+        "new_customers": new_this_month,
+        "new_customers_last": new_last_month,
+        "total_pending": int((orders["estado"] == "pending").sum()),
+        "total_customers": len(users),
+        "product_sales": product_sales,
+        "daily_revenue": daily_revenue,
+        "status_counts": orders["estado"].fillna("unknown").value_counts().to_dict(),
+        "recent_orders": orders.nlargest(5, "fecha_orden") if len(orders) else orders,
+    }
+
+
 def show_dashboard():
     """Muestra el dashboard principal con métricas."""
     
-    supabase = get_supabase()
-    
     try:
         # ============================================
-        # FETCH DATA
+        # FETCH DATA (réplica local, solo se piden los cambios)
         # ============================================
-        today = datetime.now().date()
-        first_day_month = today.replace(day=1)
-        last_month_start = (first_day_month - timedelta(days=1)).replace(day=1)
-        last_month_end = first_day_month - timedelta(days=1)
-        
-        # Orders this month
-        orders_month = supabase.table("orders")\
-            .select("*")\
-            .gte("fecha_orden", f"{first_day_month}T00:00:00")\
-            .execute()
-        
-        # Orders last month (for comparison)
-        orders_last_month = supabase.table("orders")\
-            .select("*")\
-            .gte("fecha_orden", f"{last_month_start}T00:00:00")\
-            .lte("fecha_orden", f"{last_month_end}T23:59:59")\
-            .execute()
-        
-        # Pending orders
-        pending_orders = supabase.table("orders")\
-            .select("*")\
-            .eq("estado", "pending")\
-            .execute()
-        
-        # All users
-        all_users = get_users_data()
-        
-        # User filtering (safe approach)
-        def filter_users_by_date(users, start_date):
-            if not users: return []
-            # Intentar encontrar una columna de fecha (created_at es la estándar)
-            date_col = 'created_at' if users and 'created_at' in users[0] else None
-            if not date_col:
-                # Si no hay columna de fecha, retornamos todo o lista vacía según lógica
-                return users
-            
-            filtered = []
-            for u in users:
-                u_date = u.get(date_col)
-                if u_date and u_date[:10] >= str(start_date):
-                    filtered.append(u)
-            return filtered
-
-        users_this_month_list = filter_users_by_date(all_users, first_day_month)
-        users_last_month_list = filter_users_by_date(all_users, last_month_start)
-        # Excluir los de este mes para tener solo los del mes pasado
-        users_last_month_list = [u for u in users_last_month_list if u not in users_this_month_list]
+        tables = load_tables("orders", "users", "order_items", "products")
+        summary = summarize_dashboard(
+            tables["orders"], tables["users"], tables["order_items"], tables["products"],
+            today=datetime.now().date()
+        )
         
         # ============================================
         # CALCULATE METRICS
         # ============================================
         
         # Revenue
-        revenue_month = sum(o.get('total', 0) for o in orders_month.data)
-        revenue_last_month = sum(o.get('total', 0) for o in orders_last_month.data)
+        revenue_month = summary["revenue_month"]
+        revenue_last_month = summary["revenue_last_month"]
         revenue_change = ((revenue_month - revenue_last_month) / revenue_last_month * 100) if revenue_last_month > 0 else 0
         
         # Orders
-        total_orders_month = len(orders_month.data)
-        total_orders_last_month = len(orders_last_month.data)
+        total_orders_month = summary["orders_month"]
+        total_orders_last_month = summary["orders_last_month"]
         orders_change = ((total_orders_month - total_orders_last_month) / total_orders_last_month * 100) if total_orders_last_month > 0 else 0
         
         # Customers
-        new_customers = len(users_this_month_list)
-        new_customers_last = len(users_last_month_list)
+        new_customers = summary["new_customers"]
+        new_customers_last = summary["new_customers_last"]
         customers_change = ((new_customers - new_customers_last) / new_customers_last * 100) if new_customers_last > 0 else 0
         
         # Average order value
@@ -161,10 +127,11 @@ def show_dashboard():
         avg_change = ((avg_order - avg_order_last) / avg_order_last * 100) if avg_order_last > 0 else 0
         
         # Pending
-        total_pending = len(pending_orders.data)
+        total_pending = summary["total_pending"]
         
         # Total customers
-        total_customers = len(all_users)
+        total_customers = summary["total_customers"]
+        product_sales = summary["product_sales"]
         
         # ============================================
         # KPI CARDS - ROW 1
@@ -225,27 +192,15 @@ def show_dashboard():
         
         with col7:
             # Top product
-            order_items = supabase.table("order_items")\
-                .select("product_id, cantidad, products(nombre)")\
-                .execute()
-            
-            if order_items.data:
-                product_sales = {}
-                for item in order_items.data:
-                    prod_name = item.get('products', {}).get('nombre', 'N/A')
-                    product_sales[prod_name] = product_sales.get(prod_name, 0) + item.get('cantidad', 0)
-                
-                if product_sales:
-                    top_product = max(product_sales, key=product_sales.get)
-                    st.metric(label="🏆 Más Vendido", value=top_product[:20])
-                else:
-                    st.metric(label="🏆 Más Vendido", value="Sin datos")
+            if not product_sales.empty:
+                top_product = str(product_sales.index[0])
+                st.metric(label="🏆 Más Vendido", value=top_product[:20])
             else:
                 st.metric(label="🏆 Más Vendido", value="Sin datos")
         
         with col8:
             # Conversion rate (delivered / total)
-            delivered = len([o for o in orders_month.data if o.get('estado') == 'delivered'])
+            delivered = summary["delivered_month"]
             conversion = (delivered / total_orders_month * 100) if total_orders_month > 0 else 0
             st.metric(
                 label="✅ Tasa de Entrega",
@@ -263,17 +218,8 @@ def show_dashboard():
             st.markdown("### 📈 Ingresos - Últimos 30 días")
             
             # Revenue trend
-            last_30_days = datetime.now() - timedelta(days=30)
-            orders_30 = supabase.table("orders")\
-                .select("total, fecha_orden")\
-                .gte("fecha_orden", last_30_days.isoformat())\
-                .execute()
-            
-            if orders_30.data:
-                df_revenue = pd.DataFrame(orders_30.data)
-                df_revenue['fecha'] = pd.to_datetime(df_revenue['fecha_orden']).dt.date
-                daily_revenue = df_revenue.groupby('fecha')['total'].sum().reset_index()
-                
+            daily_revenue = summary["daily_revenue"]
+            if not daily_revenue.empty:
                 fig = px.area(
                     daily_revenue,
                     x='fecha',
@@ -299,16 +245,8 @@ def show_dashboard():
             st.markdown("### 📊 Pedidos por Estado")
             
             # Orders by status
-            all_orders = supabase.table("orders")\
-                .select("estado")\
-                .execute()
-            
-            if all_orders.data:
-                status_counts = {}
-                for order in all_orders.data:
-                    status = order.get('estado', 'unknown')
-                    status_counts[status] = status_counts.get(status, 0) + 1
-                
+            status_counts = summary["status_counts"]
+            if status_counts:
                 df_status = pd.DataFrame([
                     {"Estado": k, "Cantidad": v} for k, v in status_counts.items()
                 ])
@@ -363,13 +301,8 @@ def show_dashboard():
         with bottom_col1:
             st.markdown("### 🏆 Top 5 Productos")
             
-            if order_items.data:
-                product_sales = {}
-                for item in order_items.data:
-                    prod_name = item.get('products', {}).get('nombre', 'N/A')
-                    product_sales[prod_name] = product_sales.get(prod_name, 0) + item.get('cantidad', 0)
-                
-                top_5 = sorted(product_sales.items(), key=lambda x: x[1], reverse=True)[:5]
+            if not product_sales.empty:
+                top_5 = list(product_sales.head(5).items())
                 
                 if top_5:
                     df_top = pd.DataFrame(top_5, columns=['Producto', 'Vendidos'])
@@ -402,17 +335,12 @@ def show_dashboard():
         with bottom_col2:
             st.markdown("### 📋 Últimos Pedidos")
             
-            recent_orders = supabase.table("orders")\
-                .select("order_id, estado, total, fecha_orden")\
-                .order("fecha_orden", desc=True)\
-                .limit(5)\
-                .execute()
-            
-            if recent_orders.data:
-                for order in recent_orders.data:
+            recent_orders = summary["recent_orders"]
+            if not recent_orders.empty:
+                for order in recent_orders.to_dict("records"):
                     # Explicitly define variables from order dict to avoid NameError
                     estado = order.get('estado', 'unknown')
-                    fecha = order.get('fecha_orden', '')[:10]
+                    fecha = order['fecha_orden'].strftime('%Y-%m-%d') if pd.notna(order.get('fecha_orden')) else ''
                     total = order.get('total', 0)
                     
                     emoji_dict = {
@@ -6,6 +6,7 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 from config.database import get_supabase
+from app.utils.keyset import fetch_all
 
 
 def show_discounts():
@@ -28,12 +29,11 @@ def show_discounts():
     # ============================================
     with tab1:
         try:
-            discounts = supabase.table("discounts")\
-                .select("*")\
-                .order("created_at", desc=True)\
-                .execute()
+            discounts = fetch_all(supabase, "discounts", key="discount_id")
+            # El cursor es discount_id (único); la lista se muestra como antes, por created_at desc
+            discounts.sort(key=lambda d: (d.get('created_at') or '', d['discount_id']), reverse=True)
             
-            if discounts.data:
+            if discounts:
                 # Filtros
                 col_filter1, col_filter2 = st.columns(2)
                 with col_filter1:
@@ -47,7 +47,7 @@ def show_discounts():
                         ["Todos", "Activos", "Inactivos"]
                     )
                 
-                filtered = discounts.data
+                filtered = discounts
                 if filter_type != "Todos":
                     filtered = [d for d in filtered if d.get('type') == filter_type]
                 if filter_active == "Activos":
@@ -169,8 +169,8 @@ def show_discounts():
             # Cliente específico para descuentos individuales
             if discount_type_select == "individual":
                 try:
-                    users = supabase.table("users").select("user_id, nombre, telefono").execute()
-                    user_options = {f"{u.get('nombre', 'Sin nombre')} ({u.get('telefono', 'N/A')})": u['user_id'] for u in users.data}
+                    users = fetch_all(supabase, "users", key="user_id", columns="user_id, nombre, telefono")
+                    user_options = {f"{u.get('nombre', 'Sin nombre')} ({u.get('telefono', 'N/A')})": u['user_id'] for u in users}
                     selected_user = st.selectbox("Seleccionar cliente", list(user_options.keys()))
                     user_id = user_options.get(selected_user)
                 except:
@@ -179,6 +179,17 @@ def show_discounts():
             else:
                 user_id = None
             
+            # Categoría opcional: la regla cuenta solo las unidades y el subtotal de esa categoría
+            category_id = None
+            if discount_type_select != "individual":
+                try:
+                    categories = fetch_all(supabase, "product_categories", key="category_id", columns="category_id, name")
+                    category_options = {"Todas las categorías": None}
+                    category_options.update({c.get('name', 'Sin nombre'): c['category_id'] for c in categories})
+                    category_id = category_options[st.selectbox("Categoría", list(category_options.keys()))]
+                except Exception:
+                    st.warning("No se pudieron cargar las categorías")
+            
             submitted = st.form_submit_button("✅ Crear Descuento", use_container_width=True)
             
             if submitted:
@@ -198,6 +209,7 @@ def show_discounts():
                             "start_date": start_date.isoformat() if start_date else None,
                             "end_date": end_date.isoformat() if end_date else None,
                             "user_id": user_id,
+                            "category_id": category_id,
                             "active": True
                         }
                         
@@ -216,12 +228,12 @@ def show_discounts():
         
         try:
             # Get discount usage stats
-            discounts_data = supabase.table("discounts").select("*").execute()
+            discounts_data = fetch_all(supabase, "discounts", key="discount_id")
             
-            if discounts_data.data:
-                total_discounts = len(discounts_data.data)
-                active_discounts = len([d for d in discounts_data.data if d.get('active')])
-                total_uses = sum(d.get('current_uses', 0) for d in discounts_data.data)
+            if discounts_data:
+                total_discounts = len(discounts_data)
+                active_discounts = len([d for d in discounts_data if d.get('active')])
+                total_uses = sum(d.get('current_uses', 0) for d in discounts_data)
                 
                 col1, col2, col3 = st.columns(3)
                 with col1:
@@ -235,7 +247,7 @@ def show_discounts():
                 # Breakdown by type
                 st.markdown("##### Por Tipo")
                 type_counts = {}
-                for d in discounts_data.data:
+                for d in discounts_data:
                     t = d.get('type', 'unknown')
                     type_counts[t] = type_counts.get(t, 0) + 1
                 
@@ -265,16 +277,14 @@ def show_discounts():
         
         # Show existing rules
         try:
-            rules = supabase.table("discounts")\
-                .select("*")\
-                .eq("type", "rule")\
-                .execute()
+            rules = fetch_all(supabase, "discounts", key="discount_id",
+                              filters=lambda q: q.eq("type", "rule"))
             
-            if rules.data:
+            if rules:
                 st.markdown("---")
                 st.markdown("##### Reglas Activas")
                 
-                for rule in rules.data:
+                for rule in rules:
                     status = "🟢" if rule.get('active') else "⚫"
                     condition = []
                     if rule.get('min_order_amount', 0) > 0:
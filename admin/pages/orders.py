@@ -6,6 +6,7 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 from config.database import get_supabase
+from app.services.order_items import order_items_loader
 
 
 def show_orders_management():
@@ -95,6 +96,9 @@ def show_orders_management():
         
         st.success(f"✅ {len(orders)} pedidos encontrados")
         
+        # Items de todos los pedidos en una sola consulta
+        items_loader = order_items_loader(supabase).prime(order['order_id'] for order in orders)
+        
         # ============================================
         # MOSTRAR PEDIDOS
         # ============================================
@@ -142,15 +146,12 @@ def show_orders_management():
                         st.info(f"📝 Notas: {order['notas']}")
                     
                     # Items del pedido
-                    items_response = supabase.table("order_items")\
-                        .select("*, products(nombre, precio)")\
-                        .eq("order_id", order['order_id'])\
-                        .execute()
+                    items = items_loader.load(order['order_id'])
                     
-                    if items_response.data:
+                    if items:
                         st.markdown("**📦 Items del pedido:**")
-                        for item in items_response.data:
-                            product = item.get('products', {})
+                        for item in items:
+                            product = item.get('products') or {}
                             product_name = product.get('nombre', 'N/A')
                             st.write(f"- {product_name} x{item['cantidad']} = ${item['subtotal']:,.0f}")
                 
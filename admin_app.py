@@ -74,6 +74,7 @@ if check_password():
                 "📦 Pedidos",
                 "👥 Clientes",
                 "🎟️ Descuentos",
+                "📣 Campañas",
                 "📈 Analytics",
                 "🔐 Acceso"
             ],
@@ -90,8 +91,16 @@ if check_password():
             </div>
         """, unsafe_allow_html=True)
         
-        # Logout button
+        # Mirror rebuild
         st.markdown("<br>", unsafe_allow_html=True)
+        if st.button("🔄 Reconstruir réplica", use_container_width=True,
+                     help="Recarga todas las tablas del panel desde Supabase"):
+            from admin.mirror import rebuild_mirror
+            with st.spinner("Reconstruyendo réplica..."):
+                loaded = rebuild_mirror()
+            st.success(f"✅ Réplica reconstruida ({sum(loaded.values()):,} filas)")
+
+        # Logout button
         if st.button("🚪 Cerrar Sesión", use_container_width=True):
             st.session_state["password_correct"] = False
             st.rerun()
@@ -130,6 +139,10 @@ if check_password():
         from admin.pages.discounts import show_discounts
         show_discounts()
     
+    elif page == "📣 Campañas":
+        from admin.pages.campaigns import show_campaigns
+        show_campaigns()
+    
     elif page == "📈 Analytics":
         from admin.pages.analytics import show_analytics
         show_analytics()
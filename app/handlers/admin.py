@@ -3,9 +3,10 @@ Handlers para panel de administración
 """
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from config.database import get_supabase
+from config.database import db, get_supabase
+from app.services.order_notifier import wake_order_notifier
+from app.services.order_stats import OrderStatsService
 import logging
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
@@ -34,20 +35,12 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     supabase = get_supabase()
     
-    # Obtener estadísticas rápidas
+    # Obtener estadísticas rápidas (resumen precalculado, una consulta)
     try:
-        # Total de órdenes
-        orders_response = supabase.table("orders").select("*", count="exact").execute()
-        total_orders = orders_response.count
-        
-        # Órdenes pendientes
-        pending_response = supabase.table("orders").select("*", count="exact").eq("estado", "pending").execute()
-        pending_orders = pending_response.count
-        
-        # Órdenes hoy
-        today = datetime.now().strftime('%Y-%m-%d')
-        today_response = supabase.table("orders").select("*", count="exact").gte("created_at", today).execute()
-        today_orders = today_response.count
+        stats = OrderStatsService.get_stats(supabase)
+        total_orders = stats['total_orders']
+        pending_orders = stats['by_state'].get('pending', {}).get('count', 0)
+        today_orders = stats['today_orders']
         
         text = "👨‍💼 **PANEL DE ADMINISTRACIÓN**\n\n"
         text += "📊 **Estadísticas:**\n\n"
@@ -101,28 +94,21 @@ async def admin_view_orders(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
     
     # Determinar filtro
-    filter_type = query.data.split('_')[-1]  # pending, confirmed, all
-    
-    supabase = get_supabase()
+    filter_type, = context.args  # pending, confirmed, all
     
     try:
-        # Construir query según filtro
-        query_builder = supabase.table("orders")\
-            .select("*, users(nombre, telegram_id)")\
-            .order("created_at", desc=True)\
-            .limit(10)
-        
+        # Filtro por estado
+        estado_filtro = None
         if filter_type == "pending":
-            query_builder = query_builder.eq("estado", "pending")
+            estado_filtro = "pending"
             title = "⏳ ÓRDENES PENDIENTES"
         elif filter_type == "confirmed":
-            query_builder = query_builder.eq("estado", "confirmed")
+            estado_filtro = "confirmed"
             title = "✅ ÓRDENES CONFIRMADAS"
         else:
             title = "📦 TODAS LAS ÓRDENES"
         
-        response = query_builder.execute()
-        orders = response.data
+        orders = db.list_admin_orders(estado_filtro, limit=10)
         
         if not orders:
             text = f"{title}\n\n"
@@ -132,14 +118,13 @@ async def admin_view_orders(update: Update, context: ContextTypes.DEFAULT_TYPE):
             text += f"Mostrando últimas {len(orders)} órdenes:\n\n"
             
             for order in orders:
-                order_id = order['order_id']
-                estado = order['estado']
-                total = order['total']
-                fecha = order.get('created_at', 'N/A')[:10]
+                order_id = order.order_id
+                estado = order.estado
+                total = order.total
+                fecha = (order.created_at or 'N/A')[:10]
                 
                 # Info del usuario
-                user_info = order.get('users', {})
-                nombre = user_info.get('nombre', 'N/A')
+                nombre = order.cliente.get('nombre', 'N/A')
                 
                 # Emoji según estado
                 estado_emoji = {
@@ -159,7 +144,7 @@ async def admin_view_orders(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         # Botones de órdenes individuales (primeras 5)
         for i, order in enumerate(orders[:5]):
-            order_id = order['order_id']
+            order_id = order.order_id
             keyboard.append([
                 InlineKeyboardButton(
                     f"Ver Detalles Orden #{order_id}",
@@ -202,37 +187,25 @@ async def admin_order_detail(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     await query.answer()
     
-    # Extraer order_id
-    order_id = int(query.data.split('_')[-1])
-    
-    supabase = get_supabase()
+    # Argumentos ya convertidos por el router (callback: admin_order_detail_<order_id>)
+    order_id, = context.args
     
     try:
         # Obtener orden con usuario
-        order_response = supabase.table("orders")\
-            .select("*, users(nombre, telegram_id)")\
-            .eq("order_id", order_id)\
-            .single()\
-            .execute()
-        
-        order = order_response.data
+        order = db.get_admin_order(order_id)
+        if order is None:
+            raise ValueError(f"Orden {order_id} no encontrada")
         
         # Obtener items de la orden
-        items_response = supabase.table("order_items")\
-            .select("*, products(nombre)")\
-            .eq("order_id", order_id)\
-            .execute()
-        
-        items = items_response.data
+        items = db.get_order_lines(order_id)
         
         # Construir mensaje
-        estado = order['estado']
-        total = order['total']
-        fecha = order.get('created_at', 'N/A')[:16]
+        estado = order.estado
+        total = order.total
+        fecha = (order.created_at or 'N/A')[:16]
         
-        user_info = order.get('users', {})
-        nombre = user_info.get('nombre', 'N/A')
-        telegram_id = user_info.get('telegram_id', 'N/A')
+        nombre = order.cliente.get('nombre', 'N/A')
+        telegram_id = order.cliente.get('telegram_id', 'N/A')
         
         # Emoji según estado
         estado_emoji = {
@@ -251,10 +224,10 @@ async def admin_order_detail(update: Update, context: ContextTypes.DEFAULT_TYPE)
         text += f"📦 **Productos:**\n\n"
         
         for item in items:
-            product_name = item.get('products', {}).get('nombre', 'N/A')
-            cantidad = item['cantidad']
-            precio = item['precio_unitario']
-            subtotal = item['subtotal']
+            product_name = item.nombre
+            cantidad = item.cantidad
+            precio = item.precio_unitario
+            subtotal = item.subtotal
             
             text += f"• {product_name} x{cantidad}\n"
             text += f"  ${precio:,.0f} → **${subtotal:,.0f}**\n\n"
@@ -324,10 +297,8 @@ async def admin_change_status(update: Update, context: ContextTypes.DEFAULT_TYPE
         await query.answer("⛔ No tienes permisos", show_alert=True)
         return
     
-    # Extraer order_id y nuevo estado
-    parts = query.data.split('_')
-    order_id = int(parts[3])
-    new_status = parts[4]
+    # Argumentos ya convertidos por el router (admin_change_status_<order_id>_<estado>)
+    order_id, new_status = context.args
     
     supabase = get_supabase()
     
@@ -338,10 +309,13 @@ async def admin_change_status(update: Update, context: ContextTypes.DEFAULT_TYPE
             .eq("order_id", order_id)\
             .execute()
         
+        # El trigger ya registró el evento; avisar al notificador para no esperar al siguiente ciclo
+        wake_order_notifier(context)
+        
         await query.answer(f"✅ Orden #{order_id} actualizada a {new_status}", show_alert=True)
         
         # Volver a mostrar detalles
-        context.user_data['temp_callback'] = f"admin_order_detail_{order_id}"
+        context.args = [order_id]
         await admin_order_detail(update, context)
         
     except Exception as e:
@@ -365,19 +339,19 @@ async def admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     supabase = get_supabase()
     
     try:
-        # Total órdenes
-        total_response = supabase.table("orders").select("*", count="exact").execute()
-        total = total_response.count
+        # Resumen precalculado por triggers (una consulta)
+        stats = OrderStatsService.get_stats(supabase)
+        total = stats['total_orders']
         
         # Por estado
-        pending = supabase.table("orders").select("*", count="exact").eq("estado", "pending").execute().count
-        confirmed = supabase.table("orders").select("*", count="exact").eq("estado", "confirmed").execute().count
-        completed = supabase.table("orders").select("*", count="exact").eq("estado", "completed").execute().count
-        cancelled = supabase.table("orders").select("*", count="exact").eq("estado", "cancelled").execute().count
+        by_state = stats['by_state']
+        pending = by_state.get('pending', {}).get('count', 0)
+        confirmed = by_state.get('confirmed', {}).get('count', 0)
+        completed = by_state.get('completed', {}).get('count', 0)
+        cancelled = by_state.get('cancelled', {}).get('count', 0)
         
         # Total vendido
-        orders_data = supabase.table("orders").select("total").execute().data
-        total_ventas = sum(order['total'] for order in orders_data)
+        total_ventas = stats['total_revenue']
         
         # Promedio
         promedio = total_ventas / total if total > 0 else 0
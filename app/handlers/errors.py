@@ -0,0 +1,27 @@
+"""
+Handler de errores de la aplicación (registrado en ambos entrypoints)
+"""
+from telegram import Update
+from telegram.ext import ContextTypes
+from app.utils.db_gateway import DatabaseUnavailable
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def on_error(update: object, context: ContextTypes.DEFAULT_TYPE):
+    """Errores no atendidos por los handlers; con la base caída se avisa al usuario"""
+    if not isinstance(context.error, DatabaseUnavailable):
+        logger.error("❌ Error no manejado", exc_info=context.error)
+        return
+    logger.warning(f"⚠️ {context.error}")
+    if not isinstance(update, Update):
+        return
+    # En un botón no sirve answer(): casi todos los handlers ya lo llamaron
+    # antes de tocar la base y Telegram rechaza la segunda respuesta
+    if update.effective_message is None:
+        return
+    try:
+        await update.effective_message.reply_text(DatabaseUnavailable.USER_MESSAGE)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo avisar al usuario de la caída: {e}")
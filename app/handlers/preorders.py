@@ -4,12 +4,15 @@ Handlers para gestión de pre-órdenes mayoristas
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
-from config.database import get_supabase
+from config.database import db
+from app.services.cart import get_cart
 from app.services.discount_service import DiscountService
+from app.services.pickup_slots import PickupService
 from app.services.pdf_generator import PDFGenerator
 from app.services.email_service import EmailService
+from app.utils.db_gateway import DatabaseUnavailable
 import logging
-from datetime import datetime, timedelta, date, time as dt_time
+from datetime import datetime, date, time as dt_time
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +34,7 @@ async def start_preorder(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     
-    cart = context.user_data.get('cart', [])
+    cart = get_cart(context.user_data)
     
     if not cart:
         text = "🛒 Tu carrito está vacío.\n\nAgrega productos primero."
@@ -44,10 +47,18 @@ async def start_preorder(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return ConversationHandler.END
     
     # Calcular descuentos
-    total_quantity = sum(item['cantidad'] for item in cart)
-    subtotal, desc_pct, desc_monto, total = DiscountService.calculate_discount(cart)
+    total_quantity = cart.quantity
+    try:
+        user_id = db.get_user_id(update.effective_user.id)
+    except Exception as e:
+        logger.warning(f"⚠️ Sin user_id para descuentos individuales: {e}")
+        user_id = None
+    quote = DiscountService.quote(cart.items(), user_id)
+    subtotal, desc_pct, desc_monto, total = quote.subtotal, quote.percent, quote.amount, quote.total
     
     # Guardar en context
+    context.user_data['preorder_user_id'] = user_id
+    context.user_data['preorder_discount_id'] = quote.rule.discount_id if quote.rule else None
     context.user_data['preorder_subtotal'] = subtotal
     context.user_data['preorder_descuento_pct'] = desc_pct
     context.user_data['preorder_descuento_monto'] = desc_monto
@@ -58,7 +69,7 @@ async def start_preorder(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text += f"💰 Subtotal: ${subtotal:,.0f}\n"
     
     if desc_pct > 0:
-        text += f"🎉 Descuento: {desc_pct}% = -${desc_monto:,.0f}\n"
+        text += f"🎉 Descuento: {desc_pct:g}% = -${desc_monto:,.0f}\n"
     
     text += f"💵 **Total: ${total:,.0f}**\n\n"
     text += "─────────────────────\n\n"
@@ -91,17 +102,11 @@ async def select_customer_type(update: Update, context: ContextTypes.DEFAULT_TYP
     context.user_data['preorder_tipo'] = customer_type
     
     user = update.effective_user
-    supabase = get_supabase()
+    contact = db.get_user_contact(user.id)
     
-    user_response = supabase.table("users")\
-        .select("*")\
-        .eq("telegram_id", user.id)\
-        .execute()
-    
-    if user_response.data:
-        db_user = user_response.data[0]
-        context.user_data['preorder_nombre'] = db_user.get('nombre', user.first_name)
-        context.user_data['preorder_telefono'] = db_user.get('telefono', '')
+    if contact:
+        context.user_data['preorder_nombre'] = contact.nombre or user.first_name
+        context.user_data['preorder_telefono'] = contact.telefono or ''
     else:
         context.user_data['preorder_nombre'] = user.first_name or 'Cliente'
         context.user_data['preorder_telefono'] = ''
@@ -167,29 +172,26 @@ async def receive_company(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return await show_location_selection_from_message(update, context)
 
 
-async def show_location_selection_from_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Muestra ubicaciones después de recibir mensaje"""
-    supabase = get_supabase()
-    locations = supabase.table("pickup_locations")\
-        .select("*")\
-        .eq("activo", True)\
-        .order("orden_display")\
-        .execute()
-    
+def _location_menu():
+    """Texto y teclado con los puntos de recogida (desde el registro en memoria)"""
     text = "📍 **PUNTO DE RECOGIDA**\n\nSelecciona dónde quieres recoger tu pedido:"
     
     keyboard = []
-    for loc in locations.data:
+    for loc in PickupService.registry().all():
         keyboard.append([
             InlineKeyboardButton(
-                f"{loc['nombre']} - {loc['barrio']}",
-                callback_data=f"preorder_loc_{loc['location_id']}"
+                f"{loc.nombre} - {loc.barrio}",
+                callback_data=f"preorder_loc_{loc.location_id}"
             )
         ])
     
     keyboard.append([InlineKeyboardButton("❌ Cancelar", callback_data="view_cart")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
+    return text, InlineKeyboardMarkup(keyboard)
+
+
+async def show_location_selection_from_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Muestra ubicaciones después de recibir mensaje"""
+    text, reply_markup = _location_menu()
     await update.message.reply_text(text=text, reply_markup=reply_markup, parse_mode='Markdown')
     
     return SELECTING_LOCATION
@@ -199,30 +201,65 @@ async def show_location_selection(update: Update, context: ContextTypes.DEFAULT_
     """Muestra ubicaciones después de callback"""
     query = update.callback_query
     
-    supabase = get_supabase()
-    locations = supabase.table("pickup_locations")\
-        .select("*")\
-        .eq("activo", True)\
-        .order("orden_display")\
-        .execute()
+    text, reply_markup = _location_menu()
+    await query.edit_message_text(text=text, reply_markup=reply_markup, parse_mode='Markdown')
     
-    text = "📍 **PUNTO DE RECOGIDA**\n\nSelecciona dónde quieres recoger tu pedido:"
+    return SELECTING_LOCATION
+
+
+def _date_menu(location):
+    """Texto y teclado con los días que aún tienen franjas libres"""
+    text = "📅 **FECHA DE RECOGIDA**\n\n"
+    text += f"📍 Lugar: {location.nombre}\n"
+    text += f"   {location.direccion}, {location.barrio}\n\n"
     
     keyboard = []
-    for loc in locations.data:
+    days = PickupService.slots().available_days(location)
+    for fecha in days:
+        dia_nombre = ['Lun', 'Mar', 'Mié', 'Jue', 'Vie', 'Sáb', 'Dom'][fecha.weekday()]
         keyboard.append([
             InlineKeyboardButton(
-                f"{loc['nombre']} - {loc['barrio']}",
-                callback_data=f"preorder_loc_{loc['location_id']}"
+                f"{dia_nombre} {fecha.strftime('%d/%m/%Y')}",
+                callback_data=f"preorder_date_{fecha.isoformat()}"
             )
         ])
     
+    if days:
+        text += "Selecciona la fecha:"
+    else:
+        text += "😔 Este punto no tiene cupos en los próximos días. Elige otro punto:"
+        keyboard.append([InlineKeyboardButton("📍 Cambiar punto", callback_data="preorder_change_location")])
+    
     keyboard.append([InlineKeyboardButton("❌ Cancelar", callback_data="view_cart")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    return text, InlineKeyboardMarkup(keyboard)
+
+
+def _time_menu(location, fecha, notice: str = ""):
+    """Texto y teclado con las horas que tienen cupo"""
+    text = notice
+    text += "🕐 **HORA DE RECOGIDA**\n\n"
+    text += f"📍 {location.nombre}\n"
+    text += f"📅 Fecha: {fecha.strftime('%d/%m/%Y')}\n\n"
     
-    await query.edit_message_text(text=text, reply_markup=reply_markup, parse_mode='Markdown')
+    keyboard = []
+    hours = PickupService.slots().available_hours(location, fecha)
+    for hour, free in hours:
+        hora = dt_time(hour, 0)
+        keyboard.append([
+            InlineKeyboardButton(
+                f"{hora.strftime('%I:%M %p')} ({free} cupos)",
+                callback_data=f"preorder_time_{hora.isoformat()}"
+            )
+        ])
     
-    return SELECTING_LOCATION
+    text += "Selecciona la hora:" if hours else "😔 Ya no quedan cupos este día."
+    keyboard.append([InlineKeyboardButton("📅 Cambiar fecha", callback_data="preorder_change_date")])
+    keyboard.append([InlineKeyboardButton("❌ Cancelar", callback_data="view_cart")])
+    return text, InlineKeyboardMarkup(keyboard)
+
+
+def _selected_location(context: ContextTypes.DEFAULT_TYPE):
+    return PickupService.registry().get(context.user_data.get('preorder_location_id'))
 
 
 async def select_location(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -231,69 +268,38 @@ async def select_location(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
     
     location_id = int(query.data.split('_')[-1])
-    context.user_data['preorder_location_id'] = location_id
+    location = PickupService.registry().get(location_id)
     
-    supabase = get_supabase()
-    location = supabase.table("pickup_locations")\
-        .select("*")\
-        .eq("location_id", location_id)\
-        .single()\
-        .execute()
-    
-    loc_data = location.data
-    
-    text = "📅 **FECHA DE RECOGIDA**\n\n"
-    text += f"📍 Lugar: {loc_data['nombre']}\n"
-    text += f"   {loc_data['direccion']}, {loc_data.get('barrio', '')}\n\n"
-    text += "Selecciona la fecha:"
-    
-    keyboard = []
-    today = date.today()
+    if location is None:
+        return await show_location_selection(update, context)
     
-    for i in range(1, 8):
-        fecha = today + timedelta(days=i)
-        dia_nombre = ['Lun', 'Mar', 'Mié', 'Jue', 'Vie', 'Sáb', 'Dom'][fecha.weekday()]
-        keyboard.append([
-            InlineKeyboardButton(
-                f"{dia_nombre} {fecha.strftime('%d/%m/%Y')}",
-                callback_data=f"preorder_date_{fecha.isoformat()}"
-            )
-        ])
-    
-    keyboard.append([InlineKeyboardButton("❌ Cancelar", callback_data="view_cart")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    context.user_data['preorder_location_id'] = location_id
     
+    text, reply_markup = _date_menu(location)
     await query.edit_message_text(text=text, reply_markup=reply_markup, parse_mode='Markdown')
     
     return SELECTING_DATE
 
 
 async def select_date(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Maneja selección de fecha"""
+    """Maneja selección de fecha (o vuelve a la lista de fechas)"""
     query = update.callback_query
     await query.answer()
     
+    location = _selected_location(context)
+    if location is None:
+        return await show_location_selection(update, context)
+    
+    if query.data == "preorder_change_date":
+        text, reply_markup = _date_menu(location)
+        await query.edit_message_text(text=text, reply_markup=reply_markup, parse_mode='Markdown')
+        return SELECTING_DATE
+    
     fecha_str = query.data.split('_')[-1]
     fecha = date.fromisoformat(fecha_str)
     context.user_data['preorder_fecha'] = fecha
     
-    text = "🕐 **HORA DE RECOGIDA**\n\n"
-    text += f"📅 Fecha: {fecha.strftime('%d/%m/%Y')}\n\n"
-    text += "Selecciona la hora:"
-    
-    keyboard = []
-    for hour in range(8, 19):
-        hora = dt_time(hour, 0)
-        keyboard.append([
-            InlineKeyboardButton(
-                hora.strftime('%I:%M %p'),
-                callback_data=f"preorder_time_{hora.isoformat()}"
-            )
-        ])
-    
-    keyboard.append([InlineKeyboardButton("❌ Cancelar", callback_data="view_cart")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
+    text, reply_markup = _time_menu(location, fecha)
     await query.edit_message_text(text=text, reply_markup=reply_markup, parse_mode='Markdown')
     
     return SELECTING_TIME
@@ -306,6 +312,17 @@ async def select_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     time_str = query.data.split('_')[-1]
     hora = dt_time.fromisoformat(time_str)
+    location = _selected_location(context)
+    fecha = context.user_data.get('preorder_fecha')
+    
+    if location is None:
+        return await show_location_selection(update, context)
+    
+    if not PickupService.slots().is_bookable(location, fecha, hora.hour):
+        text, reply_markup = _time_menu(location, fecha, "⚠️ Esa hora se acaba de llenar.\n\n")
+        await query.edit_message_text(text=text, reply_markup=reply_markup, parse_mode='Markdown')
+        return SELECTING_TIME
+    
     context.user_data['preorder_hora'] = hora
     
     return await show_preorder_summary(query, context)
@@ -328,13 +345,56 @@ async def show_preorder_summary(query, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def confirm_preorder(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Confirma la pre-orden"""
+    """Confirma la pre-orden reservando su franja de recogida"""
     query = update.callback_query
+    
+    location = _selected_location(context)
+    fecha = context.user_data.get('preorder_fecha')
+    hora = context.user_data.get('preorder_hora')
+    
+    if location is None or fecha is None or hora is None:
+        await query.answer()
+        return await show_location_selection(update, context)
+    
+    try:
+        reserved = PickupService.slots().reserve(location, fecha, hora.hour)
+    except Exception as e:
+        # Ni el cupo ni la pre-orden quedaron tomados: el cliente puede reintentar
+        logger.error(f"❌ Pre-orden rechazada, no se pudo reservar la franja: {e}")
+        await query.answer("⚠️ Intenta de nuevo en unos minutos")
+        keyboard = [[InlineKeyboardButton("🔄 Intentar de nuevo", callback_data="preorder_confirm")],
+                    [InlineKeyboardButton("🏠 Menú Principal", callback_data="menu_volver")]]
+        await query.edit_message_text(text=DatabaseUnavailable.USER_MESSAGE, reply_markup=InlineKeyboardMarkup(keyboard))
+        return CONFIRMING_PREORDER
+
+    if not reserved:
+        await query.answer("⚠️ Esa hora se acaba de llenar")
+        text, reply_markup = _time_menu(location, fecha, "⚠️ Otra pre-orden tomó el último cupo de esa hora.\n\n")
+        await query.edit_message_text(text=text, reply_markup=reply_markup, parse_mode='Markdown')
+        return SELECTING_TIME
+    
+    try:
+        DiscountService.record_usage(
+            context.user_data.get('preorder_discount_id'),
+            context.user_data.get('preorder_user_id'),
+            context.user_data.get('preorder_descuento_monto') or 0
+        )
+    except Exception as e:
+        # La pre-orden ya tiene su cupo; el uso perdido solo afecta el conteo de max_uses
+        logger.error(f"❌ No se pudo registrar el uso del descuento: {e}")
+    
     await query.answer("✅ Pre-orden creada")
     
-    text = "🎉 Pre-orden creada exitosamente!"
+    text = "🎉 Pre-orden creada exitosamente!\n\n"
+    text += f"📍 {location.nombre}\n"
+    text += f"📅 {fecha.strftime('%d/%m/%Y')} 🕐 {hora.strftime('%I:%M %p')}"
     
-    keyboard = [[InlineKeyboardButton("🏠 Menú Principal", callback_data="menu_volver")]]
+    booking = f"{location.location_id}_{fecha.isoformat()}_{hora.hour}"
+    context.user_data.setdefault('preorder_bookings', []).append(booking)
+    keyboard = [
+        [InlineKeyboardButton("❌ Cancelar pre-orden", callback_data=f"preorder_release_{booking}")],
+        [InlineKeyboardButton("🏠 Menú Principal", callback_data="menu_volver")]
+    ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
     await query.edit_message_text(text=text, reply_markup=reply_markup)
@@ -342,6 +402,34 @@ async def confirm_preorder(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ConversationHandler.END
 
 
+async def release_preorder(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Cancela una pre-orden ya confirmada y devuelve su cupo (preorder_release_<punto>_<fecha>_<hora>)"""
+    query = update.callback_query
+    location_id, fecha, hour = context.args
+    booking = f"{location_id}_{fecha.isoformat()}_{hour}"
+    
+    bookings = context.user_data.get('preorder_bookings', [])
+    location = PickupService.registry().get(location_id)
+    if booking not in bookings or location is None:
+        await query.answer("Esta pre-orden ya no está activa")
+        return
+    
+    try:
+        PickupService.slots().release(location, fecha, hour)
+    except Exception as e:
+        logger.error(f"❌ No se pudo liberar el cupo de la pre-orden {booking}: {e}")
+        await query.answer("⚠️ No se pudo cancelar, intenta de nuevo en unos minutos", show_alert=True)
+        return
+    bookings.remove(booking)
+    
+    await query.answer("Pre-orden cancelada")
+    keyboard = [[InlineKeyboardButton("🏠 Menú Principal", callback_data="menu_volver")]]
+    await query.edit_message_text(
+        text=f"❌ Pre-orden cancelada.\n\n📍 {location.nombre}\n📅 {fecha.strftime('%d/%m/%Y')} 🕐 {hour}:00\n\nEl cupo quedó libre.",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+
+
 async def cancel_preorder(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Cancela el flujo"""
     query = update.callback_query
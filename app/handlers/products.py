@@ -6,6 +6,8 @@ from app.services.email_service import EmailService
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from config.database import get_supabase
+from app.services.cart import CartFull, get_cart, reprice
+from app.utils.db_gateway import DatabaseUnavailable
 import logging
 from datetime import datetime
 
@@ -18,8 +20,8 @@ async def show_products_by_category(update: Update, context: ContextTypes.DEFAUL
     query = update.callback_query
     await query.answer()
 
-    # Extraer category_id del callback_data (formato: cat_1, cat_2, etc.)
-    category_id = int(query.data.split('_')[1])
+    # Argumentos ya convertidos por el router (callback: cat_<category_id>)
+    category_id, = context.args
 
     from config.database import db
 
@@ -44,11 +46,10 @@ async def show_products_by_category(update: Update, context: ContextTypes.DEFAUL
         text += f"Encontrados {len(products)} producto{'s' if len(products) > 1 else ''}:\n\n"
 
     # Mostrar estado del carrito si hay items
-    cart = context.user_data.get('cart', [])
+    cart = get_cart(context.user_data)
     if cart:
         total_items = len(cart)
-        total_price = sum(item['precio'] * item['cantidad'] for item in cart)
-        text += f"🛒 Tu carrito: {total_items} producto{'s' if total_items > 1 else ''} | ${total_price:,.0f}\n\n"
+        text += f"🛒 Tu carrito: {total_items} producto{'s' if total_items > 1 else ''} | ${cart.subtotal:,.0f}\n\n"
 
     keyboard = []
 
@@ -96,8 +97,8 @@ async def show_product_detail(update: Update, context: ContextTypes.DEFAULT_TYPE
     query = update.callback_query
     await query.answer()
 
-    # Extraer product_id del callback_data (formato: prod_123)
-    product_id = int(query.data.split('_')[1])
+    # Argumentos ya convertidos por el router (callback: prod_<product_id>)
+    product_id, = context.args
 
     from config.database import db
 
@@ -123,11 +124,10 @@ async def show_product_detail(update: Update, context: ContextTypes.DEFAULT_TYPE
     text += f"📝 {descripcion}\n"
 
     # Mostrar estado del carrito
-    cart = context.user_data.get('cart', [])
+    cart = get_cart(context.user_data)
     if cart:
         total_items = len(cart)
-        total_price = sum(item['precio'] * item['cantidad'] for item in cart)
-        text += f"\n🛒 Tu carrito: {total_items} producto{'s' if total_items > 1 else ''} | ${total_price:,.0f}"
+        text += f"\n🛒 Tu carrito: {total_items} producto{'s' if total_items > 1 else ''} | ${cart.subtotal:,.0f}"
 
     # Botones mejorados (B2B + Standard)
     keyboard = [
@@ -178,12 +178,8 @@ async def add_to_cart(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     query = update.callback_query
 
-    # Extraer product_id
-    product_id = int(query.data.split('_')[1])
-
-    # Inicializar carrito si no existe
-    if 'cart' not in context.user_data:
-        context.user_data['cart'] = []
+    # Argumentos ya convertidos por el router (callback: add_<product_id>)
+    product_id, = context.args
 
     # Obtener info del producto
     from config.database import db
@@ -193,20 +189,18 @@ async def add_to_cart(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.answer("❌ Error agregando producto", show_alert=True)
         return
 
-    # Agregar al carrito
-    context.user_data['cart'].append({
-        'product_id': product_id,
-        'nombre': product['nombre'],
-        'precio': product['precio'],
-        'cantidad': 1
-    })
+    # Agregar al carrito (si ya estaba, suma la cantidad)
+    cart = get_cart(context.user_data)
+    try:
+        cart.add(product_id, product['nombre'], product['precio'], 1, product.get('category_id'))
+    except CartFull as e:
+        await query.answer(f"⚠️ {e}", show_alert=True)
+        return
 
     logger.info(f"Producto {product_id} agregado al carrito")
 
-    # Calcular total del carrito
-    cart = context.user_data['cart']
     total_items = len(cart)
-    total_price = sum(item['precio'] * item['cantidad'] for item in cart)
+    total_price = cart.subtotal
 
     # Obtener info de categoría para el botón de volver
     category_id = product.get('category_id', 1)
@@ -274,7 +268,7 @@ async def view_cart(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
-    cart = context.user_data.get('cart', [])
+    cart = get_cart(context.user_data)
 
     if not cart:
         text = "🛒 **TU CARRITO**\n\n"
@@ -287,20 +281,13 @@ async def view_cart(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ]
     else:
         text = "🛒 **TU CARRITO**\n\n"
-        total = 0
 
-        for idx, item in enumerate(cart, 1):
-            nombre = item['nombre']
-            precio = item['precio']
-            cantidad = item['cantidad']
-            subtotal = precio * cantidad
-
-            text += f"**{idx}.** {nombre}\n"
-            text += f"   ${precio:,.0f} x {cantidad} = **${subtotal:,.0f}**\n\n"
-            total += subtotal
+        for idx, line in enumerate(cart, 1):
+            text += f"**{idx}.** {line.nombre}\n"
+            text += f"   ${line.precio:,.0f} x {line.cantidad} = **${line.subtotal:,.0f}**\n\n"
 
         text += f"─────────────────────\n"
-        text += f"💰 **TOTAL: ${total:,.0f}**\n"
+        text += f"💰 **TOTAL: ${cart.subtotal:,.0f}**\n"
 
         keyboard = [
             [
@@ -344,10 +331,43 @@ async def clear_cart(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer("🗑️ Carrito vaciado")
 
-    context.user_data['cart'] = []
+    get_cart(context.user_data).clear()
     await view_cart(update, context)
 
 
+async def _show_cart_diff(query, cart, diff):
+    """
+    Un solo mensaje con lo que cambió en el carrito desde que se armó
+    (precios nuevos y productos ya no disponibles) para volver a confirmar
+    """
+    text = "⚠️ **Tu carrito cambió**\n\n"
+    for change in diff.changed:
+        text += f"🏷️ {change.line.nombre}: antes ${change.line.precio:,.0f} → ahora ${change.precio:,.0f}\n"
+    for line in diff.removed:
+        text += f"🚫 {line.nombre} ya no está disponible\n"
+
+    if cart:
+        text += f"\n💵 **Nuevo total: ${cart.subtotal:,.0f}**\n\n"
+        text += "¿Confirmas el pedido con estos precios?"
+        keyboard = [
+            [InlineKeyboardButton("✅ Confirmar Pedido", callback_data="confirm_order")],
+            [InlineKeyboardButton("🛒 Ver Carrito", callback_data="view_cart")],
+            [InlineKeyboardButton("🏠 Menú Principal", callback_data="menu_volver")]
+        ]
+    else:
+        text += "\n🛒 Tu carrito quedó vacío."
+        keyboard = [
+            [InlineKeyboardButton("🛍️ Ver Productos", callback_data="menu_hacer_pedido")],
+            [InlineKeyboardButton("🏠 Menú Principal", callback_data="menu_volver")]
+        ]
+
+    await query.edit_message_text(
+        text=text,
+        reply_markup=InlineKeyboardMarkup(keyboard),
+        parse_mode='Markdown'
+    )
+
+
 async def confirm_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Confirma y procesa el pedido guardándolo en Supabase
@@ -355,7 +375,7 @@ async def confirm_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
-    cart = context.user_data.get('cart', [])
+    cart = get_cart(context.user_data)
 
     if not cart:
         text = "🛒 Tu carrito está vacío.\n\nAgrega productos primero."
@@ -374,18 +394,24 @@ async def confirm_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
     supabase = get_supabase()
 
     try:
+        # ============================================
+        # 0. VALIDAR PRECIOS CONTRA EL CATÁLOGO ACTUAL
+        # ============================================
+        from config.database import db
+        catalog = db.get_catalog_prices([line.product_id for line in cart])
+        diff = reprice(cart, catalog)
+        if diff:
+            logger.info(f"🏷️ Carrito re-preciado: {len(diff.changed)} cambios, {len(diff.removed)} quitados")
+            await _show_cart_diff(query, cart, diff)
+            return
+
         # ============================================
         # 1. VERIFICAR/CREAR USUARIO
         # ============================================
-        user_response = supabase.table("users")\
-            .select("*")\
-            .eq("telegram_id", user.id)\
-            .execute()
+        user_id = db.get_user_id(user.id)
 
-        if user_response.data:
+        if user_id is not None:
             # Usuario existe
-            db_user = user_response.data[0]
-            user_id = db_user['user_id']
             logger.info(f"✅ Usuario existente: {user_id}")
         else:
             # Crear nuevo usuario
@@ -400,7 +426,7 @@ async def confirm_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # ============================================
         # 2. CALCULAR TOTALES
         # ============================================
-        subtotal = sum(item['precio'] * item['cantidad'] for item in cart)
+        subtotal = cart.subtotal
         tax = subtotal * 0.0  # 0% de impuesto
         delivery_fee = 0  # Sin cargo de envío
         total = subtotal + tax + delivery_fee
@@ -428,13 +454,13 @@ async def confirm_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # 4. CREAR ITEMS DE LA ORDEN
         # ============================================
         order_items = []
-        for item in cart:
+        for line in cart:
             order_item = {
                 'order_id': order_id,
-                'product_id': item['product_id'],
-                'cantidad': item['cantidad'],
-                'precio_unitario': float(item['precio']),
-                'subtotal': float(item['precio'] * item['cantidad'])
+                'product_id': line.product_id,
+                'cantidad': line.cantidad,
+                'precio_unitario': float(line.precio),
+                'subtotal': float(line.subtotal)
             }
             order_items.append(order_item)
 
@@ -451,12 +477,12 @@ async def confirm_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
         try:
             # Preparar datos para el email con detalles de productos
             items_with_names = []
-            for item in cart:
+            for line in cart:
                 items_with_names.append({
-                    'product_name': item['nombre'],
-                    'cantidad': item['cantidad'],
-                    'precio_unitario': item['precio'],
-                    'subtotal': item['precio'] * item['cantidad']
+                    'product_name': line.nombre,
+                    'cantidad': line.cantidad,
+                    'precio_unitario': line.precio,
+                    'subtotal': line.subtotal
                 })
             
             email_data = {
@@ -476,11 +502,14 @@ async def confirm_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
             else:
                 logger.warning(f"⚠️ No se pudo generar PDF para orden #{order_id}")
             
-            # Enviar email con PDF adjunto
-            email_result = EmailService.send_order_confirmation_to_admin(email_data)
+            # Notificar al admin (inmediato o agrupado en el digest)
+            email_result = await EmailService.notify_admin_new_order(
+                email_data,
+                pdf_path=pdf_path
+            )
             
             if email_result:
-                logger.info(f"✅ Email enviado al admin para orden #{order_id}")
+                logger.info(f"✅ Notificación al admin registrada para orden #{order_id}")
             else:
                 logger.warning(f"⚠️ No se pudo enviar email para orden #{order_id}")
                 
@@ -503,14 +532,9 @@ async def confirm_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
         text += f"👤 {user.first_name}\n\n"
         text += "📦 **Resumen de tu pedido:**\n\n"
 
-        for idx, item in enumerate(cart, 1):
-            nombre = item['nombre']
-            cantidad = item['cantidad']
-            precio = item['precio']
-            subtotal_item = precio * cantidad
-
-            text += f"**{idx}.** {nombre} x{cantidad}\n"
-            text += f"   ${precio:,.0f} → **${subtotal_item:,.0f}**\n\n"
+        for idx, line in enumerate(cart, 1):
+            text += f"**{idx}.** {line.nombre} x{line.cantidad}\n"
+            text += f"   ${line.precio:,.0f} → **${line.subtotal:,.0f}**\n\n"
 
         text += f"─────────────────────\n\n"
         text += f"💰 Subtotal: ${subtotal:,.0f}\n"
@@ -553,7 +577,7 @@ async def confirm_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
         text += f"🔢 **Número de orden:** {order_id}"
 
         # Limpiar carrito
-        context.user_data['cart'] = []
+        cart.clear()
 
         keyboard = [
             [
@@ -590,6 +614,10 @@ async def confirm_order(update: Update, context: ContextTypes.DEFAULT_TYPE):
         import traceback
         traceback.print_exc()
 
+        if isinstance(e, DatabaseUnavailable):
+            text = DatabaseUnavailable.USER_MESSAGE
+        else:
+            text = "❌ No pudimos registrar tu pedido.\n\nTu carrito sigue guardado, intenta de nuevo."
         keyboard = [
             [InlineKeyboardButton("🔄 Intentar de nuevo", callback_data="view_cart")],
             [InlineKeyboardButton("🏠 Menú Principal", callback_data="menu_volver")]
@@ -610,14 +638,8 @@ async def smart_add_to_cart(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     query = update.callback_query
     
-    # Extraer datos: smart_add_123_5
-    parts = query.data.split('_')
-    product_id = int(parts[2])
-    quantity = int(parts[3])
-
-    # Inicializar carrito si no existe
-    if 'cart' not in context.user_data:
-        context.user_data['cart'] = []
+    # Argumentos ya convertidos por el router (smart_add_123_5 → [123, 5])
+    product_id, quantity = context.args
 
     # Obtener info del producto
     from config.database import db
@@ -627,20 +649,18 @@ async def smart_add_to_cart(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.answer("❌ Error: Producto no encontrado", show_alert=True)
         return
 
-    # Agregar al carrito
-    context.user_data['cart'].append({
-        'product_id': product_id,
-        'nombre': product['nombre'],
-        'precio': product['precio'],
-        'cantidad': quantity
-    })
+    # Agregar al carrito (si ya estaba, suma la cantidad)
+    cart = get_cart(context.user_data)
+    try:
+        cart.add(product_id, product['nombre'], product['precio'], quantity, product.get('category_id'))
+    except CartFull as e:
+        await query.answer(f"⚠️ {e}", show_alert=True)
+        return
 
     logger.info(f"Smart add: {quantity}x {product['nombre']} al carrito")
 
-    # Calcular total del carrito
-    cart = context.user_data['cart']
     total_items = len(cart)
-    total_price = sum(item['precio'] * item['cantidad'] for item in cart)
+    total_price = cart.subtotal
 
     # Mensaje de confirmación
     await query.answer(f"✅ Agregado: {quantity}x {product['nombre']}", show_alert=False)
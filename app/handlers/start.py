@@ -8,7 +8,8 @@ from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
-from config.database import get_supabase
+from config.database import db, get_supabase
+from app.services.cart import get_cart
 
 logger = logging.getLogger(__name__)
 
@@ -23,14 +24,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     supabase = get_supabase()
     try:
         # Verificar si el usuario ya existe
-        response = (
-            supabase.table("users")
-            .select("*")
-            .eq("telegram_id", user.id)
-            .execute()
-        )
-
-        if not response.data:
+        if db.get_user_id(user.id) is None:
             # Crear nuevo usuario
             new_user = {
                 "telegram_id": user.id,
@@ -113,17 +107,8 @@ async def show_order_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
-    supabase = get_supabase()
-
-    # Obtener categorías activas
-    response = (
-        supabase.table("product_categories")
-        .select("*")
-        .eq("is_active", True)
-        .order("display_order")
-        .execute()
-    )
-    categories = response.data or []
+    # Categorías activas (catálogo en memoria)
+    categories = db.get_categories()
 
     text = "🛒 **HACER UN PEDIDO**\n\n"
     text += "Selecciona una categoría:\n"
@@ -143,7 +128,7 @@ async def show_order_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
     # Botón para ver carrito
-    cart_count = len(context.user_data.get("cart", []))
+    cart_count = len(get_cart(context.user_data))
     if cart_count > 0:
         keyboard.append(
             [
@@ -174,18 +159,11 @@ async def show_my_orders(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
     user = update.effective_user
 
-    supabase = get_supabase()
-
     try:
         # Obtener user_id
-        user_response = (
-            supabase.table("users")
-            .select("user_id")
-            .eq("telegram_id", user.id)
-            .execute()
-        )
+        user_id = db.get_user_id(user.id)
 
-        if not user_response.data:
+        if user_id is None:
             text = (
                 "❌ Usuario no encontrado.\n\n"
                 "Por favor usa /start para registrarte."
@@ -195,18 +173,8 @@ async def show_my_orders(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await query.edit_message_text(text=text, reply_markup=reply_markup)
             return
 
-        user_id = user_response.data[0]["user_id"]
-
         # Obtener pedidos
-        response = (
-            supabase.table("orders")
-            .select("*")
-            .eq("user_id", user_id)
-            .order("fecha_orden", desc=True)
-            .limit(10)
-            .execute()
-        )
-        orders = response.data or []
+        orders = db.get_recent_orders(user_id, limit=10)
 
         if not orders:
             # PRIMER PEDIDO
@@ -234,10 +202,10 @@ async def show_my_orders(update: Update, context: ContextTypes.DEFAULT_TYPE):
             active_orders = [
                 o
                 for o in orders
-                if o["estado"] in ["pending", "confirmed", "preparing", "ready"]
+                if o.estado in ["pending", "confirmed", "preparing", "ready"]
             ]
             last_delivered = next(
-                (o for o in orders if o["estado"] == "delivered"),
+                (o for o in orders if o.estado == "delivered"),
                 None,
             )
 
@@ -254,12 +222,12 @@ async def show_my_orders(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 }
 
                 for order in active_orders:
-                    order_id = order["order_id"]
-                    status = order["estado"]
-                    total = order["total"]
+                    order_id = order.order_id
+                    status = order.estado
+                    total = order.total
                     created = (
-                        order["fecha_orden"][:10]
-                        if order.get("fecha_orden")
+                        order.fecha_orden[:10]
+                        if order.fecha_orden
                         else "N/A"
                     )
 
@@ -278,9 +246,9 @@ async def show_my_orders(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
             # ÚLTIMO PEDIDO ENTREGADO
             if last_delivered:
-                order_id = last_delivered["order_id"]
-                total = last_delivered["total"]
-                fecha_str = last_delivered.get("fecha_orden", "")
+                order_id = last_delivered.order_id
+                total = last_delivered.total
+                fecha_str = last_delivered.fecha_orden or ""
 
                 # Calcular días desde la entrega
                 if fecha_str:
@@ -7,6 +7,7 @@ import os
 import logging
 import sys
 import threading
+from datetime import date
 from pathlib import Path
 from http.server import HTTPServer, BaseHTTPRequestHandler
 
@@ -62,6 +63,7 @@ from handlers.start import (
 
 
 from handlers.chat_handler import handle_free_chat
+from handlers.errors import on_error
 
 
 # ==========================================
@@ -75,7 +77,8 @@ from handlers.products import (
     add_to_cart,
     view_cart,
     clear_cart,
-    confirm_order
+    confirm_order,
+    smart_add_to_cart
 )
 
 
@@ -112,6 +115,7 @@ from handlers.preorders import (
     select_time,
     confirm_preorder,
     cancel_preorder,
+    release_preorder,
     SELECTING_TYPE,
     ENTERING_EMAIL,
     ENTERING_PHONE,
@@ -135,6 +139,21 @@ from handlers.chat_handler import (
 )
 
 
+# ==========================================
+# IMPORTS - SERVICIOS
+# ==========================================
+
+
+from app.services.email_service import EmailService
+from app.services.order_notifier import start_order_notifications, stop_order_notifications
+from app.services.campaign_engine import start_campaigns, stop_campaigns
+from app.services.catalog import start_catalog_sync, stop_catalog_sync
+from app.utils.callback_router import CallbackRouter
+from app.utils.metrics import metrics
+from app.utils.http_clients import clients
+from config.database import db, get_supabase
+
+
 # ==========================================
 # CLASE HEALTH CHECK (PARA RENDER HTTP)
 # ==========================================
@@ -144,6 +163,14 @@ class HealthCheck(BaseHTTPRequestHandler):
     """Servidor HTTP simple para Render healthcheck"""
     
     def do_GET(self):
+        if self.path == '/metrics':
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        
         self.send_response(200)
         self.end_headers()
         self.wfile.write(b'Bot running')
@@ -166,6 +193,29 @@ def start_http_server():
     server.serve_forever()
 
 
+# ==========================================
+# ARRANQUE Y APAGADO ORDENADO
+# ==========================================
+
+
+async def on_startup(application: Application):
+    """Arranca servicios de fondo una vez inicializado el bot"""
+    supabase = get_supabase()
+    await start_order_notifications(application, supabase)
+    await start_campaigns(application, supabase)
+    await start_catalog_sync(application, db.catalog)
+
+
+async def on_shutdown(application: Application):
+    """Libera recursos compartidos al detener el bot"""
+    await stop_catalog_sync(db.catalog)
+    await stop_campaigns(application)
+    await stop_order_notifications(application)
+    await EmailService.close_digest()
+    EmailService.close_transport()
+    await clients.aclose()
+
+
 # ==========================================
 # FUNCIÓN PRINCIPAL
 # ==========================================
@@ -183,7 +233,13 @@ def main():
 
 
     # Crear aplicación
-    application = Application.builder().token(token).build()
+    application = (
+        Application.builder()
+        .token(token)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
 
 
     # ==========================================
@@ -251,51 +307,46 @@ def main():
 
 
     # ==========================================
-    # SECTION 3: CALLBACKS - MENÚ PRINCIPAL
+    # SECTION 3: CALLBACKS (ROUTER POR PREFIJO)
     # ==========================================
+    # Un solo handler: el callback_data se resuelve en un trie y los
+    # argumentos llegan convertidos en context.args
     
-    application.add_handler(CallbackQueryHandler(show_main_menu, pattern="^menu_volver$"))
-    application.add_handler(CallbackQueryHandler(show_order_menu, pattern="^menu_hacer_pedido$"))
-    application.add_handler(CallbackQueryHandler(show_my_orders, pattern="^menu_mis_pedidos$"))
-    application.add_handler(CallbackQueryHandler(show_info, pattern="^menu_informacion$"))
-    application.add_handler(CallbackQueryHandler(show_contact, pattern="^menu_contacto$"))
-
-
-    # ==========================================
-    # SECTION 4: CALLBACKS - PRODUCTOS
-    # ==========================================
+    router = CallbackRouter()
     
-    application.add_handler(CallbackQueryHandler(show_products_by_category, pattern="^cat_"))
-    application.add_handler(CallbackQueryHandler(show_product_detail, pattern="^prod_"))
-    application.add_handler(CallbackQueryHandler(add_to_cart, pattern="^add_"))
-
-
-    # ==========================================
-    # SECTION 5: CALLBACKS - CARRITO
-    # ==========================================
+    # Menú principal
+    router.add("menu_volver", show_main_menu)
+    router.add("menu_hacer_pedido", show_order_menu)
+    router.add("menu_mis_pedidos", show_my_orders)
+    router.add("menu_informacion", show_info)
+    router.add("menu_contacto", show_contact)
     
-    application.add_handler(CallbackQueryHandler(view_cart, pattern="^view_cart$"))
-    application.add_handler(CallbackQueryHandler(clear_cart, pattern="^clear_cart$"))
-    application.add_handler(CallbackQueryHandler(confirm_order, pattern="^confirm_order$"))
-
-
-    # ==========================================
-    # SECTION 6: CALLBACKS - ADMIN
-    # ==========================================
+    # Productos
+    router.add("cat", show_products_by_category, int)
+    router.add("prod", show_product_detail, int)
+    router.add("add", add_to_cart, int)
+    router.add("smart_add", smart_add_to_cart, int, int)
     
-    application.add_handler(CallbackQueryHandler(admin_panel, pattern="^admin_panel$"))
-    application.add_handler(CallbackQueryHandler(admin_view_orders, pattern="^admin_orders_"))
-    application.add_handler(CallbackQueryHandler(admin_order_detail, pattern="^admin_order_detail_"))
-    application.add_handler(CallbackQueryHandler(admin_change_status, pattern="^admin_change_status_"))
-    application.add_handler(CallbackQueryHandler(admin_stats, pattern="^admin_stats$"))
-
-
-    # ==========================================
-    # SECTION 7: CALLBACKS - CHAT IA
-    # ==========================================
+    # Carrito
+    router.add("view_cart", view_cart)
+    router.add("clear_cart", clear_cart)
+    router.add("confirm_order", confirm_order)
+    
+    # Pre-órdenes confirmadas
+    router.add("preorder_release", release_preorder, int, date, int)
+    
+    # Admin
+    router.add("admin_panel", admin_panel)
+    router.add("admin_orders", admin_view_orders, str)
+    router.add("admin_order_detail", admin_order_detail, int)
+    router.add("admin_change_status", admin_change_status, int, str)
+    router.add("admin_stats", admin_stats)
+    
+    # Chat IA
+    router.add("chat_libre", start_chat_libre)
+    router.add("exit_chat", exit_chat)
     
-    application.add_handler(CallbackQueryHandler(start_chat_libre, pattern="^chat_libre$"))
-    application.add_handler(CallbackQueryHandler(exit_chat, pattern="^exit_chat$"))
+    application.add_handler(router.handler())
 
 
     # ==========================================
@@ -321,6 +372,7 @@ def main():
 
 
     application.add_handler(CallbackQueryHandler(log_update), group=-1)
+    application.add_error_handler(on_error)
 
 
     # ==========================================
@@ -3,35 +3,33 @@ import os
 from datetime import datetime
 from telegram import Update
 from telegram.ext import ContextTypes
-from openai import AsyncOpenAI
-from app.services.database import DatabaseService
+from app.utils.http_clients import clients
+from config.database import db
 from config.prompts import get_system_prompt, get_returning_customer_prompt
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Clientes
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-db = DatabaseService()
+# Clientes: AsyncOpenAI sale del registro compartido (clients.async_openai())
 
 
 async def get_ai_response(user_message: str, user_name: str, user_id: int) -> str:
     """Obtiene respuesta inteligente de OpenAI con contexto de BD"""
     try:
         # Obtener usuario de BD
-        user = db.get_user(user_id)
+        user = db.get_user(user_id, columns="user_id")
         
         # Determinar prompt según el usuario
         if user:
             # Cliente recurrente
-            orders = db.get_user_orders(user['user_id'], limit=1)
+            orders = db.get_user_orders(user['user_id'], limit=1, columns="productos")
             last_order = orders[0]['productos'] if orders else None
             system_prompt = get_returning_customer_prompt(user_name, str(last_order))
         else:
             # Cliente nuevo
             system_prompt = get_system_prompt(user_name)
         
-        response = await client.chat.completions.create(
+        response = await clients.async_openai().chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -57,7 +55,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info(f"👤 Comando /start de {user_name} (ID: {user_id})")
     
     # Verificar si usuario existe en BD
-    db_user = db.get_user(user_id)
+    db_user = db.get_user(user_id, columns="user_id")
     
     if not db_user:
         # Usuario nuevo → Crear en BD
@@ -85,7 +83,7 @@ async def handle_user_message(update: Update, context: ContextTypes.DEFAULT_TYPE
     logger.info(f"📨 Mensaje de {user_name}: {message_text}")
     
     # Verificar si usuario existe en BD
-    db_user = db.get_user(user_id)
+    db_user = db.get_user(user_id, columns="user_id")
     
     if not db_user:
         # Usuario nuevo → Crear en BD
@@ -5,8 +5,9 @@ Servicio de IA con OpenAI GPT-4o-mini + Knowledge Base
 import os
 import logging
 from typing import Dict, Optional, List
-from openai import OpenAI
-from config.database import get_supabase
+from config.database import db, get_supabase
+from app.utils.http_clients import clients
+from app.utils.keyset import fetch_all
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +19,7 @@ class AIService:
         if not api_key:
             raise ValueError("OPENAI_API_KEY no encontrada en .env")
         
-        self.client = OpenAI(api_key=api_key)
+        self.client = clients.openai()
         self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
         self.threshold = float(os.getenv("CHAT_CONFIDENCE_THRESHOLD", "0.8"))
         self.supabase = get_supabase()
@@ -39,12 +40,13 @@ class AIService:
             query_lower = query.lower()
             
             # Obtener todas las entradas activas de KB
-            response = self.supabase.table("knowledge_base")\
-                .select("*")\
-                .eq("activa", True)\
-                .execute()
-            
-            kb_entries = response.data
+            try:
+                kb_entries = fetch_all(self.supabase, "knowledge_base", key="kb_id",
+                                       filters=lambda q: q.eq("activa", True))
+            except Exception as e:
+                # Base caída: última KB guardada con el catálogo
+                logger.warning(f"⚠️ KB desde la copia del catálogo: {e}")
+                kb_entries = db.catalog.snapshot().knowledge_base
             
             if not kb_entries:
                 logger.warning("⚠️ Knowledge Base vacía")
@@ -75,10 +77,13 @@ class AIService:
             if best_match and best_score >= 1:
                 # Actualizar contador
                 kb_id = best_match['kb_id']
-                self.supabase.table("knowledge_base")\
-                    .update({"veces_usado": best_match['veces_usado'] + 1})\
-                    .eq("kb_id", kb_id)\
-                    .execute()
+                try:
+                    self.supabase.table("knowledge_base")\
+                        .update({"veces_usado": best_match['veces_usado'] + 1})\
+                        .eq("kb_id", kb_id)\
+                        .execute()
+                except Exception as e:
+                    logger.warning(f"⚠️ No se pudo actualizar el contador de KB {kb_id}: {e}")
                 
                 logger.info(f"✅ Respuesta KB encontrada: {kb_id} (score: {best_score})")
                 return {
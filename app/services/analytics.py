@@ -0,0 +1,123 @@
+"""
+Métricas de analytics por rango de fechas.
+
+Todas las métricas de la página de analytics salen de una sola pasada
+vectorizada sobre los pedidos de la réplica local: las fechas se leen una
+vez como enteros (ns desde 1970, UTC) y día, hora y día de la semana se
+obtienen con aritmética entera; los agregados son np.bincount. El costo es
+lineal en el número de pedidos y no depende de cuántas gráficas se dibujen.
+
+El resultado es un dict de valores pequeños (series de 24, 7 o N días),
+pensado para memoizarse por (rango, versión de los datos).
+"""
+
+from datetime import date
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+DAY_NS = 86_400 * 10**9
+HOUR_NS = 3_600 * 10**9
+
+# 1970-01-01 fue jueves; lunes = 0
+EPOCH_WEEKDAY = 3
+WEEKDAY_LABELS = ('Lun', 'Mar', 'Mie', 'Jue', 'Vie', 'Sab', 'Dom')
+
+
+def _empty_range(days: pd.DatetimeIndex) -> Dict:
+    return _result(
+        days,
+        daily_revenue=np.zeros(len(days)),
+        daily_orders=np.zeros(len(days), dtype=np.int64),
+        heatmap=np.zeros((7, 24), dtype=np.int64),
+        status_counts=pd.Series(dtype=np.int64),
+        positions=np.empty(0, dtype=np.int64),
+    )
+
+
+def _result(days, daily_revenue, daily_orders, heatmap, status_counts, positions) -> Dict:
+    """Arma el resultado a partir de los conteos crudos"""
+    total_revenue = float(daily_revenue.sum())
+    total_orders = int(daily_orders.sum())
+    delivered = int(status_counts.get('delivered', 0))
+
+    return {
+        'total_revenue': total_revenue,
+        'total_orders': total_orders,
+        'avg_ticket': total_revenue / total_orders if total_orders else 0.0,
+        'delivered': delivered,
+        'delivery_rate': delivered / total_orders * 100 if total_orders else 0.0,
+        'daily': pd.DataFrame({'fecha': days.date, 'total': daily_revenue, 'pedidos': daily_orders}),
+        'by_weekday': pd.Series(heatmap.sum(axis=1), index=list(WEEKDAY_LABELS)),
+        'by_hour': pd.Series(heatmap.sum(axis=0), index=range(24)),
+        'heatmap': pd.DataFrame(heatmap, index=list(WEEKDAY_LABELS), columns=range(24)),
+        'status_counts': status_counts,
+        'positions': positions,
+    }
+
+
+def compute_range(orders: pd.DataFrame, start_date: date, end_date: date) -> Dict:
+    """
+    Métricas de los pedidos con fecha_orden entre dos días (inclusive, UTC)
+
+    Args:
+        orders: Pedidos de la réplica (fecha_orden ya como datetime UTC)
+        start_date: Primer día
+        end_date: Último día
+
+    Returns:
+        Dict: total_revenue, total_orders, avg_ticket, delivered,
+        delivery_rate, daily (fecha/total/pedidos, un renglón por día del
+        rango), by_weekday, by_hour, heatmap (día x hora), status_counts y
+        positions (filas de orders dentro del rango, para exportar)
+    """
+    days = pd.date_range(start_date, end_date, freq='D')
+    if orders.empty or len(days) == 0 or 'fecha_orden' not in orders.columns:
+        return _empty_range(days)
+
+    start_ns = pd.Timestamp(start_date, tz='UTC').value
+    end_ns = start_ns + len(days) * DAY_NS
+
+    # NaT queda como el mínimo int64 y cae fuera de cualquier rango
+    ts = orders['fecha_orden'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    positions = np.flatnonzero((ts >= start_ns) & (ts < end_ns))
+    ts = ts[positions]
+
+    totals = pd.to_numeric(orders['total'].to_numpy()[positions], errors='coerce')
+    totals = np.nan_to_num(np.asarray(totals, dtype=float))
+
+    day_index = (ts - start_ns) // DAY_NS
+    absolute_day = ts // DAY_NS
+    hour = (ts - absolute_day * DAY_NS) // HOUR_NS
+    weekday = (absolute_day + EPOCH_WEEKDAY) % 7
+
+    estados = orders['estado'].to_numpy()[positions] if 'estado' in orders.columns else np.empty(0)
+    status_counts = pd.Series(estados).value_counts()
+
+    return _result(
+        days,
+        daily_revenue=np.bincount(day_index, weights=totals, minlength=len(days)),
+        daily_orders=np.bincount(day_index, minlength=len(days)),
+        heatmap=np.bincount(weekday * 24 + hour, minlength=168).reshape(7, 24),
+        status_counts=status_counts,
+        positions=positions,
+    )
+
+
+def top_products(items: pd.DataFrame, products: pd.DataFrame, order_ids) -> pd.DataFrame:
+    """Unidades e ingresos por producto en los pedidos dados (mayor ingreso primero)"""
+    columns = ['Producto', 'Unidades', 'Ingresos', 'Categoría']
+    if items.empty or len(order_ids) == 0:
+        return pd.DataFrame(columns=columns)
+
+    selected = items.loc[items['order_id'].isin(order_ids), ['product_id', 'cantidad', 'subtotal']]
+    totals = selected.groupby('product_id', sort=False).agg(Unidades=('cantidad', 'sum'), Ingresos=('subtotal', 'sum'))
+    catalog = products.reindex(columns=['product_id', 'nombre', 'categoria']).drop_duplicates('product_id')
+    merged = totals.reset_index().merge(catalog, on='product_id', how='left')
+    merged = merged.fillna({'nombre': 'N/A', 'categoria': 'N/A'})
+
+    # Productos distintos con el mismo nombre se suman, como antes
+    return merged.groupby('nombre', as_index=False).agg(
+        Unidades=('Unidades', 'sum'), Ingresos=('Ingresos', 'sum'), Categoría=('categoria', 'first')
+    ).rename(columns={'nombre': 'Producto'}).sort_values('Ingresos', ascending=False, ignore_index=True)[columns]
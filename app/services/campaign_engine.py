@@ -0,0 +1,487 @@
+"""
+Motor de campañas: envía una promoción a todos los usuarios del bot.
+
+- Recorre la tabla users por páginas con keyset (user_id > último visto),
+  así solo hay una página en memoria aunque haya 100k usuarios.
+- Envía con un pool de workers limitado por un token bucket compartido
+  con el resto de envíos del bot.
+- Guarda el estado de entrega por destinatario en lotes (upsert).
+- Al terminar cada página guarda el checkpoint (campaigns.last_user_id);
+  si el proceso se reinicia, la campaña continúa desde ahí.
+- Una campaña se toma con un UPDATE condicional que deja un lease
+  (lease_owner, lease_until) y solo procede si el UPDATE devolvió la fila.
+  Cada checkpoint renueva el lease; con dos procesos del bot vivos (por
+  ejemplo, durante un deploy) solo uno envía. Si el dueño muere, otro la
+  retoma cuando vence el lease.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TelegramError
+
+from app.utils.metrics import metrics
+from app.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def create_campaign(supabase, name: str, message: str, parse_mode: Optional[str] = None) -> Dict:
+    """Crea una campaña en cola (desde el panel); el bot la toma en su próximo ciclo"""
+    response = supabase.table("campaigns").insert({
+        'name': name,
+        'message': message,
+        'parse_mode': parse_mode,
+        'status': 'queued'
+    }).execute()
+    return response.data[0]
+
+
+def lease_free_filter() -> str:
+    """Filtro de PostgREST para campañas sin lease o con el lease vencido"""
+    return f"lease_until.is.null,lease_until.lt.{_now()}"
+
+
+class CampaignEngine:
+    """Ejecuta campañas de difusión de forma reanudable"""
+
+    def __init__(
+        self,
+        supabase,
+        bot,
+        bucket: Optional[TokenBucket] = None,
+        workers: int = 8,
+        page_size: int = 500,
+        flush_size: int = 200,
+        max_attempts: int = 3,
+        lease_seconds: float = 300
+    ):
+        """
+        Args:
+            supabase: Cliente de Supabase
+            bot: Bot de Telegram (solo se usa send_message)
+            bucket: Limitador global; compartirlo con la cola de notificaciones
+                evita que entre los dos se pasen del límite de Telegram
+            workers: Envíos concurrentes
+            page_size: Usuarios por página de keyset
+            flush_size: Estados de entrega por upsert
+            max_attempts: Intentos por destinatario ante errores de red o RetryAfter
+            lease_seconds: Vigencia del lease; debe cubrir de sobra el envío
+                de una página, porque se renueva en cada checkpoint
+        """
+        self.supabase = supabase
+        self.bot = bot
+        self.bucket = bucket or TokenBucket(25)
+        self.workers = max(1, workers)
+        self.page_size = page_size
+        self.flush_size = flush_size
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._stop_requested = False
+        self._sent = metrics.counter("campaign_messages_sent_total", "Mensajes de campaña enviados")
+        self._failed = metrics.counter("campaign_messages_failed_total", "Mensajes de campaña fallidos")
+
+    # ============================================
+    # ADMINISTRACIÓN
+    # ============================================
+
+    def request_stop(self):
+        """Detiene la campaña en curso al terminar la página actual"""
+        self._stop_requested = True
+
+    # ============================================
+    # LECTURAS Y ESCRITURAS
+    # ============================================
+
+    def _get_campaign(self, campaign_id: int) -> Optional[Dict]:
+        response = self.supabase.table("campaigns")\
+            .select("*")\
+            .eq("campaign_id", campaign_id)\
+            .execute()
+        return response.data[0] if response.data else None
+
+    def _lease_until(self) -> str:
+        return (datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)).isoformat()
+
+    def _claim(self, campaign: Dict) -> Optional[Dict]:
+        """
+        Toma la campaña si sigue en el estado leído y nadie tiene el lease vigente
+
+        El UPDATE es condicional: de dos procesos que compiten, solo uno
+        recibe la fila de vuelta.
+        """
+        values = {'status': 'running', 'lease_owner': self.owner, 'lease_until': self._lease_until(),
+                  'updated_at': _now()}
+        if not campaign.get('started_at'):
+            values['started_at'] = _now()
+        response = self.supabase.table("campaigns")\
+            .update(values)\
+            .eq("campaign_id", campaign['campaign_id'])\
+            .eq("status", campaign['status'])\
+            .or_(lease_free_filter())\
+            .execute()
+        return response.data[0] if response.data else None
+
+    def _checkpoint(self, campaign_id: int, values: Dict) -> bool:
+        """Guarda el checkpoint y renueva el lease; False si otro proceso lo tomó"""
+        values = {**values, 'lease_until': self._lease_until(), 'updated_at': _now()}
+        response = self.supabase.table("campaigns")\
+            .update(values)\
+            .eq("campaign_id", campaign_id)\
+            .eq("lease_owner", self.owner)\
+            .execute()
+        return bool(response.data)
+
+    def _release(self, campaign_id: int, values: Optional[Dict] = None):
+        """Suelta el lease (con el estado final, si lo hay)"""
+        values = {**(values or {}), 'lease_owner': None, 'lease_until': None, 'updated_at': _now()}
+        self.supabase.table("campaigns")\
+            .update(values)\
+            .eq("campaign_id", campaign_id)\
+            .eq("lease_owner", self.owner)\
+            .execute()
+
+    def _fetch_page(self, after_user_id: int) -> List[Dict]:
+        """Siguiente página de usuarios por keyset (nunca usa OFFSET)"""
+        response = self.supabase.table("users")\
+            .select("user_id, telegram_id")\
+            .gt("user_id", after_user_id)\
+            .order("user_id")\
+            .limit(self.page_size)\
+            .execute()
+        return response.data or []
+
+    def _already_delivered(self, campaign_id: int, user_ids: List[int]) -> set:
+        """Destinatarios de la página que ya tienen estado (reanudación)"""
+        response = self.supabase.table("campaign_deliveries")\
+            .select("user_id")\
+            .eq("campaign_id", campaign_id)\
+            .in_("user_id", user_ids)\
+            .execute()
+        return {row['user_id'] for row in response.data or []}
+
+    def _save_deliveries(self, rows: List[Dict]):
+        for i in range(0, len(rows), self.flush_size):
+            self.supabase.table("campaign_deliveries")\
+                .upsert(rows[i:i + self.flush_size], on_conflict="campaign_id,user_id")\
+                .execute()
+
+    # ============================================
+    # ENVÍO
+    # ============================================
+
+    async def _send_one(self, campaign: Dict, recipient: Dict) -> Dict:
+        """Envía a un destinatario y retorna su fila de estado"""
+        kwargs = {}
+        if campaign.get('parse_mode'):
+            kwargs['parse_mode'] = campaign['parse_mode']
+
+        status, error = 'failed', None
+        attempts = 0
+        while True:
+            await self.bucket.acquire()
+            attempts += 1
+            try:
+                await self.bot.send_message(
+                    chat_id=recipient['telegram_id'],
+                    text=campaign['message'],
+                    **kwargs
+                )
+                status, error = 'sent', None
+                break
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                if hasattr(retry_after, "total_seconds"):
+                    retry_after = retry_after.total_seconds()
+                # Vaciar el bucket frena a todos los workers, no solo a este
+                self.bucket.pause(float(retry_after))
+                error = str(e)
+                if attempts >= self.max_attempts:
+                    break
+            except Forbidden as e:
+                status, error = 'blocked', str(e)
+                break
+            except BadRequest as e:
+                error = str(e)
+                break
+            except NetworkError as e:
+                error = str(e)
+                if attempts >= self.max_attempts:
+                    break
+                await asyncio.sleep(attempts)
+            except TelegramError as e:
+                # ChatMigrated, InvalidToken...: falla este destinatario, no la campaña
+                error = str(e)
+                break
+
+        if status == 'sent':
+            self._sent.inc()
+        else:
+            self._failed.inc()
+
+        return {
+            'campaign_id': campaign['campaign_id'],
+            'user_id': recipient['user_id'],
+            'telegram_id': recipient['telegram_id'],
+            'status': status,
+            'error': error,
+            'sent_at': _now()
+        }
+
+    async def _send_page(self, campaign: Dict, recipients: List[Dict]) -> Tuple[int, int]:
+        """
+        Reparte una página entre los workers
+
+        Los estados de entrega se guardan cada ``flush_size`` envíos, y lo
+        ya enviado se guarda también si la página se interrumpe, para que
+        al reanudar no se repita.
+
+        Returns:
+            Tuple[int, int]: (enviados, fallidos)
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for recipient in recipients:
+            queue.put_nowait(recipient)
+
+        buffer: List[Dict] = []
+        counts = {'sent': 0, 'failed': 0}
+
+        async def flush():
+            nonlocal buffer
+            rows, buffer = buffer, []
+            if rows:
+                await asyncio.to_thread(self._save_deliveries, rows)
+
+        async def worker():
+            while True:
+                try:
+                    recipient = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                row = await self._send_one(campaign, recipient)
+                buffer.append(row)
+                counts['sent' if row['status'] == 'sent' else 'failed'] += 1
+                if len(buffer) >= self.flush_size:
+                    await flush()
+
+        tasks = [asyncio.create_task(worker()) for _ in range(min(self.workers, len(recipients)))]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            await flush()
+
+        return counts['sent'], counts['failed']
+
+    def _count_deliveries(self, campaign_id: int) -> Tuple[int, int]:
+        """Totales exactos desde la tabla de entregas"""
+        def count(**filters):
+            query = self.supabase.table("campaign_deliveries")\
+                .select("user_id", count="exact")\
+                .eq("campaign_id", campaign_id)
+            for column, value in filters.items():
+                query = query.eq(column, value)
+            return query.limit(1).execute().count or 0
+
+        total = count()
+        sent = count(status='sent')
+        return sent, total - sent
+
+    async def run(self, campaign_id: int) -> Optional[Dict]:
+        """
+        Ejecuta (o reanuda) una campaña hasta terminar o hasta que se pida detenerla
+
+        Returns:
+            Optional[Dict]: Campaña con su estado final; None si no existe, no
+                está en cola ni interrumpida, u otro proceso la tiene tomada
+        """
+        seen = await asyncio.to_thread(self._get_campaign, campaign_id)
+        if not seen:
+            logger.error(f"❌ Campaña {campaign_id} no encontrada")
+            return None
+        if seen.get('status') not in ('queued', 'running'):
+            logger.warning(f"⚠️ Campaña #{campaign_id} en estado {seen.get('status')}: no se envía")
+            return None
+
+        campaign = await asyncio.to_thread(self._claim, seen)
+        if not campaign:
+            logger.info(f"📣 Campaña #{campaign_id} tomada por otro proceso")
+            return None
+
+        self._stop_requested = False
+        cursor = campaign.get('last_user_id') or 0
+        resuming = cursor > 0 or seen.get('status') != 'queued' or bool(seen.get('started_at'))
+        if resuming:
+            sent, failed = await asyncio.to_thread(self._count_deliveries, campaign_id)
+        else:
+            sent, failed = 0, 0
+
+        logger.info(f"📣 Campaña #{campaign_id} {'reanudada' if resuming else 'iniciada'} desde user_id > {cursor}")
+
+        try:
+            page = await asyncio.to_thread(self._fetch_page, cursor)
+            while page:
+                # Pedir la siguiente página mientras se envía la actual
+                next_page = asyncio.create_task(asyncio.to_thread(self._fetch_page, page[-1]['user_id']))
+
+                recipients = [u for u in page if u.get('telegram_id')]
+                if resuming and recipients:
+                    # Tras un corte puede haber envíos de esta página ya registrados
+                    done = await asyncio.to_thread(
+                        self._already_delivered, campaign_id, [u['user_id'] for u in recipients]
+                    )
+                    recipients = [u for u in recipients if u['user_id'] not in done]
+                resuming = False
+
+                try:
+                    page_sent, page_failed = await self._send_page(campaign, recipients) if recipients else (0, 0)
+                except BaseException:
+                    next_page.cancel()
+                    raise
+
+                cursor = page[-1]['user_id']
+                sent += page_sent
+                failed += page_failed
+                held = await asyncio.to_thread(self._checkpoint, campaign_id, {
+                    'last_user_id': cursor,
+                    'total_sent': sent,
+                    'total_failed': failed
+                })
+                if not held:
+                    # El lease venció y otro proceso la retomó desde el checkpoint anterior
+                    next_page.cancel()
+                    logger.warning(f"⚠️ Campaña #{campaign_id} perdió el lease en user_id {cursor}; se detiene")
+                    return None
+
+                page = await next_page
+
+                if self._stop_requested or await self._paused_externally(campaign_id):
+                    logger.info(f"⏸️ Campaña #{campaign_id} pausada en user_id {cursor}")
+                    await asyncio.to_thread(self._release, campaign_id, {'status': 'paused'})
+                    return await asyncio.to_thread(self._get_campaign, campaign_id)
+
+            await asyncio.to_thread(self._release, campaign_id, {
+                'status': 'completed',
+                'finished_at': _now()
+            })
+            logger.info(f"✅ Campaña #{campaign_id} completada: {sent} enviados, {failed} fallidos")
+
+        except asyncio.CancelledError:
+            # Apagado del bot: el checkpoint ya está guardado, queda en 'running'
+            # sin lease para que el próximo proceso la retome de inmediato
+            logger.info(f"⏸️ Campaña #{campaign_id} interrumpida en user_id {cursor}")
+            try:
+                await asyncio.to_thread(self._release, campaign_id)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo soltar el lease de la campaña #{campaign_id}: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"❌ Error en campaña #{campaign_id}: {e}")
+            import traceback
+            traceback.print_exc()
+            await asyncio.to_thread(self._release, campaign_id, {'status': 'failed'})
+
+        return await asyncio.to_thread(self._get_campaign, campaign_id)
+
+    async def _paused_externally(self, campaign_id: int) -> bool:
+        """El panel puede pausar una campaña cambiando su estado en la BD"""
+        current = await asyncio.to_thread(self._get_campaign, campaign_id)
+        return bool(current) and current.get('status') == 'paused'
+
+
+class CampaignRunner:
+    """Tarea de fondo del bot que toma campañas en cola o interrumpidas"""
+
+    def __init__(self, engine: CampaignEngine, poll_interval: float = 30):
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info("📣 Ejecutor de campañas iniciado")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def _next_campaign(self) -> Optional[Dict]:
+        # 'running' primero: son campañas cortadas por un reinicio; las que
+        # tienen un lease vigente las está enviando otro proceso
+        for status in ('running', 'queued'):
+            response = self.engine.supabase.table("campaigns")\
+                .select("campaign_id")\
+                .eq("status", status)\
+                .or_(lease_free_filter())\
+                .order("campaign_id")\
+                .limit(1)\
+                .execute()
+            if response.data:
+                return response.data[0]
+        return None
+
+    async def _run(self):
+        while True:
+            try:
+                campaign = await asyncio.to_thread(self._next_campaign)
+                # None: otro proceso la tomó primero; esperar al próximo ciclo
+                if campaign and await self.engine.run(campaign['campaign_id']):
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Error buscando campañas: {e}")
+
+            await asyncio.sleep(self.poll_interval)
+
+
+# ============================================
+# INTEGRACIÓN CON LA APLICACIÓN DEL BOT
+# ============================================
+
+RUNNER_KEY = 'campaign_runner'
+
+
+async def start_campaigns(application, supabase):
+    """Arranca el ejecutor de campañas; comparte el limitador con la cola de notificaciones"""
+    from app.services.order_notifier import OUTBOX_KEY
+
+    outbox = application.bot_data.get(OUTBOX_KEY)
+    engine = CampaignEngine(
+        supabase,
+        application.bot,
+        bucket=outbox.bucket if outbox else None,
+        workers=int(os.getenv('CAMPAIGN_WORKERS', '8')),
+        page_size=int(os.getenv('CAMPAIGN_PAGE_SIZE', '500'))
+    )
+    runner = CampaignRunner(engine, poll_interval=float(os.getenv('CAMPAIGN_POLL_INTERVAL', '30')))
+    runner.start()
+    application.bot_data[RUNNER_KEY] = runner
+
+
+async def stop_campaigns(application):
+    runner = application.bot_data.pop(RUNNER_KEY, None)
+    if runner:
+        await runner.stop()
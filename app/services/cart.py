@@ -0,0 +1,203 @@
+"""
+Carrito de compras guardado en context.user_data.
+
+Una línea por producto (product_id): agregar el mismo producto otra vez
+suma la cantidad en vez de crear otro item. Subtotal y unidades se llevan
+como contadores que se actualizan en cada cambio, así que mostrarlos no
+recorre el carrito.
+
+Para persistencia (pickle de PTB o JSON) el carrito se guarda como una
+lista compacta ``[product_id, nombre, precio, cantidad, category_id]`` por
+línea y se limita a MAX_LINES productos y MAX_QUANTITY unidades por línea.
+
+Uso:
+    cart = get_cart(context.user_data)
+    cart.add(product_id, product['nombre'], product['precio'], 6, product.get('category_id'))
+    cart.subtotal, cart.quantity, len(cart)
+"""
+
+from typing import Any, Dict, Iterator, List, Mapping, NamedTuple, Optional
+
+# Límites por usuario para que user_data no crezca sin control
+MAX_LINES = 40
+MAX_QUANTITY = 9999
+
+CART_KEY = 'cart'
+
+
+class CartFull(Exception):
+    """El carrito alcanzó MAX_LINES productos distintos"""
+
+
+class CartLine(NamedTuple):
+    product_id: int
+    nombre: str
+    precio: float
+    cantidad: int
+    category_id: Optional[int] = None
+
+    @property
+    def subtotal(self) -> float:
+        return self.precio * self.cantidad
+
+    def as_item(self) -> Dict:
+        """Item en el formato de dict que usan descuentos, PDF y pedidos"""
+        return {
+            'product_id': self.product_id,
+            'nombre': self.nombre,
+            'precio': self.precio,
+            'cantidad': self.cantidad,
+            'category_id': self.category_id,
+        }
+
+
+class Cart:
+    """Líneas por product_id con subtotal y unidades acumulados"""
+
+    __slots__ = ('_lines', 'subtotal', 'quantity')
+
+    def __init__(self):
+        self._lines: Dict[int, CartLine] = {}
+        self.subtotal = 0.0
+        self.quantity = 0
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __iter__(self) -> Iterator[CartLine]:
+        return iter(self._lines.values())
+
+    def __contains__(self, product_id) -> bool:
+        return product_id in self._lines
+
+    def get(self, product_id: int) -> Optional[CartLine]:
+        return self._lines.get(product_id)
+
+    def _put(self, line: CartLine):
+        old = self._lines.get(line.product_id)
+        if old is not None:
+            self.subtotal -= old.subtotal
+            self.quantity -= old.cantidad
+        if line.cantidad > 0:
+            self._lines[line.product_id] = line
+            self.subtotal += line.subtotal
+            self.quantity += line.cantidad
+        elif old is not None:
+            del self._lines[line.product_id]
+        if not self._lines:
+            # Sin líneas no debe quedar residuo de redondeo
+            self.subtotal, self.quantity = 0.0, 0
+
+    def add(self, product_id: int, nombre: str, precio: float, cantidad: int = 1,
+            category_id: Optional[int] = None) -> CartLine:
+        """
+        Suma unidades de un producto (el precio y nombre quedan los más recientes)
+
+        Raises:
+            CartFull: Si es un producto nuevo y ya hay MAX_LINES
+        """
+        old = self._lines.get(product_id)
+        if old is None and len(self._lines) >= MAX_LINES:
+            raise CartFull(f"El carrito admite hasta {MAX_LINES} productos distintos")
+        total = min((old.cantidad if old else 0) + int(cantidad), MAX_QUANTITY)
+        line = CartLine(product_id, nombre, float(precio), total, category_id)
+        self._put(line)
+        return line
+
+    def set_quantity(self, product_id: int, cantidad: int):
+        """Fija la cantidad de una línea existente (0 la quita)"""
+        old = self._lines.get(product_id)
+        if old is not None:
+            self._put(old._replace(cantidad=max(0, min(int(cantidad), MAX_QUANTITY))))
+
+    def remove(self, product_id: int):
+        self.set_quantity(product_id, 0)
+
+    def clear(self):
+        self._lines.clear()
+        self.subtotal, self.quantity = 0.0, 0
+
+    def items(self) -> List[Dict]:
+        """Líneas como dicts (DiscountService, PDF, inserción en order_items)"""
+        return [line.as_item() for line in self._lines.values()]
+
+    # === PERSISTENCIA ===
+
+    def to_state(self) -> List[list]:
+        """Forma compacta y serializable: una lista por línea"""
+        return [list(line) for line in self._lines.values()]
+
+    @classmethod
+    def from_state(cls, state) -> 'Cart':
+        """
+        Reconstruye el carrito desde to_state() o desde la lista de dicts
+        que se guardaba antes (un item por cada vez que se agregaba)
+        """
+        cart = cls()
+        for entry in state or ():
+            if isinstance(entry, dict):
+                entry = (entry['product_id'], entry.get('nombre', ''), entry.get('precio', 0),
+                         entry.get('cantidad', 1), entry.get('category_id'))
+            try:
+                cart.add(*entry)
+            except CartFull:
+                break
+        return cart
+
+    def __getstate__(self):
+        return self.to_state()
+
+    def __setstate__(self, state):
+        restored = Cart.from_state(state)
+        self._lines, self.subtotal, self.quantity = restored._lines, restored.subtotal, restored.quantity
+
+
+class PriceChange(NamedTuple):
+    line: CartLine
+    precio: float
+
+
+class CartDiff(NamedTuple):
+    """Diferencias entre el carrito y el catálogo al momento de confirmar"""
+    changed: List[PriceChange]
+    removed: List[CartLine]
+
+    def __bool__(self) -> bool:
+        return bool(self.changed or self.removed)
+
+
+def reprice(cart: Cart, catalog: Mapping[int, Any]) -> CartDiff:
+    """
+    Ajusta el carrito al catálogo actual y retorna lo que cambió
+
+    Args:
+        cart: Carrito a validar (se modifica en el sitio)
+        catalog: product_id -> producto con precio, nombre, category_id y
+            available (ver DatabaseService.get_catalog_prices)
+
+    Returns:
+        CartDiff: Líneas con precio distinto y líneas quitadas por no estar
+        disponibles (vacío si el carrito ya coincidía)
+    """
+    changed, removed = [], []
+    for line in list(cart):
+        product = catalog.get(line.product_id)
+        if product is None or not product.available:
+            removed.append(line)
+            cart.remove(line.product_id)
+            continue
+
+        precio = float(product.precio)
+        if precio != line.precio:
+            changed.append(PriceChange(line, precio))
+        if (precio, product.nombre, product.category_id) != (line.precio, line.nombre, line.category_id):
+            cart._put(line._replace(precio=precio, nombre=product.nombre, category_id=product.category_id))
+    return CartDiff(changed, removed)
+
+
+def get_cart(user_data: Dict) -> Cart:
+    """Carrito del usuario (lo crea o migra el formato anterior si hace falta)"""
+    cart = user_data.get(CART_KEY)
+    if not isinstance(cart, Cart):
+        cart = user_data[CART_KEY] = Cart.from_state(cart)
+    return cart
@@ -0,0 +1,430 @@
+"""
+Catálogo en memoria del bot (categorías y productos).
+
+Los handlers leen de un CatalogSnapshot inmutable: listar categorías, ver
+los productos de una categoría o el detalle de un producto no consulta la
+base. El snapshot se reemplaza completo, con una sola asignación, cuando
+cambia la versión del catálogo (catalog_version, ver
+scripts/add_catalog_sync.sql):
+
+- Cada ``poll_interval`` segundos (con jitter) se lee la fila de la versión;
+  si no cambió, no se lee nada más.
+- Opcionalmente, Supabase Realtime avisa del cambio al instante.
+
+Mientras se recarga, los handlers siguen leyendo el snapshot anterior.
+Para que todas las réplicas no recarguen en el mismo instante, un aviso se
+atiende tras una espera aleatoria de hasta ``reload_spread`` segundos, y
+dentro de un proceso solo un hilo recarga cada versión.
+
+Último catálogo bueno en disco: cada snapshot leído de la base (con los
+puntos de recogida y la Knowledge Base) se guarda en ``snapshot_path``.
+Al arrancar, el bot lo lee de ahí en milisegundos y atiende el menú de
+inmediato mientras revalida contra la base en segundo plano; si la base
+no responde, se sigue usando esa copia.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.utils.keyset import fetch_all
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Sube si cambia la estructura del archivo; los archivos de otro formato se ignoran
+SNAPSHOT_FORMAT = 1
+DEFAULT_SNAPSHOT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "catalog_snapshot.json"
+)
+
+
+def _normalize_product(row: Dict, categories: Dict[int, Dict]) -> Dict:
+    """Producto con las claves que esperan los handlers"""
+    product = dict(row)
+    product['activo'] = row.get('activo', True)
+    product['disponible'] = row.get('disponible', row.get('is_available', True))
+    category = categories.get(row.get('category_id'))
+    if category is not None:
+        product['product_categories'] = {'name': category['name'], 'icon_emoji': category.get('icon_emoji')}
+    return product
+
+
+class CatalogSnapshot:
+    """
+    Catálogo completo en un momento dado
+
+    Los dicts que retorna son compartidos entre handlers: no modificarlos
+    (product() retorna una copia). ``source`` es "db" o "disk" (copia
+    guardada, pendiente de revalidar).
+    """
+
+    __slots__ = ('version', 'categories', 'locations', 'knowledge_base', 'source', 'loaded_at',
+                 '_categories', '_products', '_by_category')
+
+    def __init__(
+        self,
+        version: Optional[int],
+        categories: List[Dict],
+        products: List[Dict],
+        locations: List[Dict] = (),
+        knowledge_base: List[Dict] = (),
+        source: str = "db"
+    ):
+        self.version = version
+        self.locations = list(locations)
+        self.knowledge_base = list(knowledge_base)
+        self.source = source
+        # Una copia de disco nunca cuenta como reciente para max_age
+        self.loaded_at = time.monotonic() if source == "db" else float('-inf')
+        self._categories = {c['category_id']: c for c in categories}
+        self.categories = sorted(
+            (c for c in categories if c.get('is_active', True) is not False),
+            key=lambda c: (c.get('display_order') or 0, c['category_id'])
+        )
+
+        self._products = {p['product_id']: _normalize_product(p, self._categories) for p in products}
+        self._by_category: Dict[int, List[Dict]] = {}
+        for product in sorted(self._products.values(), key=lambda p: p.get('nombre') or ''):
+            if product['activo']:
+                self._by_category.setdefault(product.get('category_id'), []).append(product)
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def category(self, category_id: int) -> Optional[Dict]:
+        return self._categories.get(category_id)
+
+    def products_in(self, category_id: int) -> List[Dict]:
+        """Productos activos de una categoría, por nombre"""
+        return self._by_category.get(category_id, [])
+
+    def product(self, product_id: int) -> Optional[Dict]:
+        product = self._products.get(product_id)
+        return dict(product) if product is not None else None
+
+    def available_products(self) -> List[Dict]:
+        """Productos activos y disponibles, agrupados por categoría"""
+        return sorted(
+            (p for p in self._products.values() if p['activo'] and p['disponible']),
+            key=lambda p: p.get('categoria') or ''
+        )
+
+    # === PERSISTENCIA ===
+
+    def to_dict(self) -> Dict:
+        return {
+            'format': SNAPSHOT_FORMAT,
+            'version': self.version,
+            'categories': list(self._categories.values()),
+            'products': list(self._products.values()),
+            'locations': self.locations,
+            'knowledge_base': self.knowledge_base,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, source: str = "disk") -> 'CatalogSnapshot':
+        """
+        Raises:
+            ValueError: Si el archivo es de otro formato
+        """
+        if data.get('format') != SNAPSHOT_FORMAT:
+            raise ValueError(f"formato {data.get('format')!r}, se esperaba {SNAPSHOT_FORMAT}")
+        return cls(data.get('version'), data['categories'], data['products'],
+                   data.get('locations', ()), data.get('knowledge_base', ()), source)
+
+    def save(self, path: str):
+        """Escribe el snapshot de forma atómica (nunca queda un archivo a medias)"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(',', ':'), default=str)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'CatalogSnapshot':
+        with open(path, 'rb') as f:
+            return cls.from_dict(json.loads(f.read()))
+
+
+class CatalogCache:
+    """Snapshot del catálogo con recarga por cambio de versión"""
+
+    def __init__(
+        self,
+        supabase_factory: Callable,
+        poll_interval: float = 15.0,
+        reload_spread: float = 5.0,
+        max_age: float = 300.0,
+        rng: Callable[[], float] = random.random,
+        snapshot_path: Optional[str] = None
+    ):
+        """
+        Args:
+            supabase_factory: Función que retorna el cliente de Supabase
+            poll_interval: Segundos promedio entre lecturas de la versión
+            reload_spread: Espera aleatoria máxima antes de atender un aviso
+            max_age: Sin la tabla catalog_version, segundos entre recargas completas
+            rng: Fuente de azar para el jitter (0 <= x < 1)
+            snapshot_path: Archivo del último catálogo bueno (None = no persistir)
+        """
+        self.supabase_factory = supabase_factory
+        self.poll_interval = poll_interval
+        self.reload_spread = reload_spread
+        self.max_age = max_age
+        self.rng = rng
+        self.snapshot_path = snapshot_path
+        self.reloads = 0
+
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[CatalogSnapshot], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+
+        self._reloads = metrics.counter("catalog_reloads_total", "Recargas completas del catálogo")
+        self._version = metrics.gauge("catalog_version", "Versión del catálogo en memoria")
+
+    # === LECTURA ===
+
+    def _read_version(self) -> Optional[int]:
+        """Versión actual en la base (None si no existe la tabla o no se pudo leer)"""
+        try:
+            rows = self.supabase_factory().table("catalog_version")\
+                .select("version")\
+                .eq("id", 1)\
+                .limit(1)\
+                .execute().data
+        except Exception as e:
+            logger.debug(f"catalog_version no disponible: {e}")
+            return None
+        return int(rows[0]['version']) if rows else None
+
+    def _load(self, version: Optional[int]) -> CatalogSnapshot:
+        supabase = self.supabase_factory()
+        categories = fetch_all(supabase, "product_categories", key="category_id")
+        products = fetch_all(supabase, "products", key="product_id")
+
+        # Puntos y KB van en la copia de disco; si sus tablas fallan se conserva lo anterior
+        previous = self._snapshot
+        try:
+            locations = sorted(
+                fetch_all(supabase, "pickup_locations", key="location_id", filters=lambda q: q.eq("activo", True)),
+                key=lambda row: (row.get('orden_display') or 0, row['location_id'])
+            )
+        except Exception as e:
+            logger.debug(f"pickup_locations no disponible: {e}")
+            locations = previous.locations if previous else []
+        try:
+            knowledge_base = fetch_all(supabase, "knowledge_base", key="kb_id", filters=lambda q: q.eq("activa", True))
+        except Exception as e:
+            logger.debug(f"knowledge_base no disponible: {e}")
+            knowledge_base = previous.knowledge_base if previous else []
+        return CatalogSnapshot(version, categories, products, locations, knowledge_base)
+
+    def _restore(self) -> Optional[CatalogSnapshot]:
+        """Último catálogo bueno guardado en disco (None si no hay o no se puede leer)"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        started = time.perf_counter()
+        try:
+            snapshot = CatalogSnapshot.load(self.snapshot_path)
+        except Exception as e:
+            logger.warning(f"⚠️ Copia del catálogo ilegible, se ignora ({self.snapshot_path}): {e}")
+            return None
+        logger.info(f"💾 Catálogo v{snapshot.version} leído de disco en {(time.perf_counter() - started) * 1000:.1f} ms")
+        return snapshot
+
+    def _persist(self, snapshot: CatalogSnapshot):
+        try:
+            snapshot.save(self.snapshot_path)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo guardar la copia del catálogo: {e}")
+
+    def _swap(self, snapshot: CatalogSnapshot):
+        self._snapshot = snapshot
+        self.reloads += 1
+        self._reloads.inc()
+        self._version.set(snapshot.version or 0)
+        logger.info(f"📦 Catálogo v{snapshot.version} ({snapshot.source}): "
+                    f"{len(snapshot.categories)} categorías, {len(snapshot)} productos")
+        if snapshot.source == "db" and self.snapshot_path:
+            self._persist(snapshot)
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error(f"❌ Error en listener del catálogo: {e}")
+
+    def on_change(self, listener: Callable[[CatalogSnapshot], None]):
+        """Registra una función que recibe cada snapshot nuevo"""
+        self._listeners.append(listener)
+
+    def snapshot(self) -> CatalogSnapshot:
+        """
+        Catálogo actual; la primera llamada lo carga
+
+        Si hay copia en disco se usa esa sin esperar a la base. Con la tarea
+        de fondo corriendo, ella la revalida (ver _run); sin tarea, la misma
+        llamada que la leyó hace un refresh() antes de retornar.
+
+        Raises:
+            Exception: Si no hay snapshot, ni copia en disco, y la base no responde
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+
+        with self._lock:
+            restored = None
+            if self._snapshot is None:
+                restored = self._restore()
+                # La versión se lee antes que los datos: un cambio en medio se verá en el próximo ciclo
+                self._swap(restored or self._load(self._read_version()))
+            snapshot = self._snapshot
+
+        if restored is not None and not self.syncing:
+            # Nadie más revalidaría la copia: sin esto se serviría para siempre
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo revalidar la copia del catálogo, se usa v{snapshot.version}: {e}")
+            snapshot = self._snapshot
+        return snapshot
+
+    def refresh(self) -> bool:
+        """
+        Recarga el catálogo si cambió la versión
+
+        Returns:
+            bool: True si se cargó un snapshot nuevo
+        """
+        current = self._snapshot
+        version = self._read_version()
+        if current is not None:
+            if version is None and time.monotonic() - current.loaded_at < self.max_age:
+                return False
+            if version is not None and version == current.version:
+                return False
+
+        with self._lock:
+            latest = self._snapshot
+            if latest is not current and latest is not None and (version is None or latest.version == version):
+                # Otro hilo ya cargó esta versión mientras esperábamos
+                return False
+            self._swap(self._load(version))
+        return True
+
+    # === CICLO DE VIDA ===
+
+    @property
+    def syncing(self) -> bool:
+        """True si la tarea de fondo está corriendo"""
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            logger.info("📦 Sincronización del catálogo iniciada")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def notify(self):
+        """Aviso de cambio (Realtime u otro hilo): revisar la versión pronto"""
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _revalidate(self):
+        try:
+            await asyncio.to_thread(self.refresh)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo recargar el catálogo, se mantiene v{getattr(self._snapshot, 'version', None)}: {e}")
+
+    async def _run(self):
+        try:
+            # Primero la copia de disco (rápida); con la tarea ya corriendo, snapshot() no la revalida
+            snapshot = await asyncio.to_thread(self.snapshot)
+        except Exception as e:
+            logger.warning(f"⚠️ Catálogo no disponible al arrancar, se reintenta en segundo plano: {e}")
+            snapshot = None
+        if snapshot is None or snapshot.source == "disk":
+            # Arranque desde la copia de disco (o sin nada): revalidar ya, no en el próximo poll
+            await self._revalidate()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval * (0.5 + self.rng()))
+                # Todas las réplicas reciben el aviso a la vez: repartir las recargas
+                await asyncio.sleep(self.reload_spread * self.rng())
+            except asyncio.TimeoutError:
+                pass
+            # Se limpia justo antes de revisar: un aviso llegado durante el arranque no se pierde
+            self._wake.clear()
+            await self._revalidate()
+
+    def start_realtime(self, url: str, key: str) -> threading.Thread:
+        """
+        Escucha los UPDATE de catalog_version por Supabase Realtime en un hilo aparte
+
+        Si la conexión falla, el polling sigue funcionando igual.
+        """
+        ws_url = url.replace('https://', 'wss://').replace('http://', 'ws://').rstrip('/')
+
+        def listen():
+            try:
+                from realtime.connection import Socket
+
+                asyncio.set_event_loop(asyncio.new_event_loop())
+                socket = Socket(f"{ws_url}/realtime/v1/websocket?apikey={key}&vsn=1.0.0", auto_reconnect=True)
+                socket.connect()
+                channel = socket.set_channel("realtime:public:catalog_version")
+                channel.join().on("UPDATE", lambda payload: self.notify())
+                logger.info("📡 Escuchando cambios del catálogo por Realtime")
+                socket.listen()
+            except Exception as e:
+                logger.warning(f"⚠️ Realtime del catálogo no disponible, solo polling: {e}")
+
+        thread = threading.Thread(target=listen, name="catalog-realtime", daemon=True)
+        thread.start()
+        return thread
+
+
+# ============================================
+# INTEGRACIÓN CON LA APLICACIÓN DEL BOT
+# ============================================
+
+async def start_catalog_sync(application, cache: CatalogCache):
+    """Arranca la revisión periódica de la versión (y Realtime si CATALOG_REALTIME=1)"""
+    from app.services.pickup_slots import PickupService
+
+    cache.poll_interval = float(os.getenv('CATALOG_POLL_INTERVAL', cache.poll_interval))
+    # Los puntos de recogida también suben la versión: releerlos en el próximo uso
+    cache.on_change(lambda snapshot: PickupService.registry().invalidate())
+    cache.start()
+    try:
+        # Cargar antes del primer mensaje para no hacer esperar al primer cliente
+        await asyncio.to_thread(cache.snapshot)
+    except Exception as e:
+        logger.warning(f"⚠️ Catálogo no disponible al arrancar, se reintenta en segundo plano: {e}")
+
+    if os.getenv('CATALOG_REALTIME', '').lower() in ('1', 'true', 'yes'):
+        cache.start_realtime(os.getenv('SUPABASE_URL', ''), os.getenv('SUPABASE_KEY', ''))
+
+
+async def stop_catalog_sync(cache: CatalogCache):
+    await cache.stop()
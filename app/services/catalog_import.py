@@ -0,0 +1,410 @@
+"""
+Importación masiva del catálogo (categorías y productos).
+
+El archivo del proveedor (CSV, XLSX, JSON o JSON Lines) se lee fila a fila
+y se compara contra el catálogo actual, que se trae completo una sola vez
+(keyset). El resultado es un diff en memoria: categorías y productos nuevos,
+cambiados y, opcionalmente, productos que ya no vienen en el archivo. El
+diff se aplica con ``upsert(on_conflict=...)`` por lotes sobre la clave
+natural, así que el número de consultas depende del tamaño de los lotes y
+no del número de productos:
+
+    2 lecturas + ceil(categorías / lote) + ceil(productos / lote) + 1
+
+Al final se sube la versión del catálogo (bump_catalog_version, ver
+scripts/add_catalog_import.sql) para que los bots recarguen sus cachés.
+
+Columnas del archivo (encabezados, sin distinguir mayúsculas):
+    categoria, nombre, precio [, descripcion, disponible, activo, emoji]
+"""
+
+import csv
+import json
+import logging
+import os
+import re
+import zipfile
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from xml.etree import ElementTree
+
+from app.utils.keyset import fetch_all
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+DEFAULT_EMOJI = '📦'
+
+CATEGORY_COLUMNS = "category_id, name, icon_emoji, display_order, is_active"
+PRODUCT_COLUMNS = "product_id, nombre, category_id, categoria, descripcion, precio, activo, disponible"
+
+# Coma solo como separador de miles: "22,000" o "1,250,000.50"
+THOUSANDS_PRICE = re.compile(r'^\d{1,3}(,\d{3})*(\.\d+)?$')
+
+
+class CategorySpec(NamedTuple):
+    name: str
+    icon_emoji: Optional[str] = None
+    display_order: Optional[int] = None
+
+
+class ProductSpec(NamedTuple):
+    categoria: str
+    nombre: str
+    precio: float
+    descripcion: Optional[str] = None
+    disponible: Optional[bool] = None
+    activo: bool = True
+    emoji: Optional[str] = None
+
+
+class CatalogDiff(NamedTuple):
+    """Cambios a aplicar; las filas ya traen todas las columnas (las no dadas, con su valor actual)"""
+    categories: List[Dict]
+    new_products: List[Dict]
+    changed_products: List[Tuple[Dict, Dict]]   # (actual, nuevo)
+    deactivated: List[Dict]
+    unchanged: int
+    errors: List[str]
+
+    def __bool__(self) -> bool:
+        return bool(self.categories or self.new_products or self.changed_products or self.deactivated)
+
+    def summary(self, limit: int = 20) -> List[str]:
+        """Líneas legibles del diff (para --dry-run)"""
+        lines = [
+            f"📂 Categorías nuevas o cambiadas: {len(self.categories)}",
+            f"✅ Productos nuevos: {len(self.new_products)}",
+            f"✏️ Productos cambiados: {len(self.changed_products)}",
+            f"🚫 Productos desactivados: {len(self.deactivated)}",
+            f"➖ Sin cambios: {self.unchanged}",
+        ]
+        for row in self.new_products[:limit]:
+            lines.append(f"   + {row['categoria']} / {row['nombre']}: ${row['precio']:,.0f}")
+        for old, new in self.changed_products[:limit]:
+            fields = ', '.join(f"{k}: {old.get(k)!r} → {new[k]!r}" for k in _PRODUCT_FIELDS if not _same(old.get(k), new[k]))
+            lines.append(f"   ~ {new['categoria']} / {new['nombre']}: {fields}")
+        for row in self.deactivated[:limit]:
+            lines.append(f"   - {row['categoria']} / {row['nombre']}")
+        lines += [f"⚠️ {error}" for error in self.errors[:limit]]
+        return lines
+
+
+# ============================================
+# LECTURA
+# ============================================
+
+def _read_csv(path: str) -> Iterator[Dict]:
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.DictReader(f, dialect=dialect)
+
+
+def _read_json(path: str) -> Iterator[Dict]:
+    with open(path, encoding='utf-8-sig') as f:
+        if path.endswith(('.jsonl', '.ndjson')):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            data = json.load(f)
+            yield from (data.get('products', []) if isinstance(data, dict) else data)
+
+
+_XLSX_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+
+def _xlsx_column(ref: str) -> int:
+    index = 0
+    for char in ref:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - 64
+    return index - 1
+
+
+def _read_xlsx(path: str) -> Iterator[Dict]:
+    """Primera hoja de un XLSX, fila a fila (iterparse, sin cargar la hoja completa)"""
+    with zipfile.ZipFile(path) as archive:
+        names = archive.namelist()
+        shared: List[str] = []
+        if 'xl/sharedStrings.xml' in names:
+            with archive.open('xl/sharedStrings.xml') as f:
+                for _, element in ElementTree.iterparse(f):
+                    if element.tag == f'{_XLSX_NS}si':
+                        shared.append(''.join(t.text or '' for t in element.iter(f'{_XLSX_NS}t')))
+                        element.clear()
+
+        sheets = sorted(n for n in names if re.fullmatch(r'xl/worksheets/sheet\d+\.xml', n))
+        if not sheets:
+            return
+        sheet = 'xl/worksheets/sheet1.xml' if 'xl/worksheets/sheet1.xml' in sheets else sheets[0]
+
+        headers: Optional[List[str]] = None
+        with archive.open(sheet) as f:
+            for _, element in ElementTree.iterparse(f):
+                if element.tag != f'{_XLSX_NS}row':
+                    continue
+                values: Dict[int, object] = {}
+                for position, cell in enumerate(element.iter(f'{_XLSX_NS}c')):
+                    column = _xlsx_column(cell.get('r')) if cell.get('r') else position
+                    kind = cell.get('t')
+                    if kind == 'inlineStr':
+                        value = ''.join(t.text or '' for t in cell.iter(f'{_XLSX_NS}t'))
+                    else:
+                        raw = cell.findtext(f'{_XLSX_NS}v')
+                        if raw is None:
+                            continue
+                        value = shared[int(raw)] if kind == 's' else raw
+                    values[column] = value
+                element.clear()
+
+                if headers is None:
+                    headers = [str(values.get(i, '')) for i in range(max(values, default=-1) + 1)]
+                    continue
+                if values:
+                    yield {name: values.get(i) for i, name in enumerate(headers) if name}
+
+
+READERS = {
+    '.csv': _read_csv,
+    '.xlsx': _read_xlsx,
+    '.json': _read_json,
+    '.jsonl': _read_json,
+    '.ndjson': _read_json,
+}
+
+
+def read_rows(path: str) -> Iterator[Dict]:
+    """
+    Filas del archivo como dicts, en streaming
+
+    Raises:
+        ValueError: Si la extensión no es de un formato soportado
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in READERS:
+        raise ValueError(f"Formato no soportado: {extension} (usar {', '.join(sorted(READERS))})")
+    return READERS[extension](path)
+
+
+def _parse_price(value) -> float:
+    """
+    Precio con coma de miles y punto decimal, como se muestran en el bot
+
+    Raises:
+        ValueError: Si un separador puede ser de miles o decimal ("22.000",
+            "1.250.000", "4500,50" o "22.000,50" de un CSV en español): la
+            fila se rechaza en vez de importar un precio mil veces menor o
+            cien veces mayor
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).replace('$', '').replace(' ', '')
+    if ',' in text:
+        if not THOUSANDS_PRICE.match(text):
+            raise ValueError(f"Separador ambiguo en el precio {value!r}")
+    elif '.' in text:
+        decimals = text.rsplit('.', 1)[1]
+        if text.count('.') > 1 or ',' in decimals or len(decimals) == 3:
+            raise ValueError(f"Separador ambiguo en el precio {value!r}")
+    return float(text.replace(',', ''))
+
+
+def _parse_bool(value) -> Optional[bool]:
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'si', 'sí', 'x', 'yes', 'y')
+
+
+def parse_products(rows: Iterable[Dict], errors: List[str]) -> Iterator[ProductSpec]:
+    """
+    Normaliza las filas del archivo; las inválidas se anotan en ``errors``
+
+    Args:
+        rows: Filas con categoria, nombre, precio y columnas opcionales
+        errors: Lista donde se agregan los errores por fila
+    """
+    for number, row in enumerate(rows, 2):
+        row = {str(k).strip().lower(): v for k, v in row.items() if k is not None}
+        categoria = str(row.get('categoria') or '').strip()
+        nombre = str(row.get('nombre') or '').strip()
+        try:
+            precio = _parse_price(row.get('precio'))
+        except (TypeError, ValueError):
+            errors.append(f"Fila {number}: precio inválido {row.get('precio')!r}")
+            continue
+        if not categoria or not nombre or precio <= 0:
+            errors.append(f"Fila {number}: falta categoría, nombre o precio")
+            continue
+
+        activo = _parse_bool(row.get('activo'))
+        yield ProductSpec(
+            categoria=categoria,
+            nombre=nombre,
+            precio=precio,
+            descripcion=(str(row['descripcion']).strip() or None) if row.get('descripcion') is not None else None,
+            disponible=_parse_bool(row.get('disponible')),
+            activo=True if activo is None else activo,
+            emoji=row.get('emoji') or None,
+        )
+
+
+# ============================================
+# DIFF Y APLICACIÓN
+# ============================================
+
+_CATEGORY_FIELDS = ('icon_emoji', 'display_order', 'is_active')
+_PRODUCT_FIELDS = ('categoria', 'descripcion', 'precio', 'activo', 'disponible')
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)) and not isinstance(a, bool):
+        return float(a) == float(b)
+    return a == b
+
+
+class CatalogImporter:
+    """Compara un catálogo contra Supabase y aplica las diferencias por lotes"""
+
+    def __init__(self, supabase, batch_size: int = BATCH_SIZE):
+        self.supabase = supabase
+        self.batch_size = batch_size
+        self.categories: Dict[str, Dict] = {}
+        self.products: Dict[Tuple[str, str], Dict] = {}
+
+    def load_existing(self):
+        """Trae categorías y productos actuales (una lectura por tabla)"""
+        categories = fetch_all(self.supabase, "product_categories", key="category_id", columns=CATEGORY_COLUMNS)
+        names = {c['category_id']: c['name'] for c in categories}
+        self.categories = {c['name']: c for c in categories}
+        self.products = {}
+        for product in fetch_all(self.supabase, "products", key="product_id", columns=PRODUCT_COLUMNS):
+            category = names.get(product.get('category_id'))
+            if category is not None:
+                self.products[(category, product['nombre'])] = product
+        logger.info(f"📦 Catálogo actual: {len(self.categories)} categorías, {len(self.products)} productos")
+
+    def diff(
+        self,
+        products: Iterable[ProductSpec],
+        categories: Iterable[CategorySpec] = (),
+        deactivate_missing: bool = False,
+        errors: Optional[List[str]] = None
+    ) -> CatalogDiff:
+        """
+        Cambios necesarios para que el catálogo quede como el archivo
+
+        Args:
+            products: Productos del archivo (si se repite uno, gana el último)
+            categories: Emoji y orden de categorías (las demás salen de los productos)
+            deactivate_missing: Desactivar productos activos que no vienen en el archivo
+            errors: Errores de lectura a incluir en el resultado
+        """
+        specs = {c.name: c for c in categories}
+        next_order = max((c.get('display_order') or 0 for c in self.categories.values()), default=0)
+        wanted: Dict[str, Dict] = {}
+        incoming: Dict[Tuple[str, str], Dict] = {}
+
+        for product in products:
+            if product.categoria not in specs:
+                specs[product.categoria] = CategorySpec(product.categoria, product.emoji)
+            current = self.products.get((product.categoria, product.nombre), {})
+            incoming[(product.categoria, product.nombre)] = {
+                'nombre': product.nombre,
+                'categoria': product.categoria,
+                'descripcion': product.descripcion if product.descripcion is not None else current.get('descripcion'),
+                'precio': product.precio,
+                'activo': product.activo,
+                'disponible': product.disponible if product.disponible is not None
+                else current.get('disponible') is not False,
+            }
+
+        for name, spec in specs.items():
+            current = self.categories.get(name) or {}
+            display_order = spec.display_order
+            if display_order is None:
+                if not current:
+                    next_order += 1
+                display_order = current.get('display_order') if current else next_order
+            row = {
+                'name': name,
+                'icon_emoji': spec.icon_emoji or current.get('icon_emoji') or DEFAULT_EMOJI,
+                'display_order': display_order,
+                'is_active': True,
+            }
+            if not current or any(not _same(current.get(k), row[k]) for k in _CATEGORY_FIELDS):
+                wanted[name] = row
+
+        new_products, changed, unchanged = [], [], 0
+        for key, row in incoming.items():
+            current = self.products.get(key)
+            if current is None:
+                new_products.append(row)
+            elif any(not _same(current.get(k), row[k]) for k in _PRODUCT_FIELDS):
+                changed.append((current, row))
+            else:
+                unchanged += 1
+
+        deactivated = []
+        if deactivate_missing:
+            for key, current in self.products.items():
+                if key not in incoming and current.get('activo') is not False:
+                    deactivated.append({
+                        'nombre': current['nombre'],
+                        'categoria': key[0],
+                        'descripcion': current.get('descripcion'),
+                        'precio': current['precio'],
+                        'activo': False,
+                        'disponible': current.get('disponible'),
+                    })
+
+        return CatalogDiff(list(wanted.values()), new_products, changed, deactivated, unchanged, list(errors or []))
+
+    def _batches(self, rows: List[Dict]) -> Iterator[List[Dict]]:
+        for i in range(0, len(rows), self.batch_size):
+            yield rows[i:i + self.batch_size]
+
+    def apply(self, diff: CatalogDiff) -> Dict[str, int]:
+        """
+        Aplica el diff con upserts por lotes y sube la versión del catálogo
+
+        Returns:
+            Dict[str, int]: Filas escritas por tipo
+        """
+        category_ids = {name: c['category_id'] for name, c in self.categories.items()}
+        for batch in self._batches(diff.categories):
+            for row in self.supabase.table("product_categories").upsert(batch, on_conflict="name").execute().data:
+                category_ids[row['name']] = row['category_id']
+                self.categories[row['name']] = row
+
+        rows = diff.new_products + [new for _, new in diff.changed_products] + diff.deactivated
+        payload = [{**row, 'category_id': category_ids[row['categoria']]} for row in rows]
+        for batch in self._batches(payload):
+            self.supabase.table("products").upsert(batch, on_conflict="nombre,category_id").execute()
+
+        if diff:
+            self.bump_version()
+
+        written = {
+            'categories': len(diff.categories),
+            'created': len(diff.new_products),
+            'updated': len(diff.changed_products),
+            'deactivated': len(diff.deactivated),
+        }
+        logger.info(f"✅ Catálogo importado: {written}")
+        return written
+
+    def bump_version(self) -> Optional[int]:
+        """Avisa a los bots que el catálogo cambió"""
+        try:
+            return self.supabase.rpc("bump_catalog_version").execute().data
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo subir la versión del catálogo (¿falta scripts/add_catalog_import.sql?): {e}")
+            return None
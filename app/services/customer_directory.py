@@ -0,0 +1,124 @@
+"""
+Directorio de clientes para el panel de admin.
+
+Lee la vista customer_directory (scripts/add_customer_directory.sql): una
+página de clientes por consulta, con búsqueda ILIKE respaldada por un
+índice de trigramas y paginación keyset sobre el orden elegido. Los
+agregados por cliente vienen precalculados, así que el costo de una página
+no crece con el número de clientes ni de pedidos.
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.query_batch import QueryBatch
+
+logger = logging.getLogger(__name__)
+
+# Orden -> columna; siempre descendente y desempatado por user_id
+SORTS = {
+    'recent': 'created_at',
+    'value': 'total_spent',
+    'orders': 'order_count',
+}
+
+Cursor = Tuple[object, int]
+
+
+def _escape_like(text: str) -> str:
+    """Escapa los comodines de LIKE para buscar el texto tal cual"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _quote(value) -> str:
+    """Valor para un filtro lógico de PostgREST (fechas llevan ':' y '+')"""
+    text = str(value)
+    return f'"{text}"' if any(c in text for c in ',.:()+ ') else text
+
+
+class CustomerDirectory:
+    """Búsqueda y paginación de clientes"""
+
+    VIEW = "customer_directory"
+    PAGE_SIZE = 25
+
+    @classmethod
+    def search_page(
+        cls,
+        supabase,
+        search: str = '',
+        sort: str = 'recent',
+        cursor: Optional[Cursor] = None,
+        page_size: int = None
+    ) -> Tuple[List[Dict], Optional[Cursor]]:
+        """
+        Una página de clientes
+
+        Args:
+            supabase: Cliente de Supabase
+            search: Texto a buscar en nombre o teléfono
+            sort: 'recent', 'value' u 'orders'
+            cursor: (valor de orden, user_id) de la última fila de la página anterior
+            page_size: Filas por página
+
+        Returns:
+            Tuple: (filas, cursor de la página siguiente o None si es la última)
+        """
+        column = SORTS[sort]
+        page_size = page_size or cls.PAGE_SIZE
+
+        query = supabase.table(cls.VIEW).select("*")
+
+        term = (search or '').strip().lower()
+        if term:
+            query = query.ilike("search_text", f"%{_escape_like(term)}%")
+
+        if cursor is not None:
+            value, last_id = cursor
+            value = _quote(value)
+            query = query.or_(f"{column}.lt.{value},and({column}.eq.{value},user_id.lt.{last_id})")
+
+        rows = query\
+            .order(column, desc=True)\
+            .order("user_id", desc=True)\
+            .limit(page_size + 1)\
+            .execute().data or []
+
+        # Una fila de más indica que hay otra página
+        if len(rows) <= page_size:
+            return rows, None
+        rows = rows[:page_size]
+        return rows, (rows[-1][column], rows[-1]['user_id'])
+
+    @classmethod
+    def get_counts(cls, supabase, now: datetime = None) -> Dict[str, int]:
+        """
+        Totales del encabezado (en paralelo)
+
+        Returns:
+            Dict: total, new_this_month y active (con al menos un pedido)
+        """
+        now = now or datetime.now()
+        first_day_month = now.replace(day=1).date()
+
+        batch = QueryBatch(timeout=5)
+        batch.add("total", lambda: supabase.table("users")
+                  .select("user_id", count="estimated")
+                  .limit(1)
+                  .execute().count, default=None)
+        batch.add("new_this_month", lambda: supabase.table("users")
+                  .select("user_id", count="exact")
+                  .gte("created_at", f"{first_day_month}T00:00:00")
+                  .limit(1)
+                  .execute().count, default=None)
+        batch.add("active", lambda: supabase.table("customer_stats")
+                  .select("user_id", count="estimated")
+                  .gt("order_count", 0)
+                  .limit(1)
+                  .execute().count, default=None)
+        result = batch.run()
+
+        if result.failed:
+            logger.warning(f"⚠️ Conteos de clientes incompletos: {', '.join(result.failed)}")
+        return result.results
@@ -0,0 +1,339 @@
+"""
+Motor de reglas de descuento compiladas a partir de la tabla discounts.
+
+El panel de admin escribe en ``discounts`` descuentos generales, por
+cliente y por categoría. Aquí se leen los automáticos (activos, sin código,
+vigentes y con usos disponibles) y se compilan por alcance:
+
+- global: aplica a todos los clientes
+- cliente: ``user_id`` de la regla
+- categoría: ``category_id`` de la regla, sobre las unidades y el subtotal
+  de los items de esa categoría
+
+Cada alcance se compila en una tabla ordenada por umbrales (cantidad mínima
+x monto mínimo) con la mejor regla porcentual y la mejor fija acumuladas,
+así que evaluar un carrito son dos ``bisect``: O(log n) en el número de
+reglas. Se aplica un solo descuento, el que más ahorra.
+
+Las reglas de respaldo (DiscountService.DISCOUNT_TIERS) son el alcance
+global mientras no haya una regla global vigente; las de cliente y
+categoría compiten con ellas.
+
+La tabla se relee cada ``ttl`` segundos pero solo se recompila si las
+reglas cambiaron o si una regla entra o sale de su vigencia.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.utils.keyset import fetch_all
+
+logger = logging.getLogger(__name__)
+
+RULE_COLUMNS = (
+    "discount_id, name, code, discount_type, value, min_order_amount, min_quantity, "
+    "user_id, category_id, start_date, end_date, max_uses, current_uses, active"
+)
+
+
+class Rule(NamedTuple):
+    """Regla automática ya normalizada"""
+    discount_id: Optional[int]
+    name: str
+    kind: str            # 'percentage' o 'fixed'
+    value: float
+    min_quantity: int = 0
+    min_amount: float = 0.0
+    user_id: Optional[int] = None
+    category_id: Optional[int] = None
+
+    def saving(self, amount: float) -> float:
+        """Ahorro de la regla sobre un subtotal"""
+        if self.kind == 'percentage':
+            return amount * self.value / 100
+        return min(self.value, amount)
+
+
+class Quote(NamedTuple):
+    """Precio de un carrito"""
+    subtotal: float
+    quantity: int
+    percent: float
+    amount: float
+    total: float
+    rule: Optional[Rule] = None
+
+
+# ============================================
+# COMPILACIÓN
+# ============================================
+
+# Celdas máximas de la tabla de un alcance (umbrales de cantidad x de monto)
+MAX_GRID_CELLS = 250_000
+
+
+class _Scope:
+    """
+    Reglas de un alcance compiladas en una tabla de umbrales
+
+    Filas: cantidades mínimas distintas; columnas: montos mínimos distintos.
+    La celda (i, j) guarda la mejor regla porcentual y la mejor fija entre
+    las que piden a lo sumo esa cantidad y ese monto (máximo acumulado en
+    ambos ejes), así que un carrito se resuelve con dos bisect.
+    """
+
+    __slots__ = ('quantities', 'amounts', 'percent', 'fixed', 'linear', 'size')
+
+    def __init__(self, rules: List[Rule]):
+        self.size = len(rules)
+        self.quantities = sorted({r.min_quantity for r in rules})
+        self.amounts = sorted({r.min_amount for r in rules})
+        self.linear: Optional[List[Rule]] = None
+
+        if len(self.quantities) * len(self.amounts) > MAX_GRID_CELLS:
+            logger.warning(f"⚠️ {len(rules)} reglas con demasiados umbrales distintos; se evalúan una por una")
+            self.linear = rules
+            return
+
+        self.percent = self._grid([r for r in rules if r.kind == 'percentage'])
+        self.fixed = self._grid([r for r in rules if r.kind == 'fixed'])
+
+    def _grid(self, rules: List[Rule]) -> List[List[Optional[Rule]]]:
+        grid: List[List[Optional[Rule]]] = [[None] * len(self.amounts) for _ in self.quantities]
+        for rule in rules:
+            i = bisect_right(self.quantities, rule.min_quantity) - 1
+            j = bisect_right(self.amounts, rule.min_amount) - 1
+            if grid[i][j] is None or rule.value > grid[i][j].value:
+                grid[i][j] = rule
+
+        for i, row in enumerate(grid):
+            above = grid[i - 1] if i else None
+            for j in range(len(row)):
+                candidates = (row[j], row[j - 1] if j else None, above[j] if above else None)
+                row[j] = max((r for r in candidates if r is not None), key=lambda r: r.value, default=None)
+        return grid
+
+    def best(self, quantity: int, amount: float) -> Tuple[float, Optional[Rule]]:
+        if self.linear is not None:
+            candidates = [r for r in self.linear if quantity >= r.min_quantity and amount >= r.min_amount]
+        else:
+            i = bisect_right(self.quantities, quantity) - 1
+            j = bisect_right(self.amounts, amount) - 1
+            if i < 0 or j < 0:
+                return 0.0, None
+            candidates = (self.percent[i][j], self.fixed[i][j])
+
+        best_saving, best_rule = 0.0, None
+        for rule in candidates:
+            if rule is not None:
+                saving = rule.saving(amount)
+                if saving > best_saving:
+                    best_saving, best_rule = saving, rule
+        return best_saving, best_rule
+
+
+def _parse_ts(value) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def rule_from_row(row: Dict) -> Rule:
+    return Rule(
+        discount_id=row.get('discount_id'),
+        name=row.get('name') or 'Descuento',
+        kind='fixed' if row.get('discount_type') == 'fixed' else 'percentage',
+        value=float(row.get('value') or 0),
+        min_quantity=int(row.get('min_quantity') or 0),
+        min_amount=float(row.get('min_order_amount') or 0),
+        user_id=row.get('user_id'),
+        category_id=row.get('category_id'),
+    )
+
+
+class CompiledRules:
+    """Reglas vigentes en un momento, agrupadas por alcance"""
+
+    def __init__(self, rules: Iterable[Rule], valid_until: Optional[datetime] = None):
+        rules = [r for r in rules if r.value > 0]
+        customers: Dict[int, List[Rule]] = {}
+        categories: Dict[int, List[Rule]] = {}
+        general: List[Rule] = []
+
+        for rule in rules:
+            if rule.user_id is not None:
+                customers.setdefault(rule.user_id, []).append(rule)
+            elif rule.category_id is not None:
+                categories.setdefault(rule.category_id, []).append(rule)
+            else:
+                general.append(rule)
+
+        self.rules = rules
+        self.general = _Scope(general)
+        self.customers = {k: _Scope(v) for k, v in customers.items()}
+        self.categories = {k: _Scope(v) for k, v in categories.items()}
+        self.valid_until = valid_until
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict], now: datetime) -> 'CompiledRules':
+        """
+        Compila las filas de discounts vigentes en ``now``
+
+        valid_until es el próximo inicio o fin de vigencia: a partir de ahí
+        el conjunto de reglas cambia y hay que recompilar.
+        """
+        rules, boundaries = [], []
+        for row in rows:
+            if not row.get('active') or row.get('code'):
+                continue
+            max_uses = row.get('max_uses')
+            if max_uses and (row.get('current_uses') or 0) >= max_uses:
+                continue
+
+            start, end = _parse_ts(row.get('start_date')), _parse_ts(row.get('end_date'))
+            boundaries += [t for t in (start, end) if t and t > now]
+            if (start and start > now) or (end and end <= now):
+                continue
+            rules.append(rule_from_row(row))
+
+        return cls(rules, min(boundaries, default=None))
+
+    def quote(self, items: Iterable[Dict], user_id: Optional[int] = None) -> Quote:
+        """
+        Precio de un carrito con el mejor descuento aplicable
+
+        Args:
+            items: Items con precio, cantidad y opcionalmente category_id
+            user_id: Cliente (users.user_id) para sus reglas individuales
+        """
+        subtotal, quantity = 0.0, 0
+        by_category: Dict[int, List] = {}
+        for item in items:
+            precio = float(item.get('precio', 0))
+            cantidad = int(item.get('cantidad', 0))
+            subtotal += precio * cantidad
+            quantity += cantidad
+            category_id = item.get('category_id')
+            if category_id in self.categories:
+                totals = by_category.setdefault(category_id, [0, 0.0])
+                totals[0] += cantidad
+                totals[1] += precio * cantidad
+
+        saving, rule = self.general.best(quantity, subtotal)
+        scope = self.customers.get(user_id) if user_id is not None else None
+        if scope is not None:
+            saving, rule = max((saving, rule), scope.best(quantity, subtotal), key=lambda c: c[0])
+        for category_id, (cat_quantity, cat_amount) in by_category.items():
+            saving, rule = max((saving, rule), self.categories[category_id].best(cat_quantity, cat_amount),
+                               key=lambda c: c[0])
+
+        percent = 0.0
+        if rule is not None:
+            percent = rule.value if rule.kind == 'percentage' and rule.category_id is None \
+                else round(saving / subtotal * 100, 1)
+        return Quote(subtotal, quantity, percent, saving, subtotal - saving, rule)
+
+    def quantity_tiers(self) -> List[Rule]:
+        """Reglas generales solo por cantidad y en porcentaje (para mostrar al cliente)"""
+        return sorted(
+            (r for r in self.rules
+             if r.user_id is None and r.category_id is None and r.kind == 'percentage'
+             and r.min_quantity > 0 and r.min_amount <= 0),
+            key=lambda r: r.min_quantity
+        )
+
+
+# ============================================
+# MOTOR
+# ============================================
+
+class DiscountEngine:
+    """Reglas compiladas con recarga periódica y recompilación solo por cambios"""
+
+    def __init__(
+        self,
+        supabase_factory: Callable,
+        fallback: Iterable[Rule] = (),
+        ttl: float = 60.0,
+        clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc)
+    ):
+        """
+        Args:
+            supabase_factory: Función que retorna el cliente de Supabase
+            fallback: Reglas globales a usar mientras la tabla no tenga
+                descuentos automáticos globales vigentes (o no se pueda leer)
+            ttl: Segundos entre lecturas de la tabla
+            clock: Hora actual (UTC), para vigencias
+        """
+        self.supabase_factory = supabase_factory
+        self.fallback = list(fallback)
+        self.ttl = ttl
+        self.clock = clock
+        self.compilations = 0
+
+        self._compiled: Optional[CompiledRules] = None
+        self._rows: List[Dict] = []
+        self._fingerprint = None
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def _load(self) -> List[Dict]:
+        return fetch_all(self.supabase_factory(), "discounts", key="discount_id", columns=RULE_COLUMNS,
+                         filters=lambda q: q.eq("active", True))
+
+    def _compile(self, rows: List[Dict], now: datetime) -> CompiledRules:
+        compiled = CompiledRules.from_rows(rows, now)
+        if not any(r.user_id is None and r.category_id is None for r in compiled.rules):
+            # Sin reglas globales vigentes, los tramos de respaldo siguen siendo el alcance global
+            compiled = CompiledRules(compiled.rules + self.fallback, compiled.valid_until)
+        self.compilations += 1
+        logger.info(f"🏷️ Reglas de descuento compiladas: {len(compiled.rules)}")
+        return compiled
+
+    def rules(self) -> CompiledRules:
+        """Reglas vigentes; relee la tabla si pasó el ttl"""
+        with self._lock:
+            now = self.clock()
+            if time.monotonic() - self._checked_at >= self.ttl:
+                self._checked_at = time.monotonic()
+                try:
+                    rows = self._load()
+                    fingerprint = tuple(tuple(row.items()) for row in rows)
+                    if fingerprint != self._fingerprint:
+                        self._fingerprint, self._rows = fingerprint, rows
+                        self._compiled = self._compile(rows, now)
+                except Exception as e:
+                    logger.warning(f"⚠️ No se pudieron leer los descuentos: {e}")
+
+            if self._compiled is None:
+                self._compiled = self._compile([], now)
+            elif self._compiled.valid_until and now >= self._compiled.valid_until:
+                # Una regla empezó o terminó su vigencia
+                self._compiled = self._compile(self._rows, now)
+            return self._compiled
+
+    def invalidate(self):
+        """Fuerza la relectura en la próxima consulta (p. ej. tras editar reglas)"""
+        with self._lock:
+            self._checked_at = float('-inf')
+
+    def quote(self, items: Iterable[Dict], user_id: Optional[int] = None) -> Quote:
+        return self.rules().quote(items, user_id)
+
+    def quote_many(self, carts: Iterable[Iterable[Dict]], user_ids: Optional[Iterable[Optional[int]]] = None) -> List[Quote]:
+        """
+        Cotiza muchos carritos con las mismas reglas compiladas
+
+        Args:
+            carts: Carritos (listas de items)
+            user_ids: Cliente de cada carrito (None: sin reglas individuales)
+        """
+        compiled = self.rules()
+        carts = list(carts)
+        user_ids = list(user_ids) if user_ids is not None else [None] * len(carts)
+        return [compiled.quote(cart, user_id) for cart, user_id in zip(carts, user_ids)]
@@ -1,9 +1,21 @@
 """
 Servicio para calcular descuentos por volumen
+
+Los descuentos salen de las reglas automáticas de la tabla discounts
+(ver app/services/discount_rules.py). DISCOUNT_TIERS es el descuento
+global mientras la tabla no tenga una regla automática global vigente.
+
+Al confirmar una pre-orden, record_usage suma el uso a la regla aplicada
+(current_uses) y guarda su fila en discount_usage.
 """
 
 import logging
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+from app.services.discount_rules import DiscountEngine, Quote, Rule
+from app.utils.db_gateway import MISSING_FUNCTION_CODES, supabase_client
 
 logger = logging.getLogger(__name__)
 
@@ -11,64 +23,142 @@ logger = logging.getLogger(__name__)
 class DiscountService:
     """Maneja cálculo de descuentos por volumen"""
     
-    # Configuración de descuentos por cantidad total
+    # Descuentos por cantidad total si no hay reglas en la tabla discounts
     DISCOUNT_TIERS = [
         {"min_quantity": 100, "discount_percent": 15},
         {"min_quantity": 50, "discount_percent": 10},
         {"min_quantity": 20, "discount_percent": 5},
     ]
     
+    _engine: Optional[DiscountEngine] = None
+    
+    @classmethod
+    def engine(cls) -> DiscountEngine:
+        """Motor de reglas compartido por el proceso"""
+        if cls._engine is None:
+            cls._engine = DiscountEngine(
+                supabase_client,
+                fallback=[
+                    Rule(None, f"{tier['min_quantity']}+ unidades", 'percentage',
+                         tier['discount_percent'], min_quantity=tier['min_quantity'])
+                    for tier in cls.DISCOUNT_TIERS
+                ]
+            )
+        return cls._engine
+    
     @classmethod
-    def calculate_discount(cls, cart_items: List[Dict]) -> Tuple[float, int, float, float]:
+    def calculate_discount(cls, cart_items: List[Dict], user_id: Optional[int] = None) -> Tuple[float, float, float, float]:
         """
-        Calcula descuento basado en cantidad total de productos
+        Calcula el mejor descuento aplicable al carrito
         
         Args:
             cart_items: Lista de items del carrito con estructura:
                 [
-                    {'product_id': 1, 'nombre': 'X', 'precio': 1000, 'cantidad': 50},
+                    {'product_id': 1, 'nombre': 'X', 'precio': 1000, 'cantidad': 50, 'category_id': 2},
                     ...
                 ]
+            user_id: Cliente (users.user_id) para aplicar sus descuentos individuales
         
         Returns:
-            Tuple[float, int, float, float]: (subtotal, descuento_porcentaje, descuento_monto, total)
+            Tuple[float, float, float, float]: (subtotal, descuento_porcentaje, descuento_monto, total)
         """
+        quote = cls.quote(cart_items, user_id)
+        return (quote.subtotal, quote.percent, quote.amount, quote.total)
+    
+    @classmethod
+    def quote(cls, cart_items: List[Dict], user_id: Optional[int] = None) -> Quote:
+        """Igual que calculate_discount, pero con la regla aplicada (quote.rule)"""
         try:
-            # Calcular subtotal y cantidad total
-            subtotal = 0.0
-            total_quantity = 0
-            
-            for item in cart_items:
-                precio = float(item.get('precio', 0))
-                cantidad = int(item.get('cantidad', 0))
-                subtotal += precio * cantidad
-                total_quantity += cantidad
-            
-            # Determinar descuento aplicable
-            descuento_porcentaje = 0
-            
-            for tier in cls.DISCOUNT_TIERS:
-                if total_quantity >= tier['min_quantity']:
-                    descuento_porcentaje = tier['discount_percent']
-                    break
-            
-            # Calcular monto de descuento
-            descuento_monto = subtotal * (descuento_porcentaje / 100)
-            
-            # Calcular total
-            total = subtotal - descuento_monto
+            quote = cls.engine().quote(cart_items, user_id)
             
             logger.info(
-                f"Descuento calculado: {total_quantity} unidades → "
-                f"{descuento_porcentaje}% = ${descuento_monto:,.0f}"
+                f"Descuento calculado: {quote.quantity} unidades → "
+                f"{quote.percent:g}% = ${quote.amount:,.0f}"
             )
             
-            return (subtotal, descuento_porcentaje, descuento_monto, total)
+            return quote
             
         except Exception as e:
             logger.error(f"Error calculando descuento: {e}")
             # En caso de error, retornar sin descuento
-            return (subtotal, 0, 0.0, subtotal)
+            subtotal = sum(float(i.get('precio', 0)) * int(i.get('cantidad', 0)) for i in cart_items)
+            quantity = sum(int(i.get('cantidad', 0)) for i in cart_items)
+            return Quote(subtotal, quantity, 0, 0.0, subtotal)
+    
+    @classmethod
+    def record_usage(cls, discount_id: Optional[int], user_id: Optional[int], amount_saved: float,
+                     order_id: Optional[int] = None) -> bool:
+        """
+        Registra el uso de un descuento automático en un pedido confirmado
+        
+        use_discount (scripts/add_discount_usage.sql) suma el uso y guarda la
+        fila de discount_usage solo si la regla no agotó max_uses. Los tramos
+        de respaldo no tienen fila en discounts y no se registran.
+        
+        Args:
+            discount_id: Regla aplicada (None: sin descuento o tramo de respaldo)
+            user_id: Cliente (users.user_id)
+            amount_saved: Monto descontado
+            order_id: Pedido, si ya existe
+        
+        Returns:
+            bool: False si la regla ya había agotado sus usos
+        """
+        if discount_id is None or amount_saved <= 0:
+            return True
+        
+        supabase = supabase_client()
+        try:
+            uses = supabase.rpc("use_discount", {
+                "p_discount_id": discount_id,
+                "p_user_id": user_id,
+                "p_order_id": order_id,
+                "p_amount_saved": float(amount_saved)
+            }).execute().data
+        except APIError as e:
+            if e.code not in MISSING_FUNCTION_CODES:
+                raise
+            # Sin la migración: mismo registro, sin garantía ante confirmaciones simultáneas
+            logger.warning(f"⚠️ use_discount no disponible, se registra el uso sin la función: {e}")
+            uses = cls._record_usage_directly(supabase, discount_id, user_id, amount_saved, order_id)
+        
+        # Una regla que llegó a max_uses deja de ofrecerse
+        cls.engine().invalidate()
+        if uses is None:
+            logger.warning(f"⚠️ El descuento {discount_id} ya había agotado sus usos")
+            return False
+        logger.info(f"🏷️ Uso registrado del descuento {discount_id} ({uses} usos): ${amount_saved:,.0f}")
+        return True
+    
+    @staticmethod
+    def _record_usage_directly(supabase, discount_id: int, user_id: Optional[int], amount_saved: float,
+                               order_id: Optional[int]) -> Optional[int]:
+        rows = supabase.table("discounts")\
+            .select("current_uses, max_uses")\
+            .eq("discount_id", discount_id)\
+            .execute().data
+        if not rows:
+            return None
+        uses = (rows[0].get('current_uses') or 0) + 1
+        if rows[0].get('max_uses') and uses > rows[0]['max_uses']:
+            return None
+        
+        supabase.table("discounts")\
+            .update({"current_uses": uses})\
+            .eq("discount_id", discount_id)\
+            .execute()
+        supabase.table("discount_usage").insert({
+            "discount_id": discount_id,
+            "user_id": user_id,
+            "order_id": order_id,
+            "amount_saved": float(amount_saved)
+        }).execute()
+        return uses
+    
+    @classmethod
+    def quote_many(cls, carts: List[List[Dict]], user_ids: Optional[List[Optional[int]]] = None):
+        """Cotiza muchos carritos de una vez con las mismas reglas compiladas"""
+        return cls.engine().quote_many(carts, user_ids)
     
     @classmethod
     def get_discount_info_text(cls, total_quantity: int) -> str:
@@ -83,9 +173,9 @@ class DiscountService:
         """
         text = "💰 **DESCUENTOS POR VOLUMEN**\n\n"
         
-        for tier in reversed(cls.DISCOUNT_TIERS):
-            min_qty = tier['min_quantity']
-            discount = tier['discount_percent']
+        for tier in cls.engine().rules().quantity_tiers():
+            min_qty = tier.min_quantity
+            discount = f"{tier.value:g}"
             
             if total_quantity >= min_qty:
                 text += f"✅ {min_qty}+ unidades: **{discount}% OFF** (¡Aplicado!)\n"
@@ -140,7 +230,7 @@ if __name__ == "__main__":
     subtotal, desc_pct, desc_monto, total = DiscountService.calculate_discount(cart)
     
     print(f"Subtotal: ${subtotal:,.0f}")
-    print(f"Descuento: {desc_pct}% = ${desc_monto:,.0f}")
+    print(f"Descuento: {desc_pct:g}% = ${desc_monto:,.0f}")
     print(f"Total: ${total:,.0f}")
     print()
     print(DiscountService.get_discount_info_text(55))
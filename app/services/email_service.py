@@ -9,9 +9,12 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 from dotenv import load_dotenv
+from app.services.smtp_pool import AsyncMailTransport, SMTPConnectionPool
+from app.services.order_digest import OrderDigest, zip_pdfs
+from app.utils.template_engine import templates
 
 load_dotenv()
 
@@ -30,6 +33,104 @@ class EmailService:
     FROM_NAME = os.getenv('EMAIL_FROM_NAME', 'Milhojaldres Bot')
     ADMIN_EMAIL = os.getenv('ADMIN_EMAIL')
     
+    # Pool de conexiones SMTP persistentes
+    SMTP_POOL_SIZE = int(os.getenv('EMAIL_POOL_SIZE', '2'))
+    SMTP_TIMEOUT = float(os.getenv('EMAIL_TIMEOUT', '30'))
+    SMTP_KEEPALIVE = float(os.getenv('EMAIL_KEEPALIVE', '60'))  # segundos antes de validar con NOOP
+    SMTP_USE_TLS = os.getenv('EMAIL_USE_TLS', 'true').lower() != 'false'
+    
+    # Modo digest: agrupa las notificaciones de pedidos al admin
+    DIGEST_ENABLED = os.getenv('EMAIL_DIGEST_ENABLED', 'false').lower() == 'true'
+    DIGEST_WINDOW = float(os.getenv('EMAIL_DIGEST_WINDOW', '300'))  # segundos sin pedidos para cerrar el lote
+    DIGEST_MAX_LATENCY = float(os.getenv('EMAIL_DIGEST_MAX_LATENCY', '900'))  # espera máxima de un pedido
+    DIGEST_MAX_ORDERS = int(os.getenv('EMAIL_DIGEST_MAX_ORDERS', '50'))
+    DIGEST_URGENT_TOTAL = float(os.getenv('EMAIL_DIGEST_URGENT_TOTAL', '500000'))  # pedidos >= se envían ya
+    
+    _transport: Optional[AsyncMailTransport] = None
+    _digest: Optional[OrderDigest] = None
+    
+    @classmethod
+    def get_transport(cls) -> AsyncMailTransport:
+        """Retorna el transporte compartido, creándolo la primera vez"""
+        if cls._transport is None:
+            pool = SMTPConnectionPool(
+                host=cls.SMTP_HOST,
+                port=cls.SMTP_PORT,
+                user=cls.SMTP_USER,
+                password=cls.SMTP_PASSWORD,
+                size=cls.SMTP_POOL_SIZE,
+                timeout=cls.SMTP_TIMEOUT,
+                keepalive=cls.SMTP_KEEPALIVE,
+                use_tls=cls.SMTP_USE_TLS
+            )
+            cls._transport = AsyncMailTransport(pool)
+        return cls._transport
+    
+    @classmethod
+    def close_transport(cls):
+        """Cierra las sesiones SMTP abiertas (llamar al apagar el bot)"""
+        if cls._transport is not None:
+            cls._transport.close()
+            cls._transport = None
+    
+    @classmethod
+    def _is_configured(cls) -> bool:
+        if not cls.SMTP_USER or not cls.SMTP_PASSWORD:
+            logger.error("❌ EMAIL_USER y EMAIL_PASSWORD no configurados en .env")
+            return False
+        return True
+    
+    @classmethod
+    def _build_message(
+        cls,
+        to_email: str,
+        subject: str,
+        body_html: str,
+        attachment_path: Optional[str] = None,
+        attachments: Optional[List[Tuple[str, bytes]]] = None
+    ) -> MIMEMultipart:
+        """
+        Construye el mensaje MIME con cuerpo HTML y adjuntos opcionales
+        
+        Args:
+            to_email: Destinatario
+            subject: Asunto
+            body_html: Cuerpo en HTML
+            attachment_path: Ruta del archivo adjunto (opcional)
+            attachments: Adjuntos en memoria como (nombre, contenido)
+        
+        Returns:
+            MIMEMultipart: Mensaje listo para enviar
+        """
+        msg = MIMEMultipart('alternative')
+        msg['From'] = f"{cls.FROM_NAME} <{cls.FROM_EMAIL}>"
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        
+        # Agregar cuerpo HTML
+        html_part = MIMEText(body_html, 'html', 'utf-8')
+        msg.attach(html_part)
+        
+        files = list(attachments or [])
+        
+        # Agregar adjunto si existe
+        if attachment_path and Path(attachment_path).exists():
+            with open(attachment_path, 'rb') as f:
+                files.insert(0, (Path(attachment_path).name, f.read()))
+        
+        for filename, content in files:
+            part = MIMEBase('application', 'octet-stream')
+            part.set_payload(content)
+            encoders.encode_base64(part)
+            part.add_header(
+                'Content-Disposition',
+                f'attachment; filename= {filename}'
+            )
+            msg.attach(part)
+            logger.info(f"📎 Adjunto agregado: {filename}")
+        
+        return msg
+    
     @classmethod
     def _send_email(
         cls,
@@ -39,7 +140,7 @@ class EmailService:
         attachment_path: Optional[str] = None
     ) -> bool:
         """
-        Envía email con Gmail SMTP
+        Envía email con Gmail SMTP (bloqueante, usa el pool de conexiones)
         
         Args:
             to_email: Destinatario
@@ -51,43 +152,15 @@ class EmailService:
             bool: True si se envió correctamente
         """
         try:
-            # Validar configuración
-            if not cls.SMTP_USER or not cls.SMTP_PASSWORD:
-                logger.error("❌ EMAIL_USER y EMAIL_PASSWORD no configurados en .env")
+            if not cls._is_configured():
                 return False
             
-            # Crear mensaje
-            msg = MIMEMultipart('alternative')
-            msg['From'] = f"{cls.FROM_NAME} <{cls.FROM_EMAIL}>"
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            # Agregar cuerpo HTML
-            html_part = MIMEText(body_html, 'html', 'utf-8')
-            msg.attach(html_part)
-            
-            # Agregar adjunto si existe
-            if attachment_path and Path(attachment_path).exists():
-                with open(attachment_path, 'rb') as f:
-                    part = MIMEBase('application', 'octet-stream')
-                    part.set_payload(f.read())
-                    encoders.encode_base64(part)
-                    filename = Path(attachment_path).name
-                    part.add_header(
-                        'Content-Disposition',
-                        f'attachment; filename= {filename}'
-                    )
-                    msg.attach(part)
-                    logger.info(f"📎 Adjunto agregado: {filename}")
+            msg = cls._build_message(to_email, subject, body_html, attachment_path)
+            sent = cls.get_transport().send_sync(msg)
             
-            # Enviar email
-            with smtplib.SMTP(cls.SMTP_HOST, cls.SMTP_PORT) as server:
-                server.starttls()
-                server.login(cls.SMTP_USER, cls.SMTP_PASSWORD)
-                server.send_message(msg)
-            
-            logger.info(f"✅ Email enviado exitosamente a: {to_email}")
-            return True
+            if sent:
+                logger.info(f"✅ Email enviado exitosamente a: {to_email}")
+            return sent
             
         except smtplib.SMTPAuthenticationError as e:
             logger.error(f"❌ Error de autenticación SMTP: {e}")
@@ -99,6 +172,94 @@ class EmailService:
             traceback.print_exc()
             return False
     
+    @classmethod
+    async def _send_email_async(
+        cls,
+        to_email: str,
+        subject: str,
+        body_html: str,
+        attachment_path: Optional[str] = None
+    ) -> bool:
+        """Igual que _send_email pero sin bloquear el event loop"""
+        results = await cls.send_bulk([{
+            'to_email': to_email,
+            'subject': subject,
+            'body_html': body_html,
+            'attachment_path': attachment_path
+        }])
+        return results[0]
+    
+    @classmethod
+    async def send_bulk(cls, emails: List[Dict]) -> List[bool]:
+        """
+        Envía varios emails reutilizando una sola sesión SMTP
+        
+        Args:
+            emails: Lista de dicts con to_email, subject, body_html y
+                opcionalmente attachment_path y attachments
+        
+        Returns:
+            List[bool]: Resultado de cada email, en el mismo orden
+        """
+        if not emails:
+            return []
+        
+        try:
+            if not cls._is_configured():
+                return [False] * len(emails)
+            
+            messages = [
+                cls._build_message(
+                    e['to_email'],
+                    e['subject'],
+                    e['body_html'],
+                    e.get('attachment_path'),
+                    e.get('attachments')
+                )
+                for e in emails
+            ]
+            results = await cls.get_transport().send_bulk(messages)
+            
+            logger.info(f"✅ {sum(results)}/{len(results)} emails enviados")
+            return results
+            
+        except smtplib.SMTPAuthenticationError as e:
+            logger.error(f"❌ Error de autenticación SMTP: {e}")
+            logger.error("Verifica EMAIL_USER y EMAIL_PASSWORD en .env")
+            return [False] * len(emails)
+        except Exception as e:
+            logger.error(f"❌ Error enviando emails: {e}")
+            import traceback
+            traceback.print_exc()
+            return [False] * len(emails)
+    
+    @classmethod
+    def _render_pre_order_email(cls, pre_order_data: Dict) -> Tuple[str, str]:
+        """
+        Arma asunto y cuerpo HTML de la cotización/pre-orden
+        
+        Args:
+            pre_order_data: Datos de la pre-orden
+        
+        Returns:
+            Tuple[str, str]: (asunto, cuerpo_html)
+        """
+        numero_cot = pre_order_data.get('numero_cotizacion', 'N/A')
+        total = pre_order_data.get('total', 0)
+        nombre = pre_order_data.get('nombre_cliente', 'Cliente')
+        
+        subject = f"📋 Tu Cotización #{numero_cot} - ${total:,.0f} | Milhojaldres"
+        
+        body_html = templates.render(
+            "email/pre_order.html",
+            nombre=nombre,
+            numero_cotizacion=numero_cot,
+            total=total,
+            contact_email=cls.FROM_EMAIL or ''
+        )
+        
+        return subject, body_html
+    
     @classmethod
     def send_pre_order_email(
         cls,
@@ -118,77 +279,7 @@ class EmailService:
             bool: True si se envió correctamente
         """
         try:
-            numero_cot = pre_order_data.get('numero_cotizacion', 'N/A')
-            total = pre_order_data.get('total', 0)
-            nombre = pre_order_data.get('nombre_cliente', 'Cliente')
-            
-            subject = f"📋 Tu Cotización #{numero_cot} - ${total:,.0f} | Milhojaldres"
-            
-            body_html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <style>
-        body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-        .header {{ background-color: #4CAF50; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }}
-        .content {{ padding: 20px; background-color: #f9f9f9; }}
-        .info {{ background-color: white; padding: 15px; margin: 10px 0; border-left: 4px solid #4CAF50; border-radius: 4px; }}
-        .total {{ font-size: 24px; font-weight: bold; color: #4CAF50; }}
-        .footer {{ text-align: center; padding: 20px; color: #666; font-size: 12px; }}
-        .highlight {{ background-color: #fffde7; padding: 15px; border-radius: 4px; margin: 10px 0; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🍪 Milhojaldres</h1>
-            <p>Tu Cotización está Lista</p>
-        </div>
-        
-        <div class="content">
-            <h2>¡Hola {nombre}! 👋</h2>
-            
-            <p>Tu pre-orden ha sido creada exitosamente.</p>
-            
-            <div class="info">
-                <p><strong>📋 Número de Cotización:</strong> {numero_cot}</p>
-                <p><strong>💵 Total a Pagar:</strong> <span class="total">${total:,.0f}</span></p>
-                <p><strong>📄 PDF Adjunto:</strong> Revisa el archivo adjunto para ver los detalles completos</p>
-            </div>
-            
-            <h3>💳 ¿Cómo pagar?</h3>
-            <ol>
-                <li>Abre el PDF adjunto con los detalles de tu cotización</li>
-                <li>Elige tu método de pago (Nequi, Daviplata o Transferencia)</li>
-                <li>Realiza el pago por el monto total indicado</li>
-                <li>Envía el comprobante al WhatsApp: <strong>301 417 0313</strong></li>
-            </ol>
-            
-            <div class="highlight">
-                <p><strong>⏰ Confirmación:</strong></p>
-                <p>Verificaremos tu pago en 1-2 horas máximo y te enviaremos la confirmación.</p>
-            </div>
-            
-            <h3>📱 ¿Tienes dudas?</h3>
-            <p>Contáctanos directamente:</p>
-            <ul>
-                <li><strong>WhatsApp:</strong> 301 417 0313</li>
-                <li><strong>Email:</strong> {cls.FROM_EMAIL}</li>
-            </ul>
-        </div>
-        
-        <div class="footer">
-            <p>Esta cotización es válida por 7 días</p>
-            <p>Milhojaldres | Bogotá, Colombia</p>
-            <p>¡Gracias por tu confianza! 🍪</p>
-        </div>
-    </div>
-</body>
-</html>
-            """
-            
+            subject, body_html = cls._render_pre_order_email(pre_order_data)
             return cls._send_email(
                 to_email=to_email,
                 subject=subject,
@@ -200,16 +291,68 @@ class EmailService:
             logger.error(f"❌ Error en send_pre_order_email: {e}")
             return False
     
+    @classmethod
+    async def send_pre_order_email_async(
+        cls,
+        to_email: str,
+        pre_order_data: Dict,
+        pdf_path: Optional[str] = None
+    ) -> bool:
+        """Versión no bloqueante de send_pre_order_email para handlers async"""
+        try:
+            subject, body_html = cls._render_pre_order_email(pre_order_data)
+            return await cls._send_email_async(
+                to_email=to_email,
+                subject=subject,
+                body_html=body_html,
+                attachment_path=pdf_path
+            )
+            
+        except Exception as e:
+            logger.error(f"❌ Error en send_pre_order_email_async: {e}")
+            return False
+    
+    @classmethod
+    def _render_admin_order_email(cls, order_data: Dict) -> Tuple[str, str]:
+        """
+        Arma asunto y cuerpo HTML de la notificación de pedido al admin
+        
+        Args:
+            order_data: Datos del pedido
+        
+        Returns:
+            Tuple[str, str]: (asunto, cuerpo_html)
+        """
+        order_id = order_data.get('order_id', 'N/A')
+        total = order_data.get('total', 0)
+        nombre = order_data.get('nombre_cliente', 'Cliente')
+        items = order_data.get('items', [])
+        
+        subject = f"🔔 Nuevo Pedido #{order_id} - ${total:,.0f}"
+        
+        body_html = templates.render(
+            "email/admin_order.html",
+            order_id=order_id,
+            nombre=nombre,
+            total=total,
+            fecha=order_data.get('fecha', 'N/A'),
+            items=items
+        )
+        
+        return subject, body_html
+    
     @classmethod
     def send_order_confirmation_to_admin(
         cls,
-        order_data: Dict
+        order_data: Dict,
+        pdf_path: Optional[str] = None
     ) -> bool:
         """
         Envía notificación de pedido normal al admin
         
         Args:
             order_data: Datos del pedido
+            pdf_path: Ruta del PDF del pedido (opcional)
         
         Returns:
             bool: True si se envió correctamente
@@ -220,88 +363,48 @@ class EmailService:
                 return False
             
             order_id = order_data.get('order_id', 'N/A')
-            total = order_data.get('total', 0)
-            nombre = order_data.get('nombre_cliente', 'Cliente')
-            items = order_data.get('items', [])
+            subject, body_html = cls._render_admin_order_email(order_data)
             
-            # Construir tabla de productos
-            items_html = ""
-            for item in items:
-                items_html += f"""
-                <tr>
-                    <td style="padding: 8px; border: 1px solid #ddd;">{item.get('product_name', 'N/A')}</td>
-                    <td style="padding: 8px; border: 1px solid #ddd; text-align: center;">{item.get('cantidad', 0)}</td>
-                    <td style="padding: 8px; border: 1px solid #ddd; text-align: right;">${item.get('precio_unitario', 0):,.0f}</td>
-                    <td style="padding: 8px; border: 1px solid #ddd; text-align: right;">${item.get('subtotal', 0):,.0f}</td>
-                </tr>
-                """
+            result = cls._send_email(
+                to_email=cls.ADMIN_EMAIL,
+                subject=subject,
+                body_html=body_html,
+                attachment_path=pdf_path
+            )
             
-            subject = f"🔔 Nuevo Pedido #{order_id} - ${total:,.0f}"
+            if result:
+                logger.info(f"✅ Notificación de orden #{order_id} enviada al admin")
+            else:
+                logger.error(f"❌ No se pudo enviar notificación de orden #{order_id}")
             
-            body_html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <style>
-        body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-        .header {{ background-color: #2196F3; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }}
-        .content {{ padding: 20px; background-color: #f9f9f9; }}
-        .info {{ background-color: white; padding: 15px; margin: 10px 0; border-left: 4px solid #2196F3; border-radius: 4px; }}
-        table {{ width: 100%; border-collapse: collapse; margin: 15px 0; background-color: white; }}
-        th {{ background-color: #2196F3; color: white; padding: 10px; text-align: left; }}
-        .total-row {{ background-color: #e3f2fd; font-weight: bold; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🔔 Nuevo Pedido Recibido</h1>
-            <p>Pedido #{order_id}</p>
-        </div>
-        
-        <div class="content">
-            <div class="info">
-                <p><strong>👤 Cliente:</strong> {nombre}</p>
-                <p><strong>📦 Orden:</strong> #{order_id}</p>
-                <p><strong>💰 Total:</strong> ${total:,.0f}</p>
-                <p><strong>📅 Fecha:</strong> {order_data.get('fecha', 'N/A')}</p>
-            </div>
+            return result
             
-            <h3>📋 Productos:</h3>
-            <table>
-                <thead>
-                    <tr>
-                        <th>Producto</th>
-                        <th style="text-align: center;">Cantidad</th>
-                        <th style="text-align: right;">Precio Unit.</th>
-                        <th style="text-align: right;">Subtotal</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {items_html}
-                    <tr class="total-row">
-                        <td colspan="3" style="padding: 10px; text-align: right;">TOTAL:</td>
-                        <td style="padding: 10px; text-align: right;">${total:,.0f}</td>
-                    </tr>
-                </tbody>
-            </table>
+        except Exception as e:
+            logger.error(f"❌ Error en send_order_confirmation_to_admin: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+    
+    @classmethod
+    async def send_order_confirmation_to_admin_async(
+        cls,
+        order_data: Dict,
+        pdf_path: Optional[str] = None
+    ) -> bool:
+        """Versión no bloqueante de send_order_confirmation_to_admin"""
+        try:
+            if not cls.ADMIN_EMAIL:
+                logger.warning("⚠️ ADMIN_EMAIL no configurado en .env")
+                return False
             
-            <div class="info">
-                <p><strong>⚠️ Acción requerida:</strong></p>
-                <p>Revisa tu panel de administración para gestionar este pedido.</p>
-            </div>
-        </div>
-    </div>
-</body>
-</html>
-            """
+            order_id = order_data.get('order_id', 'N/A')
+            subject, body_html = cls._render_admin_order_email(order_data)
             
-            result = cls._send_email(
+            result = await cls._send_email_async(
                 to_email=cls.ADMIN_EMAIL,
                 subject=subject,
-                body_html=body_html
+                body_html=body_html,
+                attachment_path=pdf_path
             )
             
             if result:
@@ -312,7 +415,7 @@ class EmailService:
             return result
             
         except Exception as e:
-            logger.error(f"❌ Error en send_order_confirmation_to_admin: {e}")
+            logger.error(f"❌ Error en send_order_confirmation_to_admin_async: {e}")
             import traceback
             traceback.print_exc()
             return False
@@ -321,6 +424,114 @@ class EmailService:
     def send_new_order_notification_to_admin(cls, order_data: Dict) -> bool:
         """Alias para mantener compatibilidad con código anterior"""
         return cls.send_order_confirmation_to_admin(order_data)
+    
+    @classmethod
+    async def send_new_order_notification_to_admin_async(
+        cls,
+        order_data: Dict,
+        pdf_path: Optional[str] = None
+    ) -> bool:
+        """Alias async de send_order_confirmation_to_admin_async"""
+        return await cls.send_order_confirmation_to_admin_async(order_data, pdf_path)
+
+    
+    # ============================================
+    # DIGEST DE PEDIDOS PARA EL ADMIN
+    # ============================================
+    
+    @classmethod
+    def _render_admin_digest_email(cls, orders: List[Dict]) -> Tuple[str, str]:
+        """
+        Arma asunto y cuerpo HTML del resumen de varios pedidos
+        
+        Args:
+            orders: Datos de cada pedido (mismo formato que order_data)
+        
+        Returns:
+            Tuple[str, str]: (asunto, cuerpo_html)
+        """
+        total = sum(o.get('total', 0) or 0 for o in orders)
+        
+        subject = f"🔔 {len(orders)} Pedidos Nuevos - ${total:,.0f}"
+        
+        body_html = templates.render(
+            "email/admin_digest.html",
+            orders=orders,
+            total=total
+        )
+        
+        return subject, body_html
+    
+    @classmethod
+    async def _send_admin_digest(cls, batch: List[Dict]) -> bool:
+        """Envía un lote de pedidos como un solo email con los PDFs en un ZIP"""
+        if not cls.ADMIN_EMAIL:
+            logger.warning("⚠️ ADMIN_EMAIL no configurado en .env")
+            return False
+        
+        if len(batch) == 1:
+            entry = batch[0]
+            return await cls.send_order_confirmation_to_admin_async(
+                entry['order_data'],
+                entry['pdf_path']
+            )
+        
+        orders = [entry['order_data'] for entry in batch]
+        subject, body_html = cls._render_admin_digest_email(orders)
+        
+        attachments = []
+        zip_content = zip_pdfs([entry['pdf_path'] for entry in batch])
+        if zip_content:
+            attachments.append((f"Pedidos_{len(orders)}.zip", zip_content))
+        
+        results = await cls.send_bulk([{
+            'to_email': cls.ADMIN_EMAIL,
+            'subject': subject,
+            'body_html': body_html,
+            'attachments': attachments
+        }])
+        return results[0]
+    
+    @classmethod
+    def get_digest(cls) -> OrderDigest:
+        """Retorna el agrupador de pedidos, creándolo la primera vez"""
+        if cls._digest is None:
+            cls._digest = OrderDigest(
+                send_digest=cls._send_admin_digest,
+                send_now=cls.send_order_confirmation_to_admin_async,
+                window=cls.DIGEST_WINDOW,
+                max_latency=cls.DIGEST_MAX_LATENCY,
+                max_orders=cls.DIGEST_MAX_ORDERS,
+                urgent_total=cls.DIGEST_URGENT_TOTAL
+            )
+        return cls._digest
+    
+    @classmethod
+    async def notify_admin_new_order(
+        cls,
+        order_data: Dict,
+        pdf_path: Optional[str] = None
+    ) -> bool:
+        """
+        Notifica al admin de un pedido nuevo
+        
+        Con EMAIL_DIGEST_ENABLED el pedido se agrupa con otros en un solo
+        email; los pedidos urgentes (total >= EMAIL_DIGEST_URGENT_TOTAL) se
+        envían de inmediato.
+        
+        Returns:
+            bool: True si se envió o quedó en cola para el digest
+        """
+        if not cls.DIGEST_ENABLED:
+            return await cls.send_order_confirmation_to_admin_async(order_data, pdf_path)
+        return await cls.get_digest().add(order_data, pdf_path)
+    
+    @classmethod
+    async def close_digest(cls):
+        """Envía los pedidos pendientes del digest (llamar al apagar el bot)"""
+        if cls._digest is not None:
+            await cls._digest.close()
+            cls._digest = None
 
 
 # Instancia singleton para compatibilidad
@@ -0,0 +1,370 @@
+"""
+Exportación de pedidos e items por rango de fechas, en streaming.
+
+Los pedidos del rango se recorren por keyset de order_id (páginas de
+``page_size``) y cada página se escribe al archivo antes de pedir la
+siguiente; los items se piden por página de pedidos con un solo ``in_``.
+La memoria usada depende del tamaño de página, no del rango.
+
+Formatos:
+- csv: UTF-8 con BOM (Excel lo abre con tildes correctas)
+- xlsx: hoja única escrita como XML dentro del zip, sin dependencias
+- parquet: un row group por página (pyarrow)
+
+Con ``chunk_rows`` la exportación se parte en varios archivos completos
+(parte 1, parte 2, ...) para que cada descarga tenga un tamaño acotado.
+
+Uso:
+    parts = export_range(supabase, "orders", "csv", date(2024, 1, 1), date(2024, 12, 31), "/tmp/export")
+"""
+
+import codecs
+import csv
+import io
+import logging
+import os
+import re
+import zipfile
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from app.services.order_items import fetch_items_by_order
+from app.utils.keyset import PAGE_SIZE, iter_pages
+
+logger = logging.getLogger(__name__)
+
+
+class Column(NamedTuple):
+    """Columna exportada: nombre y tipo (int, float, bool, text, timestamp)"""
+    name: str
+    kind: str = 'text'
+
+
+ORDER_COLUMNS = (
+    Column('order_id', 'int'),
+    Column('user_id', 'int'),
+    Column('estado'),
+    Column('subtotal', 'float'),
+    Column('tax', 'float'),
+    Column('delivery_fee', 'float'),
+    Column('total', 'float'),
+    Column('is_paid', 'bool'),
+    Column('notas'),
+    Column('fecha_orden', 'timestamp'),
+)
+
+ITEM_COLUMNS = (
+    Column('item_id', 'int'),
+    Column('order_id', 'int'),
+    Column('fecha_orden', 'timestamp'),
+    Column('product_id', 'int'),
+    Column('producto'),
+    Column('categoria'),
+    Column('cantidad', 'int'),
+    Column('precio_unitario', 'float'),
+    Column('subtotal', 'float'),
+)
+
+ITEM_SELECT = "item_id, order_id, product_id, cantidad, precio_unitario, subtotal, products(nombre, categoria)"
+
+FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', '.xlsx'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+}
+
+# Una hoja de Excel admite 1.048.576 filas, incluido el encabezado
+XLSX_MAX_ROWS = 1_048_575
+
+
+# ============================================
+# LECTURA POR PÁGINAS
+# ============================================
+
+def _range_filter(start_date: date, end_date: date) -> Callable:
+    """fecha_orden entre dos días (inclusive, UTC)"""
+    start = f"{start_date.isoformat()}T00:00:00+00:00"
+    end = f"{(end_date + timedelta(days=1)).isoformat()}T00:00:00+00:00"
+    return lambda query: query.gte("fecha_orden", start).lt("fecha_orden", end)
+
+
+def iter_order_pages(supabase, start_date: date, end_date: date, page_size: int = PAGE_SIZE) -> Iterator[List[Dict]]:
+    """Pedidos del rango, página por página en orden de order_id"""
+    columns = ", ".join(c.name for c in ORDER_COLUMNS)
+    yield from iter_pages(
+        supabase, "orders", key="order_id", columns=columns,
+        page_size=page_size, filters=_range_filter(start_date, end_date)
+    )
+
+
+def iter_item_pages(supabase, start_date: date, end_date: date, page_size: int = PAGE_SIZE) -> Iterator[List[Dict]]:
+    """Items de los pedidos del rango, una página por página de pedidos"""
+    for orders in iter_order_pages(supabase, start_date, end_date, page_size):
+        items = fetch_items_by_order(supabase, [o['order_id'] for o in orders], columns=ITEM_SELECT)
+        page = []
+        for order in orders:
+            for item in sorted(items.get(order['order_id'], ()), key=lambda i: i['item_id']):
+                product = item.get('products') or {}
+                page.append({
+                    **item,
+                    'fecha_orden': order.get('fecha_orden'),
+                    'producto': product.get('nombre'),
+                    'categoria': product.get('categoria'),
+                })
+        if page:
+            yield page
+
+
+SOURCES = {
+    'orders': (ORDER_COLUMNS, iter_order_pages),
+    'items': (ITEM_COLUMNS, iter_item_pages),
+}
+
+
+# ============================================
+# ESCRITORES
+# ============================================
+
+class CsvWriter:
+    """CSV UTF-8 con BOM, escrito fila a fila"""
+
+    def __init__(self, out, columns: Tuple[Column, ...]):
+        out.write(codecs.BOM_UTF8)
+        self._text = io.TextIOWrapper(out, encoding='utf-8', newline='', write_through=True)
+        self._names = [c.name for c in columns]
+        self._writer = csv.writer(self._text)
+        self._writer.writerow(self._names)
+
+    def write(self, rows: List[Dict]):
+        self._writer.writerows([row.get(name) for name in self._names] for row in rows)
+
+    def close(self):
+        self._text.flush()
+        self._text.detach()
+
+
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Datos" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _column_letter(index: int) -> str:
+    letters = ''
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        letters = chr(65 + rest) + letters
+    return letters
+
+
+def _xml_text(value) -> str:
+    text = _XML_INVALID.sub('', str(value))
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+class XlsxWriter:
+    """
+    Libro de una hoja escrito en streaming
+
+    La hoja se escribe como XML directo dentro del zip (textos en línea, sin
+    tabla de strings compartidos), así que nunca se arma en memoria.
+    """
+
+    def __init__(self, out, columns: Tuple[Column, ...]):
+        self._zip = zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_DEFLATED)
+        self._sheet = self._zip.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True)
+        self._columns = columns
+        self._letters = [_column_letter(i) for i in range(len(columns))]
+        self._row = 0
+        self._emit(
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        )
+        self._emit(self._row_xml([c.name for c in columns], ['text'] * len(columns)))
+
+    def _emit(self, text: str):
+        self._sheet.write(text.encode('utf-8'))
+
+    def _cell(self, ref: str, value, kind: str) -> str:
+        if value is None or value == '':
+            return ''
+        if kind in ('int', 'float') and not isinstance(value, bool):
+            return f'<c r="{ref}"><v>{value}</v></c>'
+        if kind == 'bool':
+            return f'<c r="{ref}" t="b"><v>{int(bool(value))}</v></c>'
+        return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{_xml_text(value)}</t></is></c>'
+
+    def _row_xml(self, values, kinds) -> str:
+        self._row += 1
+        cells = ''.join(
+            self._cell(f"{letter}{self._row}", value, kind)
+            for letter, value, kind in zip(self._letters, values, kinds)
+        )
+        return f'<row r="{self._row}">{cells}</row>'
+
+    def write(self, rows: List[Dict]):
+        if self._row + len(rows) > XLSX_MAX_ROWS + 1:
+            raise ValueError("La hoja de Excel no admite más filas; usa chunk_rows")
+        kinds = [c.kind for c in self._columns]
+        self._emit(''.join(
+            self._row_xml([row.get(c.name) for c in self._columns], kinds) for row in rows
+        ))
+
+    def close(self):
+        self._emit('</sheetData></worksheet>')
+        self._sheet.close()
+        for name, content in _XLSX_PARTS.items():
+            self._zip.writestr(name, content)
+        self._zip.close()
+
+
+class ParquetWriter:
+    """Parquet con un row group por página y esquema fijo"""
+
+    def __init__(self, out, columns: Tuple[Column, ...]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {
+            'int': pa.int64(), 'float': pa.float64(), 'bool': pa.bool_(),
+            'text': pa.string(), 'timestamp': pa.timestamp('us', tz='UTC'),
+        }
+        self._pa = pa
+        self._columns = columns
+        self._schema = pa.schema([(c.name, types[c.kind]) for c in columns])
+        self._writer = pq.ParquetWriter(out, self._schema)
+
+    def write(self, rows: List[Dict]):
+        arrays = []
+        for column, field in zip(self._columns, self._schema):
+            values = [row.get(column.name) for row in rows]
+            if column.kind == 'timestamp':
+                values = pd.to_datetime(pd.Series(values, dtype=object), utc=True, format='ISO8601')
+                arrays.append(self._pa.Array.from_pandas(values, type=field.type))
+            else:
+                arrays.append(self._pa.array(values, type=field.type, from_pandas=True))
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+WRITERS = {'csv': CsvWriter, 'xlsx': XlsxWriter, 'parquet': ParquetWriter}
+
+
+# ============================================
+# EXPORTACIÓN
+# ============================================
+
+def export_filename(kind: str, fmt: str, start_date: date, end_date: date, part: Optional[int] = None) -> str:
+    suffix = f"_parte{part}" if part else ""
+    return f"{'pedidos' if kind == 'orders' else 'items'}_{start_date}_{end_date}{suffix}{FORMATS[fmt][1]}"
+
+
+def export_range(
+    supabase,
+    kind: str,
+    fmt: str,
+    start_date: date,
+    end_date: date,
+    directory: str,
+    chunk_rows: Optional[int] = None,
+    page_size: int = PAGE_SIZE
+) -> List[str]:
+    """
+    Exporta pedidos o items de un rango a uno o varios archivos
+
+    Args:
+        supabase: Cliente de Supabase
+        kind: 'orders' o 'items'
+        fmt: 'csv', 'xlsx' o 'parquet'
+        start_date: Primer día (UTC)
+        end_date: Último día (UTC, inclusive)
+        directory: Carpeta de salida
+        chunk_rows: Filas máximas por archivo (None: un solo archivo; en
+            xlsx nunca más que el límite de una hoja)
+        page_size: Filas por consulta
+
+    Returns:
+        List[str]: Rutas de los archivos escritos, en orden
+    """
+    if kind not in SOURCES:
+        raise ValueError(f"Tipo de exportación desconocido: {kind}")
+    if fmt not in WRITERS:
+        raise ValueError(f"Formato de exportación desconocido: {fmt}")
+
+    columns, source = SOURCES[kind]
+    limit = min(chunk_rows or XLSX_MAX_ROWS, XLSX_MAX_ROWS) if fmt == 'xlsx' else chunk_rows
+    chunked = limit is not None
+
+    os.makedirs(directory, exist_ok=True)
+    paths: List[str] = []
+    handle = writer = None
+    in_part = total = 0
+
+    def open_part():
+        nonlocal handle, writer, in_part
+        path = os.path.join(directory, export_filename(kind, fmt, start_date, end_date, len(paths) + 1 if chunked else None))
+        paths.append(path)
+        handle = open(path, 'wb')
+        writer = WRITERS[fmt](handle, columns)
+        in_part = 0
+
+    try:
+        open_part()
+        for page in source(supabase, start_date, end_date, page_size):
+            start = 0
+            while start < len(page):
+                if limit and in_part >= limit:
+                    writer.close()
+                    handle.close()
+                    open_part()
+                stop = start + limit - in_part if limit else len(page)
+                chunk = page[start:stop]
+                writer.write(chunk)
+                in_part += len(chunk)
+                total += len(chunk)
+                start += len(chunk)
+        writer.close()
+    finally:
+        if handle is not None:
+            handle.close()
+
+    # Una sola parte no necesita el sufijo
+    if chunked and len(paths) == 1:
+        single = os.path.join(directory, export_filename(kind, fmt, start_date, end_date))
+        os.replace(paths[0], single)
+        paths = [single]
+
+    logger.info(f"📤 Exportados {total} {kind} ({fmt}) en {len(paths)} archivo(s)")
+    return paths
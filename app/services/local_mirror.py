@@ -0,0 +1,364 @@
+"""
+Réplica local en Parquet de las tablas que consulta el panel de admin.
+
+En vez de traer orders, users y order_items completos en cada carga de
+página, el panel mantiene una copia local y solo pide a Supabase las filas
+con updated_at posterior a la última sincronización (marca de agua). Las
+páginas trabajan sobre DataFrames de pandas ya cargados, así que el costo
+de una carga depende de cuánto cambió, no de cuánta historia hay.
+
+- Paginación keyset por (updated_at, id): nunca se pierden filas con la
+  misma marca de tiempo aunque caigan en el borde de una página.
+- Cada sincronización relee una ventana de ``overlap`` segundos antes de la
+  marca de agua, por si una transacción confirmó tarde con un updated_at
+  anterior. Las filas repetidas se reemplazan por id.
+- Las tablas sin updated_at (o sin la migración scripts/add_updated_at.sql)
+  se recargan completas por keyset de id.
+- Los archivos se escriben de forma atómica; otra instancia del panel que
+  comparta el directorio recarga desde disco cuando ve archivos más nuevos.
+- Los borrados no traen updated_at: cada ``reconcile_interval`` segundos
+  se piden solo las claves primarias (keyset de id) y se quitan las filas
+  locales que ya no existen. rebuild() (botón en la barra lateral del
+  panel) reconstruye desde cero.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+from postgrest.exceptions import APIError
+
+from app.utils.db_gateway import MISSING_COLUMN_CODE
+from app.utils.keyset import fetch_all
+from app.utils.query_batch import QueryBatch
+
+logger = logging.getLogger(__name__)
+
+
+class MirrorTable(NamedTuple):
+    """Tabla replicada: clave primaria, columna de marca de agua y columnas de fecha"""
+    name: str
+    pk: str
+    watermark: Optional[str] = 'updated_at'
+    dates: Tuple[str, ...] = ()
+
+
+DEFAULT_TABLES = (
+    MirrorTable('orders', 'order_id', dates=('fecha_orden', 'updated_at')),
+    MirrorTable('users', 'user_id', dates=('created_at', 'updated_at')),
+    MirrorTable('order_items', 'item_id', dates=('updated_at',)),
+    # Catálogo pequeño y sin updated_at: se recarga completo
+    MirrorTable('products', 'product_id', watermark=None, dates=('created_at',)),
+)
+
+
+def _parse_ts(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class LocalMirror:
+    """Copia local incremental de tablas de Supabase"""
+
+    def __init__(
+        self,
+        supabase,
+        directory: str,
+        tables=DEFAULT_TABLES,
+        max_age: float = 15.0,
+        overlap: float = 60.0,
+        page_size: int = 1000,
+        timeout: float = 30.0,
+        reconcile_interval: float = 300.0
+    ):
+        """
+        Args:
+            supabase: Cliente de Supabase
+            directory: Carpeta de los archivos Parquet (compartida entre procesos)
+            tables: Tablas a replicar
+            max_age: Segundos durante los que una sincronización se reutiliza;
+                varias sesiones del panel dentro de ese lapso no consultan de nuevo
+            overlap: Segundos que se releen antes de la marca de agua
+            page_size: Filas por consulta (no más que el max-rows de PostgREST)
+            timeout: Plazo total de una sincronización
+            reconcile_interval: Segundos entre comparaciones de claves para
+                quitar filas borradas en Supabase
+        """
+        self.supabase = supabase
+        self.directory = directory
+        self.tables = {t.name: t for t in tables}
+        self.max_age = max_age
+        self.overlap = overlap
+        self.page_size = page_size
+        self.timeout = timeout
+        self.reconcile_interval = reconcile_interval
+
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._state: Dict[str, Dict] = {}
+        self._loaded_mtime: Dict[str, float] = {}
+        self._last_sync = 0.0
+        self._lock = threading.Lock()
+        self._table_locks = {name: threading.Lock() for name in self.tables}
+
+        os.makedirs(directory, exist_ok=True)
+        for name in self.tables:
+            self._load(name)
+
+    # ============================================
+    # ARCHIVOS
+    # ============================================
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.parquet")
+
+    def _state_path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.state.json")
+
+    def _load(self, name: str):
+        """Carga la tabla desde disco si existe"""
+        path = self._path(name)
+        if not os.path.exists(path) or not os.path.exists(self._state_path(name)):
+            self._frames[name] = pd.DataFrame()
+            self._state[name] = {}
+            self._loaded_mtime[name] = 0.0
+            return
+
+        try:
+            with open(self._state_path(name), encoding='utf-8') as f:
+                self._state[name] = json.load(f)
+            self._frames[name] = pd.read_parquet(path)
+            self._loaded_mtime[name] = os.path.getmtime(self._state_path(name))
+        except Exception as e:
+            logger.warning(f"⚠️ Réplica de {name} ilegible, se reconstruirá: {e}")
+            self._frames[name] = pd.DataFrame()
+            self._state[name] = {}
+            self._loaded_mtime[name] = 0.0
+
+    def _save(self, name: str):
+        """Escribe datos y estado con reemplazo atómico (los lectores nunca ven archivos a medias)"""
+        path = self._path(name)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        self._frames[name].to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+        state_path = self._state_path(name)
+        tmp = f"{state_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._state[name], f)
+        os.replace(tmp, state_path)
+        self._loaded_mtime[name] = os.path.getmtime(state_path)
+
+    def _reload_if_newer(self, name: str):
+        """Otro proceso sincronizó después que nosotros: tomar su versión"""
+        state_path = self._state_path(name)
+        if os.path.exists(state_path) and os.path.getmtime(state_path) > self._loaded_mtime.get(name, 0.0):
+            self._load(name)
+
+    # ============================================
+    # LECTURA REMOTA
+    # ============================================
+
+    def _page(self, query):
+        return query.limit(self.page_size).execute().data or []
+
+    def _fetch_changes(self, table: MirrorTable, since: Optional[str]) -> List[Dict]:
+        """Filas con updated_at >= since, recorridas por keyset (updated_at, pk)"""
+        rows: List[Dict] = []
+        ts, last_pk = since, None
+
+        while True:
+            if last_pk is not None:
+                # Primero el resto de filas con la misma marca de tiempo
+                page = self._page(
+                    self.supabase.table(table.name).select("*")
+                    .eq(table.watermark, ts)
+                    .gt(table.pk, last_pk)
+                    .order(table.pk)
+                )
+                rows.extend(page)
+                if len(page) == self.page_size:
+                    last_pk = page[-1][table.pk]
+                    continue
+
+            query = self.supabase.table(table.name).select("*")
+            if ts is not None:
+                query = query.gte(table.watermark, ts) if last_pk is None else query.gt(table.watermark, ts)
+            page = self._page(query.order(table.watermark).order(table.pk))
+            rows.extend(page)
+
+            if len(page) < self.page_size:
+                return rows
+            ts, last_pk = page[-1][table.watermark], page[-1][table.pk]
+
+    def _fetch_all(self, table: MirrorTable) -> List[Dict]:
+        """Tabla completa por keyset de id"""
+        return fetch_all(self.supabase, table.name, key=table.pk, page_size=self.page_size)
+
+    def _fetch_keys(self, table: MirrorTable) -> set:
+        """Solo las claves primarias de la tabla, por keyset de id"""
+        rows = fetch_all(self.supabase, table.name, key=table.pk, columns=table.pk, page_size=self.page_size)
+        return {row[table.pk] for row in rows}
+
+    def _reconcile_due(self, state: Dict) -> bool:
+        reconciled_at = state.get('reconciled_at')
+        if not reconciled_at:
+            return True
+        return datetime.now() - datetime.fromisoformat(reconciled_at) >= timedelta(seconds=self.reconcile_interval)
+
+    # ============================================
+    # SINCRONIZACIÓN
+    # ============================================
+
+    def _to_frame(self, table: MirrorTable, rows: List[Dict]) -> pd.DataFrame:
+        df = pd.DataFrame(rows)
+        for column in table.dates:
+            if column in df.columns:
+                df[column] = pd.to_datetime(df[column], utc=True, format='ISO8601')
+        return df
+
+    def _sync_table(self, name: str, full: bool = False) -> int:
+        """Trae los cambios de una tabla; retorna cuántas filas llegaron"""
+        # Un hilo que superó el plazo del lote puede seguir vivo: no pisarlo
+        with self._table_locks[name]:
+            return self._sync_table_locked(name, full)
+
+    def _sync_table_locked(self, name: str, full: bool) -> int:
+        table = self.tables[name]
+        self._reload_if_newer(name)
+        state = self._state.get(name) or {}
+
+        watermark = None if full else state.get('watermark')
+        incremental = table.watermark is not None
+
+        if incremental:
+            since = None
+            if watermark:
+                since = (_parse_ts(watermark) - timedelta(seconds=self.overlap)).isoformat()
+            try:
+                rows = self._fetch_changes(table, since)
+            except APIError as e:
+                # Falta la migración: replicar la tabla completa hasta que exista.
+                # Cualquier otro error (plazo, 5xx, breaker) sube y se conserva el frame actual
+                if e.code != MISSING_COLUMN_CODE:
+                    raise
+                logger.warning(f"⚠️ {name} sin {table.watermark} ({e}); se recarga completa")
+                incremental = False
+
+        if not incremental:
+            rows = self._fetch_all(table)
+            full = True
+
+        changed = self._to_frame(table, rows)
+        current = self._frames.get(name)
+
+        if full or current is None or current.empty:
+            merged = changed
+        elif changed.empty:
+            merged = current
+        else:
+            merged = pd.concat([current, changed], ignore_index=True)
+            merged = merged.drop_duplicates(subset=table.pk, keep='last')
+
+        # Las claves se piden después de los cambios: una fila local que no aparece fue borrada
+        removed = 0
+        reconciled_at = state.get('reconciled_at')
+        if full or (not watermark and merged is changed):
+            # La tabla llegó completa: no hay nada que comparar
+            reconciled_at = datetime.now().isoformat()
+        elif self._reconcile_due(state) and not merged.empty and table.pk in merged.columns:
+            keys = self._fetch_keys(table)
+            alive = merged[table.pk].isin(keys)
+            removed = int((~alive).sum())
+            if removed:
+                merged = merged[alive]
+                logger.info(f"🗑️ {removed} filas borradas en Supabase quitadas de la réplica de {name}")
+            reconciled_at = datetime.now().isoformat()
+
+        if not merged.empty and table.pk in merged.columns:
+            merged = merged.sort_values(table.pk, ignore_index=True)
+
+        new_state = {'mode': 'incremental' if incremental else 'full', 'synced_at': datetime.now().isoformat(),
+                     'reconciled_at': reconciled_at}
+        if incremental:
+            latest = max((r[table.watermark] for r in rows if r.get(table.watermark)), default=None, key=_parse_ts)
+            if watermark and (latest is None or _parse_ts(latest) < _parse_ts(watermark)):
+                latest = watermark
+            new_state['watermark'] = latest
+
+        self._frames[name] = merged
+        self._state[name] = new_state
+        if rows or removed or full or not os.path.exists(self._path(name)) \
+                or reconciled_at != state.get('reconciled_at'):
+            self._save(name)
+        return len(rows)
+
+    def sync(self, force: bool = False) -> Dict[str, int]:
+        """
+        Trae los cambios de todas las tablas (en paralelo)
+
+        Args:
+            force: Ignorar max_age y consultar de todas formas
+
+        Returns:
+            Dict[str, int]: Filas recibidas por tabla ({} si se reutilizó la anterior)
+        """
+        with self._lock:
+            if not force and time.monotonic() - self._last_sync < self.max_age:
+                return {}
+
+            batch = QueryBatch(timeout=self.timeout)
+            for name in self.tables:
+                batch.add(name, self._sync_table, name, default=0)
+            result = batch.run()
+
+            if result.ok:
+                self._last_sync = time.monotonic()
+            logger.info(f"🔄 Réplica sincronizada en {result.elapsed:.2f}s: {result.results}")
+            return result.results
+
+    def rebuild(self, name: Optional[str] = None) -> Dict[str, int]:
+        """
+        Recarga completa sin esperar a la próxima comparación de claves
+
+        Returns:
+            Dict[str, int]: Filas cargadas por tabla
+        """
+        with self._lock:
+            loaded = {table: self._sync_table(table, full=True) for table in ([name] if name else list(self.tables))}
+            self._last_sync = time.monotonic()
+            logger.info(f"🔄 Réplica reconstruida: {loaded}")
+            return loaded
+
+    # ============================================
+    # CONSULTA
+    # ============================================
+
+    def frame(self, name: str) -> pd.DataFrame:
+        """
+        DataFrame de la tabla. Es compartido entre sesiones: no modificarlo
+        en el sitio (usar copy() o asignar a una variable nueva).
+        """
+        return self._frames.get(name, pd.DataFrame())
+
+    def version(self, name: str) -> str:
+        """
+        Identificador de los datos actuales de una tabla, para llaves de caché
+
+        Cambia cuando llega una fila nueva o modificada (marca de agua) o
+        cambia el número de filas. Las tablas sin marca de agua usan la hora
+        de la última recarga completa.
+        """
+        state = self._state.get(name) or {}
+        stamp = state.get('watermark') or state.get('synced_at') or ''
+        return f"{stamp}|{len(self._frames.get(name, ()))}"
+
+    def status(self) -> Dict[str, Dict]:
+        """Filas y marca de agua por tabla (para mostrar en el panel)"""
+        return {
+            name: {'rows': len(self._frames.get(name, ())), **(self._state.get(name) or {})}
+            for name in self.tables
+        }
@@ -0,0 +1,103 @@
+"""
+Numeración de cotizaciones y documentos sin colisiones.
+
+Los números salen de lease_numbers() (scripts/add_number_sequences.sql):
+cada proceso reserva un bloque de ``block_size`` números consecutivos en una
+consulta y los reparte en memoria. Tomar un número del bloque actual es un
+``next()`` sobre un iterador de range, atómico en CPython, así que no hay
+lock en el camino común; solo el hilo que agota el bloque pide otro.
+
+La base nunca entrega dos veces el mismo rango, así que no hay números
+repetidos entre reinicios ni entre réplicas. Los números que un proceso no
+alcanzó a usar antes de terminar quedan como huecos en la secuencia.
+
+Uso:
+    numero = NumberService.next("cotizacion-2025")
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, Iterator, Optional
+
+from app.utils.db_gateway import supabase_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_SIZE = 20
+
+
+class NumberAllocator:
+    """Números de una secuencia, reservados por bloques"""
+
+    def __init__(self, supabase_factory: Callable, name: str, block_size: int = DEFAULT_BLOCK_SIZE):
+        """
+        Args:
+            supabase_factory: Función que retorna el cliente de Supabase
+            name: Nombre de la secuencia (fila de number_sequences)
+            block_size: Números por consulta a la base
+        """
+        self.supabase_factory = supabase_factory
+        self.name = name
+        self.block_size = block_size
+        self.leases = 0
+
+        self._block: Iterator[int] = iter(())
+        self._lock = threading.Lock()
+
+    def _lease(self) -> Iterator[int]:
+        start = self.supabase_factory().rpc(
+            "lease_numbers", {"p_name": self.name, "p_count": self.block_size}
+        ).execute().data
+        if start is None:
+            raise RuntimeError(f"lease_numbers no retornó un bloque para {self.name}")
+        start = int(start)
+        self.leases += 1
+        logger.info(f"🔢 Bloque de {self.name}: {start}-{start + self.block_size - 1}")
+        return iter(range(start, start + self.block_size))
+
+    def next(self) -> int:
+        """
+        Siguiente número de la secuencia
+
+        Raises:
+            Exception: Si no se puede reservar un bloque nuevo
+        """
+        while True:
+            block = self._block
+            try:
+                return next(block)
+            except StopIteration:
+                pass
+
+            with self._lock:
+                # Otro hilo pudo haber reservado el bloque mientras esperábamos
+                if self._block is block:
+                    self._block = self._lease()
+
+
+class NumberService:
+    """Secuencias compartidas por el proceso"""
+
+    # Tamaño de bloque por prefijo de secuencia (las demás usan DEFAULT_BLOCK_SIZE)
+    BLOCK_SIZES = {
+        'cotizacion': 10,
+    }
+
+    _allocators: Dict[str, NumberAllocator] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def allocator(cls, name: str) -> NumberAllocator:
+        allocator: Optional[NumberAllocator] = cls._allocators.get(name)
+        if allocator is None:
+            with cls._lock:
+                allocator = cls._allocators.get(name)
+                if allocator is None:
+                    block_size = cls.BLOCK_SIZES.get(name.split('-')[0], DEFAULT_BLOCK_SIZE)
+                    allocator = cls._allocators[name] = NumberAllocator(supabase_client, name, block_size)
+        return allocator
+
+    @classmethod
+    def next(cls, name: str) -> int:
+        """Siguiente número de la secuencia ``name``"""
+        return cls.allocator(name).next()
@@ -0,0 +1,163 @@
+"""
+Agrupador de notificaciones de pedidos para el admin (modo digest)
+"""
+
+import asyncio
+import io
+import logging
+import time
+import zipfile
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class OrderDigest:
+    """
+    Acumula pedidos nuevos y los entrega en un solo email.
+
+    Un lote se envía cuando pasa ``window`` segundos sin pedidos nuevos,
+    cuando el pedido más antiguo lleva ``max_latency`` segundos esperando o
+    cuando se juntan ``max_orders`` pedidos, lo que ocurra primero. Los
+    pedidos con total >= ``urgent_total`` no esperan: se envían de inmediato.
+    """
+
+    def __init__(
+        self,
+        send_digest: Callable[[List[Dict]], Awaitable[bool]],
+        send_now: Callable[[Dict, Optional[str]], Awaitable[bool]],
+        window: float = 300,
+        max_latency: float = 900,
+        max_orders: int = 50,
+        urgent_total: Optional[float] = None
+    ):
+        """
+        Args:
+            send_digest: Envía un lote; recibe dicts con 'order_data' y 'pdf_path'
+            send_now: Envía un pedido individual (order_data, pdf_path)
+            window: Segundos de calma antes de cerrar el lote
+            max_latency: Máximo de segundos que un pedido puede esperar
+            max_orders: Tamaño máximo del lote
+            urgent_total: Total a partir del cual el pedido se envía solo
+        """
+        self._send_digest = send_digest
+        self._send_now = send_now
+        self.window = window
+        self.max_latency = max_latency
+        self.max_orders = max(1, max_orders)
+        self.urgent_total = urgent_total
+
+        self._pending: List[Dict] = []
+        self._first_at = 0.0
+        self._last_at = 0.0
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def is_urgent(self, order_data: Dict) -> bool:
+        if self.urgent_total is None:
+            return False
+        return (order_data.get('total') or 0) >= self.urgent_total
+
+    async def add(self, order_data: Dict, pdf_path: Optional[str] = None) -> bool:
+        """
+        Registra un pedido nuevo
+
+        Returns:
+            bool: True si se envió o quedó en cola para el próximo digest
+        """
+        if self.is_urgent(order_data):
+            logger.info(f"🚨 Pedido #{order_data.get('order_id')} urgente, se envía sin esperar")
+            return await self._send_now(order_data, pdf_path)
+
+        now = time.monotonic()
+        if not self._pending:
+            self._first_at = now
+        self._last_at = now
+        self._pending.append({'order_data': order_data, 'pdf_path': pdf_path})
+
+        if len(self._pending) >= self.max_orders:
+            await self.flush()
+        elif self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        else:
+            self._wake.set()
+
+        return True
+
+    def _deadline(self) -> float:
+        return min(self._last_at + self.window, self._first_at + self.max_latency)
+
+    async def _run(self):
+        """Espera a que venza el lote actual y lo envía"""
+        while self._pending:
+            delay = self._deadline() - time.monotonic()
+            if delay <= 0:
+                await self.flush()
+                continue
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def flush(self) -> bool:
+        """Envía ya todos los pedidos pendientes"""
+        async with self._lock:
+            if not self._pending:
+                return True
+
+            batch, self._pending = self._pending, []
+            try:
+                sent = await self._send_digest(batch)
+            except Exception as e:
+                logger.error(f"❌ Error enviando digest de pedidos: {e}")
+                import traceback
+                traceback.print_exc()
+                sent = False
+
+            if sent:
+                logger.info(f"✅ Digest con {len(batch)} pedidos enviado al admin")
+            else:
+                # Devolver el lote a la cola para el siguiente intento
+                logger.warning(f"⚠️ Digest no enviado, {len(batch)} pedidos vuelven a la cola")
+                now = time.monotonic()
+                self._pending = batch + self._pending
+                self._first_at = self._last_at = now
+
+            return sent
+
+    async def close(self):
+        """Envía lo pendiente y detiene el temporizador (al apagar el bot)"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.flush()
+
+
+def zip_pdfs(paths: List[Optional[str]]) -> Optional[bytes]:
+    """
+    Comprime en memoria los PDFs que existan
+
+    Returns:
+        Optional[bytes]: Contenido del ZIP o None si no hay archivos
+    """
+    files = [Path(p) for p in paths if p and Path(p).exists()]
+    if not files:
+        return None
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for path in files:
+            zf.write(path, arcname=path.name)
+    return buffer.getvalue()
@@ -0,0 +1,40 @@
+"""
+Lectura de items de pedidos en lote.
+
+Los listados de pedidos (panel de admin, detalle de cliente) muestran los
+items de cada pedido; en vez de una consulta por pedido se piden todos con
+un solo ``in_("order_id", ids)`` y se agrupan en memoria.
+"""
+
+from typing import Dict, Iterable, List
+
+from app.utils.data_loader import BatchLoader, group_rows
+from app.utils.keyset import fetch_all
+
+ITEM_COLUMNS = "*, products(nombre, precio)"
+
+# PostgREST corta cada respuesta en max-rows (1000 por defecto en Supabase)
+PAGE_SIZE = 1000
+
+
+def fetch_items_by_order(supabase, order_ids: Iterable[int], columns: str = ITEM_COLUMNS) -> Dict[int, List[Dict]]:
+    """
+    Items de varios pedidos, agrupados por order_id
+
+    Returns:
+        Dict[int, List[Dict]]: order_id -> items (los pedidos sin items no aparecen)
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return {}
+
+    rows = fetch_all(
+        supabase, "order_items", key="item_id", columns=columns, page_size=PAGE_SIZE,
+        filters=lambda query: query.in_("order_id", order_ids)
+    )
+    return group_rows(rows, 'order_id')
+
+
+def order_items_loader(supabase, columns: str = ITEM_COLUMNS) -> BatchLoader:
+    """Loader de items por order_id; crear uno por página renderizada"""
+    return BatchLoader(lambda ids: fetch_items_by_order(supabase, ids, columns), default=[])
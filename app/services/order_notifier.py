@@ -0,0 +1,213 @@
+"""
+Notificaciones de cambio de estado de pedidos a los clientes.
+
+Los cambios de orders.estado quedan registrados en la tabla
+order_status_events por un trigger (scripts/add_order_status_events.sql),
+sin importar si vienen del bot, del panel Streamlit o de SQL directo. Este
+servicio lee los eventos pendientes y encola un mensaje por pedido en la
+cola de Telegram. Cada evento se marca como procesado cuando su mensaje
+sale de la cola (entregado o descartado por Telegram); si el bot se
+detiene antes, el evento sigue pendiente y se notifica al reiniciar.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+
+from app.services.telegram_outbox import TelegramOutbox
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+STATUS_MESSAGES = {
+    'pending': "🕐 Tu pedido #{order_id} está pendiente de confirmación.",
+    'confirmed': "✅ ¡Tu pedido #{order_id} fue confirmado! Ya lo estamos preparando.",
+    'preparing': "👨‍🍳 Tu pedido #{order_id} se está preparando.",
+    'ready': "📦 ¡Tu pedido #{order_id} está listo para entrega!",
+    'delivered': "🚚 Tu pedido #{order_id} fue entregado. ¡Gracias por tu compra! 🍪",
+    'completed': "🎉 Tu pedido #{order_id} fue completado. ¡Gracias por tu compra! 🍪",
+    'cancelled': "❌ Tu pedido #{order_id} fue cancelado. Si tienes dudas, escríbenos.",
+}
+
+
+def build_status_message(order_id, estado: str) -> str:
+    template = STATUS_MESSAGES.get(estado, "🔔 Tu pedido #{order_id} cambió a: {estado}")
+    return template.format(order_id=order_id, estado=estado)
+
+
+class OrderStatusNotifier:
+    """Convierte eventos de estado pendientes en mensajes de Telegram"""
+
+    def __init__(
+        self,
+        supabase,
+        outbox: TelegramOutbox,
+        poll_interval: float = 5,
+        batch_size: int = 100
+    ):
+        self.supabase = supabase
+        self.outbox = outbox
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Eventos encolados que aún no se marcan: no se vuelven a encolar
+        self._inflight: Set[int] = set()
+        self._done: List[int] = []
+        self._events = metrics.counter("order_status_events_total", "Eventos de estado procesados")
+
+    # === CICLO DE VIDA ===
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info("🔔 Notificador de estados de pedidos iniciado")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self._flush_done()
+        except Exception as e:
+            logger.error(f"❌ No se pudieron marcar los eventos notificados: {e}")
+
+    def wake(self):
+        """Revisa eventos ya (p. ej. justo después de cambiar un estado desde el bot)"""
+        self._wake.set()
+
+    async def _run(self):
+        while True:
+            try:
+                # Si el lote vino lleno puede haber más: seguir sin esperar
+                while await self.poll_once() >= self.batch_size:
+                    pass
+            except Exception as e:
+                logger.error(f"❌ Error leyendo eventos de estado: {e}")
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    # === PROCESAMIENTO ===
+
+    def _fetch_pending(self) -> List[Dict]:
+        response = self.supabase.table("order_status_events")\
+            .select("event_id, order_id, telegram_id, new_estado")\
+            .is_("processed_at", "null")\
+            .order("event_id")\
+            .limit(self.batch_size + len(self._inflight))\
+            .execute()
+        return [e for e in response.data or [] if e['event_id'] not in self._inflight]
+
+    def _mark_processed(self, event_ids: List[int]):
+        self.supabase.table("order_status_events")\
+            .update({"processed_at": datetime.now(timezone.utc).isoformat()})\
+            .in_("event_id", event_ids)\
+            .execute()
+
+    def _on_sent(self, event_id: int):
+        # Entregado o descartado por Telegram: en ambos casos no hay reintento
+        def done(delivered: bool):
+            self._done.append(event_id)
+            self._wake.set()
+        return done
+
+    async def _flush_done(self):
+        """Marca como procesados los eventos cuyo mensaje ya salió de la cola"""
+        event_ids, self._done = self._done, []
+        if not event_ids:
+            return
+        try:
+            await asyncio.to_thread(self._mark_processed, event_ids)
+        except BaseException:
+            self._done[:0] = event_ids
+            raise
+        self._inflight.difference_update(event_ids)
+        self._events.inc(len(event_ids))
+
+    async def poll_once(self) -> int:
+        """
+        Marca los eventos ya notificados y encola un lote de eventos nuevos
+
+        Returns:
+            int: Cantidad de eventos leídos
+        """
+        await self._flush_done()
+        events = await asyncio.to_thread(self._fetch_pending)
+        if not events:
+            return 0
+
+        for event in events:
+            self._inflight.add(event['event_id'])
+            chat_id = event.get('telegram_id')
+            if not chat_id:
+                # Sin chat no hay nada que enviar
+                self._done.append(event['event_id'])
+                continue
+            # La clave por pedido fusiona cambios rápidos: solo sale el último estado
+            self.outbox.enqueue(
+                chat_id,
+                build_status_message(event['order_id'], event['new_estado']),
+                key=("order_status", event['order_id']),
+                on_done=self._on_sent(event['event_id'])
+            )
+
+        await self._flush_done()
+        logger.info(f"🔔 {len(events)} cambios de estado encolados para notificar")
+        return len(events)
+
+
+# ============================================
+# INTEGRACIÓN CON LA APLICACIÓN DEL BOT
+# ============================================
+
+NOTIFIER_KEY = 'order_notifier'
+OUTBOX_KEY = 'telegram_outbox'
+
+
+async def start_order_notifications(application, supabase):
+    """Crea la cola de salida y el notificador y los guarda en bot_data"""
+    outbox = TelegramOutbox(
+        application.bot,
+        global_rate=float(os.getenv('TELEGRAM_GLOBAL_RATE', '25')),
+        per_chat_interval=float(os.getenv('TELEGRAM_PER_CHAT_INTERVAL', '1'))
+    )
+    notifier = OrderStatusNotifier(
+        supabase,
+        outbox,
+        poll_interval=float(os.getenv('ORDER_NOTIFY_POLL_INTERVAL', '5'))
+    )
+    outbox.start()
+    notifier.start()
+
+    application.bot_data[OUTBOX_KEY] = outbox
+    application.bot_data[NOTIFIER_KEY] = notifier
+
+
+async def stop_order_notifications(application):
+    # Primero se vacía la cola: el notificador marca lo que alcanzó a salir
+    outbox = application.bot_data.pop(OUTBOX_KEY, None)
+    if outbox:
+        await outbox.stop()
+
+    notifier = application.bot_data.pop(NOTIFIER_KEY, None)
+    if notifier:
+        await notifier.stop()
+
+
+def wake_order_notifier(context):
+    """Pide al notificador revisar eventos ya; no hace nada si no está activo"""
+    notifier = context.application.bot_data.get(NOTIFIER_KEY)
+    if notifier:
+        notifier.wake()
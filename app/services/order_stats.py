@@ -0,0 +1,134 @@
+"""
+Estadísticas de pedidos para el panel de admin.
+
+La ruta rápida lee la vista order_stats_summary, que mantienen los
+triggers de scripts/add_order_stats.sql: una consulta, costo constante.
+La ruta lenta recorre todos los pedidos y calcula lo mismo; queda como
+respaldo si la vista no existe y como verificador de consistencia.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from app.utils.keyset import iter_pages
+
+logger = logging.getLogger(__name__)
+
+# Los días se cuentan en hora de Bogotá, igual que en order_stats_daily
+BOGOTA_TZ = timezone(timedelta(hours=-5))
+
+
+def _empty_stats() -> Dict:
+    return {
+        'total_orders': 0,
+        'total_revenue': 0.0,
+        'by_state': {},
+        'today_orders': 0,
+        'today_revenue': 0.0
+    }
+
+
+class OrderStatsService:
+    """Lee y verifica el resumen de pedidos"""
+
+    PAGE_SIZE = 1000
+
+    @classmethod
+    def get_summary(cls, supabase) -> Dict:
+        """
+        Resumen precalculado en una sola consulta
+
+        Returns:
+            Dict: total_orders, total_revenue, today_orders, today_revenue y
+            by_state ({estado: {'count', 'revenue'}})
+        """
+        response = supabase.table("order_stats_summary").select("*").execute()
+        if not response.data:
+            return _empty_stats()
+
+        row = response.data[0]
+        return {
+            'total_orders': int(row.get('total_orders') or 0),
+            'total_revenue': float(row.get('total_revenue') or 0),
+            'by_state': {
+                estado: {'count': int(v.get('count') or 0), 'revenue': float(v.get('revenue') or 0)}
+                for estado, v in (row.get('by_state') or {}).items()
+            },
+            'today_orders': int(row.get('today_orders') or 0),
+            'today_revenue': float(row.get('today_revenue') or 0)
+        }
+
+    @classmethod
+    def compute_from_orders(cls, supabase) -> Dict:
+        """
+        Ruta lenta: recorre todos los pedidos (por páginas) y calcula el resumen
+
+        Returns:
+            Dict: Mismo formato que get_summary
+        """
+        stats = _empty_stats()
+        today = datetime.now(BOGOTA_TZ).date()
+
+        for rows in iter_pages(supabase, "orders", key="order_id",
+                               columns="order_id, estado, total, fecha_orden",
+                               page_size=cls.PAGE_SIZE):
+            for order in rows:
+                estado = order.get('estado') or 'pending'
+                total = float(order.get('total') or 0)
+
+                bucket = stats['by_state'].setdefault(estado, {'count': 0, 'revenue': 0.0})
+                bucket['count'] += 1
+                bucket['revenue'] += total
+                stats['total_orders'] += 1
+                stats['total_revenue'] += total
+
+                fecha = order.get('fecha_orden')
+                if fecha and cls._local_day(fecha) == today:
+                    stats['today_orders'] += 1
+                    stats['today_revenue'] += total
+
+        return stats
+
+    @staticmethod
+    def _local_day(fecha: str):
+        parsed = datetime.fromisoformat(fecha.replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.astimezone(BOGOTA_TZ).date()
+
+    @classmethod
+    def get_stats(cls, supabase) -> Dict:
+        """Resumen rápido; si la vista no está instalada usa la ruta lenta"""
+        try:
+            return cls.get_summary(supabase)
+        except Exception as e:
+            logger.warning(f"⚠️ order_stats_summary no disponible, calculando desde orders: {e}")
+            return cls.compute_from_orders(supabase)
+
+    @classmethod
+    def check_consistency(cls, supabase, tolerance: float = 0.01) -> List[str]:
+        """
+        Compara el resumen precalculado con el cálculo completo
+
+        Returns:
+            List[str]: Diferencias encontradas (vacía si todo cuadra)
+        """
+        fast = cls.get_summary(supabase)
+        slow = cls.compute_from_orders(supabase)
+        problems = []
+
+        for key in ('total_orders', 'total_revenue', 'today_orders', 'today_revenue'):
+            if abs(fast[key] - slow[key]) > tolerance:
+                problems.append(f"{key}: resumen={fast[key]} real={slow[key]}")
+
+        for estado in sorted(set(fast['by_state']) | set(slow['by_state'])):
+            f = fast['by_state'].get(estado, {'count': 0, 'revenue': 0.0})
+            s = slow['by_state'].get(estado, {'count': 0, 'revenue': 0.0})
+            if f['count'] != s['count'] or abs(f['revenue'] - s['revenue']) > tolerance:
+                problems.append(
+                    f"{estado}: resumen={f['count']} (${f['revenue']:,.0f}) "
+                    f"real={s['count']} (${s['revenue']:,.0f})"
+                )
+
+        return problems
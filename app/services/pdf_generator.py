@@ -7,6 +7,8 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional
 
+from app.services.numbering import NumberService
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,18 +27,16 @@ class PDFGenerator:
     @classmethod
     def generate_cotizacion_number(cls) -> str:
         """
-        Genera número único de cotización
+        Genera número único de cotización (secuencia por año, ver
+        app/services/numbering.py)
         
         Returns:
-            str: Número de cotización (ej: COT-2025-001)
+            str: Número de cotización (ej: COT-2025-000001)
         """
-        now = datetime.now()
-        year = now.year
-        
-        # Usar timestamp para garantizar unicidad
-        numero = f"COT-{year}-{now.strftime('%m%d%H%M%S')}"
+        year = datetime.now().year
+        numero = NumberService.next(f"cotizacion-{year}")
         
-        return numero
+        return f"COT-{year}-{numero:06d}"
     
     @classmethod
     def generate_pdf(
@@ -4,6 +4,7 @@ Servicio para generar PDFs de pedidos y cotizaciones
 
 import os
 import logging
+import uuid
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List
@@ -47,9 +48,9 @@ class PDFService:
         try:
             cls._ensure_pdf_dir()
             
-            # Nombre del archivo
+            # Nombre del archivo: el sufijo evita choques entre réplicas sin consultar la base
             order_id = order_data.get('order_id', 'N/A')
-            filename = f"Pedido_{order_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+            filename = f"Pedido_{order_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.pdf"
             filepath = cls.PDF_DIR / filename
             
             # Crear documento
@@ -0,0 +1,321 @@
+"""
+Puntos de recogida y cupos por hora para las pre-órdenes.
+
+- LocationRegistry: los puntos activos se leen una vez y quedan en memoria
+  ``ttl`` segundos; listar los puntos o elegir uno no consulta la base.
+- SlotBook: reservas por (punto, día, hora). Las de los próximos días de un
+  punto se traen en una consulta y quedan en un dict, así que saber si una
+  franja tiene cupo es una búsqueda O(1). Reservar llama a
+  reserve_pickup_slot (scripts/add_pickup_slots.sql), que suma la reserva
+  solo si queda cupo en una sola sentencia: dos confirmaciones simultáneas
+  no pueden pasarse de la capacidad, aunque vengan de procesos distintos.
+  Cancelar una pre-orden devuelve el cupo con release_pickup_slot.
+
+Uso:
+    location = PickupService.registry().get(location_id)
+    PickupService.slots().available_hours(location, fecha)
+    PickupService.slots().reserve(location, fecha, hora)
+"""
+
+import logging
+import threading
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from postgrest.exceptions import APIError
+
+from app.utils.db_gateway import MISSING_FUNCTION_CODES, supabase_client
+
+logger = logging.getLogger(__name__)
+
+# Valores si pickup_locations aún no tiene las columnas de la migración
+DEFAULT_CAPACITY = 5
+DEFAULT_OPENING = 8
+DEFAULT_CLOSING = 19
+
+
+class PickupLocation(NamedTuple):
+    location_id: int
+    nombre: str
+    direccion: str = ''
+    barrio: str = ''
+    capacidad_por_hora: int = DEFAULT_CAPACITY
+    hora_apertura: int = DEFAULT_OPENING
+    hora_cierre: int = DEFAULT_CLOSING
+
+    @classmethod
+    def from_row(cls, row: Dict) -> 'PickupLocation':
+        def value(key, default):
+            return row.get(key) if row.get(key) is not None else default
+
+        return cls(
+            location_id=row['location_id'],
+            nombre=row.get('nombre') or 'Punto de recogida',
+            direccion=row.get('direccion') or '',
+            barrio=row.get('barrio') or '',
+            capacidad_por_hora=int(value('capacidad_por_hora', DEFAULT_CAPACITY)),
+            hora_apertura=int(value('hora_apertura', DEFAULT_OPENING)),
+            hora_cierre=int(value('hora_cierre', DEFAULT_CLOSING)),
+        )
+
+    @property
+    def hours(self) -> range:
+        """Horas de inicio de las franjas (la última empieza a hora_cierre - 1)"""
+        return range(self.hora_apertura, self.hora_cierre)
+
+
+# ============================================
+# PUNTOS DE RECOGIDA
+# ============================================
+
+class LocationRegistry:
+    """Puntos de recogida activos, en el orden de orden_display"""
+
+    def __init__(self, supabase_factory: Callable, ttl: float = 300.0,
+                 fallback: Optional[Callable[[], List[Dict]]] = None):
+        """
+        Args:
+            supabase_factory: Función que retorna el cliente de Supabase
+            ttl: Segundos entre lecturas de la tabla
+            fallback: Filas a usar si la tabla no se puede leer y no hay copia anterior
+        """
+        self.supabase_factory = supabase_factory
+        self.ttl = ttl
+        self.fallback = fallback
+        self._locations: Optional[List[PickupLocation]] = None
+        self._by_id: Dict[int, PickupLocation] = {}
+        self._loaded_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def _load(self) -> List[PickupLocation]:
+        # select("*"): las columnas de capacidad pueden no existir todavía
+        rows = self.supabase_factory().table("pickup_locations")\
+            .select("*")\
+            .eq("activo", True)\
+            .order("orden_display")\
+            .execute().data or []
+        return [PickupLocation.from_row(row) for row in rows]
+
+    def all(self) -> List[PickupLocation]:
+        """
+        Puntos activos; relee la tabla si pasó el ttl
+
+        Raises:
+            Exception: Si la tabla no se puede leer y no hay copia anterior ni fallback
+        """
+        with self._lock:
+            if time.monotonic() - self._loaded_at >= self.ttl:
+                try:
+                    locations = self._load()
+                    self._locations, self._by_id = locations, {loc.location_id: loc for loc in locations}
+                    self._loaded_at = time.monotonic()
+                    logger.info(f"📍 Puntos de recogida cargados: {len(locations)}")
+                except Exception as e:
+                    if self._locations is None:
+                        if self.fallback is None:
+                            raise
+                        # Última copia buena del catálogo; una recarga del catálogo la invalida
+                        locations = [PickupLocation.from_row(row) for row in self.fallback()]
+                        self._locations, self._by_id = locations, {loc.location_id: loc for loc in locations}
+                        self._loaded_at = time.monotonic()
+                        logger.warning(f"⚠️ Puntos de recogida desde la copia del catálogo ({len(locations)}): {e}")
+                    logger.warning(f"⚠️ No se pudieron leer los puntos de recogida, se usa la copia anterior: {e}")
+            return self._locations
+
+    def get(self, location_id: int) -> Optional[PickupLocation]:
+        self.all()
+        return self._by_id.get(location_id)
+
+    def invalidate(self):
+        """Fuerza la relectura en la próxima consulta (p. ej. tras editar puntos)"""
+        with self._lock:
+            self._loaded_at = float('-inf')
+
+
+# ============================================
+# CUPOS
+# ============================================
+
+SlotKey = Tuple[int, date, int]
+
+
+class SlotBook:
+    """Reservas por franja con consulta O(1) y reserva atómica en la base"""
+
+    def __init__(
+        self,
+        supabase_factory: Callable,
+        ttl: float = 30.0,
+        horizon_days: int = 7,
+        clock: Callable[[], date] = date.today
+    ):
+        """
+        Args:
+            supabase_factory: Función que retorna el cliente de Supabase
+            ttl: Segundos durante los que se reutilizan los contadores de un punto
+            horizon_days: Días que se ofrecen, empezando mañana
+            clock: Fecha de hoy
+        """
+        self.supabase_factory = supabase_factory
+        self.ttl = ttl
+        self.horizon_days = horizon_days
+        self.clock = clock
+
+        self._booked: Dict[SlotKey, int] = {}
+        self._loaded_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def days(self) -> List[date]:
+        today = self.clock()
+        return [today + timedelta(days=i) for i in range(1, self.horizon_days + 1)]
+
+    def _refresh(self, location_id: int):
+        """Trae las reservas del horizonte de un punto en una consulta (bajo el lock)"""
+        if time.monotonic() - self._loaded_at.get(location_id, float('-inf')) < self.ttl:
+            return
+        days = self.days()
+        try:
+            rows = self.supabase_factory().table("pickup_slot_counts")\
+                .select("fecha, hora, reservados")\
+                .eq("location_id", location_id)\
+                .gte("fecha", days[0].isoformat())\
+                .lte("fecha", days[-1].isoformat())\
+                .execute().data or []
+        except Exception as e:
+            # Sin la migración: solo cuentan las reservas de este proceso
+            logger.warning(f"⚠️ No se pudieron leer los cupos del punto {location_id}: {e}")
+            self._loaded_at[location_id] = time.monotonic()
+            return
+
+        for key in [k for k in self._booked if k[0] == location_id]:
+            del self._booked[key]
+        for row in rows:
+            self._booked[(location_id, date.fromisoformat(str(row['fecha'])[:10]), int(row['hora']))] = \
+                int(row['reservados'] or 0)
+        self._loaded_at[location_id] = time.monotonic()
+
+    def _free(self, location: PickupLocation, day: date, hour: int) -> int:
+        if hour not in location.hours:
+            return 0
+        return max(0, location.capacidad_por_hora - self._booked.get((location.location_id, day, hour), 0))
+
+    def free(self, location: PickupLocation, day: date, hour: int) -> int:
+        """Cupos que quedan en una franja"""
+        with self._lock:
+            self._refresh(location.location_id)
+            return self._free(location, day, hour)
+
+    def is_bookable(self, location: PickupLocation, day: date, hour: int) -> bool:
+        """La franja está dentro del horizonte y del horario y tiene cupo"""
+        days = self.days()
+        return days[0] <= day <= days[-1] and self.free(location, day, hour) > 0
+
+    def available_hours(self, location: PickupLocation, day: date) -> List[Tuple[int, int]]:
+        """(hora, cupos libres) de las franjas con cupo de un día"""
+        with self._lock:
+            self._refresh(location.location_id)
+            return [(hour, free) for hour in location.hours if (free := self._free(location, day, hour)) > 0]
+
+    def available_days(self, location: PickupLocation) -> List[date]:
+        """Días del horizonte con al menos una franja libre"""
+        with self._lock:
+            self._refresh(location.location_id)
+            return [day for day in self.days() if any(self._free(location, day, h) for h in location.hours)]
+
+    def reserve(self, location: PickupLocation, day: date, hour: int) -> bool:
+        """
+        Reserva un cupo en la franja
+
+        Returns:
+            bool: False si la franja se llenó (o está fuera del horario)
+
+        Raises:
+            DatabaseUnavailable: Si el circuito de la base está abierto
+            Exception: Cualquier otro error de la base; la reserva no se tomó
+        """
+        if not self.is_bookable(location, day, hour):
+            return False
+
+        key = (location.location_id, day, hour)
+        # La llamada va sin el lock: una base lenta no frena las consultas de cupo
+        try:
+            booked = self._call("reserve_pickup_slot", location, day, hour)
+        except _FunctionMissing as e:
+            # Sin la migración: el lock evita sobrecupo dentro de este proceso
+            logger.warning(f"⚠️ reserve_pickup_slot no disponible, se reserva localmente: {e}")
+            with self._lock:
+                if self._free(location, day, hour) <= 0:
+                    return False
+                self._booked[key] = self._booked.get(key, 0) + 1
+                return True
+
+        with self._lock:
+            if booked is None:
+                # Otra confirmación tomó el último cupo
+                self._booked[key] = location.capacidad_por_hora
+                logger.info(f"⛔ Franja llena: punto {location.location_id} {day} {hour}:00")
+                return False
+            self._booked[key] = int(booked)
+        logger.info(f"✅ Cupo reservado: punto {location.location_id} {day} {hour}:00 ({booked}/{location.capacidad_por_hora})")
+        return True
+
+    def release(self, location: PickupLocation, day: date, hour: int):
+        """
+        Devuelve el cupo de una pre-orden cancelada
+
+        Raises:
+            DatabaseUnavailable: Si el circuito de la base está abierto
+            Exception: Cualquier otro error de la base; el cupo sigue tomado
+        """
+        key = (location.location_id, day, hour)
+        try:
+            booked = self._call("release_pickup_slot", location, day, hour)
+        except _FunctionMissing as e:
+            logger.warning(f"⚠️ release_pickup_slot no disponible, se libera localmente: {e}")
+            with self._lock:
+                self._booked[key] = max(0, self._booked.get(key, 0) - 1)
+            return
+
+        with self._lock:
+            # NULL: la franja ya no tenía reservas en la base
+            self._booked[key] = int(booked or 0)
+        logger.info(f"↩️ Cupo liberado: punto {location.location_id} {day} {hour}:00")
+
+    def _call(self, function: str, location: PickupLocation, day: date, hour: int):
+        params = {"p_location_id": location.location_id, "p_fecha": day.isoformat(), "p_hora": hour}
+        try:
+            return self.supabase_factory().rpc(function, params).execute().data
+        except APIError as e:
+            # Solo la función inexistente tiene respaldo local; el resto lo decide el handler
+            if e.code in MISSING_FUNCTION_CODES:
+                raise _FunctionMissing(e) from e
+            raise
+
+
+class _FunctionMissing(Exception):
+    """La base no tiene la función de cupos (falta scripts/add_pickup_slots.sql)"""
+
+
+def _catalog_locations() -> List[Dict]:
+    from config.database import db
+    return db.catalog.snapshot().locations
+
+
+class PickupService:
+    """Registro de puntos y cupos compartidos por el proceso"""
+
+    _registry: Optional[LocationRegistry] = None
+    _slots: Optional[SlotBook] = None
+
+    @classmethod
+    def registry(cls) -> LocationRegistry:
+        if cls._registry is None:
+            cls._registry = LocationRegistry(supabase_client, fallback=_catalog_locations)
+        return cls._registry
+
+    @classmethod
+    def slots(cls) -> SlotBook:
+        if cls._slots is None:
+            cls._slots = SlotBook(supabase_client)
+        return cls._slots
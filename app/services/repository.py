@@ -0,0 +1,362 @@
+"""
+Repositorio único de acceso a Supabase.
+
+Reúne en DatabaseService lo que antes estaba duplicado en
+config/database.py y app/services/database.py, y agrega lecturas tipadas:
+cada modelo de fila declara sus campos y la proyección sale de ellos, así
+que una consulta trae solo las columnas que el llamador usa en vez de
+``select("*")``.
+
+Uso:
+    user_id = db.get_user_id(telegram_id)
+    for order in db.get_recent_orders(user_id):
+        print(order.order_id, order.total)
+"""
+
+import logging
+import os
+from dataclasses import dataclass, field, fields
+from typing import ClassVar, Dict, List, Optional
+
+from supabase import Client
+
+from app.services.catalog import DEFAULT_SNAPSHOT_PATH, CatalogCache
+from app.utils.keyset import fetch_all
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# MODELOS DE FILA
+# ============================================
+
+def embed(resource: str, columns: str):
+    """Campo con un recurso embebido de PostgREST, p. ej. users(nombre)"""
+    return field(default=None, metadata={'select': f"{resource}({columns})"})
+
+
+class Row:
+    """
+    Base de los modelos: la proyección es la lista de campos del dataclass
+
+    Los campos con embed() se piden como recurso embebido y quedan como dict.
+    """
+
+    __slots__ = ()
+    COLUMNS: ClassVar[str] = ""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.COLUMNS = ""
+
+    @classmethod
+    def columns(cls) -> str:
+        """Proyección para select(), calculada una vez por modelo"""
+        if not cls.COLUMNS:
+            cls.COLUMNS = ", ".join(f.metadata.get('select', f.name) for f in fields(cls))
+        return cls.COLUMNS
+
+    @classmethod
+    def from_row(cls, row: Dict):
+        return cls(**{f.name: row.get(f.name) for f in fields(cls)})
+
+    @classmethod
+    def from_rows(cls, rows: Optional[List[Dict]]) -> List:
+        return [cls.from_row(row) for row in rows or []]
+
+
+@dataclass(frozen=True, slots=True)
+class UserContact(Row):
+    user_id: int
+    nombre: Optional[str] = None
+    telefono: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class OrderSummary(Row):
+    """Pedido en listados del cliente (Mis Pedidos)"""
+    order_id: int
+    estado: str
+    total: float
+    fecha_orden: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class AdminOrder(Row):
+    """Pedido en el panel de admin del bot, con el cliente embebido"""
+    order_id: int
+    estado: str
+    total: float
+    created_at: Optional[str] = None
+    users: Optional[Dict] = embed("users", "nombre, telegram_id")
+
+    @property
+    def cliente(self) -> Dict:
+        return self.users or {}
+
+
+@dataclass(frozen=True, slots=True)
+class OrderItemLine(Row):
+    """Línea de un pedido para mostrar (nombre del producto embebido)"""
+    item_id: int
+    cantidad: int
+    precio_unitario: float
+    subtotal: float
+    products: Optional[Dict] = embed("products", "nombre")
+
+    @property
+    def nombre(self) -> str:
+        return (self.products or {}).get('nombre', 'N/A')
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogPrice(Row):
+    """Precio vigente y disponibilidad de un producto (re-precio del carrito)"""
+    product_id: int
+    nombre: str
+    precio: float
+    category_id: Optional[int] = None
+    activo: Optional[bool] = True
+    disponible: Optional[bool] = True
+
+    @property
+    def available(self) -> bool:
+        return self.activo is not False and self.disponible is not False
+
+
+# ============================================
+# SERVICIO
+# ============================================
+
+class DatabaseService:
+    """Maneja todas las operaciones con Supabase"""
+
+    def __init__(self, client: Client = None):
+        # Sin cliente explícito usa el global (config.database), creado al primer uso
+        self._client = client
+        self._catalog: Optional[CatalogCache] = None
+        logger.info("✅ DatabaseService inicializado")
+
+    @property
+    def client(self) -> Client:
+        if self._client is None:
+            from config.database import get_supabase
+            self._client = get_supabase()
+        return self._client
+
+    @property
+    def catalog(self) -> CatalogCache:
+        """Catálogo en memoria (se recarga cuando cambia catalog_version y se guarda en disco)"""
+        if self._catalog is None:
+            self._catalog = CatalogCache(
+                lambda: self.client,
+                snapshot_path=os.getenv("CATALOG_SNAPSHOT_PATH", DEFAULT_SNAPSHOT_PATH)
+            )
+        return self._catalog
+
+    # === LECTURAS TIPADAS ===
+    # No atrapan errores: el handler decide qué mostrarle al usuario
+
+    def get_user_id(self, telegram_id: int) -> Optional[int]:
+        """user_id del usuario de Telegram o None si no está registrado"""
+        rows = self.client.table("users")\
+            .select("user_id")\
+            .eq("telegram_id", telegram_id)\
+            .limit(1)\
+            .execute().data
+        return rows[0]['user_id'] if rows else None
+
+    def get_user_contact(self, telegram_id: int) -> Optional[UserContact]:
+        """Nombre y teléfono para precargar formularios"""
+        rows = self.client.table("users")\
+            .select(UserContact.columns())\
+            .eq("telegram_id", telegram_id)\
+            .limit(1)\
+            .execute().data
+        return UserContact.from_row(rows[0]) if rows else None
+
+    def get_recent_orders(self, user_id: int, limit: int = 10) -> List[OrderSummary]:
+        """Últimos pedidos del cliente, del más reciente al más antiguo"""
+        rows = self.client.table("orders")\
+            .select(OrderSummary.columns())\
+            .eq("user_id", user_id)\
+            .order("fecha_orden", desc=True)\
+            .limit(limit)\
+            .execute().data
+        return OrderSummary.from_rows(rows)
+
+    def list_admin_orders(self, estado: str = None, limit: int = 10) -> List[AdminOrder]:
+        """Últimos pedidos para el panel de admin, opcionalmente por estado"""
+        query = self.client.table("orders").select(AdminOrder.columns())
+        if estado:
+            query = query.eq("estado", estado)
+        rows = query.order("created_at", desc=True).limit(limit).execute().data
+        return AdminOrder.from_rows(rows)
+
+    def get_admin_order(self, order_id: int) -> Optional[AdminOrder]:
+        rows = self.client.table("orders")\
+            .select(AdminOrder.columns())\
+            .eq("order_id", order_id)\
+            .limit(1)\
+            .execute().data
+        return AdminOrder.from_row(rows[0]) if rows else None
+
+    def get_order_lines(self, order_id: int) -> List[OrderItemLine]:
+        rows = self.client.table("order_items")\
+            .select(OrderItemLine.columns())\
+            .eq("order_id", order_id)\
+            .order("item_id")\
+            .execute().data
+        return OrderItemLine.from_rows(rows)
+
+    def get_catalog_prices(self, product_ids: List[int]) -> Dict[int, CatalogPrice]:
+        """Precio y disponibilidad actuales de varios productos en una consulta"""
+        if not product_ids:
+            return {}
+        rows = fetch_all(
+            self.client, "products", key="product_id", columns=CatalogPrice.columns(),
+            filters=lambda q: q.in_("product_id", list(product_ids))
+        )
+        return {row['product_id']: CatalogPrice.from_row(row) for row in rows}
+
+    # === USUARIOS ===
+
+    def get_user(self, telegram_id: int, columns: str = "*") -> Optional[Dict]:
+        """Obtiene usuario por telegram_id"""
+        try:
+            response = self.client.table("users").select(columns).eq("telegram_id", telegram_id).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            logger.error(f"Error obteniendo usuario: {e}")
+            return None
+
+    def create_user(self, telegram_id: int, nombre: str, telefono: str = None, direccion: str = None) -> Dict:
+        """Crea nuevo usuario"""
+        try:
+            data = {
+                "telegram_id": telegram_id,
+                "nombre": nombre,
+                "telefono": telefono,
+                "direccion": direccion
+            }
+            response = self.client.table("users").insert(data).execute()
+            logger.info(f"✅ Usuario creado: {nombre}")
+            return response.data[0]
+        except Exception as e:
+            logger.error(f"Error creando usuario: {e}")
+            return None
+
+    def update_user(self, user_id: int, **kwargs) -> bool:
+        """Actualiza datos del usuario"""
+        try:
+            self.client.table("users").update(kwargs).eq("user_id", user_id).execute()
+            logger.info(f"✅ Usuario {user_id} actualizado")
+            return True
+        except Exception as e:
+            logger.error(f"Error actualizando usuario: {e}")
+            return False
+
+    # === ÓRDENES ===
+
+    def create_order(self, user_id: int, productos: List[Dict], total: float, notas: str = None) -> Dict:
+        """Crea nueva orden"""
+        try:
+            data = {
+                "user_id": user_id,
+                "productos": productos,
+                "total": total,
+                "notas": notas
+            }
+            response = self.client.table("orders").insert(data).execute()
+            logger.info(f"✅ Orden creada para user_id {user_id}")
+            return response.data[0]
+        except Exception as e:
+            logger.error(f"Error creando orden: {e}")
+            return None
+
+    def get_user_orders(self, user_id: int, limit: int = 5,
+                        columns: str = "order_id, productos, total, estado, fecha_orden") -> List[Dict]:
+        """Obtiene últimas órdenes del usuario"""
+        try:
+            response = (
+                self.client.table("orders")
+                .select(columns)
+                .eq("user_id", user_id)
+                .order("fecha_orden", desc=True)
+                .limit(limit)
+                .execute()
+            )
+            return response.data
+        except Exception as e:
+            logger.error(f"Error obteniendo órdenes: {e}")
+            return []
+
+    # === PREFERENCIAS ===
+
+    def get_preferences(self, user_id: int) -> Optional[Dict]:
+        """Obtiene preferencias del usuario"""
+        try:
+            response = self.client.table("preferences").select("*").eq("user_id", user_id).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            logger.error(f"Error obteniendo preferencias: {e}")
+            return None
+
+    def update_preferences(self, user_id: int, **kwargs) -> bool:
+        """Actualiza preferencias del usuario"""
+        try:
+            # Intentar actualizar primero
+            result = self.client.table("preferences").update(kwargs).eq("user_id", user_id).execute()
+
+            # Si no existe, crear
+            if not result.data:
+                kwargs["user_id"] = user_id
+                self.client.table("preferences").insert(kwargs).execute()
+
+            logger.info(f"✅ Preferencias actualizadas para user_id {user_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error actualizando preferencias: {e}")
+            return False
+
+    # === PRODUCTOS ===
+
+    def get_all_products(self) -> List[Dict]:
+        """Obtiene todos los productos activos y disponibles (catálogo en memoria)"""
+        try:
+            return self.catalog.snapshot().available_products()
+        except Exception as e:
+            logger.error(f"Error obteniendo productos: {e}")
+            return []
+
+    def get_categories(self) -> List[Dict]:
+        """Categorías activas en orden de display_order"""
+        try:
+            return self.catalog.snapshot().categories
+        except Exception as e:
+            logger.error(f"Error obteniendo categorías: {e}")
+            return []
+
+    def get_products_by_category(self, category_id: int) -> List[Dict]:
+        """Productos activos de una categoría"""
+        try:
+            return self.catalog.snapshot().products_in(category_id)
+        except Exception as e:
+            logger.error(f"Error obteniendo productos de la categoría {category_id}: {e}")
+            return []
+
+    def get_product_by_id(self, product_id: int) -> Optional[Dict]:
+        """Detalle de un producto (None si no existe o no hay catálogo)"""
+        try:
+            return self.catalog.snapshot().product(product_id)
+        except Exception as e:
+            logger.error(f"Error obteniendo producto {product_id}: {e}")
+            return None
+
+    def get_category(self, category_id: int) -> Optional[Dict]:
+        """Categoría por ID (None si no existe o no hay catálogo)"""
+        try:
+            return self.catalog.snapshot().category(category_id)
+        except Exception as e:
+            logger.error(f"Error obteniendo categoría {category_id}: {e}")
+            return None
@@ -0,0 +1,238 @@
+"""
+Pool de conexiones SMTP persistentes y transporte asíncrono de emails
+"""
+
+import asyncio
+import logging
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.message import Message
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledConnection:
+    """Conexión SMTP autenticada junto con su último uso"""
+
+    __slots__ = ("server", "last_used")
+
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """
+    Mantiene un número acotado de sesiones SMTP ya autenticadas.
+
+    Cada sesión hace STARTTLS y login una sola vez; después se reutiliza
+    para todos los mensajes. Las conexiones inactivas más de ``keepalive``
+    segundos se validan con NOOP antes de usarse y se reabren si el
+    servidor las cerró.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        size: int = 2,
+        timeout: float = 30,
+        keepalive: float = 60,
+        use_tls: bool = True
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.keepalive = keepalive
+        self.use_tls = use_tls
+
+        self._idle: "queue.LifoQueue[_PooledConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._closed = False
+
+        # Contadores simples para diagnóstico
+        self.connects = 0
+        self.reconnects = 0
+        self.sent = 0
+
+    # === CONEXIONES ===
+
+    def _connect(self) -> _PooledConnection:
+        """Abre una sesión nueva: conexión, STARTTLS y login"""
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.use_tls:
+                server.starttls(context=ssl.create_default_context())
+                server.ehlo()
+            if self.user and self.password:
+                server.login(self.user, self.password)
+        except Exception:
+            self._close_quietly(server)
+            raise
+
+        self.connects += 1
+        logger.info(f"📡 Sesión SMTP abierta con {self.host}:{self.port}")
+        return _PooledConnection(server)
+
+    @staticmethod
+    def _close_quietly(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _is_alive(self, conn: _PooledConnection) -> bool:
+        """Valida con NOOP las conexiones que llevan tiempo inactivas"""
+        if time.monotonic() - conn.last_used < self.keepalive:
+            return True
+        try:
+            code, _ = conn.server.noop()
+            return code == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _checkout(self) -> _PooledConnection:
+        if self._closed:
+            raise RuntimeError("SMTPConnectionPool cerrado")
+
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+
+                if self._is_alive(conn):
+                    return conn
+
+                self._close_quietly(conn.server)
+                self.reconnects += 1
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _checkin(self, conn: Optional[_PooledConnection]):
+        try:
+            if conn is None:
+                return
+            if self._closed:
+                self._close_quietly(conn.server)
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    # === ENVÍO ===
+
+    def send_messages(self, messages: Iterable[Message]) -> List[bool]:
+        """
+        Envía varios mensajes sobre una misma sesión SMTP
+
+        Args:
+            messages: Mensajes MIME ya construidos
+
+        Returns:
+            List[bool]: Resultado de cada mensaje, en el mismo orden
+        """
+        messages = list(messages)
+        results: List[bool] = []
+        if not messages:
+            return results
+
+        conn = self._checkout()
+        try:
+            for msg in messages:
+                try:
+                    conn.server.send_message(msg)
+                    results.append(True)
+                except (smtplib.SMTPServerDisconnected, OSError):
+                    # El servidor cerró la sesión: reconectar una vez y reintentar
+                    self._close_quietly(conn.server)
+                    conn = None
+                    self.reconnects += 1
+                    conn = self._connect()
+                    conn.server.send_message(msg)
+                    results.append(True)
+                except smtplib.SMTPException as e:
+                    logger.error(f"❌ Mensaje rechazado por SMTP: {e}")
+                    results.append(False)
+                    try:
+                        conn.server.rset()
+                    except (smtplib.SMTPException, OSError):
+                        pass
+        except BaseException:
+            if conn is not None:
+                self._close_quietly(conn.server)
+                conn = None
+            raise
+        finally:
+            self._checkin(conn)
+
+        self.sent += sum(results)
+        return results
+
+    def close(self):
+        """Cierra todas las sesiones inactivas y rechaza nuevos envíos"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close_quietly(conn.server)
+
+
+class AsyncMailTransport:
+    """
+    Transporte de emails que no bloquea el event loop.
+
+    El trabajo SMTP (bloqueante) se ejecuta en un pool de hilos del mismo
+    tamaño que el pool de conexiones, de modo que cada hilo usa su propia
+    sesión persistente.
+    """
+
+    def __init__(self, pool: SMTPConnectionPool):
+        self.pool = pool
+        self._executor = ThreadPoolExecutor(
+            max_workers=pool.size,
+            thread_name_prefix="smtp"
+        )
+
+    async def send(self, message: Message) -> bool:
+        """Envía un mensaje sin bloquear el event loop"""
+        results = await self.send_bulk([message])
+        return results[0]
+
+    async def send_bulk(self, messages: Iterable[Message]) -> List[bool]:
+        """Envía varios mensajes en una sola sesión SMTP"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            self.pool.send_messages,
+            list(messages)
+        )
+
+    def send_sync(self, message: Message) -> bool:
+        """Versión bloqueante para código síncrono (scripts, Streamlit)"""
+        return self.pool.send_messages([message])[0]
+
+    def close(self):
+        """Libera hilos y sesiones SMTP"""
+        self._executor.shutdown(wait=False)
+        self.pool.close()
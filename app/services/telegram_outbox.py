@@ -0,0 +1,266 @@
+"""
+Cola global de mensajes salientes de Telegram con límites de tasa
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+from app.utils.metrics import metrics
+from app.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class OutboundMessage:
+    """Mensaje en cola; ``enqueued_at`` y ``callbacks`` se conservan aunque se reemplace el texto"""
+
+    __slots__ = ("key", "chat_id", "text", "kwargs", "enqueued_at", "attempts", "not_before", "callbacks")
+
+    def __init__(self, key: Hashable, chat_id: int, text: str, kwargs: Dict):
+        self.key = key
+        self.chat_id = chat_id
+        self.text = text
+        self.kwargs = kwargs
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+        self.not_before = 0.0
+        self.callbacks: List[Callable[[bool], None]] = []
+
+
+class TelegramOutbox:
+    """
+    Envía mensajes respetando los límites de Telegram.
+
+    - Global: ``global_rate`` mensajes por segundo (Telegram permite ~30).
+    - Por chat: como máximo un mensaje cada ``per_chat_interval`` segundos.
+    - Mensajes con la misma ``key`` que aún no salieron se fusionan: solo
+      se envía el último texto (p. ej. varios cambios seguidos de estado
+      del mismo pedido).
+    - ``RetryAfter`` pausa toda la cola el tiempo que indique Telegram y el
+      mensaje se reintenta; errores de red se reintentan con backoff.
+    - ``on_done`` se llama cuando el mensaje sale de la cola para siempre:
+      con True si Telegram lo aceptó, con False si se descartó. Un mensaje
+      que sigue en cola al detenerla no lo llama.
+    """
+
+    def __init__(
+        self,
+        bot,
+        global_rate: float = 25,
+        per_chat_interval: float = 1.0,
+        max_attempts: int = 5,
+        retry_backoff: float = 2.0
+    ):
+        self.bot = bot
+        self.per_chat_interval = per_chat_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+
+        self.bucket = TokenBucket(global_rate)
+        self._pending: "OrderedDict[Hashable, OutboundMessage]" = OrderedDict()
+        self._chat_ready_at: Dict[int, float] = {}
+        self._paused_until = 0.0
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._ids = itertools.count()
+
+        self._depth = metrics.gauge("telegram_outbox_depth", "Mensajes en cola")
+        self._latency = metrics.histogram(
+            "telegram_outbox_send_latency_seconds",
+            "Tiempo desde que se encola un mensaje hasta que Telegram lo acepta"
+        )
+        self._sent = metrics.counter("telegram_outbox_sent_total", "Mensajes enviados")
+        self._failed = metrics.counter("telegram_outbox_failed_total", "Mensajes descartados")
+        self._coalesced = metrics.counter("telegram_outbox_coalesced_total", "Mensajes fusionados")
+        self._retries = metrics.counter("telegram_outbox_retries_total", "Reintentos")
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    # === CICLO DE VIDA ===
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info("📤 Cola de mensajes de Telegram iniciada")
+
+    async def stop(self, drain_timeout: float = 5):
+        """Intenta vaciar la cola y detiene el worker"""
+        if self._task is None:
+            return
+
+        deadline = time.monotonic() + drain_timeout
+        while self._pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        if self._pending:
+            logger.warning(f"⚠️ {len(self._pending)} mensajes sin enviar al detener la cola")
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    # === ENCOLAR ===
+
+    def enqueue(
+        self,
+        chat_id: int,
+        text: str,
+        key: Optional[Hashable] = None,
+        on_done: Optional[Callable[[bool], None]] = None,
+        **kwargs
+    ) -> bool:
+        """
+        Agrega un mensaje a la cola
+
+        Args:
+            chat_id: Chat destino
+            text: Texto del mensaje
+            key: Clave de fusión; si ya hay un mensaje pendiente con la misma
+                clave se reemplaza su contenido
+            on_done: Se llama con True al entregarse o False al descartarse;
+                al fusionar, los de ambos mensajes se llaman con el último
+            **kwargs: Argumentos extra para bot.send_message (parse_mode, etc.)
+
+        Returns:
+            bool: True si se fusionó con un mensaje pendiente
+        """
+        if key is None:
+            key = ("msg", next(self._ids))
+
+        current = self._pending.get(key)
+        if current is not None:
+            current.chat_id = chat_id
+            current.text = text
+            current.kwargs = kwargs
+            if on_done is not None:
+                current.callbacks.append(on_done)
+            self._coalesced.inc()
+            return True
+
+        msg = OutboundMessage(key, chat_id, text, kwargs)
+        if on_done is not None:
+            msg.callbacks.append(on_done)
+        self._pending[key] = msg
+        self._depth.set(len(self._pending))
+        self._wake.set()
+        return False
+
+    # === WORKER ===
+
+    def _next_ready(self, now: float):
+        """
+        Primer mensaje que ya puede salir
+
+        Returns:
+            Tuple[Optional[OutboundMessage], float]: (mensaje, segundos hasta
+            el próximo candidato si no hay ninguno listo)
+        """
+        wait = None
+        for msg in self._pending.values():
+            ready_at = max(msg.not_before, self._chat_ready_at.get(msg.chat_id, 0.0))
+            if ready_at <= now:
+                return msg, 0.0
+            delay = ready_at - now
+            wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+
+            msg, wait = self._next_ready(now)
+            if msg is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self.bucket.acquire()
+            await self._deliver(msg)
+
+    async def _deliver(self, msg: OutboundMessage):
+        # Se saca de la cola antes de enviar: un cambio nuevo con la misma
+        # clave durante el envío entra como mensaje aparte
+        self._pending.pop(msg.key, None)
+        msg.attempts += 1
+
+        try:
+            await self.bot.send_message(chat_id=msg.chat_id, text=msg.text, **msg.kwargs)
+
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            if hasattr(retry_after, "total_seconds"):
+                retry_after = retry_after.total_seconds()
+            logger.warning(f"⏳ Telegram pidió esperar {retry_after}s")
+            self._paused_until = time.monotonic() + float(retry_after)
+            self.bucket.pause(float(retry_after))  # el límite es por bot: frena también campañas
+            self._retries.inc()
+            self._requeue(msg, front=True)
+
+        except (Forbidden, BadRequest) as e:
+            # Usuario bloqueó el bot o chat inválido: no tiene sentido reintentar
+            logger.warning(f"⚠️ Mensaje a {msg.chat_id} descartado: {e}")
+            self._failed.inc()
+            self._finish(msg, False)
+
+        except NetworkError as e:
+            if msg.attempts >= self.max_attempts:
+                logger.error(f"❌ Mensaje a {msg.chat_id} descartado tras {msg.attempts} intentos: {e}")
+                self._failed.inc()
+                self._finish(msg, False)
+            else:
+                msg.not_before = time.monotonic() + self.retry_backoff ** msg.attempts
+                self._retries.inc()
+                self._requeue(msg)
+
+        except Exception as e:
+            logger.error(f"❌ Error enviando mensaje a {msg.chat_id}: {e}")
+            import traceback
+            traceback.print_exc()
+            self._failed.inc()
+            self._finish(msg, False)
+
+        else:
+            now = time.monotonic()
+            if len(self._chat_ready_at) > 10000:
+                self._chat_ready_at = {c: t for c, t in self._chat_ready_at.items() if t > now}
+            self._chat_ready_at[msg.chat_id] = now + self.per_chat_interval
+            self._latency.observe(now - msg.enqueued_at)
+            self._sent.inc()
+            self._finish(msg, True)
+
+        finally:
+            self._depth.set(len(self._pending))
+
+    def _finish(self, msg: OutboundMessage, delivered: bool):
+        for callback in msg.callbacks:
+            try:
+                callback(delivered)
+            except Exception as e:
+                logger.error(f"❌ Error en on_done del mensaje a {msg.chat_id}: {e}")
+
+    def _requeue(self, msg: OutboundMessage, front: bool = False):
+        newer = self._pending.get(msg.key)
+        if newer is not None:
+            # Llegó una versión más nueva mientras se enviaba: gana la nueva
+            newer.callbacks[:0] = msg.callbacks
+            return
+        self._pending[msg.key] = msg
+        if front:
+            self._pending.move_to_end(msg.key, last=False)
@@ -0,0 +1,161 @@
+"""
+Router de callback_data por trie de prefijos.
+
+Con un CallbackQueryHandler por botón, PTB prueba los regex en orden para
+cada toque hasta encontrar uno que coincida. El router registra todas las
+rutas en un solo handler: el callback_data se parte una vez por "_" y se
+baja por un trie de palabras; gana la ruta literal más larga y las
+palabras que sobran son los argumentos, que se convierten a su tipo antes
+de llamar al handler. El costo depende del largo del callback_data, no de
+cuántas rutas haya.
+
+Los formatos existentes no cambian (los botones viejos en el historial del
+chat siguen funcionando):
+
+    router = CallbackRouter()
+    router.add("menu_volver", show_main_menu)
+    router.add("cat", show_products_by_category, int)
+    router.add("smart_add", smart_add_to_cart, int, int)
+    application.add_handler(router.handler())
+
+    # cat_7          → show_products_by_category, context.args == [7]
+    # smart_add_12_6 → smart_add_to_cart,         context.args == [12, 6]
+
+Tipos de argumento: int, float, str, bool ("1"/"0"), date y time (ISO), o
+cualquier función str → valor. Si un argumento no se puede convertir, la
+ruta no coincide y el toque sigue a los demás handlers.
+"""
+
+import logging
+from datetime import date, time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import BaseHandler
+
+logger = logging.getLogger(__name__)
+
+SEPARATOR = "_"
+
+DECODERS: Dict[Any, Callable[[str], Any]] = {
+    int: int,
+    float: float,
+    str: str,
+    bool: lambda value: {"1": True, "0": False}[value],
+    date: date.fromisoformat,
+    time: time.fromisoformat,
+}
+
+
+class Route(NamedTuple):
+    path: str
+    callback: Callable
+    decoders: Tuple[Callable[[str], Any], ...]
+
+    @property
+    def namespace(self) -> str:
+        return self.path.split(SEPARATOR, 1)[0]
+
+    @property
+    def action(self) -> str:
+        parts = self.path.split(SEPARATOR, 1)
+        return parts[1] if len(parts) > 1 else ''
+
+
+class CallbackMatch(NamedTuple):
+    route: Route
+    args: List[Any]
+
+
+class _Node:
+    __slots__ = ('children', 'route')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        self.route: Optional[Route] = None
+
+
+class CallbackRouter:
+    """Rutas de callback_data → handler, con argumentos tipados"""
+
+    def __init__(self):
+        self._root = _Node()
+        self.routes: Dict[str, Route] = {}
+
+    def add(self, path: str, callback: Callable, *arg_types) -> Route:
+        """
+        Registra una ruta
+
+        Args:
+            path: Prefijo literal del callback_data ("admin_order_detail")
+            callback: Handler async (update, context)
+            *arg_types: Tipo o decodificador de cada argumento que sigue al prefijo
+
+        Raises:
+            ValueError: Si la ruta ya estaba registrada
+        """
+        if path in self.routes:
+            raise ValueError(f"Ruta de callback duplicada: {path}")
+        route = Route(path, callback, tuple(DECODERS.get(t, t) for t in arg_types))
+
+        node = self._root
+        for word in path.split(SEPARATOR):
+            node = node.children.setdefault(word, _Node())
+        node.route = route
+        self.routes[path] = route
+        return route
+
+    def resolve(self, data: str) -> Optional[CallbackMatch]:
+        """Ruta y argumentos ya convertidos para un callback_data (None si no hay ruta)"""
+        words = data.split(SEPARATOR)
+        node = self._root
+        best, consumed = None, 0
+        for i, word in enumerate(words):
+            node = node.children.get(word)
+            if node is None:
+                break
+            if node.route is not None:
+                best, consumed = node.route, i + 1
+        if best is None:
+            return None
+
+        raw = words[consumed:]
+        if len(raw) != len(best.decoders):
+            return None
+        try:
+            args = [decode(value) for decode, value in zip(best.decoders, raw)]
+        except (ValueError, KeyError):
+            logger.warning(f"⚠️ Argumentos inválidos en callback '{data}' para {best.path}")
+            return None
+        return CallbackMatch(best, args)
+
+    def handler(self, block: bool = True) -> 'CallbackRouterHandler':
+        """Handler de PTB que atiende todas las rutas del router"""
+        return CallbackRouterHandler(self, block=block)
+
+
+class CallbackRouterHandler(BaseHandler[Update, Any]):
+    """Un solo handler de PTB para todas las rutas; deja los argumentos en context.args"""
+
+    __slots__ = ('router',)
+
+    def __init__(self, router: CallbackRouter, block: bool = True):
+        super().__init__(self._unrouted, block=block)
+        self.router = router
+
+    @staticmethod
+    async def _unrouted(update: Update, context):
+        # No se llama: handle_update despacha a la ruta encontrada
+        return None
+
+    def check_update(self, update: object) -> Optional[CallbackMatch]:
+        if not isinstance(update, Update) or update.callback_query is None:
+            return None
+        data = update.callback_query.data
+        if not isinstance(data, str):
+            return None
+        return self.router.resolve(data)
+
+    async def handle_update(self, update: Update, application, check_result: CallbackMatch, context):
+        context.args = check_result.args
+        return await check_result.route.callback(update, context)
@@ -0,0 +1,88 @@
+"""
+Carga por lotes al estilo DataLoader.
+
+Evita el patrón N+1 (una consulta por fila dentro de un bucle): las claves
+se registran primero con prime() y la primera llamada a load() que no
+encuentra su clave en caché trae todas las pendientes en una sola consulta
+(o en trozos de ``max_batch_size``). El caché vive lo que vive el loader,
+así que se crea uno por página o por petición.
+"""
+
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable, Iterable, List
+
+
+def group_rows(rows: Iterable[Dict], key: str) -> Dict[Any, List[Dict]]:
+    """Agrupa filas por el valor de una columna"""
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[row.get(key)].append(row)
+    return dict(grouped)
+
+
+class BatchLoader:
+    """
+    Carga valores por clave en lotes.
+
+    ``batch_fn`` recibe una lista de claves sin repetir y retorna un dict
+    clave -> valor; las claves que no vengan en el dict toman ``default``.
+
+    Ejemplo:
+        loader = BatchLoader(lambda ids: fetch_items(ids), default=[])
+        loader.prime(order['order_id'] for order in orders)
+        for order in orders:
+            items = loader.load(order['order_id'])   # una consulta en total
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Hashable]], Dict], max_batch_size: int = 200, default: Any = None):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.default = default
+        self.batches = 0
+        self._cache: Dict[Hashable, Any] = {}
+        self._pending: Dict[Hashable, None] = {}
+
+    def prime(self, keys: Iterable[Hashable]) -> "BatchLoader":
+        """Registra claves para cargarlas juntas en el próximo load()"""
+        for key in keys:
+            if key not in self._cache:
+                self._pending[key] = None
+        return self
+
+    def dispatch(self):
+        """Carga ya todas las claves pendientes"""
+        keys = list(self._pending)
+        self._pending.clear()
+
+        for start in range(0, len(keys), self.max_batch_size):
+            chunk = keys[start:start + self.max_batch_size]
+            values = self.batch_fn(chunk) or {}
+            self.batches += 1
+            for key in chunk:
+                self._cache[key] = values.get(key, self._copy_default())
+
+    def _copy_default(self):
+        # Un [] o {} compartido entre claves se terminaría modificando por todas
+        return type(self.default)() if isinstance(self.default, (list, dict)) else self.default
+
+    def load(self, key: Hashable) -> Any:
+        """Valor de una clave; si no está en caché se carga junto con las pendientes"""
+        if key not in self._cache:
+            self._pending[key] = None
+            self.dispatch()
+        return self._cache[key]
+
+    def load_many(self, keys: Iterable[Hashable]) -> List[Any]:
+        """Valores de varias claves con una sola ronda de consultas"""
+        keys = list(keys)
+        self.prime(keys)
+        if self._pending:
+            self.dispatch()
+        return [self._cache[key] for key in keys]
+
+    def clear(self, key: Hashable = None):
+        """Olvida una clave (o todo el caché) tras modificar los datos"""
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
@@ -0,0 +1,299 @@
+"""
+Gateway de las llamadas a Supabase: plazos, reintentos y circuit breaker.
+
+Toda petición de PostgREST pasa por GatewayTransport (ver
+http_clients.PooledSupabaseClient):
+
+- Plazo por operación: una lectura (GET/HEAD) tiene ``read_deadline``
+  segundos en total, contando reintentos; una escritura (POST, PATCH,
+  DELETE, RPC) tiene ``write_deadline``. Cada intento recibe lo que queda
+  del plazo como timeouts de httpx, y el cuerpo se lee en el transporte
+  revisando el reloj tras cada trozo. Una espera ya empezada puede durar
+  hasta lo que quedaba al inicio del intento, así que en el peor caso (un
+  servidor que manda bytes de a poco) la operación dura menos del doble
+  del plazo. Con la base degradada, un toque en el bot falla en segundos
+  en vez de esperar el timeout HTTP completo.
+- Reintentos: solo las lecturas, que son idempotentes, se reintentan ante
+  errores de red, timeouts o respuestas 5xx, con backoff exponencial y
+  jitter completo. Una escritura nunca se repite: podría aplicarse dos veces.
+- Circuit breaker: tras ``failure_threshold`` fallos seguidos se abre y
+  las llamadas fallan al instante con DatabaseUnavailable. Pasados
+  ``reset_timeout`` segundos deja pasar una sola petición de prueba; si
+  responde, se cierra.
+
+Las lecturas que tienen copia en memoria (catálogo, puntos de recogida,
+KB) la siguen sirviendo mientras el breaker está abierto; las escrituras
+se rechazan y el handler muestra DatabaseUnavailable.USER_MESSAGE.
+
+Métricas (ver /metrics):
+- supabase_circuit_state: 0 cerrado, 1 semiabierto, 2 abierto
+- supabase_circuit_trips_total: veces que se abrió
+- supabase_rejected_total: llamadas rechazadas sin tocar la red
+- supabase_retries_total: reintentos de lecturas
+- supabase_failures_total: llamadas fallidas (red, plazo o 5xx)
+
+Configuración (.env, opcional):
+    DB_READ_DEADLINE=5
+    DB_WRITE_DEADLINE=10
+    DB_READ_RETRIES=2
+    DB_BREAKER_THRESHOLD=5
+    DB_BREAKER_RESET=30
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable
+
+import httpx
+
+from app.utils.metrics import MetricsRegistry, metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Códigos de PostgREST para una función RPC que no existe (falta su migración)
+MISSING_FUNCTION_CODES = frozenset({"PGRST202", "404"})
+
+# Código de Postgres para una columna que no existe (falta su migración)
+MISSING_COLUMN_CODE = "42703"
+
+
+def supabase_client():
+    """
+    Cliente compartido de config.database, importado al pedirlo
+
+    config.database exige credenciales al importarse; los servicios que lo
+    piden a través de esta función se pueden importar y probar sin ellas.
+    """
+    from config.database import get_supabase
+    return get_supabase()
+
+
+class DatabaseUnavailable(ConnectionError):
+    """La base no responde y el circuit breaker está abierto"""
+
+    USER_MESSAGE = (
+        "⚠️ Estamos teniendo problemas con nuestro sistema y no podemos guardar cambios en este momento.\n\n"
+        "Tu carrito sigue guardado; intenta de nuevo en unos minutos."
+    )
+
+
+class CircuitBreaker:
+    """
+    Breaker de fallos consecutivos con estados cerrado/abierto/semiabierto
+
+    Es seguro entre hilos: las consultas síncronas se hacen desde el loop
+    del bot y desde hilos de asyncio.to_thread.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+    STATE_NAMES = {CLOSED: "cerrado", HALF_OPEN: "semiabierto", OPEN: "abierto"}
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        registry: MetricsRegistry = None
+    ):
+        """
+        Args:
+            name: Prefijo de las métricas
+            failure_threshold: Fallos seguidos que abren el circuito
+            reset_timeout: Segundos abierto antes de probar de nuevo
+            clock: Reloj monotónico (inyectable en tests)
+            registry: Registro de métricas
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+        registry = registry or default_metrics
+        self._state_gauge = registry.gauge(f"{name}_circuit_state", "Estado del circuito (0 cerrado, 1 semiabierto, 2 abierto)")
+        self._trips = registry.counter(f"{name}_circuit_trips_total", "Veces que se abrió el circuito")
+        self._rejected = registry.counter(f"{name}_rejected_total", "Llamadas rechazadas con el circuito abierto")
+        self._state_gauge.set(self.CLOSED)
+
+    def _set_state(self, state: int):
+        if state != self.state:
+            logger.warning(f"🔌 Circuito {self.name}: {self.STATE_NAMES[self.state]} → {self.STATE_NAMES[state]}")
+        self.state = state
+        self._state_gauge.set(state)
+
+    def allow(self) -> bool:
+        """True si la llamada puede ir a la red (con el circuito semiabierto, solo una a la vez)"""
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.CLOSED or (self.state == self.HALF_OPEN and not self._probing):
+                self._probing = self.state == self.HALF_OPEN
+                return True
+            self._rejected.inc()
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self._trips.inc()
+                self._opened_at = self.clock()
+                self._set_state(self.OPEN)
+
+    def release(self):
+        """Libera la prueba del semiabierto sin juzgar a la base (error ajeno a la red)"""
+        with self._lock:
+            self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN
+
+
+class GatewayTransport(httpx.BaseTransport):
+    """Transporte httpx que aplica plazos, reintentos y breaker sobre otro transporte"""
+
+    def __init__(
+        self,
+        transport: httpx.BaseTransport,
+        breaker: CircuitBreaker,
+        read_deadline: float = 5.0,
+        write_deadline: float = 10.0,
+        read_retries: int = 2,
+        backoff: float = 0.1,
+        rng: Callable[[], float] = random.random,
+        sleep: Callable[[float], None] = time.sleep,
+        registry: MetricsRegistry = None
+    ):
+        """
+        Args:
+            transport: Transporte real (el pool compartido)
+            breaker: Circuit breaker de la base
+            read_deadline: Segundos totales de una lectura, con reintentos
+            write_deadline: Segundos de una escritura (sin reintentos)
+            read_retries: Reintentos máximos de una lectura
+            backoff: Espera base entre reintentos (se duplica en cada uno)
+            rng: Fuente de azar para el jitter (0 <= x < 1)
+            sleep: Función de espera (inyectable en tests)
+            registry: Registro de métricas
+        """
+        self._transport = transport
+        self.breaker = breaker
+        self.read_deadline = read_deadline
+        self.write_deadline = write_deadline
+        self.read_retries = read_retries
+        self.backoff = backoff
+        self.rng = rng
+        self.sleep = sleep
+
+        registry = registry or default_metrics
+        self._retries = registry.counter(f"{breaker.name}_retries_total", "Reintentos de lecturas")
+        self._failures = registry.counter(f"{breaker.name}_failures_total", "Llamadas fallidas (red, plazo o 5xx)")
+
+    @classmethod
+    def from_env(cls, transport: httpx.BaseTransport, registry: MetricsRegistry = None) -> 'GatewayTransport':
+        breaker = CircuitBreaker(
+            "supabase",
+            failure_threshold=int(os.getenv("DB_BREAKER_THRESHOLD", 5)),
+            reset_timeout=float(os.getenv("DB_BREAKER_RESET", 30)),
+            registry=registry
+        )
+        return cls(
+            transport, breaker,
+            read_deadline=float(os.getenv("DB_READ_DEADLINE", 5)),
+            write_deadline=float(os.getenv("DB_WRITE_DEADLINE", 10)),
+            read_retries=int(os.getenv("DB_READ_RETRIES", 2)),
+            registry=registry
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.breaker.allow():
+            raise DatabaseUnavailable(f"Supabase no disponible (circuito abierto): {request.method} {request.url.path}")
+
+        idempotent = request.method in IDEMPOTENT_METHODS
+        deadline = time.monotonic() + (self.read_deadline if idempotent else self.write_deadline)
+        attempts = 1 + (self.read_retries if idempotent else 0)
+        connect = (request.extensions.get("timeout") or {}).get("connect")
+
+        for attempt in range(attempts):
+            remaining = deadline - time.monotonic()
+            # El plazo es de la operación completa: cada intento usa lo que queda
+            request.extensions["timeout"] = {
+                "connect": min(connect, remaining) if connect else remaining,
+                "read": remaining, "write": remaining, "pool": remaining,
+            }
+            try:
+                response = self._read_within(self._transport.handle_request(request), deadline, request)
+            except httpx.TransportError as e:
+                error = e
+            except BaseException:
+                self.breaker.release()
+                raise
+            else:
+                if response.status_code < 500:
+                    self.breaker.record_success()
+                    return response
+                if attempt == attempts - 1:
+                    # El llamador ve el 5xx como siempre (APIError de postgrest)
+                    self._fail(f"HTTP {response.status_code}")
+                    return response
+                response.close()
+                error = None
+
+            pause = self.backoff * (2 ** attempt) * self.rng()
+            if attempt == attempts - 1 or time.monotonic() + pause >= deadline:
+                break
+            self._retries.inc()
+            self.sleep(pause)
+
+        self._fail(error)
+        if error is None:
+            raise httpx.ReadTimeout(f"Plazo agotado para {request.method} {request.url.path}", request=request)
+        raise error
+
+    @staticmethod
+    def _read_within(response: httpx.Response, deadline: float, request: httpx.Request) -> httpx.Response:
+        """
+        Lee el cuerpo dentro del transporte y revisa el plazo tras cada trozo
+
+        Los timeouts de httpx son por lectura: un servidor que manda bytes de
+        a poco nunca los dispara. Así el intento se corta con el primer trozo
+        que llega pasado el plazo.
+        """
+        chunks = []
+        try:
+            for chunk in response.stream:
+                chunks.append(chunk)
+                if time.monotonic() > deadline:
+                    raise httpx.ReadTimeout(f"Plazo agotado leyendo {request.method} {request.url.path}", request=request)
+        finally:
+            response.close()
+        return httpx.Response(response.status_code, headers=response.headers, content=b"".join(chunks),
+                              extensions=response.extensions)
+
+    def _fail(self, reason):
+        self._failures.inc()
+        self.breaker.record_failure()
+        logger.warning(f"⚠️ Llamada a Supabase fallida ({self.breaker.failures} seguidas): {reason}")
+
+    def close(self):
+        self._transport.close()
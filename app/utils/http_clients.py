@@ -0,0 +1,294 @@
+"""
+Registro de clientes HTTP del proceso (Supabase y OpenAI).
+
+Todos los clientes comparten un mismo pool de conexiones httpx con HTTP/2,
+keep-alive y timeouts ajustados, así que una consulta a Supabase o una
+llamada a OpenAI reutiliza la conexión TLS abierta en vez de negociar una
+nueva. Las consultas a Supabase pasan además por el gateway de
+app/utils/db_gateway.py (plazos, reintentos y circuit breaker). Los clientes se crean la primera vez que se piden y el pool se cierra
+una sola vez al apagar el bot (``await clients.aclose()``).
+
+Métricas (ver /metrics):
+- http_requests_total: peticiones enviadas por el pool
+- http_connections_opened_total: conexiones TCP nuevas
+- http_tls_handshakes_total: negociaciones TLS
+- http_connections_reused_total: peticiones servidas por una conexión ya abierta
+
+Configuración (.env, opcional):
+    HTTP_MAX_CONNECTIONS=20
+    HTTP_MAX_KEEPALIVE=10
+    HTTP_KEEPALIVE_EXPIRY=60
+    HTTP_TIMEOUT=30
+    HTTP_CONNECT_TIMEOUT=5
+    OPENAI_TIMEOUT=60
+"""
+
+import logging
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient as PostgrestSession
+from supabase import Client as SupabaseClient, ClientOptions
+
+from app.utils.db_gateway import GatewayTransport
+from app.utils.metrics import MetricsRegistry, metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(_env_float("HTTP_MAX_CONNECTIONS", 20)),
+        max_keepalive_connections=int(_env_float("HTTP_MAX_KEEPALIVE", 10)),
+        keepalive_expiry=_env_float("HTTP_KEEPALIVE_EXPIRY", 60),
+    )
+
+
+def default_timeout() -> httpx.Timeout:
+    return httpx.Timeout(_env_float("HTTP_TIMEOUT", 30), connect=_env_float("HTTP_CONNECT_TIMEOUT", 5))
+
+
+# ============================================
+# TRANSPORTE COMPARTIDO
+# ============================================
+
+class _PoolStats:
+    """Cuenta conexiones y handshakes a partir de los eventos de trace de httpcore"""
+
+    def __init__(self, registry: MetricsRegistry):
+        self.requests = registry.counter("http_requests_total", "Peticiones HTTP enviadas por el pool compartido")
+        self.opened = registry.counter("http_connections_opened_total", "Conexiones TCP abiertas por el pool compartido")
+        self.tls = registry.counter("http_tls_handshakes_total", "Negociaciones TLS del pool compartido")
+        self.reused = registry.counter("http_connections_reused_total", "Peticiones servidas por una conexión reutilizada")
+        self.connections = registry.gauge("http_pool_connections", "Conexiones abiertas en el pool compartido")
+
+    def trace(self, previous, state: Dict):
+        """Callback de trace para una petición; marca si abrió conexión"""
+        def callback(event: str, info: Dict):
+            if event == "connection.connect_tcp.complete":
+                state['connected'] = True
+                self.opened.inc()
+            elif event == "connection.start_tls.complete":
+                self.tls.inc()
+            if previous:
+                previous(event, info)
+        return callback
+
+    def async_trace(self, previous, state: Dict):
+        sync_callback = self.trace(None, state)
+
+        async def callback(event: str, info: Dict):
+            sync_callback(event, info)
+            if previous:
+                await previous(event, info)
+        return callback
+
+    def finished(self, state: Dict, pool):
+        self.requests.inc()
+        if not state.get('connected'):
+            self.reused.inc()
+        connections = getattr(pool, 'connections', None)
+        if connections is not None:
+            self.connections.set(len(connections))
+
+
+class SharedTransport(httpx.BaseTransport):
+    """
+    Transporte httpx compartido entre varios clientes
+
+    close() de cada cliente no cierra el pool; solo shutdown() lo hace.
+    """
+
+    def __init__(self, stats: _PoolStats, limits: httpx.Limits = None):
+        self._transport = httpx.HTTPTransport(http2=True, limits=limits or pool_limits(), retries=1)
+        self._stats = stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        state: Dict = {}
+        request.extensions["trace"] = self._stats.trace(request.extensions.get("trace"), state)
+        response = self._transport.handle_request(request)
+        self._stats.finished(state, getattr(self._transport, '_pool', None))
+        return response
+
+    def close(self):
+        pass
+
+    def shutdown(self):
+        self._transport.close()
+
+
+class SharedAsyncTransport(httpx.AsyncBaseTransport):
+    """Versión async de SharedTransport (AsyncOpenAI)"""
+
+    def __init__(self, stats: _PoolStats, limits: httpx.Limits = None):
+        self._transport = httpx.AsyncHTTPTransport(http2=True, limits=limits or pool_limits(), retries=1)
+        self._stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        state: Dict = {}
+        request.extensions["trace"] = self._stats.async_trace(request.extensions.get("trace"), state)
+        response = await self._transport.handle_async_request(request)
+        self._stats.finished(state, getattr(self._transport, '_pool', None))
+        return response
+
+    async def aclose(self):
+        pass
+
+    async def shutdown(self):
+        await self._transport.aclose()
+
+
+# ============================================
+# CLIENTES SOBRE EL POOL
+# ============================================
+
+class PooledPostgrestClient(SyncPostgrestClient):
+    """PostgREST cuya sesión httpx va sobre el transporte compartido"""
+
+    def __init__(self, *args, transport: httpx.BaseTransport, **kwargs):
+        self._shared_transport = transport
+        super().__init__(*args, **kwargs)
+
+    def create_session(self, base_url, headers, timeout, verify=True):
+        return PostgrestSession(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            follow_redirects=True,
+            transport=self._shared_transport,
+        )
+
+
+class PooledSupabaseClient(SupabaseClient):
+    """Cliente de Supabase que crea PostgREST sobre el pool compartido"""
+
+    def __init__(self, url: str, key: str, transport: httpx.BaseTransport, options: ClientOptions = None):
+        self._shared_transport = transport
+        super().__init__(url, key, options)
+
+    def _init_postgrest_client(self, rest_url, headers, schema, timeout=None):
+        return PooledPostgrestClient(
+            rest_url, headers=headers, schema=schema,
+            timeout=timeout or default_timeout(), transport=self._shared_transport
+        )
+
+
+# ============================================
+# REGISTRO
+# ============================================
+
+class ClientRegistry:
+    """Crea bajo demanda los clientes del proceso sobre el pool compartido"""
+
+    def __init__(self, metrics_registry: MetricsRegistry = None, limits: httpx.Limits = None):
+        self._metrics = metrics_registry or default_metrics
+        self._stats = _PoolStats(self._metrics)
+        self._limits = limits
+        self._transport: Optional[SharedTransport] = None
+        self._db_gateway: Optional[GatewayTransport] = None
+        self._async_transport: Optional[SharedAsyncTransport] = None
+        self._supabase: Dict[Tuple[str, str], PooledSupabaseClient] = {}
+        self._openai: Optional[OpenAI] = None
+        self._async_openai: Optional[AsyncOpenAI] = None
+        self._lock = threading.RLock()
+
+    # === POOL ===
+
+    def transport(self) -> SharedTransport:
+        with self._lock:
+            if self._transport is None:
+                self._transport = SharedTransport(self._stats, self._limits)
+            return self._transport
+
+    def async_transport(self) -> SharedAsyncTransport:
+        with self._lock:
+            if self._async_transport is None:
+                self._async_transport = SharedAsyncTransport(self._stats, self._limits)
+            return self._async_transport
+
+    def db_gateway(self) -> GatewayTransport:
+        """Transporte de Supabase: el pool compartido detrás del gateway (un breaker por proceso)"""
+        with self._lock:
+            if self._db_gateway is None:
+                self._db_gateway = GatewayTransport.from_env(self.transport(), self._metrics)
+            return self._db_gateway
+
+    def http_client(self, **kwargs) -> httpx.Client:
+        """Cliente httpx sobre el pool compartido (base_url, headers, ... por cliente)"""
+        kwargs.setdefault("timeout", default_timeout())
+        return httpx.Client(transport=self.transport(), **kwargs)
+
+    def async_http_client(self, **kwargs) -> httpx.AsyncClient:
+        kwargs.setdefault("timeout", default_timeout())
+        return httpx.AsyncClient(transport=self.async_transport(), **kwargs)
+
+    # === CLIENTES ===
+
+    def supabase(self, url: str, key: str) -> PooledSupabaseClient:
+        """Cliente de Supabase cuyo PostgREST usa el pool compartido (uno por url/key)"""
+        with self._lock:
+            client = self._supabase.get((url, key))
+            if client is None:
+                client = self._supabase[(url, key)] = PooledSupabaseClient(
+                    url, key, self.db_gateway(),
+                    options=ClientOptions(postgrest_client_timeout=default_timeout())
+                )
+                logger.info("✅ Cliente de Supabase creado sobre el pool HTTP compartido")
+            return client
+
+    def openai(self) -> OpenAI:
+        """Cliente OpenAI síncrono (AIService)"""
+        with self._lock:
+            if self._openai is None:
+                self._openai = OpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    timeout=_env_float("OPENAI_TIMEOUT", 60),
+                    http_client=self.http_client()
+                )
+            return self._openai
+
+    def async_openai(self) -> AsyncOpenAI:
+        """Cliente OpenAI async (rutas de Telegram)"""
+        with self._lock:
+            if self._async_openai is None:
+                self._async_openai = AsyncOpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    timeout=_env_float("OPENAI_TIMEOUT", 60),
+                    http_client=self.async_http_client()
+                )
+            return self._async_openai
+
+    # === APAGADO ===
+
+    def close(self):
+        """Cierra el pool síncrono; los clientes se recrean si se vuelven a pedir"""
+        with self._lock:
+            transport, self._transport = self._transport, None
+            self._db_gateway = None
+            self._supabase.clear()
+            self._openai = None
+        if transport is not None:
+            transport.shutdown()
+            logger.info("🔌 Pool HTTP compartido cerrado")
+
+    async def aclose(self):
+        """Cierra ambos pools (llamar en on_shutdown)"""
+        with self._lock:
+            transport, self._async_transport = self._async_transport, None
+            self._async_openai = None
+        if transport is not None:
+            await transport.shutdown()
+        self.close()
+
+
+# Registro global del proceso
+clients = ClientRegistry()
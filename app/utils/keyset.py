@@ -0,0 +1,82 @@
+"""
+Lectura completa de tablas por keyset.
+
+PostgREST corta cada respuesta en max-rows (1000 por defecto en Supabase)
+sin avisar: un ``select("*").execute()`` sobre una tabla más grande devuelve
+solo las primeras filas. Estas funciones recorren la tabla por páginas
+ordenadas por una columna única (``WHERE key > último ORDER BY key LIMIT n``),
+así que cada página cuesta lo mismo sin importar cuántas van.
+
+Uso:
+    for rows in iter_pages(supabase, "orders", key="order_id",
+                           columns="order_id, total",
+                           filters=lambda q: q.eq("estado", "delivered")):
+        ...
+
+    products = fetch_all(supabase, "products", key="product_id")
+"""
+
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Tamaño de página por defecto; no debe superar max-rows del servidor
+PAGE_SIZE = 1000
+
+
+def _with_key(columns: str, key: str) -> str:
+    """Asegura que la columna del cursor venga en la proyección"""
+    names = [c.strip() for c in columns.split(',')]
+    if '*' in names or key in names:
+        return columns
+    return f"{key}, {columns}"
+
+
+def iter_pages(
+    supabase,
+    table: str,
+    key: str = "id",
+    columns: str = "*",
+    page_size: int = PAGE_SIZE,
+    filters: Optional[Callable] = None,
+    desc: bool = False,
+    after=None
+) -> Iterator[List[Dict]]:
+    """
+    Recorre una tabla (o un filtro sobre ella) página por página
+
+    Args:
+        supabase: Cliente de Supabase
+        table: Tabla o vista
+        key: Columna única y ordenable que hace de cursor (normalmente la PK)
+        columns: Proyección; se agrega key si no está
+        page_size: Filas por consulta
+        filters: Función que recibe el query y le agrega filtros (eq, in_, ...)
+        desc: Recorrer de mayor a menor
+        after: Empezar después de este valor de key (reanudar)
+
+    Yields:
+        List[Dict]: Cada página no vacía, en orden de key
+    """
+    columns = _with_key(columns, key)
+    last = after
+
+    while True:
+        query = supabase.table(table).select(columns)
+        if filters:
+            query = filters(query)
+        if last is not None:
+            query = query.lt(key, last) if desc else query.gt(key, last)
+
+        rows = query.order(key, desc=desc).limit(page_size).execute().data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        last = rows[-1][key]
+
+
+def fetch_all(supabase, table: str, key: str = "id", **kwargs) -> List[Dict]:
+    """Todas las filas de iter_pages en una lista"""
+    rows: List[Dict] = []
+    for page in iter_pages(supabase, table, key, **kwargs):
+        rows.extend(page)
+    return rows
@@ -0,0 +1,171 @@
+"""
+Servidor SMTP local en memoria para tests y benchmarks.
+
+Implementa solo lo que usa smtplib (EHLO/HELO, AUTH, MAIL, RCPT, DATA,
+RSET, NOOP, QUIT) y guarda los mensajes recibidos en memoria. Corre en un
+hilo propio con su event loop, así que sirve tanto para código síncrono
+como asíncrono.
+"""
+
+import asyncio
+import email
+import threading
+from email.message import Message
+from typing import List, Optional
+
+
+class LocalSMTPServer:
+    """Stand-in de SMTP: acepta todo y cuenta conexiones y mensajes"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        """
+        Args:
+            host: Interfaz donde escuchar
+            port: Puerto (0 = uno libre)
+            latency: Retardo artificial por respuesta, en segundos, para
+                simular la latencia de red de un servidor real
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+
+        self.messages: List[Message] = []
+        self.connections = 0
+        self.logins = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self._writers = set()
+        self._ready = threading.Event()
+
+    # === CICLO DE VIDA ===
+
+    def start(self) -> "LocalSMTPServer":
+        self._thread = threading.Thread(target=self._run, name="local-smtp", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=5)
+        return self
+
+    def stop(self):
+        if not self._loop:
+            return
+        self._loop.call_soon_threadsafe(self._shutdown)
+        self._thread.join(timeout=5)
+        self._loop = None
+
+    def disconnect_all(self):
+        """Cierra todas las sesiones abiertas (simula timeouts del servidor)"""
+        if self._loop:
+            future = asyncio.run_coroutine_threadsafe(self._close_writers(), self._loop)
+            future.result(timeout=5)
+
+    def __enter__(self) -> "LocalSMTPServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    def _shutdown(self):
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        self._loop.stop()
+
+    async def _close_writers(self):
+        for writer in list(self._writers):
+            writer.close()
+        self._writers.clear()
+
+    # === PROTOCOLO ===
+
+    async def _reply(self, writer: asyncio.StreamWriter, line: str):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        writer.write(line.encode() + b"\r\n")
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._writers.add(writer)
+        mail_from = None
+        rcpt_to: List[str] = []
+
+        try:
+            await self._reply(writer, "220 localhost ESMTP listo")
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                line = raw.decode("utf-8", "replace").rstrip("\r\n")
+                verb = line.split(" ", 1)[0].upper()
+
+                if verb == "EHLO":
+                    writer.write(b"250-localhost\r\n250-8BITMIME\r\n")
+                    await self._reply(writer, "250 AUTH PLAIN LOGIN")
+                elif verb == "HELO":
+                    await self._reply(writer, "250 localhost")
+                elif verb == "AUTH":
+                    parts = line.split()
+                    if len(parts) > 1 and parts[1].upper() == "LOGIN":
+                        # Usuario y contraseña llegan en dos líneas aparte
+                        if len(parts) < 3:
+                            await self._reply(writer, "334 VXNlcm5hbWU6")
+                            await reader.readline()
+                        await self._reply(writer, "334 UGFzc3dvcmQ6")
+                        await reader.readline()
+                    self.logins += 1
+                    await self._reply(writer, "235 2.7.0 Autenticado")
+                elif verb == "MAIL":
+                    mail_from = line[10:].strip()
+                    rcpt_to = []
+                    await self._reply(writer, "250 OK")
+                elif verb == "RCPT":
+                    rcpt_to.append(line[8:].strip())
+                    await self._reply(writer, "250 OK")
+                elif verb == "DATA":
+                    await self._reply(writer, "354 Terminar con <CRLF>.<CRLF>")
+                    data = await self._read_data(reader)
+                    msg = email.message_from_bytes(data)
+                    msg["X-Envelope-From"] = mail_from or ""
+                    msg["X-Envelope-To"] = ", ".join(rcpt_to)
+                    self.messages.append(msg)
+                    await self._reply(writer, "250 OK en cola")
+                elif verb == "RSET":
+                    mail_from, rcpt_to = None, []
+                    await self._reply(writer, "250 OK")
+                elif verb == "NOOP":
+                    await self._reply(writer, "250 OK")
+                elif verb == "QUIT":
+                    await self._reply(writer, "221 Adiós")
+                    break
+                else:
+                    await self._reply(writer, "502 Comando no implementado")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    @staticmethod
+    async def _read_data(reader: asyncio.StreamReader) -> bytes:
+        lines = []
+        while True:
+            raw = await reader.readline()
+            if not raw or raw in (b".\r\n", b".\n"):
+                break
+            if raw.startswith(b".."):
+                raw = raw[1:]
+            lines.append(raw)
+        return b"".join(lines)
@@ -0,0 +1,155 @@
+"""
+Ejecución concurrente de lecturas independientes.
+
+El cliente de Supabase es síncrono: cada consulta bloquea hasta que llega
+la respuesta. Cuando una página necesita varias lecturas que no dependen
+entre sí, QueryBatch las lanza a la vez en un pool de hilos y espera como
+máximo ``timeout`` segundos en total. Lo que no termine a tiempo o falle
+se reporta aparte y la página sigue con lo que sí llegó.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Suficiente para un dashboard completo; el cuello de botella es la red
+MAX_WORKERS = 16
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Pool compartido; se crea la primera vez que se usa"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="query-batch")
+        return _executor
+
+
+class BatchResult:
+    """
+    Resultado de un lote: valores, errores y tiempos por consulta.
+
+    ``results`` tiene una entrada por consulta; las que fallaron o no
+    terminaron a tiempo quedan con su valor ``default``.
+    """
+
+    def __init__(self):
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, BaseException] = {}
+        self.timed_out: list = []
+        self.timings: Dict[str, float] = {}
+        self.elapsed = 0.0
+
+    def __getitem__(self, name: str) -> Any:
+        return self.results[name]
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and not self.timed_out
+
+    @property
+    def failed(self) -> list:
+        """Nombres de las consultas sin resultado (error o timeout)"""
+        return list(self.errors) + self.timed_out
+
+
+class QueryBatch:
+    """
+    Agrupa consultas independientes y las ejecuta en paralelo.
+
+    Ejemplo:
+        batch = QueryBatch(timeout=5)
+        batch.add("pending", lambda: supabase.table("orders").select("order_id").eq("estado", "pending").execute().data, default=[])
+        batch.add("recent", fetch_recent, 5, default=[])
+        result = batch.run()
+        pending = result["pending"]
+    """
+
+    def __init__(self, timeout: float = 5.0):
+        self.timeout = timeout
+        self._queries: Dict[str, tuple] = {}
+
+    def add(self, name: str, fn: Callable, *args, default: Any = None, **kwargs) -> "QueryBatch":
+        """Registra una consulta; ``default`` se usa si falla o se vence el plazo"""
+        if name in self._queries:
+            raise ValueError(f"Consulta duplicada en el lote: {name}")
+        self._queries[name] = (fn, args, kwargs, default)
+        return self
+
+    def __len__(self):
+        return len(self._queries)
+
+    def _timed(self, name: str, fn: Callable, args, kwargs, timings: Dict[str, float]):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            timings[name] = time.perf_counter() - start
+
+    def run(self) -> BatchResult:
+        """Ejecuta todas las consultas y espera como máximo ``timeout`` segundos"""
+        result = BatchResult()
+        start = time.perf_counter()
+        executor = _get_executor()
+
+        futures = {
+            executor.submit(self._timed, name, fn, args, kwargs, result.timings): name
+            for name, (fn, args, kwargs, _) in self._queries.items()
+        }
+        done, pending = wait(futures, timeout=self.timeout)
+
+        for future, name in futures.items():
+            default = self._queries[name][3]
+            if future in pending:
+                # El hilo sigue hasta que responda la red; su resultado se descarta
+                future.cancel()
+                result.timed_out.append(name)
+                result.results[name] = default
+                logger.warning(f"⏱️ Consulta '{name}' superó el plazo de {self.timeout}s")
+                continue
+
+            error = future.exception()
+            if error is not None:
+                result.errors[name] = error
+                result.results[name] = default
+                logger.error(f"❌ Consulta '{name}' falló: {error}")
+            else:
+                result.results[name] = future.result()
+
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def run_serial(self) -> BatchResult:
+        """Una consulta tras otra, sin plazo (para depurar y comparar tiempos)"""
+        result = BatchResult()
+        start = time.perf_counter()
+
+        for name, (fn, args, kwargs, default) in self._queries.items():
+            try:
+                result.results[name] = self._timed(name, fn, args, kwargs, result.timings)
+            except Exception as e:
+                result.errors[name] = e
+                result.results[name] = default
+
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    async def run_async(self) -> BatchResult:
+        """Igual que run() sin bloquear el event loop"""
+        return await asyncio.to_thread(self.run)
+
+
+def run_queries(queries: Dict[str, Callable], timeout: float = 5.0, default: Any = None) -> BatchResult:
+    """Atajo: ``{nombre: callable sin argumentos}`` con el mismo default para todas"""
+    batch = QueryBatch(timeout=timeout)
+    for name, fn in queries.items():
+        batch.add(name, fn, default=default)
+    return batch.run()
@@ -0,0 +1,52 @@
+"""
+Limitador de tasa tipo token bucket (asyncio)
+"""
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Permite ``rate`` operaciones por segundo con ráfagas de hasta ``capacity``.
+
+    Los tokens se recargan de forma continua según el tiempo transcurrido,
+    así que no hace falta ninguna tarea de fondo.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Consume tokens si hay disponibles, sin esperar"""
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    def delay(self, tokens: float = 1) -> float:
+        """Segundos que faltan para tener ``tokens`` disponibles"""
+        self._refill()
+        missing = tokens - self._tokens
+        return max(0.0, missing / self.rate)
+
+    async def acquire(self, tokens: float = 1):
+        """Espera hasta poder consumir ``tokens``"""
+        async with self._lock:
+            while not self.try_acquire(tokens):
+                await asyncio.sleep(self.delay(tokens))
+
+    def pause(self, seconds: float):
+        """Vacía el bucket para que nadie consuma durante ``seconds``"""
+        self._refill()
+        self._tokens = min(self._tokens, 0.0) - seconds * self.rate
@@ -0,0 +1,68 @@
+"""
+Motor de templates HTML (Jinja2) para emails.
+
+Los templates viven en app/templates y se compilan una sola vez al crear
+el motor; cada render posterior solo ejecuta el código ya compilado.
+"""
+
+import logging
+from pathlib import Path
+from typing import Dict
+
+from jinja2 import Environment, FileSystemLoader, Template, StrictUndefined
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+
+
+def format_money(value) -> str:
+    """Formatea pesos sin decimales: 15000 -> $15,000"""
+    return f"${value or 0:,.0f}"
+
+
+class TemplateEngine:
+    """Carga, compila y renderiza los templates con autoescape activado"""
+
+    def __init__(self, directory: Path = TEMPLATES_DIR):
+        self.env = Environment(
+            loader=FileSystemLoader(str(directory)),
+            autoescape=True,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            keep_trailing_newline=True,
+            auto_reload=False,  # no revisar el disco en cada render
+            cache_size=-1,
+            undefined=StrictUndefined
+        )
+        self.env.filters['money'] = format_money
+
+        self._compiled: Dict[str, Template] = {}
+        self.load_all()
+
+    def load_all(self) -> int:
+        """
+        Compila todos los templates del directorio
+
+        Returns:
+            int: Cantidad de templates compilados
+        """
+        for name in self.env.list_templates():
+            self._compiled[name] = self.env.get_template(name)
+
+        logger.info(f"🧩 {len(self._compiled)} templates compilados")
+        return len(self._compiled)
+
+    def get(self, name: str) -> Template:
+        template = self._compiled.get(name)
+        if template is None:
+            template = self._compiled[name] = self.env.get_template(name)
+        return template
+
+    def render(self, name: str, **context) -> str:
+        """Renderiza un template ya compilado"""
+        return self.get(name).render(**context)
+
+
+# Instancia compartida: compila los templates al importar el módulo
+templates = TemplateEngine()
@@ -4,6 +4,7 @@ Bot principal de Telegram para Milhojaldres
 
 import os
 import logging
+from datetime import date
 from dotenv import load_dotenv
 
 from telegram.ext import (
@@ -50,6 +51,9 @@ from app.handlers.products import (
     smart_add_to_cart,
 )
 
+# ===== Errores =====
+from app.handlers.errors import on_error
+
 # ===== Admin =====
 from app.handlers.admin import (
     admin_panel,
@@ -74,6 +78,7 @@ from app.handlers.preorders import (
     select_time,
     confirm_preorder,
     cancel_preorder,
+    release_preorder,
     SELECTING_TYPE,
     ENTERING_EMAIL,
     ENTERING_PHONE,
@@ -84,6 +89,33 @@ from app.handlers.preorders import (
     CONFIRMING_PREORDER,
 )
 
+# ===== Servicios =====
+from app.services.email_service import EmailService
+from app.services.order_notifier import start_order_notifications, stop_order_notifications
+from app.services.campaign_engine import start_campaigns, stop_campaigns
+from app.services.catalog import start_catalog_sync, stop_catalog_sync
+from app.utils.callback_router import CallbackRouter
+from app.utils.http_clients import clients
+from config.database import db, get_supabase
+
+
+async def on_startup(application: Application):
+    """Arranca servicios de fondo una vez inicializado el bot"""
+    supabase = get_supabase()
+    await start_order_notifications(application, supabase)
+    await start_campaigns(application, supabase)
+    await start_catalog_sync(application, db.catalog)
+
+
+async def on_shutdown(application: Application):
+    """Libera recursos compartidos al detener el bot"""
+    await stop_catalog_sync(db.catalog)
+    await stop_campaigns(application)
+    await stop_order_notifications(application)
+    await EmailService.close_digest()
+    EmailService.close_transport()
+    await clients.aclose()
+
 
 def main():
     token = os.getenv("TELEGRAM_BOT_TOKEN")
@@ -91,7 +123,13 @@ def main():
         logger.error("❌ TELEGRAM_BOT_TOKEN no encontrado en .env")
         return
 
-    application = Application.builder().token(token).build()
+    application = (
+        Application.builder()
+        .token(token)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
 
     # ============ COMANDOS ============
     application.add_handler(CommandHandler("start", start_command))
@@ -148,33 +186,40 @@ def main():
     )
     application.add_handler(preorder_conv_handler)
 
-    # ============ CALLBACKS: MENÚ ============
-    application.add_handler(CallbackQueryHandler(show_main_menu, pattern="^menu_volver$"))
-    application.add_handler(CallbackQueryHandler(show_order_menu, pattern="^menu_hacer_pedido$"))
-    application.add_handler(CallbackQueryHandler(show_my_orders, pattern="^menu_mis_pedidos$"))
-    application.add_handler(CallbackQueryHandler(show_info, pattern="^menu_informacion$"))
-    application.add_handler(CallbackQueryHandler(show_contact, pattern="^menu_contacto$"))
-
-    # Botón Chat IA (callback_data="chat_libre")
-    application.add_handler(CallbackQueryHandler(start_chat_libre, pattern="^chat_libre$"))
-
-    # ============ CALLBACKS: PRODUCTOS ============
-    application.add_handler(CallbackQueryHandler(show_products_by_category, pattern="^cat_"))
-    application.add_handler(CallbackQueryHandler(show_product_detail, pattern="^prod_"))
-    application.add_handler(CallbackQueryHandler(add_to_cart, pattern="^add_"))
-    application.add_handler(CallbackQueryHandler(smart_add_to_cart, pattern="^smart_add_"))
-
-    # ============ CALLBACKS: CARRITO ============
-    application.add_handler(CallbackQueryHandler(view_cart, pattern="^view_cart$"))
-    application.add_handler(CallbackQueryHandler(clear_cart, pattern="^clear_cart$"))
-    application.add_handler(CallbackQueryHandler(confirm_order, pattern="^confirm_order$"))
-
-    # ============ ADMIN ============
-    application.add_handler(CallbackQueryHandler(admin_panel, pattern="^admin_panel$"))
-    application.add_handler(CallbackQueryHandler(admin_view_orders, pattern="^admin_orders"))
-    application.add_handler(CallbackQueryHandler(admin_order_detail, pattern="^admin_order_detail_"))
-    application.add_handler(CallbackQueryHandler(admin_change_status, pattern="^admin_change_status_"))
-    application.add_handler(CallbackQueryHandler(admin_stats, pattern="^admin_stats$"))
+    # ============ CALLBACKS ============
+    # Un solo handler: el callback_data se resuelve por prefijo en un trie
+    router = CallbackRouter()
+
+    # Menú
+    router.add("menu_volver", show_main_menu)
+    router.add("menu_hacer_pedido", show_order_menu)
+    router.add("menu_mis_pedidos", show_my_orders)
+    router.add("menu_informacion", show_info)
+    router.add("menu_contacto", show_contact)
+    router.add("chat_libre", start_chat_libre)
+
+    # Productos
+    router.add("cat", show_products_by_category, int)
+    router.add("prod", show_product_detail, int)
+    router.add("add", add_to_cart, int)
+    router.add("smart_add", smart_add_to_cart, int, int)
+
+    # Carrito
+    router.add("view_cart", view_cart)
+    router.add("clear_cart", clear_cart)
+    router.add("confirm_order", confirm_order)
+
+    # Pre-órdenes confirmadas
+    router.add("preorder_release", release_preorder, int, date, int)
+
+    # Admin
+    router.add("admin_panel", admin_panel)
+    router.add("admin_orders", admin_view_orders, str)
+    router.add("admin_order_detail", admin_order_detail, int)
+    router.add("admin_change_status", admin_change_status, int, str)
+    router.add("admin_stats", admin_stats)
+
+    application.add_handler(router.handler())
 
     # ============ CHAT LIBRE (TEXTOS) ============
     # Importante: queda después de ConversationHandler para no romper flujos.
@@ -186,6 +231,7 @@ def main():
             logger.info(f"🔍 CALLBACK RECIBIDO: {update.callback_query.data}")
 
     application.add_handler(CallbackQueryHandler(log_update), group=-1)
+    application.add_error_handler(on_error)
 
     logger.info("🚀 Bot iniciado correctamente")
     logger.info("🔗 Esperando mensajes...")
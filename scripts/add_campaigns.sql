@@ -0,0 +1,47 @@
+-- ==============================================================================
+-- CAMPAÑAS (DIFUSIÓN DE PROMOCIONES A TODOS LOS USUARIOS)
+-- Ejecutar en el Editor SQL de Supabase.
+-- ==============================================================================
+
+-- 1. CAMPAÑAS
+-- status: queued -> running -> completed | paused | failed
+-- last_user_id es el checkpoint: todos los usuarios con user_id <= last_user_id
+-- ya fueron procesados, así que un reinicio continúa desde ahí.
+CREATE TABLE IF NOT EXISTS public.campaigns (
+    campaign_id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    name TEXT NOT NULL,
+    message TEXT NOT NULL,
+    parse_mode TEXT,                               -- NULL, 'Markdown' o 'HTML'
+    status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'paused', 'completed', 'failed')),
+    last_user_id BIGINT NOT NULL DEFAULT 0,
+    total_sent INT NOT NULL DEFAULT 0,
+    total_failed INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_campaigns_status ON public.campaigns(status);
+
+-- 2. ESTADO DE ENTREGA POR DESTINATARIO
+-- status: sent, failed, blocked (el usuario bloqueó el bot)
+CREATE TABLE IF NOT EXISTS public.campaign_deliveries (
+    campaign_id BIGINT REFERENCES public.campaigns(campaign_id) ON DELETE CASCADE,
+    user_id BIGINT REFERENCES public.users(user_id) ON DELETE CASCADE,
+    telegram_id BIGINT,
+    status TEXT NOT NULL CHECK (status IN ('sent', 'failed', 'blocked')),
+    error TEXT,
+    sent_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (campaign_id, user_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_campaign_deliveries_status
+    ON public.campaign_deliveries(campaign_id, status);
+
+-- 3. LEASE DEL PROCESO QUE ENVÍA
+-- Un bot toma la campaña con un UPDATE condicional (status igual al leído y
+-- lease_until nulo o vencido) y renueva lease_until en cada checkpoint. Con
+-- dos procesos vivos, por ejemplo durante un deploy, solo uno la envía.
+ALTER TABLE public.campaigns ADD COLUMN IF NOT EXISTS lease_owner TEXT;
+ALTER TABLE public.campaigns ADD COLUMN IF NOT EXISTS lease_until TIMESTAMP WITH TIME ZONE;
@@ -0,0 +1,34 @@
+-- ==============================================================================
+-- IMPORTACIÓN MASIVA DEL CATÁLOGO
+-- Ejecutar en el Editor SQL de Supabase.
+--
+-- scripts/import_products.py aplica el catálogo con upserts por lotes sobre
+-- la clave natural (nombre de categoría; nombre + categoría de producto) y
+-- al terminar sube la versión del catálogo para que los bots recarguen.
+-- ==============================================================================
+
+-- 1. COLUMNAS QUE USA LA IMPORTACIÓN
+ALTER TABLE public.product_categories ADD COLUMN IF NOT EXISTS display_order INT DEFAULT 0;
+ALTER TABLE public.product_categories ADD COLUMN IF NOT EXISTS is_active BOOLEAN DEFAULT TRUE;
+
+-- 2. CLAVES NATURALES (requeridas por upsert on_conflict)
+-- Si fallan por duplicados, unificar primero las filas repetidas
+CREATE UNIQUE INDEX IF NOT EXISTS ux_product_categories_name ON public.product_categories(name);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_products_nombre_category ON public.products(nombre, category_id);
+
+-- 3. VERSIÓN DEL CATÁLOGO (una sola fila)
+CREATE TABLE IF NOT EXISTS public.catalog_version (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+INSERT INTO public.catalog_version (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION public.bump_catalog_version()
+RETURNS BIGINT AS $$
+    UPDATE public.catalog_version
+       SET version = version + 1, updated_at = NOW()
+     WHERE id = 1
+    RETURNING version;
+$$ LANGUAGE sql;
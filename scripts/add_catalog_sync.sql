@@ -0,0 +1,39 @@
+-- ==============================================================================
+-- PROPAGACIÓN DE CAMBIOS DEL CATÁLOGO A LOS BOTS
+-- Ejecutar en el Editor SQL de Supabase, después de add_catalog_import.sql.
+--
+-- Cualquier cambio en productos, categorías o puntos de recogida (panel de
+-- admin, script de importación o SQL directo) sube catalog_version una vez
+-- por sentencia. Los bots consultan esa fila cada pocos segundos (una fila,
+-- costo constante) o la escuchan por Realtime, y solo recargan el catálogo
+-- cuando la versión cambió.
+-- ==============================================================================
+
+CREATE OR REPLACE FUNCTION public.catalog_version_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM public.bump_catalog_version();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_catalog_version_products ON public.products;
+CREATE TRIGGER trg_catalog_version_products
+    AFTER INSERT OR UPDATE OR DELETE ON public.products
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.catalog_version_trigger();
+
+DROP TRIGGER IF EXISTS trg_catalog_version_categories ON public.product_categories;
+CREATE TRIGGER trg_catalog_version_categories
+    AFTER INSERT OR UPDATE OR DELETE ON public.product_categories
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.catalog_version_trigger();
+
+DROP TRIGGER IF EXISTS trg_catalog_version_locations ON public.pickup_locations;
+CREATE TRIGGER trg_catalog_version_locations
+    AFTER INSERT OR UPDATE OR DELETE ON public.pickup_locations
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.catalog_version_trigger();
+
+-- Opcional: avisos por Realtime (CATALOG_REALTIME=1 en el bot)
+ALTER PUBLICATION supabase_realtime ADD TABLE public.catalog_version;
@@ -0,0 +1,111 @@
+-- ==============================================================================
+-- DIRECTORIO DE CLIENTES (búsqueda y agregados precalculados)
+-- Ejecutar en el Editor SQL de Supabase.
+--
+-- La página de clientes del panel pide una sola página (25 filas) a la
+-- vista customer_directory: búsqueda por nombre/teléfono con índice de
+-- trigramas y orden por keyset. Los agregados por cliente (pedidos, total
+-- comprado, último pedido) viven en customer_stats y los mantienen los
+-- triggers, así que ninguna consulta recorre orders.
+-- ==============================================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- 1. AGREGADOS POR CLIENTE (una fila por usuario)
+CREATE TABLE IF NOT EXISTS public.customer_stats (
+    user_id BIGINT PRIMARY KEY REFERENCES public.users(user_id) ON DELETE CASCADE,
+    order_count INT NOT NULL DEFAULT 0,
+    total_spent NUMERIC NOT NULL DEFAULT 0,
+    last_order_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Orden "Mayor valor" y "Más pedidos" por keyset
+CREATE INDEX IF NOT EXISTS idx_customer_stats_total ON public.customer_stats(total_spent DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_customer_stats_count ON public.customer_stats(order_count DESC, user_id DESC);
+
+-- Orden "Más recientes" por keyset
+CREATE INDEX IF NOT EXISTS idx_users_created_at ON public.users(created_at DESC, user_id DESC);
+
+-- Búsqueda ILIKE '%texto%' sobre nombre y teléfono
+CREATE INDEX IF NOT EXISTS idx_users_search_trgm ON public.users
+    USING GIN ((lower(COALESCE(nombre, '') || ' ' || COALESCE(telefono, ''))) gin_trgm_ops);
+
+-- Para recalcular last_order_at de un cliente
+CREATE INDEX IF NOT EXISTS idx_orders_user_fecha ON public.orders(user_id, fecha_orden DESC);
+
+-- 2. TRIGGERS
+CREATE OR REPLACE FUNCTION public.customer_stats_new_user()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.customer_stats (user_id) VALUES (NEW.user_id)
+    ON CONFLICT (user_id) DO NOTHING;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_customer_stats_new_user ON public.users;
+CREATE TRIGGER trg_customer_stats_new_user
+    AFTER INSERT ON public.users
+    FOR EACH ROW EXECUTE FUNCTION public.customer_stats_new_user();
+
+CREATE OR REPLACE FUNCTION public.customer_stats_apply(p_user_id BIGINT, p_count INT, p_total NUMERIC)
+RETURNS VOID AS $$
+BEGIN
+    IF p_user_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO public.customer_stats AS s (user_id, order_count, total_spent, last_order_at)
+    VALUES (p_user_id, GREATEST(p_count, 0), GREATEST(p_total, 0),
+            (SELECT MAX(fecha_orden) FROM public.orders WHERE user_id = p_user_id))
+    ON CONFLICT (user_id) DO UPDATE
+        SET order_count = s.order_count + p_count,
+            total_spent = s.total_spent + p_total,
+            last_order_at = EXCLUDED.last_order_at;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.customer_stats_on_order()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM public.customer_stats_apply(OLD.user_id, -1, -COALESCE(OLD.total, 0));
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM public.customer_stats_apply(NEW.user_id, 1, COALESCE(NEW.total, 0));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_customer_stats_on_order ON public.orders;
+CREATE TRIGGER trg_customer_stats_on_order
+    AFTER INSERT OR DELETE OR UPDATE OF user_id, total, fecha_orden ON public.orders
+    FOR EACH ROW EXECUTE FUNCTION public.customer_stats_on_order();
+
+-- 3. RECONSTRUCCIÓN COMPLETA (carga inicial o reparación)
+CREATE OR REPLACE FUNCTION public.refresh_customer_stats()
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM public.customer_stats;
+    INSERT INTO public.customer_stats (user_id, order_count, total_spent, last_order_at)
+    SELECT u.user_id, COUNT(o.order_id), COALESCE(SUM(o.total), 0), MAX(o.fecha_orden)
+    FROM public.users u
+    LEFT JOIN public.orders o ON o.user_id = u.user_id
+    GROUP BY u.user_id;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT public.refresh_customer_stats();
+
+-- 4. VISTA QUE CONSULTA EL PANEL
+-- search_text usa la misma expresión que idx_users_search_trgm
+CREATE OR REPLACE VIEW public.customer_directory AS
+SELECT
+    u.*,
+    s.order_count,
+    s.total_spent,
+    s.last_order_at,
+    lower(COALESCE(u.nombre, '') || ' ' || COALESCE(u.telefono, '')) AS search_text
+FROM public.users u
+JOIN public.customer_stats s ON s.user_id = u.user_id;
@@ -0,0 +1,36 @@
+-- ==============================================================================
+-- USOS DE DESCUENTOS AUTOMÁTICOS
+-- Ejecutar en el Editor SQL de Supabase (después de add_admin_tables.sql).
+--
+-- use_discount() suma un uso a la regla y guarda la fila de discount_usage
+-- en una sola transacción, solo si la regla no agotó max_uses: dos pedidos
+-- confirmados a la vez no pueden pasarse del límite.
+-- ==============================================================================
+
+-- Retorna los usos de la regla tras sumar este, o NULL si ya estaba agotada
+CREATE OR REPLACE FUNCTION public.use_discount(
+    p_discount_id BIGINT,
+    p_user_id BIGINT,
+    p_order_id BIGINT,
+    p_amount_saved NUMERIC
+)
+RETURNS INT AS $$
+DECLARE
+    v_uses INT;
+BEGIN
+    UPDATE public.discounts
+       SET current_uses = COALESCE(current_uses, 0) + 1, updated_at = NOW()
+     WHERE discount_id = p_discount_id
+       AND (max_uses IS NULL OR COALESCE(current_uses, 0) < max_uses)
+    RETURNING current_uses INTO v_uses;
+
+    IF v_uses IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO public.discount_usage (discount_id, user_id, order_id, amount_saved)
+    VALUES (p_discount_id, p_user_id, p_order_id, p_amount_saved);
+
+    RETURN v_uses;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,26 @@
+-- ==============================================================================
+-- SECUENCIAS DE NUMERACIÓN (cotizaciones, PDFs)
+-- Ejecutar en el Editor SQL de Supabase.
+--
+-- Cada proceso del bot pide bloques de números con lease_numbers() y los
+-- reparte en memoria: una consulta por bloque. Un número entregado nunca se
+-- vuelve a entregar, aunque el proceso se reinicie o haya varias réplicas;
+-- los números de un bloque que no se alcanzaron a usar quedan como huecos.
+-- ==============================================================================
+
+CREATE TABLE IF NOT EXISTS public.number_sequences (
+    name TEXT PRIMARY KEY,
+    next_value BIGINT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Reserva p_count números consecutivos y retorna el primero
+CREATE OR REPLACE FUNCTION public.lease_numbers(p_name TEXT, p_count INT)
+RETURNS BIGINT AS $$
+    INSERT INTO public.number_sequences AS s (name, next_value)
+    VALUES (p_name, 1 + p_count)
+    ON CONFLICT (name) DO UPDATE
+        SET next_value = s.next_value + p_count,
+            updated_at = NOW()
+    RETURNING next_value - p_count;
+$$ LANGUAGE sql;
@@ -0,0 +1,102 @@
+-- ==============================================================================
+-- ESTADÍSTICAS DE PEDIDOS PRECALCULADAS
+-- Ejecutar en el Editor SQL de Supabase.
+--
+-- Triggers sobre orders mantienen contadores por estado y por día, así el
+-- panel de admin lee un resumen en una sola consulta de costo constante en
+-- lugar de contar y sumar todo el historial cada vez.
+--
+-- Verificación contra los datos reales: python scripts/check_order_stats.py
+-- ==============================================================================
+
+-- 1. TOTALES POR ESTADO (una fila por estado)
+CREATE TABLE IF NOT EXISTS public.order_stats (
+    estado TEXT PRIMARY KEY,
+    order_count BIGINT NOT NULL DEFAULT 0,
+    revenue NUMERIC NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- 2. TOTALES POR DÍA Y ESTADO (día en hora de Bogotá)
+CREATE TABLE IF NOT EXISTS public.order_stats_daily (
+    day DATE NOT NULL,
+    estado TEXT NOT NULL,
+    order_count BIGINT NOT NULL DEFAULT 0,
+    revenue NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, estado)
+);
+
+-- 3. APLICAR UN DELTA A AMBAS TABLAS
+CREATE OR REPLACE FUNCTION public.order_stats_apply(
+    p_estado TEXT, p_fecha TIMESTAMP WITH TIME ZONE, p_count INT, p_revenue NUMERIC
+) RETURNS VOID AS $$
+BEGIN
+    p_estado := COALESCE(p_estado, 'pending');
+
+    INSERT INTO public.order_stats AS s (estado, order_count, revenue, updated_at)
+    VALUES (p_estado, p_count, p_revenue, NOW())
+    ON CONFLICT (estado) DO UPDATE
+        SET order_count = s.order_count + EXCLUDED.order_count,
+            revenue = s.revenue + EXCLUDED.revenue,
+            updated_at = NOW();
+
+    INSERT INTO public.order_stats_daily AS d (day, estado, order_count, revenue)
+    VALUES ((p_fecha AT TIME ZONE 'America/Bogota')::DATE, p_estado, p_count, p_revenue)
+    ON CONFLICT (day, estado) DO UPDATE
+        SET order_count = d.order_count + EXCLUDED.order_count,
+            revenue = d.revenue + EXCLUDED.revenue;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.order_stats_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM public.order_stats_apply(OLD.estado, OLD.fecha_orden, -1, -COALESCE(OLD.total, 0));
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM public.order_stats_apply(NEW.estado, NEW.fecha_orden, 1, COALESCE(NEW.total, 0));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_order_stats ON public.orders;
+CREATE TRIGGER trg_order_stats
+    AFTER INSERT OR DELETE OR UPDATE OF estado, total, fecha_orden ON public.orders
+    FOR EACH ROW
+    EXECUTE FUNCTION public.order_stats_trigger();
+
+-- 4. RECONSTRUIR DESDE CERO (carga inicial o corrección de diferencias)
+CREATE OR REPLACE FUNCTION public.refresh_order_stats()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE public.orders IN SHARE MODE;
+    DELETE FROM public.order_stats;
+    DELETE FROM public.order_stats_daily;
+
+    INSERT INTO public.order_stats (estado, order_count, revenue)
+    SELECT COALESCE(estado, 'pending'), COUNT(*), COALESCE(SUM(total), 0)
+    FROM public.orders
+    GROUP BY 1;
+
+    INSERT INTO public.order_stats_daily (day, estado, order_count, revenue)
+    SELECT (fecha_orden AT TIME ZONE 'America/Bogota')::DATE, COALESCE(estado, 'pending'), COUNT(*), COALESCE(SUM(total), 0)
+    FROM public.orders
+    GROUP BY 1, 2;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT public.refresh_order_stats();
+
+-- 5. RESUMEN EN UNA FILA (lo que lee el bot)
+CREATE OR REPLACE VIEW public.order_stats_summary AS
+SELECT
+    COALESCE((SELECT SUM(order_count) FROM public.order_stats), 0) AS total_orders,
+    COALESCE((SELECT SUM(revenue) FROM public.order_stats), 0) AS total_revenue,
+    COALESCE((SELECT jsonb_object_agg(estado, jsonb_build_object('count', order_count, 'revenue', revenue))
+              FROM public.order_stats), '{}'::jsonb) AS by_state,
+    COALESCE((SELECT SUM(order_count) FROM public.order_stats_daily
+              WHERE day = (NOW() AT TIME ZONE 'America/Bogota')::DATE), 0) AS today_orders,
+    COALESCE((SELECT SUM(revenue) FROM public.order_stats_daily
+              WHERE day = (NOW() AT TIME ZONE 'America/Bogota')::DATE), 0) AS today_revenue;
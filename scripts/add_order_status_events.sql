@@ -0,0 +1,42 @@
+-- ==============================================================================
+-- EVENTOS DE CAMBIO DE ESTADO DE PEDIDOS
+-- Ejecutar en el Editor SQL de Supabase.
+--
+-- Cada cambio de orders.estado (desde el bot, el panel Streamlit o SQL)
+-- deja una fila en order_status_events. El bot lee las filas pendientes y
+-- notifica al cliente por Telegram.
+-- ==============================================================================
+
+CREATE TABLE IF NOT EXISTS public.order_status_events (
+    event_id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    order_id BIGINT REFERENCES public.orders(order_id) ON DELETE CASCADE,
+    user_id BIGINT REFERENCES public.users(user_id) ON DELETE SET NULL,
+    telegram_id BIGINT,                            -- Chat destino, copiado de users
+    old_estado TEXT,
+    new_estado TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    processed_at TIMESTAMP WITH TIME ZONE          -- NULL = pendiente de notificar
+);
+
+-- Solo se consultan los pendientes, en orden de llegada
+CREATE INDEX IF NOT EXISTS idx_order_status_events_pending
+    ON public.order_status_events(event_id)
+    WHERE processed_at IS NULL;
+
+CREATE OR REPLACE FUNCTION public.log_order_status_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.order_status_events (order_id, user_id, telegram_id, old_estado, new_estado)
+    SELECT NEW.order_id, NEW.user_id, u.telegram_id, OLD.estado, NEW.estado
+    FROM (SELECT 1) AS dummy
+    LEFT JOIN public.users u ON u.user_id = NEW.user_id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_order_status_events ON public.orders;
+CREATE TRIGGER trg_order_status_events
+    AFTER UPDATE OF estado ON public.orders
+    FOR EACH ROW
+    WHEN (OLD.estado IS DISTINCT FROM NEW.estado)
+    EXECUTE FUNCTION public.log_order_status_change();
@@ -0,0 +1,75 @@
+-- ==============================================================================
+-- PUNTOS DE RECOGIDA Y CUPOS POR HORA
+-- Ejecutar en el Editor SQL de Supabase.
+--
+-- Cada punto tiene una capacidad de pre-órdenes por franja de una hora.
+-- pickup_slot_counts lleva cuántas hay reservadas por (punto, día, hora) y
+-- reserve_pickup_slot() suma una solo si queda cupo, en una sola sentencia:
+-- confirmaciones simultáneas nunca pasan de la capacidad.
+-- ==============================================================================
+
+-- 1. PUNTOS DE RECOGIDA
+CREATE TABLE IF NOT EXISTS public.pickup_locations (
+    location_id SERIAL PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    direccion TEXT,
+    barrio TEXT,
+    activo BOOLEAN DEFAULT TRUE,
+    orden_display INT DEFAULT 0
+);
+
+-- Pre-órdenes por franja y horario de atención (la última franja empieza
+-- a las hora_cierre - 1)
+ALTER TABLE public.pickup_locations ADD COLUMN IF NOT EXISTS capacidad_por_hora INT NOT NULL DEFAULT 5;
+ALTER TABLE public.pickup_locations ADD COLUMN IF NOT EXISTS hora_apertura SMALLINT NOT NULL DEFAULT 8;
+ALTER TABLE public.pickup_locations ADD COLUMN IF NOT EXISTS hora_cierre SMALLINT NOT NULL DEFAULT 19;
+
+-- 2. RESERVAS POR FRANJA
+CREATE TABLE IF NOT EXISTS public.pickup_slot_counts (
+    location_id INT NOT NULL REFERENCES public.pickup_locations(location_id) ON DELETE CASCADE,
+    fecha DATE NOT NULL,
+    hora SMALLINT NOT NULL CHECK (hora BETWEEN 0 AND 23),
+    reservados INT NOT NULL DEFAULT 0 CHECK (reservados >= 0),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (location_id, fecha, hora)
+);
+
+-- 3. RESERVAR UN CUPO (retorna las reservas de la franja, o NULL si está llena)
+CREATE OR REPLACE FUNCTION public.reserve_pickup_slot(p_location_id INT, p_fecha DATE, p_hora INT)
+RETURNS INT AS $$
+DECLARE
+    v_capacidad INT;
+    v_reservados INT;
+BEGIN
+    SELECT capacidad_por_hora INTO v_capacidad
+    FROM public.pickup_locations
+    WHERE location_id = p_location_id AND activo;
+
+    IF v_capacidad IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO public.pickup_slot_counts (location_id, fecha, hora)
+    VALUES (p_location_id, p_fecha, p_hora)
+    ON CONFLICT (location_id, fecha, hora) DO NOTHING;
+
+    -- El UPDATE bloquea la fila: la condición se evalúa contra el valor confirmado
+    UPDATE public.pickup_slot_counts
+       SET reservados = reservados + 1, updated_at = NOW()
+     WHERE location_id = p_location_id AND fecha = p_fecha AND hora = p_hora
+       AND reservados < v_capacidad
+    RETURNING reservados INTO v_reservados;
+
+    RETURN v_reservados;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 4. LIBERAR UN CUPO (pre-orden cancelada)
+CREATE OR REPLACE FUNCTION public.release_pickup_slot(p_location_id INT, p_fecha DATE, p_hora INT)
+RETURNS INT AS $$
+    UPDATE public.pickup_slot_counts
+       SET reservados = reservados - 1, updated_at = NOW()
+     WHERE location_id = p_location_id AND fecha = p_fecha AND hora = p_hora
+       AND reservados > 0
+    RETURNING reservados;
+$$ LANGUAGE sql;
@@ -0,0 +1,55 @@
+-- ==============================================================================
+-- COLUMNA updated_at PARA LA RÉPLICA LOCAL DEL PANEL
+-- Ejecutar en el Editor SQL de Supabase.
+--
+-- El panel Streamlit guarda una copia local (Parquet) de orders, users y
+-- order_items y solo pide las filas con updated_at posterior a la última
+-- sincronización. El trigger mantiene updated_at al día en cada UPDATE,
+-- venga del bot, del panel o de SQL.
+-- ==============================================================================
+
+ALTER TABLE public.orders ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE public.users ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE public.order_items ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE;
+
+-- Filas existentes: la mejor fecha conocida
+UPDATE public.orders SET updated_at = fecha_orden WHERE updated_at IS NULL;
+UPDATE public.users SET updated_at = created_at WHERE updated_at IS NULL;
+UPDATE public.order_items i
+SET updated_at = o.fecha_orden
+FROM public.orders o
+WHERE o.order_id = i.order_id AND i.updated_at IS NULL;
+UPDATE public.order_items SET updated_at = NOW() WHERE updated_at IS NULL;
+
+ALTER TABLE public.orders ALTER COLUMN updated_at SET DEFAULT NOW(), ALTER COLUMN updated_at SET NOT NULL;
+ALTER TABLE public.users ALTER COLUMN updated_at SET DEFAULT NOW(), ALTER COLUMN updated_at SET NOT NULL;
+ALTER TABLE public.order_items ALTER COLUMN updated_at SET DEFAULT NOW(), ALTER COLUMN updated_at SET NOT NULL;
+
+-- La sincronización ordena por (updated_at, id)
+CREATE INDEX IF NOT EXISTS idx_orders_updated_at ON public.orders(updated_at, order_id);
+CREATE INDEX IF NOT EXISTS idx_users_updated_at ON public.users(updated_at, user_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_updated_at ON public.order_items(updated_at, item_id);
+
+CREATE OR REPLACE FUNCTION public.touch_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- clock_timestamp() y no NOW(): en transacciones largas NOW() queda atrás
+    NEW.updated_at = clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_orders_updated_at ON public.orders;
+CREATE TRIGGER trg_orders_updated_at
+    BEFORE UPDATE ON public.orders
+    FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+
+DROP TRIGGER IF EXISTS trg_users_updated_at ON public.users;
+CREATE TRIGGER trg_users_updated_at
+    BEFORE UPDATE ON public.users
+    FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+
+DROP TRIGGER IF EXISTS trg_order_items_updated_at ON public.order_items;
+CREATE TRIGGER trg_order_items_updated_at
+    BEFORE UPDATE ON public.order_items
+    FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
@@ -0,0 +1,95 @@
+"""
+Carga del dashboard: tablas completas por PostgREST vs réplica local.
+
+Para varios tamaños de historia mide lo que cuesta una carga de página:
+- antes: traer orders, users y order_items completos (páginas de 1000 filas)
+- después: sincronizar la réplica (solo cambios) y calcular con pandas
+
+La base es en memoria con latencia simulada por consulta.
+
+Uso:
+    python scripts/bench_admin_mirror.py [latencia_ms]
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# config.database exige credenciales al importar; la base aquí es en memoria
+os.environ.setdefault('SUPABASE_URL', 'https://fake.supabase.co')
+os.environ.setdefault('SUPABASE_KEY', 'header.payload.signature')
+
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from admin.pages.dashboard import summarize_dashboard
+from app.services.local_mirror import LocalMirror
+from tests.fake_supabase import FakeSupabase
+
+
+def build_db(n_orders, latency):
+    start = datetime.now(timezone.utc) - timedelta(days=365)
+    stamp = lambda i: (start + timedelta(minutes=i * 525600 // n_orders)).isoformat()
+    orders = [
+        {'order_id': i, 'user_id': i % 500, 'estado': ('pending', 'confirmed', 'delivered')[i % 3],
+         'total': 1500 * (i % 40), 'fecha_orden': stamp(i), 'updated_at': stamp(i)}
+        for i in range(1, n_orders + 1)
+    ]
+    items = [
+        {'item_id': i, 'order_id': i, 'product_id': i % 20, 'cantidad': 1 + i % 3, 'subtotal': 3000, 'updated_at': stamp(i)}
+        for i in range(1, n_orders + 1)
+    ]
+    users = [{'user_id': i, 'created_at': stamp(i), 'updated_at': stamp(i)} for i in range(1, 501)]
+    products = [{'product_id': i, 'nombre': f'Producto {i}'} for i in range(20)]
+    return FakeSupabase(
+        {'orders': orders, 'order_items': items, 'users': users, 'products': products},
+        max_rows=1000, latency=latency
+    )
+
+
+def full_pull(db):
+    """Lo que hacía cada carga de página: todas las filas de cada tabla"""
+    for table, pk in (('orders', 'order_id'), ('users', 'user_id'), ('order_items', 'item_id')):
+        last = 0
+        while True:
+            rows = db.table(table).select("*").gt(pk, last).order(pk).limit(1000).execute().data
+            if len(rows) < 1000:
+                break
+            last = rows[-1][pk]
+
+
+def main():
+    latency_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+
+    print("🗄️ BENCHMARK RÉPLICA LOCAL DEL PANEL")
+    print("====================================")
+    print(f"Latencia simulada: {latency_ms:.0f} ms por consulta\n")
+
+    for n_orders in (1_000, 10_000, 50_000):
+        db = build_db(n_orders, latency_ms / 1000)
+
+        start = time.perf_counter()
+        full_pull(db)
+        before = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as directory:
+            mirror = LocalMirror(db, directory, max_age=0, overlap=0)
+            mirror.sync()  # carga inicial, una sola vez
+
+            # Un pedido nuevo entre dos cargas de página
+            now = datetime.now(timezone.utc).isoformat()
+            db.tables['orders'].append({'order_id': n_orders + 1, 'estado': 'pending', 'total': 1, 'fecha_orden': now, 'updated_at': now})
+
+            start = time.perf_counter()
+            mirror.sync()
+            summarize_dashboard(
+                mirror.frame('orders'), mirror.frame('users'), mirror.frame('order_items'),
+                mirror.frame('products'), today=date.today()
+            )
+            after = time.perf_counter() - start
+
+        print(f"{n_orders:>7,} pedidos  antes {before * 1000:8.1f} ms  después {after * 1000:7.1f} ms  ({before / after:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Tiempo de carga de las páginas del panel: lecturas en serie vs en paralelo.
+
+Por defecto usa una base en memoria con latencia simulada por consulta (la
+latencia real a Supabase ronda 40-120 ms). Con --live mide contra la base
+configurada en .env, solo lecturas.
+
+Uso:
+    python scripts/bench_dashboard_queries.py [latencia_ms] [--live]
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.query_batch import QueryBatch
+
+
+def build_fake(latency):
+    from tests.fake_supabase import FakeSupabase
+
+    return FakeSupabase({
+        'users': [{'user_id': i} for i in range(300)],
+        'campaigns': [{'campaign_id': i, 'name': f'C{i}'} for i in range(10)]
+    }, latency=latency)
+
+
+def campaigns_batch(supabase):
+    # Mismas lecturas que admin/pages/campaigns.py
+    batch = QueryBatch(timeout=5)
+    batch.add("total_users", lambda: supabase.table("users").select("user_id", count="exact").limit(1).execute().count)
+    batch.add("campaigns", lambda: supabase.table("campaigns").select("*").order("campaign_id", desc=True).limit(50).execute().data)
+    return batch
+
+
+def main():
+    live = "--live" in sys.argv
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    latency_ms = float(args[0]) if args else 80
+
+    if live:
+        from config.database import get_supabase
+        supabase = get_supabase()
+        source = "Supabase (.env)"
+    else:
+        supabase = build_fake(latency_ms / 1000)
+        source = f"memoria, {latency_ms:.0f} ms por consulta"
+
+    print("⏱️ BENCHMARK CARGA DE PÁGINAS DEL PANEL")
+    print("=======================================")
+    print(f"Base: {source}\n")
+
+    # El dashboard lee la réplica local: ver scripts/bench_admin_mirror.py
+    pages = {
+        "Campañas": lambda: campaigns_batch(supabase),
+    }
+
+    for name, build in pages.items():
+        batch = build()
+        serial = batch.run_serial()
+        parallel = build().run()
+        slowest = max(parallel.timings, key=parallel.timings.get)
+
+        print(
+            f"{name:<10} {len(batch)} consultas  "
+            f"antes {serial.elapsed * 1000:7.1f} ms  "
+            f"después {parallel.elapsed * 1000:7.1f} ms  "
+            f"({serial.elapsed / parallel.elapsed:4.1f}x, más lenta: {slowest})"
+        )
+        if parallel.failed:
+            print(f"   ⚠️ Sin resultado: {', '.join(parallel.failed)}")
+
+
+if __name__ == "__main__":
+    main()
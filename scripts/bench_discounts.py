@@ -0,0 +1,90 @@
+"""
+Cotización de carritos: recorrer todas las reglas vs reglas compiladas.
+
+Genera N reglas (generales, por cliente y por categoría) y cotiza 20.000
+carritos sintéticos de dos formas:
+- lineal: revisar cada regla contra cada carrito
+- compilado: CompiledRules.quote (bisect por escalera de umbrales)
+
+Uso:
+    python scripts/bench_discounts.py [n_reglas]
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import random
+import time
+from datetime import datetime, timezone
+
+from app.services.discount_rules import CompiledRules, rule_from_row
+
+
+def build_rows(n, rng):
+    rows = []
+    for i in range(n):
+        scope = rng.random()
+        rows.append({
+            'discount_id': i, 'name': f'Regla {i}', 'active': True,
+            'discount_type': 'fixed' if rng.random() < 0.2 else 'percentage',
+            'value': rng.randint(1, 30) if rng.random() >= 0.2 else rng.randint(1, 20) * 1000,
+            'min_quantity': rng.randint(0, 200) if rng.random() < 0.7 else 0,
+            'min_order_amount': rng.randint(0, 100) * 10000 if rng.random() < 0.4 else 0,
+            'user_id': rng.randint(1, 500) if scope < 0.3 else None,
+            'category_id': rng.randint(1, 6) if 0.3 <= scope < 0.5 else None,
+        })
+    return rows
+
+
+def linear_quote(rules, cart, user_id):
+    subtotal = sum(i['precio'] * i['cantidad'] for i in cart)
+    quantity = sum(i['cantidad'] for i in cart)
+    best = 0.0
+    for rule in rules:
+        if rule.user_id is not None and rule.user_id != user_id:
+            continue
+        q, amount = quantity, subtotal
+        if rule.category_id is not None:
+            q = sum(i['cantidad'] for i in cart if i['category_id'] == rule.category_id)
+            amount = sum(i['precio'] * i['cantidad'] for i in cart if i['category_id'] == rule.category_id)
+        if q >= rule.min_quantity and amount >= rule.min_amount and rule.value > 0:
+            best = max(best, rule.saving(amount))
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(1)
+    rows = build_rows(n, rng)
+    carts = [
+        [{'precio': rng.choice([1500, 4000, 22000]), 'cantidad': rng.randint(1, 60), 'category_id': rng.randint(1, 6)}
+         for _ in range(rng.randint(1, 6))]
+        for _ in range(20_000)
+    ]
+    users = [rng.randint(1, 500) for _ in carts]
+
+    print(f"🏷️ BENCHMARK DE DESCUENTOS ({n} reglas, {len(carts):,} carritos)")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    compiled = CompiledRules.from_rows(rows, datetime.now(timezone.utc))
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    rules = [rule_from_row(r) for r in rows]
+    sample = len(carts) // 20
+    start = time.perf_counter()
+    expected = [linear_quote(rules, c, u) for c, u in zip(carts[:sample], users[:sample])]
+    linear = (time.perf_counter() - start) / sample
+
+    start = time.perf_counter()
+    quotes = [compiled.quote(c, u) for c, u in zip(carts, users)]
+    fast = (time.perf_counter() - start) / len(carts)
+
+    assert all(abs(q.amount - e) < 1e-6 for q, e in zip(quotes, expected))
+    print(f"  compilar            {compile_ms:8.1f} ms")
+    print(f"  lineal              {1 / linear:10,.0f} carritos/s")
+    print(f"  compilado           {1 / fast:10,.0f} carritos/s   ({linear / fast:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: una conexión SMTP por email vs. pool de sesiones persistentes.
+
+Usa el servidor SMTP local con latencia artificial por respuesta para
+simular un proveedor real (cada comando cuesta un viaje de red).
+
+Uso:
+    python scripts/bench_email.py [mensajes] [latencia_ms]
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import smtplib
+import time
+
+from app.services.email_service import EmailService
+from app.services.smtp_pool import SMTPConnectionPool
+from app.utils.local_smtp import LocalSMTPServer
+
+
+def build_messages(n):
+    return [
+        EmailService._build_message(f"cliente{i}@test.com", f"Pedido {i}", "<p>Nuevo pedido</p>")
+        for i in range(n)
+    ]
+
+
+def send_one_connection_per_email(server, messages):
+    """Comportamiento anterior: conectar, login y enviar por cada mensaje"""
+    for msg in messages:
+        smtp = smtplib.SMTP(server.host, server.port)
+        smtp.ehlo()
+        smtp.login("bot@test.com", "secret")
+        smtp.send_message(msg)
+        smtp.quit()
+
+
+def send_pooled(server, messages):
+    pool = SMTPConnectionPool(
+        host=server.host,
+        port=server.port,
+        user="bot@test.com",
+        password="secret",
+        use_tls=False
+    )
+    pool.send_messages(messages)
+    pool.close()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 5) / 1000
+
+    print("📧 BENCHMARK SMTP")
+    print("=================")
+    print(f"Mensajes: {count} | Latencia por respuesta: {latency * 1000:.0f} ms\n")
+
+    for name, fn in (
+        ("Una conexión por email", send_one_connection_per_email),
+        ("Pool persistente", send_pooled),
+    ):
+        with LocalSMTPServer(latency=latency) as server:
+            start = time.perf_counter()
+            fn(server, build_messages(count))
+            elapsed = time.perf_counter() - start
+            print(
+                f"{name:<24} {elapsed:7.3f} s  "
+                f"({elapsed / count * 1000:6.1f} ms/email, {server.connections} conexiones)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Microbenchmark del render de emails.
+
+Compara el template precompilado contra compilar el mismo template en cada
+llamada (lo que costaría sin el motor compartido), con tablas de distintos
+tamaños.
+
+Uso:
+    python scripts/bench_email_templates.py [repeticiones]
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import timeit
+
+from app.utils.template_engine import TemplateEngine, templates
+
+
+def build_context(n_items):
+    items = [
+        {'product_name': f'Producto {i}', 'cantidad': i + 1, 'precio_unitario': 3500, 'subtotal': 3500 * (i + 1)}
+        for i in range(n_items)
+    ]
+    return {
+        'order_id': 1042,
+        'nombre': 'Ana Gómez',
+        'total': sum(item['subtotal'] for item in items),
+        'fecha': '2025-01-15 09:30',
+        'items': items
+    }
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    name = "email/admin_order.html"
+
+    print("🧩 BENCHMARK TEMPLATES DE EMAIL")
+    print("===============================")
+    print(f"Template: {name} | Repeticiones: {repeat}\n")
+
+    cold_engine = TemplateEngine()
+    loader = cold_engine.env.loader
+
+    def render_cold(context):
+        # Compilar desde la fuente en cada llamada, sin caché
+        source, _, _ = loader.get_source(cold_engine.env, name)
+        cold_engine.env.cache.clear()
+        return cold_engine.env.from_string(source).render(**context)
+
+    for n_items in (5, 50, 500):
+        context = build_context(n_items)
+        reps = max(1, repeat // max(1, n_items // 5))
+
+        warm = timeit.timeit(lambda: templates.render(name, **context), number=reps) / reps
+        cold = timeit.timeit(lambda: render_cold(context), number=reps) / reps
+
+        print(
+            f"{n_items:>4} items  precompilado {warm * 1e6:9.1f} µs  "
+            f"compilando {cold * 1e6:9.1f} µs  ({cold / warm:5.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Tamaño de respuesta y tiempo de parseo por handler: select("*") vs proyección.
+
+Para cada lectura de los handlers del bot arma la respuesta JSON que
+devolvería PostgREST con todas las columnas y con la proyección del modelo
+tipado (app/services/repository.py), y mide bytes y tiempo de json.loads.
+Las filas imitan el ancho real de las tablas (productos en JSON, notas,
+direcciones, marcas de tiempo).
+
+Uso:
+    python scripts/bench_projections.py [repeticiones]
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import time
+
+from app.services.repository import AdminOrder, OrderItemLine, OrderSummary, UserContact
+from tests.fake_supabase import FakeSupabase
+
+
+def build_db():
+    stamp = "2025-03-14T15:09:26.535897+00:00"
+    users = [
+        {'user_id': i, 'telegram_id': 1_000_000 + i, 'nombre': f"Cliente Número {i}", 'telefono': f"300{i:07d}",
+         'direccion': f"Calle {i} # 45-67, Barrio Centro, Bogotá", 'email': f"cliente{i}@correo.com",
+         'created_at': stamp, 'updated_at': stamp, 'tipo_cliente': 'individual', 'notas': None}
+        for i in range(1, 51)
+    ]
+    productos = [{'product_id': k, 'nombre': f"Milhoja {k}", 'precio': 5000, 'cantidad': 2} for k in range(4)]
+    orders = [
+        {'order_id': i, 'user_id': 1 + i % 50, 'estado': ('pending', 'confirmed', 'delivered')[i % 3],
+         'total': 20000.0, 'subtotal': 20000.0, 'tax': 0.0, 'delivery_fee': 0.0, 'discount_id': None,
+         'productos': productos, 'notas': "Sin azúcar adicional, entregar en portería",
+         'direccion_entrega': "Calle 10 # 20-30, Apto 401", 'metodo_pago': 'efectivo',
+         'fecha_orden': stamp, 'created_at': stamp, 'updated_at': stamp,
+         'users': {'nombre': f"Cliente Número {1 + i % 50}", 'telegram_id': 1_000_001 + i % 50}}
+        for i in range(1, 201)
+    ]
+    items = [
+        {'item_id': i, 'order_id': 1 + i // 4, 'product_id': i % 4, 'cantidad': 2, 'precio_unitario': 5000.0,
+         'subtotal': 10000.0, 'notas': None, 'created_at': stamp, 'updated_at': stamp,
+         'products': {'nombre': f"Milhoja {i % 4}"}}
+        for i in range(1, 801)
+    ]
+    return FakeSupabase({'users': users, 'orders': orders, 'order_items': items})
+
+
+# handler -> (tabla, columnas antes, columnas después, filtro)
+READS = {
+    'start_command (¿existe?)': ('users', "*", "user_id", lambda q: q.eq('telegram_id', 1_000_007)),
+    'select_customer_type': ('users', "*", UserContact.columns(), lambda q: q.eq('telegram_id', 1_000_007)),
+    'show_my_orders': ('orders', "*", OrderSummary.columns(), lambda q: q.eq('user_id', 8).limit(10)),
+    'admin_view_orders': ('orders', "*, users(nombre, telegram_id)", AdminOrder.columns(), lambda q: q.limit(10)),
+    'admin_order_detail (items)': ('order_items', "*, products(nombre)", OrderItemLine.columns(), lambda q: q.eq('order_id', 7)),
+}
+
+
+def fetch(db, table, columns, where) -> bytes:
+    """Respuesta serializada; los recursos embebidos solo si se pidieron"""
+    rows = where(db.table(table).select(columns)).execute().data
+    for row in rows:
+        for resource in ('users', 'products'):
+            if f"{resource}(" not in columns:
+                row.pop(resource, None)
+    return json.dumps(rows).encode()
+
+
+def measure(payload: bytes, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        json.loads(payload)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    db = build_db()
+
+    print("📏 BENCHMARK PROYECCIONES POR HANDLER")
+    print("=====================================")
+    print(f"{'handler':<28}{'bytes *':>10}{'bytes proy.':>13}{'parse * µs':>13}{'parse proy. µs':>16}")
+
+    total_before = total_after = 0
+    for handler, (table, before_cols, after_cols, where) in READS.items():
+        before = fetch(db, table, before_cols, where)
+        after = fetch(db, table, after_cols, where)
+        total_before += len(before)
+        total_after += len(after)
+        print(f"{handler:<28}{len(before):>10,}{len(after):>13,}"
+              f"{measure(before, repeat):>13.1f}{measure(after, repeat):>16.1f}")
+
+    print(f"\n✅ Bytes totales: {total_before:,} → {total_after:,} "
+          f"({100 * (1 - total_after / total_before):.0f}% menos)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Verifica que las estadísticas precalculadas (order_stats) coincidan con
+los pedidos reales.
+
+Uso:
+    python scripts/check_order_stats.py            # solo reporta
+    python scripts/check_order_stats.py --repair   # reconstruye si hay diferencias
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.database import get_supabase
+from app.services.order_stats import OrderStatsService
+
+
+def main():
+    repair = "--repair" in sys.argv
+    db = get_supabase()
+
+    print("🔍 VERIFICACIÓN DE ESTADÍSTICAS DE PEDIDOS")
+    print("==========================================")
+
+    problems = OrderStatsService.check_consistency(db)
+    if not problems:
+        print("✅ El resumen coincide con los pedidos")
+        return 0
+
+    print(f"⚠️ {len(problems)} diferencias:")
+    for problem in problems:
+        print(f"   - {problem}")
+
+    if not repair:
+        print("\nEjecuta con --repair para reconstruir el resumen")
+        return 1
+
+    print("\n🔧 Reconstruyendo resumen...")
+    db.rpc("refresh_order_stats").execute()
+
+    problems = OrderStatsService.check_consistency(db)
+    if problems:
+        print(f"❌ Siguen {len(problems)} diferencias (¿pedidos nuevos durante la verificación?)")
+        return 1
+
+    print("✅ Resumen reconstruido")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""
+Exporta pedidos o items de un rango de fechas a CSV, XLSX o Parquet.
+
+Lee por páginas (keyset) y escribe cada página al archivo, así que sirve
+para rangos de años sin cargar todo en memoria.
+
+Uso:
+    python scripts/export_orders.py 2024-01-01 2024-12-31
+    python scripts/export_orders.py 2024-01-01 2024-12-31 --items --format xlsx --out exports/
+    python scripts/export_orders.py 2023-01-01 2025-12-31 --format csv --chunk-rows 500000
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import time
+from datetime import date
+
+from config.database import get_supabase
+from app.services.export import FORMATS, export_range
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta pedidos o items por rango de fechas")
+    parser.add_argument("desde", type=date.fromisoformat, help="Primer día (AAAA-MM-DD, UTC)")
+    parser.add_argument("hasta", type=date.fromisoformat, help="Último día, inclusive")
+    parser.add_argument("--items", action="store_true", help="Exportar items en vez de pedidos")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+    parser.add_argument("--out", default="exports", help="Carpeta de salida")
+    parser.add_argument("--chunk-rows", type=int, default=None, help="Filas máximas por archivo")
+    args = parser.parse_args()
+
+    kind = "items" if args.items else "orders"
+    print(f"📤 EXPORTACIÓN DE {'ITEMS' if args.items else 'PEDIDOS'} ({args.desde} - {args.hasta})")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    paths = export_range(
+        get_supabase(), kind, args.format, args.desde, args.hasta, args.out, chunk_rows=args.chunk_rows
+    )
+
+    for path in paths:
+        print(f"   ✅ {path} ({os.path.getsize(path) / 1024:,.0f} KB)")
+    print(f"\n⏱️ {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
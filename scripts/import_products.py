@@ -1,10 +1,26 @@
 """
 Script para importar categorías y productos a Supabase.
 SIN columna 'presentacion' (solo nombre + precio)
+
+Compara el catálogo contra la base en memoria y aplica solo las diferencias
+con upserts por lotes (ver app/services/catalog_import.py). Requiere
+scripts/add_catalog_import.sql.
+
+Uso:
+    python scripts/import_products.py                      # catálogo de este script
+    python scripts/import_products.py proveedor.xlsx --dry-run
+    python scripts/import_products.py proveedor.csv --deactivate-missing
 """
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from config.database import get_supabase
+import argparse
 import logging
+import time
+
+from config.database import get_supabase
+from app.services.catalog_import import BATCH_SIZE, CatalogImporter, CategorySpec, parse_products, read_rows
 
 logging.basicConfig(
     level=logging.INFO,
@@ -79,101 +95,46 @@ PRODUCTS = [
 ]
 
 
-def import_categories():
-    """Inserta/actualiza categorías."""
-    supabase = get_supabase()
-    logger.info("\n🔄 Procesando categorías...")
-    cat_map = {}
-
-    for cat in CATEGORIES:
-        cat_name = cat["name"]
-        emoji = cat["emoji"]
-        order = cat["order"]
-
-        existing = (
-            supabase.table("product_categories")
-            .select("category_id")
-            .eq("name", cat_name)
-            .execute()
-        )
-
-        if existing.data:
-            cat_id = existing.data[0]["category_id"]
-            supabase.table("product_categories").update(
-                {"icon_emoji": emoji, "display_order": order, "is_active": True}
-            ).eq("category_id", cat_id).execute()
-            logger.info(f"  ✏️  '{cat_name}' (id={cat_id}) - Actualizado")
-        else:
-            resp = supabase.table("product_categories").insert(
-                {"name": cat_name, "icon_emoji": emoji, "display_order": order, "is_active": True}
-            ).execute()
-            cat_id = resp.data[0]["category_id"]
-            logger.info(f"  ✅ '{cat_name}' (id={cat_id}) - Creado")
-
-        cat_map[cat_name] = cat_id
-
-    return cat_map
-
-
-def import_products(cat_map: dict):
-    """Inserta/actualiza productos SIN presentacion."""
-    supabase = get_supabase()
-    logger.info("\n🔄 Procesando productos...")
-    created_count = 0
-    updated_count = 0
-
-    for prod in PRODUCTS:
-        categoria = prod["categoria"]
-        nombre = prod["nombre"]
-        precio = prod["precio"]
-
-        category_id = cat_map.get(categoria)
-        if not category_id:
-            logger.warning(f"  ⚠️  '{nombre}' - Categoría '{categoria}' no encontrada")
-            continue
-
-        existing = (
-            supabase.table("products")
-            .select("product_id")
-            .eq("nombre", nombre)
-            .eq("category_id", category_id)
-            .execute()
-        )
-
-        if existing.data:
-            prod_id = existing.data[0]["product_id"]
-            supabase.table("products").update({
-                "precio": precio,
-                "activo": True,
-            }).eq("product_id", prod_id).execute()
-            logger.info(f"  ✏️  '{nombre}' (id={prod_id}) - ${precio:,.0f}")
-            updated_count += 1
-        else:
-            resp = supabase.table("products").insert({
-                "nombre": nombre,
-                "category_id": category_id,
-                "precio": precio,
-                "activo": True,
-            }).execute()
-            prod_id = resp.data[0]["product_id"]
-            logger.info(f"  ✅ '{nombre}' (id={prod_id}) - ${precio:,.0f}")
-            created_count += 1
-
-    logger.info(f"\n📊 Resumen productos:")
-    logger.info(f"   ✅ Creados: {created_count}")
-    logger.info(f"   ✏️  Actualizados: {updated_count}")
-
-
 def main():
+    parser = argparse.ArgumentParser(description="Importa categorías y productos a Supabase")
+    parser.add_argument("archivo", nargs="?", help="CSV, XLSX, JSON o JSONL (sin archivo: el catálogo de este script)")
+    parser.add_argument("--dry-run", action="store_true", help="Mostrar los cambios sin aplicarlos")
+    parser.add_argument("--deactivate-missing", action="store_true",
+                        help="Desactivar productos que no vienen en el archivo")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Filas por upsert")
+    args = parser.parse_args()
+
     logger.info("=" * 60)
     logger.info("🍰 IMPORTACIÓN MILHOJA DRES - Categorías y Productos")
     logger.info("=" * 60)
 
     try:
-        cat_map = import_categories()
-        import_products(cat_map)
+        start = time.perf_counter()
+        errors = []
+        if args.archivo:
+            products = parse_products(read_rows(args.archivo), errors)
+            categories = []
+        else:
+            products = parse_products(PRODUCTS, errors)
+            categories = [CategorySpec(c["name"], c["emoji"], c["order"]) for c in CATEGORIES]
+
+        importer = CatalogImporter(get_supabase(), batch_size=args.batch_size)
+        importer.load_existing()
+        diff = importer.diff(products, categories, deactivate_missing=args.deactivate_missing, errors=errors)
+
+        logger.info("\n📊 Cambios:")
+        for line in diff.summary():
+            logger.info(f"   {line}")
+
+        if args.dry_run:
+            logger.info("\n🔍 --dry-run: no se aplicó ningún cambio")
+        elif not diff:
+            logger.info("\n✅ El catálogo ya está al día")
+        else:
+            importer.apply(diff)
+
         logger.info("\n" + "=" * 60)
-        logger.info("✅ ¡Importación completada exitosamente!")
+        logger.info(f"✅ ¡Importación completada en {time.perf_counter() - start:.1f}s!")
         logger.info("=" * 60)
     except Exception as e:
         logger.error(f"❌ Error: {e}")
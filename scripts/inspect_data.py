@@ -3,6 +3,7 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from config.database import get_supabase
+from app.utils.keyset import fetch_all
 import json
 
 def inspect():
@@ -14,16 +15,16 @@ def inspect():
     # 1. Inspect Categories
     print("\n📦 CATEGORÍAS (product_categories):")
     try:
-        cats = db.table("product_categories").select("*").execute()
-        print(json.dumps(cats.data, indent=2))
+        cats = fetch_all(db, "product_categories", key="category_id")
+        print(json.dumps(cats, indent=2))
     except Exception as e:
         print(f"❌ Error: {e}")
 
     # 2. Inspect Products
     print("\n🍔 PRODUCTOS (products):")
     try:
-        prods = db.table("products").select("*").execute()
-        print(json.dumps(prods.data, indent=2))
+        prods = fetch_all(db, "products", key="product_id")
+        print(json.dumps(prods, indent=2))
     except Exception as e:
         print(f"❌ Error: {e}")
 
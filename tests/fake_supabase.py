@@ -0,0 +1,312 @@
+"""
+Cliente Supabase en memoria para tests.
+
+Imita la parte de la API de postgrest que usa el proyecto:
+table().select/insert/update/upsert/delete con filtros eq, neq, in_, is_,
+gt, gte, lt, lte, ilike, or_, order, limit, range y count="exact", y rpc()
+de las funciones registradas en ``functions``. Cuenta las consultas
+ejecutadas y, como PostgREST, corta los resultados a ``max_rows``.
+Con ``latency`` cada consulta espera ese tiempo, como un viaje de red.
+"""
+import copy
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from postgrest.exceptions import APIError
+
+
+def _like_regex(pattern):
+    """Patrón ILIKE (% _ y escapes con \\) a regex sin distinguir mayúsculas"""
+    out, i = [], 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        out.append(".*" if char == "%" else "." if char == "_" else re.escape(char))
+        i += 1
+    return re.compile("".join(out), re.IGNORECASE | re.DOTALL)
+
+
+def _split_top(text):
+    """Separa por comas de primer nivel, respetando paréntesis y comillas"""
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    parts.append(current)
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _coerce(literal, value):
+    """El literal llega como texto; se compara con el tipo de la columna"""
+    if isinstance(value, bool):
+        return literal == "true"
+    if isinstance(value, (int, float)):
+        return float(literal) if any(c in literal for c in ".eE") else int(literal)
+    return literal
+
+
+_OPS = {
+    "eq": lambda v, x: v == x,
+    "neq": lambda v, x: v != x,
+    "gt": lambda v, x: v is not None and v > x,
+    "gte": lambda v, x: v is not None and v >= x,
+    "lt": lambda v, x: v is not None and v < x,
+    "lte": lambda v, x: v is not None and v <= x,
+}
+
+
+def _parse_logic(kind, text):
+    """Filtros lógicos de PostgREST: ``a.eq.1,and(b.gt.2,c.lt.3)``"""
+    terms = []
+    for term in _split_top(text):
+        if term.startswith(("and(", "or(")) and term.endswith(")"):
+            inner_kind, inner = term.split("(", 1)
+            terms.append(_parse_logic(inner_kind, inner[:-1]))
+            continue
+
+        column, op, literal = term.split(".", 2)
+        literal = literal[1:-1] if literal.startswith('"') and literal.endswith('"') else literal
+        if op == "ilike":
+            regex = _like_regex(literal.replace("*", "%"))
+            terms.append(lambda row, c=column, r=regex: row.get(c) is not None and r.fullmatch(str(row.get(c))) is not None)
+        elif op == "is":
+            terms.append(lambda row, c=column: row.get(c) is None)
+        else:
+            terms.append(lambda row, c=column, o=_OPS[op], x=literal: o(row.get(c), _coerce(x, row.get(c))))
+
+    combine = any if kind == "or" else all
+    return lambda row: combine(term(row) for term in terms)
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table_name = table
+        self.op = "select"
+        self.payload = None
+        self.columns = "*"
+        self.count = None
+        self.filters = []
+        self.orders = []
+        self.limit_value = None
+        self.offset = 0
+        self.on_conflict = None
+
+    # === OPERACIONES ===
+
+    def select(self, columns="*", count=None):
+        self.op, self.columns, self.count = "select", columns, count
+        return self
+
+    def insert(self, payload, **kwargs):
+        self.op, self.payload = "insert", payload
+        return self
+
+    def update(self, payload, **kwargs):
+        self.op, self.payload = "update", payload
+        return self
+
+    def upsert(self, payload, on_conflict=None, **kwargs):
+        self.op, self.payload, self.on_conflict = "upsert", payload, on_conflict
+        return self
+
+    def delete(self, **kwargs):
+        self.op = "delete"
+        return self
+
+    # === FILTROS ===
+
+    def _filter(self, column, fn):
+        self.filters.append((column, fn))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, lambda v: v == value)
+
+    def neq(self, column, value):
+        return self._filter(column, lambda v: v != value)
+
+    def in_(self, column, values):
+        values = list(values)
+        return self._filter(column, lambda v: v in values)
+
+    def is_(self, column, value):
+        expected = None if value in (None, "null") else value
+        return self._filter(column, lambda v: v is expected or v == expected)
+
+    def gt(self, column, value):
+        return self._filter(column, lambda v: v is not None and v > value)
+
+    def gte(self, column, value):
+        return self._filter(column, lambda v: v is not None and v >= value)
+
+    def lt(self, column, value):
+        return self._filter(column, lambda v: v is not None and v < value)
+
+    def lte(self, column, value):
+        return self._filter(column, lambda v: v is not None and v <= value)
+
+    def ilike(self, column, pattern):
+        regex = _like_regex(pattern)
+        return self._filter(column, lambda v: v is not None and regex.fullmatch(str(v)) is not None)
+
+    def or_(self, filters, **kwargs):
+        predicate = _parse_logic("or", filters)
+        return self._filter(None, predicate)
+
+    def order(self, column, desc=False, **kwargs):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, n, **kwargs):
+        self.limit_value = n
+        return self
+
+    def range(self, start, end, **kwargs):
+        self.offset = start
+        self.limit_value = end - start + 1
+        return self
+
+    # === EJECUCIÓN ===
+
+    def _matches(self, row):
+        return all(fn(row) if column is None else fn(row.get(column)) for column, fn in self.filters)
+
+    def _project(self, row):
+        parts = [c.strip() for c in self.columns.split(",") if c.strip()]
+        # Recursos embebidos ("products(nombre)") solo si la fila ya los trae
+        embedded = [c.split("(")[0].strip() for c in parts if "(" in c]
+        columns = [c for c in parts if "(" not in c and ")" not in c]
+
+        if "*" in columns:
+            return copy.deepcopy(row)
+        projected = {c: copy.deepcopy(row.get(c)) for c in columns}
+        projected.update({c: copy.deepcopy(row[c]) for c in embedded if c in row})
+        return projected
+
+    def execute(self):
+        if self.client.latency:
+            time.sleep(self.client.latency)
+        with self.client.lock:
+            return self._execute()
+
+    def _execute(self):
+        self.client.queries.append((self.table_name, self.op))
+        rows = self.client.tables.setdefault(self.table_name, [])
+
+        if self.op == "insert":
+            return SimpleNamespace(data=self.client._insert(self.table_name, self.payload), count=None)
+
+        if self.op == "upsert":
+            return SimpleNamespace(data=self.client._upsert(self.table_name, self.payload, self.on_conflict), count=None)
+
+        matched = [row for row in rows if self._matches(row)]
+
+        if self.op == "update":
+            for row in matched:
+                row.update(copy.deepcopy(self.payload))
+            return SimpleNamespace(data=copy.deepcopy(matched), count=None)
+
+        if self.op == "delete":
+            self.client.tables[self.table_name] = [row for row in rows if not self._matches(row)]
+            return SimpleNamespace(data=copy.deepcopy(matched), count=None)
+
+        for column, desc in reversed(self.orders):
+            matched.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+
+        total = len(matched)
+        matched = matched[self.offset:]
+        limit = self.client.max_rows
+        if self.limit_value is not None:
+            limit = min(limit, self.limit_value) if limit else self.limit_value
+        if limit is not None:
+            matched = matched[:limit]
+
+        data = [self._project(row) for row in matched]
+        return SimpleNamespace(data=data, count=total if self.count else None)
+
+
+class FakeRpc:
+    def __init__(self, client, name, params):
+        self.client, self.name, self.params = client, name, params
+
+    def execute(self):
+        if self.client.latency:
+            time.sleep(self.client.latency)
+        with self.client.lock:
+            self.client.queries.append((self.name, "rpc"))
+            if self.name not in self.client.functions:
+                # Como PostgREST cuando la función no está en el esquema
+                raise APIError({'code': 'PGRST202', 'message': f"Could not find the function public.{self.name}"})
+            return SimpleNamespace(data=self.client.functions[self.name](self.client, self.params), count=None)
+
+
+class FakeSupabase:
+    """Base de datos en memoria: ``tables`` es un dict tabla -> lista de filas"""
+
+    def __init__(self, tables=None, primary_keys=None, max_rows=None, latency=0.0, functions=None):
+        self.tables = {name: [dict(r) for r in rows] for name, rows in (tables or {}).items()}
+        self.primary_keys = primary_keys or {}
+        self.functions = functions or {}
+        self.max_rows = max_rows
+        self.latency = latency
+        self.queries = []
+        self.lock = threading.RLock()
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params=None):
+        """Función de Postgres: ``functions[name](client, params)``, atómica como una transacción"""
+        return FakeRpc(self, name, params or {})
+
+    def _next_id(self, table, pk):
+        return max((row.get(pk) or 0 for row in self.tables[table]), default=0) + 1
+
+    def _insert(self, table, payload):
+        rows = payload if isinstance(payload, list) else [payload]
+        pk = self.primary_keys.get(table)
+        inserted = []
+        for row in rows:
+            row = copy.deepcopy(row)
+            if pk and row.get(pk) is None:
+                row[pk] = self._next_id(table, pk)
+            self.tables.setdefault(table, []).append(row)
+            inserted.append(copy.deepcopy(row))
+        return inserted
+
+    def _upsert(self, table, payload, on_conflict):
+        rows = payload if isinstance(payload, list) else [payload]
+        keys = [k.strip() for k in (on_conflict or self.primary_keys.get(table, "id")).split(",")]
+        result = []
+        for row in rows:
+            existing = next(
+                (r for r in self.tables.setdefault(table, []) if all(r.get(k) == row.get(k) for k in keys)),
+                None
+            )
+            if existing is not None:
+                existing.update(copy.deepcopy(row))
+                result.append(copy.deepcopy(existing))
+            else:
+                result.extend(self._insert(table, row))
+        return result
+
+    def count_queries(self, table=None, op=None):
+        return sum(
+            1 for t, o in self.queries
+            if (table is None or t == table) and (op is None or o == op)
+        )
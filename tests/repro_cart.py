@@ -38,12 +38,12 @@ async def test_smart_add():
         print("\n📊 RESULTADOS:")
         
         # 1. Verificar Carrito
-        cart = context.user_data.get('cart', [])
+        cart = context.user_data['cart']
         print(f"   Carrito items: {len(cart)}")
         if len(cart) == 1:
-            item = cart[0]
-            print(f"   Item: {item['nombre']} x{item['cantidad']}")
-            if item['cantidad'] == 17 and item['product_id'] == 62:
+            item = cart.get(62)
+            print(f"   Item: {item.nombre} x{item.cantidad}")
+            if item.cantidad == 17 and item.product_id == 62:
                 print("   ✅ DATOS CORRECTOS")
             else:
                 print("   ❌ DATOS ERRONEOS")
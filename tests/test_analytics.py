@@ -0,0 +1,104 @@
+"""
+Tests del motor de analytics por rango (una pasada vectorizada)
+"""
+import os
+from datetime import date
+
+# admin.pages.analytics importa config.database, que exige credenciales
+os.environ.setdefault('SUPABASE_URL', 'https://fake.supabase.co')
+os.environ.setdefault('SUPABASE_KEY', 'header.payload.signature')
+
+import numpy as np
+import pandas as pd
+
+from app.services.analytics import WEEKDAY_LABELS, compute_range, top_products
+
+
+def make_orders(n=2000, seed=7):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2025-01-01', tz='UTC').value
+    stamps = start + rng.integers(0, 90 * 86_400, n) * 10**9
+    return pd.DataFrame({
+        'order_id': np.arange(1, n + 1),
+        'estado': rng.choice(['pending', 'delivered', 'cancelled'], n),
+        'total': rng.integers(1, 50, n) * 1000.0,
+        'fecha_orden': pd.to_datetime(stamps, utc=True),
+    })
+
+
+def reference(orders, start_date, end_date):
+    """Cálculo anterior de la página: filtrar y agrupar con pandas"""
+    fecha = orders['fecha_orden']
+    df = orders[(fecha >= pd.Timestamp(f"{start_date}T00:00:00", tz="UTC"))
+                & (fecha <= pd.Timestamp(f"{end_date}T23:59:59.999999999", tz="UTC"))]
+    return df.assign(fecha=df['fecha_orden'].dt.date, hora=df['fecha_orden'].dt.hour,
+                     dia=df['fecha_orden'].dt.dayofweek)
+
+
+def test_matches_pandas_groupby():
+    """Test: totales, días, horas, días de la semana y estados coinciden con groupby"""
+    orders = make_orders()
+    result = compute_range(orders, date(2025, 1, 10), date(2025, 2, 20))
+    df = reference(orders, date(2025, 1, 10), date(2025, 2, 20))
+
+    assert result['total_orders'] == len(df)
+    assert result['total_revenue'] == df['total'].sum()
+    assert result['delivered'] == (df['estado'] == 'delivered').sum()
+
+    daily = result['daily'].set_index('fecha')
+    expected = df.groupby('fecha')['total'].sum()
+    assert len(daily) == 42
+    assert np.allclose(daily.loc[expected.index, 'total'], expected)
+    assert daily['pedidos'].sum() == len(df)
+
+    assert list(result['by_hour']) == list(df.groupby('hora').size().reindex(range(24), fill_value=0))
+    by_day = df.groupby('dia').size().reindex(range(7), fill_value=0)
+    assert list(result['by_weekday']) == list(by_day)
+    assert list(result['by_weekday'].index) == list(WEEKDAY_LABELS)
+    assert result['status_counts'].to_dict() == df['estado'].value_counts().to_dict()
+    assert list(orders.take(result['positions'])['order_id']) == list(df['order_id'])
+
+
+def test_empty_range_and_missing_dates():
+    """Test: un rango sin pedidos (o sin tabla) da ceros con un renglón por día"""
+    orders = make_orders(100)
+    orders.loc[0, 'fecha_orden'] = pd.NaT
+
+    empty = compute_range(orders, date(2024, 6, 1), date(2024, 6, 3))
+    assert empty['total_orders'] == 0 and empty['avg_ticket'] == 0.0
+    assert list(empty['daily']['total']) == [0.0, 0.0, 0.0]
+
+    assert compute_range(pd.DataFrame(), date(2025, 1, 1), date(2025, 1, 1))['heatmap'].shape == (7, 24)
+    assert compute_range(orders, date(2024, 1, 1), date(2026, 1, 1))['total_orders'] == 99
+
+
+def test_top_products_sums_by_name():
+    """Test: el top suma unidades e ingresos por nombre y ordena por ingresos"""
+    items = pd.DataFrame({'order_id': [1, 1, 2, 3], 'product_id': [10, 11, 10, 12],
+                          'cantidad': [1, 2, 3, 5], 'subtotal': [100.0, 400.0, 300.0, 50.0]})
+    products = pd.DataFrame({'product_id': [10, 11], 'nombre': ['Milhoja', 'Torta'], 'categoria': ['A', 'B']})
+
+    top = top_products(items, products, pd.Series([1, 2]))
+    assert list(top['Producto']) == ['Milhoja', 'Torta']
+    assert list(top['Unidades']) == [4, 2]
+    assert top_products(items, products, []).empty
+
+
+def test_page_memoizes_by_version(monkeypatch):
+    """Test: la página recalcula solo cuando cambia la versión de los datos"""
+    from admin.pages import analytics as page
+
+    calls = []
+    real = page.compute_range
+    monkeypatch.setattr(page, 'compute_range', lambda *a: calls.append(a) or real(*a))
+    page.range_analytics.clear()
+    orders = make_orders(200)
+
+    first = page.range_analytics(date(2025, 1, 1), date(2025, 1, 31), 'v1|200', orders)
+    page.range_analytics(date(2025, 1, 1), date(2025, 1, 31), 'v1|200', orders)
+    assert len(calls) == 1
+    assert first['total_orders'] > 0
+
+    page.range_analytics(date(2025, 1, 1), date(2025, 1, 31), 'v2|201', orders)
+    assert len(calls) == 2
+    page.range_analytics.clear()
@@ -0,0 +1,74 @@
+"""
+Tests del router de callback_data por trie de prefijos
+"""
+import asyncio
+from datetime import date, time
+from types import SimpleNamespace
+
+import pytest
+from telegram import CallbackQuery, Update, User
+
+from app.utils.callback_router import CallbackRouter
+
+
+async def handler(update, context):
+    return context.args
+
+
+def make_router():
+    router = CallbackRouter()
+    router.add("menu_volver", handler)
+    router.add("add", handler, int)
+    router.add("smart_add", handler, int, int)
+    router.add("admin_orders", handler, str)
+    router.add("admin_order_detail", handler, int)
+    router.add("admin_change_status", handler, int, str)
+    router.add("preorder_date", handler, date)
+    router.add("preorder_time", handler, time)
+    return router
+
+
+def make_update(data):
+    query = CallbackQuery(id="1", from_user=User(1, "Ana", False), chat_instance="c", data=data)
+    return Update(update_id=1, callback_query=query)
+
+
+def test_resolve_longest_prefix_with_typed_args():
+    """Test: gana la ruta literal más larga y los argumentos llegan convertidos"""
+    router = make_router()
+
+    match = router.resolve("smart_add_62_6")
+    assert match.route.path == "smart_add" and match.args == [62, 6]
+    assert router.resolve("add_7").route.path == "add"
+    assert router.resolve("admin_orders_pending").args == ["pending"]
+
+    match = router.resolve("admin_order_detail_15")
+    assert (match.route.namespace, match.route.action, match.args) == ("admin", "order_detail", [15])
+    assert router.resolve("admin_change_status_15_cancelled").args == [15, "cancelled"]
+    assert router.resolve("preorder_date_2025-03-10").args == [date(2025, 3, 10)]
+    assert router.resolve("preorder_time_14:00:00").args == [time(14, 0)]
+    assert router.resolve("menu_volver").args == []
+
+
+def test_unknown_or_malformed_callbacks_do_not_match():
+    """Test: sin ruta, con argumentos de más o de tipo inválido, el toque sigue a otros handlers"""
+    router = make_router()
+    for data in ("menu", "menu_contacto", "smart_add_62", "smart_add_x_6", "menu_volver_1", "admin", ""):
+        assert router.resolve(data) is None, data
+
+    with pytest.raises(ValueError):
+        router.add("add", handler, int)
+
+
+def test_ptb_handler_dispatches_with_context_args():
+    """Test: el handler de PTB revisa el update una vez y despacha con context.args"""
+    router = make_router()
+    ptb_handler = router.handler()
+
+    update = make_update("admin_change_status_15_confirmed")
+    match = ptb_handler.check_update(update)
+    context = SimpleNamespace(args=None)
+    assert asyncio.run(ptb_handler.handle_update(update, None, match, context)) == [15, "confirmed"]
+
+    assert ptb_handler.check_update(make_update("preorder_loc_3")) is None
+    assert ptb_handler.check_update(Update(update_id=2)) is None
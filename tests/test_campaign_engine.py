@@ -0,0 +1,206 @@
+"""
+Tests del motor de campañas (keyset, límites, checkpoints y reanudación)
+"""
+import asyncio
+from collections import Counter
+
+import pytest
+from telegram.error import ChatMigrated, Forbidden, RetryAfter
+
+from app.services.campaign_engine import CampaignEngine, create_campaign
+from app.utils.rate_limit import TokenBucket
+from tests.fake_supabase import FakeSupabase
+
+
+class Crash(BaseException):
+    """Simula que el proceso muere a mitad de campaña"""
+
+
+class FakeBot:
+    def __init__(self, crash_after=None, blocked=(), retry_after_on=None):
+        self.sent = []
+        self.crash_after = crash_after
+        self.blocked = set(blocked)
+        self.retry_after_on = retry_after_on
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(0)
+        if self.crash_after is not None and len(self.sent) >= self.crash_after:
+            raise Crash()
+        if chat_id == self.retry_after_on:
+            self.retry_after_on = None
+            raise RetryAfter(0.05)
+        if chat_id in self.blocked:
+            raise Forbidden("bot was blocked by the user")
+        self.sent.append(chat_id)
+
+
+def make_db(n_users, max_rows=1000):
+    users = [
+        {'user_id': i, 'telegram_id': None if i % 100 == 0 else 10000 + i, 'nombre': f'U{i}'}
+        for i in range(1, n_users + 1)
+    ]
+    db = FakeSupabase(
+        {'users': users, 'campaigns': [], 'campaign_deliveries': []},
+        primary_keys={'campaigns': 'campaign_id'},
+        max_rows=max_rows
+    )
+    return db
+
+
+def make_engine(db, bot, **kwargs):
+    kwargs.setdefault('page_size', 100)
+    kwargs.setdefault('flush_size', 40)
+    return CampaignEngine(db, bot, bucket=TokenBucket(1_000_000), **kwargs)
+
+
+def test_reaches_every_user_past_row_cap():
+    """Test: recorre más usuarios que el máximo de filas por consulta"""
+    db = make_db(2500, max_rows=1000)
+    bot = FakeBot(blocked={10007})
+    engine = make_engine(db, bot)
+    campaign = create_campaign(db, "Promo", "¡Hola!")
+
+    result = asyncio.run(engine.run(campaign['campaign_id']))
+
+    expected = 2500 - 25  # usuarios sin telegram_id se omiten
+    assert result['status'] == 'completed'
+    assert result['total_sent'] == expected - 1
+    assert result['total_failed'] == 1
+    assert len(bot.sent) == len(set(bot.sent)) == expected - 1
+    assert result['last_user_id'] == 2500
+
+    statuses = Counter(d['status'] for d in db.tables['campaign_deliveries'])
+    assert statuses == {'sent': expected - 1, 'blocked': 1}
+
+    # Una consulta de usuarios por página (+1 vacía al final), nunca todo de golpe
+    assert db.count_queries('users', 'select') == 26
+    # Estados en lotes, no uno por destinatario
+    assert db.count_queries('campaign_deliveries', 'upsert') < expected / 20
+
+
+def test_resumes_from_checkpoint_without_duplicates():
+    """Test: tras un corte la campaña continúa donde quedó y nadie recibe dos veces"""
+    db = make_db(1000)
+    crashing = FakeBot(crash_after=333)
+    engine = make_engine(db, crashing, workers=4)
+    campaign = create_campaign(db, "Promo", "¡Hola!")
+
+    with pytest.raises(Crash):
+        asyncio.run(engine.run(campaign['campaign_id']))
+
+    saved = db.tables['campaigns'][0]
+    assert saved['status'] == 'running'
+    assert saved['last_user_id'] == 300
+
+    # Mientras el lease del proceso muerto siga vigente nadie la retoma
+    assert asyncio.run(make_engine(db, FakeBot()).run(campaign['campaign_id'])) is None
+    saved['lease_until'] = '2000-01-01T00:00:00+00:00'
+
+    bot = FakeBot()
+    result = asyncio.run(make_engine(db, bot).run(campaign['campaign_id']))
+
+    everyone = set(crashing.sent) | set(bot.sent)
+    assert not set(crashing.sent) & set(bot.sent)
+    assert len(everyone) == 1000 - 10
+    assert result['status'] == 'completed'
+    assert result['total_sent'] == 1000 - 10
+
+
+def test_two_processes_do_not_send_the_same_campaign():
+    """Test: dos bots que ven la misma campaña en cola la toman una sola vez"""
+    db = make_db(300)
+    first, second = FakeBot(), FakeBot()
+    campaign = create_campaign(db, "Promo", "¡Hola!")
+
+    async def both():
+        return await asyncio.gather(
+            make_engine(db, first).run(campaign['campaign_id']),
+            make_engine(db, second).run(campaign['campaign_id'])
+        )
+
+    results = asyncio.run(both())
+
+    assert sorted(r is None for r in results) == [False, True]
+    assert len(first.sent) + len(second.sent) == 300 - 3
+    saved = db.tables['campaigns'][0]
+    assert saved['status'] == 'completed'
+    assert saved['lease_owner'] is None
+
+
+def test_pause_requested_from_panel():
+    """Test: si el panel marca la campaña como pausada, se detiene al final de la página"""
+    db = make_db(500)
+
+    class PausingBot(FakeBot):
+        async def send_message(self, chat_id, text, **kwargs):
+            await super().send_message(chat_id, text, **kwargs)
+            if len(self.sent) == 50:
+                db.tables['campaigns'][0]['status'] = 'paused'
+
+    bot = PausingBot()
+    engine = make_engine(db, bot)
+    campaign = create_campaign(db, "Promo", "¡Hola!")
+
+    result = asyncio.run(engine.run(campaign['campaign_id']))
+
+    assert result['status'] == 'paused'
+    assert result['last_user_id'] == 100
+    assert len(bot.sent) == 99
+
+
+def test_retry_after_is_retried():
+    """Test: RetryAfter frena el envío y el destinatario se reintenta"""
+    db = make_db(20)
+    bot = FakeBot(retry_after_on=10005)
+    engine = make_engine(db, bot)
+    campaign = create_campaign(db, "Promo", "¡Hola!")
+
+    result = asyncio.run(engine.run(campaign['campaign_id']))
+
+    assert result['total_sent'] == 20
+    assert 10005 in bot.sent
+
+
+def test_telegram_errors_fail_only_the_recipient():
+    """Test: un ChatMigrated o un RetryAfter persistente marcan al destinatario como fallido, no la campaña"""
+    class StubbornBot(FakeBot):
+        async def send_message(self, chat_id, text, **kwargs):
+            self.attempts = getattr(self, 'attempts', 0) + (chat_id == 10003)
+            if chat_id == 10002:
+                raise ChatMigrated(-100123)
+            if chat_id == 10003:
+                raise RetryAfter(0.01)
+            await super().send_message(chat_id, text, **kwargs)
+
+    db = make_db(10)
+    bot = StubbornBot()
+    engine = make_engine(db, bot, max_attempts=3)
+    campaign = create_campaign(db, "Promo", "¡Hola!")
+
+    result = asyncio.run(engine.run(campaign['campaign_id']))
+
+    assert result['status'] == 'completed'
+    assert (result['total_sent'], result['total_failed']) == (8, 2)
+    assert bot.attempts == 3
+    failed = {r['telegram_id'] for r in db.tables['campaign_deliveries'] if r['status'] == 'failed'}
+    assert failed == {10002, 10003}
+
+
+def test_token_bucket_limits_throughput():
+    """Test: el pool de workers no supera la tasa del bucket"""
+    db = make_db(30)
+    bot = FakeBot()
+    bucket = TokenBucket(100, capacity=1)
+    engine = CampaignEngine(db, bot, bucket=bucket, workers=8, page_size=10)
+    campaign = create_campaign(db, "Promo", "¡Hola!")
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await engine.run(campaign['campaign_id'])
+        return loop.time() - start
+
+    elapsed = asyncio.run(run())
+    assert len(bot.sent) == 30
+    assert elapsed >= 29 / 100 * 0.9
@@ -0,0 +1,149 @@
+"""
+Tests del carrito por product_id
+"""
+import asyncio
+import os
+import pickle
+from unittest.mock import AsyncMock, MagicMock
+
+# app.handlers.products importa config.database, que exige credenciales
+os.environ.setdefault('SUPABASE_URL', 'https://fake.supabase.co')
+os.environ.setdefault('SUPABASE_KEY', 'header.payload.signature')
+
+import pytest
+
+from app.services import cart as cart_module
+from app.services.cart import Cart, CartFull, get_cart, reprice
+from app.services.repository import DatabaseService
+from tests.fake_supabase import FakeSupabase
+
+
+def test_same_product_merges_and_counters_follow():
+    """Test: agregar el mismo producto suma cantidad y los contadores siguen cada cambio"""
+    cart = Cart()
+    cart.add(1, 'Milhoja', 5000, 1, 2)
+    cart.add(1, 'Milhoja', 5000, 6, 2)
+    cart.add(2, 'Palmita', 3000, 12)
+
+    assert len(cart) == 2
+    assert (cart.quantity, cart.subtotal) == (19, 5000 * 7 + 3000 * 12)
+
+    cart.set_quantity(1, 2)
+    assert (cart.quantity, cart.subtotal) == (14, 10000 + 36000)
+    cart.remove(2)
+    assert [line.product_id for line in cart] == [1]
+    assert (cart.quantity, cart.subtotal) == (2, 10000)
+    assert cart.items() == [{'product_id': 1, 'nombre': 'Milhoja', 'precio': 5000.0, 'cantidad': 2, 'category_id': 2}]
+
+
+def test_limits(monkeypatch):
+    """Test: el carrito limita productos distintos y unidades por línea"""
+    monkeypatch.setattr(cart_module, 'MAX_LINES', 3)
+    cart = Cart()
+    for pid in range(3):
+        cart.add(pid, f'P{pid}', 1000)
+    with pytest.raises(CartFull):
+        cart.add(99, 'Otro', 1000)
+
+    cart.add(0, 'P0', 1000, 50_000)
+    assert cart.get(0).cantidad == cart_module.MAX_QUANTITY
+
+
+def test_compact_state_and_legacy_list():
+    """Test: el carrito se guarda como listas compactas y migra la lista de dicts anterior"""
+    legacy = [{'product_id': 7, 'nombre': 'Torta', 'precio': 20000, 'cantidad': 1}] * 3
+    user_data = {'cart': legacy}
+
+    cart = get_cart(user_data)
+    assert user_data['cart'] is cart and get_cart(user_data) is cart
+    assert (len(cart), cart.quantity, cart.subtotal) == (1, 3, 60000)
+    assert cart.to_state() == [[7, 'Torta', 20000.0, 3, None]]
+
+    restored = pickle.loads(pickle.dumps(cart))
+    assert restored.items() == cart.items() and restored.subtotal == cart.subtotal
+    assert len(pickle.dumps(cart)) < len(pickle.dumps(legacy))
+
+
+def test_smart_add_handler_merges(monkeypatch):
+    """Test: tocar +6 dos veces deja una línea con 12 unidades"""
+    import config.database
+    from app.handlers.products import smart_add_to_cart
+
+    db = MagicMock()
+    db.get_product_by_id.return_value = {'product_id': 62, 'nombre': 'Milhoja', 'precio': 15000, 'category_id': 1}
+    monkeypatch.setattr(config.database, 'db', db)
+
+    update = MagicMock()
+    update.callback_query.data = "smart_add_62_6"
+    update.callback_query.answer = AsyncMock()
+    update.callback_query.edit_message_text = AsyncMock()
+    context = MagicMock()
+    context.user_data = {}
+    context.args = [62, 6]
+
+    asyncio.run(smart_add_to_cart(update, context))
+    asyncio.run(smart_add_to_cart(update, context))
+
+    cart = context.user_data['cart']
+    assert (len(cart), cart.quantity, cart.subtotal) == (1, 12, 180000)
+    assert "$180,000" in update.callback_query.edit_message_text.call_args.kwargs['text']
+
+
+def make_catalog():
+    return FakeSupabase({'products': [
+        {'product_id': 1, 'nombre': 'Milhoja', 'precio': 5500, 'category_id': 2, 'activo': True, 'disponible': True},
+        {'product_id': 2, 'nombre': 'Palmita', 'precio': 3000, 'category_id': 1, 'activo': True, 'disponible': False},
+        {'product_id': 3, 'nombre': 'Torta', 'precio': 20000, 'category_id': 1, 'activo': True, 'disponible': True},
+    ]})
+
+
+def test_reprice_in_one_query():
+    """Test: el carrito se valida contra el catálogo en una consulta y reporta cambios y quitados"""
+    client = make_catalog()
+    cart = Cart()
+    cart.add(1, 'Milhoja', 5000, 2, 2)
+    cart.add(2, 'Palmita', 3000, 12, 1)
+    cart.add(3, 'Torta', 20000, 1, 1)
+    cart.add(4, 'Borrado', 1000, 1)
+
+    catalog = DatabaseService(client).get_catalog_prices([line.product_id for line in cart])
+    assert client.count_queries('products') == 1
+
+    diff = reprice(cart, catalog)
+    assert [(c.line.product_id, c.line.precio, c.precio) for c in diff.changed] == [(1, 5000.0, 5500.0)]
+    assert [line.product_id for line in diff.removed] == [2, 4]
+    assert (len(cart), cart.quantity, cart.subtotal) == (2, 3, 5500 * 2 + 20000)
+
+    # Ya coincide con el catálogo: no hay diferencias
+    assert not reprice(cart, catalog)
+
+
+def test_confirm_order_shows_diff_before_inserting(monkeypatch):
+    """Test: si el precio cambió se muestra el resumen y no se crea la orden hasta volver a confirmar"""
+    import config.database
+    from app.handlers import products
+
+    client = make_catalog()
+    client.tables.update({'users': [{'user_id': 9, 'telegram_id': 111, 'nombre': 'Ana'}], 'orders': [], 'order_items': []})
+    client.primary_keys = {'orders': 'order_id'}
+    monkeypatch.setattr(config.database, 'db', DatabaseService(client))
+    monkeypatch.setattr(products, 'get_supabase', lambda: client)
+    monkeypatch.setattr(products.PDFService, 'generate_order_pdf', staticmethod(lambda *a: None))
+    monkeypatch.setattr(products.EmailService, 'notify_admin_new_order', AsyncMock(return_value=True))
+
+    update = MagicMock()
+    update.effective_user.id = 111
+    update.callback_query.answer = AsyncMock()
+    update.callback_query.edit_message_text = AsyncMock()
+    context = MagicMock()
+    context.user_data = {}
+    get_cart(context.user_data).add(1, 'Milhoja', 5000, 2, 2)
+
+    asyncio.run(products.confirm_order(update, context))
+    text = update.callback_query.edit_message_text.call_args.kwargs['text']
+    assert "antes $5,000 → ahora $5,500" in text and "$11,000" in text
+    assert client.tables['orders'] == []
+
+    asyncio.run(products.confirm_order(update, context))
+    assert [o['total'] for o in client.tables['orders']] == [11000.0]
+    assert [i['precio_unitario'] for i in client.tables['order_items']] == [5500.0]
@@ -0,0 +1,158 @@
+"""
+Tests del catálogo en memoria y su recarga por versión
+"""
+import asyncio
+import json
+import threading
+
+from app.services.catalog import CatalogCache
+from tests.fake_supabase import FakeSupabase
+
+
+def make_client():
+    return FakeSupabase({
+        'catalog_version': [{'id': 1, 'version': 7}],
+        'product_categories': [
+            {'category_id': 1, 'name': 'Tortas', 'icon_emoji': '🎂', 'display_order': 2, 'is_active': True},
+            {'category_id': 2, 'name': 'Hojaldres', 'icon_emoji': '🥐', 'display_order': 1, 'is_active': True},
+            {'category_id': 3, 'name': 'Viejas', 'icon_emoji': '📦', 'display_order': 0, 'is_active': False},
+        ],
+        'products': [
+            {'product_id': 1, 'nombre': 'Torta de Queso', 'category_id': 1, 'categoria': 'Tortas', 'precio': 16000,
+             'activo': True, 'disponible': True},
+            {'product_id': 2, 'nombre': 'Cheese Cake', 'category_id': 1, 'categoria': 'Tortas', 'precio': 22000,
+             'activo': True, 'disponible': False},
+            {'product_id': 3, 'nombre': 'Milhoja', 'category_id': 2, 'categoria': 'Hojaldres', 'precio': 15000,
+             'activo': False, 'disponible': True},
+        ],
+    })
+
+
+def test_snapshot_serves_reads_without_queries():
+    """Test: categorías, productos y detalle salen del snapshot sin consultar la base"""
+    client = make_client()
+    cache = CatalogCache(lambda: client)
+
+    snapshot = cache.snapshot()
+    queries = client.count_queries()
+    assert snapshot.version == 7
+    assert [c['name'] for c in snapshot.categories] == ['Hojaldres', 'Tortas']
+    assert [p['nombre'] for p in snapshot.products_in(1)] == ['Cheese Cake', 'Torta de Queso']
+    assert snapshot.products_in(2) == []
+    assert [p['product_id'] for p in snapshot.available_products()] == [1]
+    assert snapshot.product(1)['product_categories'] == {'name': 'Tortas', 'icon_emoji': '🎂'}
+    assert cache.snapshot() is snapshot
+    assert client.count_queries() == queries
+
+
+def test_refresh_reloads_only_on_new_version():
+    """Test: sin cambio de versión se lee una fila; con cambio se reemplaza el snapshot una vez"""
+    client = make_client()
+    cache = CatalogCache(lambda: client)
+    first = cache.snapshot()
+    seen = []
+    cache.on_change(seen.append)
+
+    before = client.count_queries()
+    assert cache.refresh() is False
+    assert client.count_queries() - before == 1
+
+    client.tables['products'][0]['precio'] = 17000
+    client.tables['catalog_version'][0]['version'] = 8
+
+    # Muchos hilos notan el cambio a la vez: una sola recarga
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        cache.refresh()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert cache.reloads == 2 and len(seen) == 1
+    assert cache.snapshot().version == 8 and cache.snapshot().product(1)['precio'] == 17000
+    # Quien ya tenía el snapshot anterior lo sigue viendo intacto
+    assert first.product(1)['precio'] == 16000
+
+
+def test_notify_triggers_background_reload():
+    """Test: un aviso (Realtime) hace revisar la versión sin esperar al siguiente poll"""
+    client = make_client()
+    cache = CatalogCache(lambda: client, poll_interval=3600, reload_spread=0.0)
+    cache.snapshot()
+
+    async def scenario():
+        cache.start()
+        client.tables['catalog_version'][0]['version'] = 9
+        await asyncio.sleep(0)
+        cache.notify()
+        for _ in range(100):
+            if cache.snapshot().version == 9:
+                break
+            await asyncio.sleep(0.01)
+        await cache.stop()
+
+    asyncio.run(scenario())
+    assert cache.snapshot().version == 9
+
+
+def test_disk_snapshot_serves_cold_start_and_outage(tmp_path):
+    """Test: el último catálogo bueno se guarda en disco y sirve el arranque aunque la base esté caída"""
+    path = str(tmp_path / 'catalog_snapshot.json')
+    client = make_client()
+    client.tables['pickup_locations'] = [{'location_id': 1, 'nombre': 'Centro', 'activo': True, 'orden_display': 1}]
+    client.tables['knowledge_base'] = [{'kb_id': 1, 'pregunta': '¿Horario?', 'respuesta': '8 a 7', 'activa': True}]
+    CatalogCache(lambda: client, snapshot_path=path).snapshot()
+
+    def down():
+        raise ConnectionError("Supabase no responde")
+
+    cold = CatalogCache(down, snapshot_path=path)
+    snapshot = cold.snapshot()
+    assert snapshot.source == 'disk' and snapshot.version == 7
+    assert [p['product_id'] for p in snapshot.available_products()] == [1]
+    assert snapshot.product(1)['product_categories'] == {'name': 'Tortas', 'icon_emoji': '🎂'}
+    assert [loc['nombre'] for loc in snapshot.locations] == ['Centro']
+    assert snapshot.knowledge_base[0]['respuesta'] == '8 a 7'
+
+    # Durante la caída la revalidación falla y se sigue sirviendo la copia
+    try:
+        cold.refresh()
+    except ConnectionError:
+        pass
+    assert cold.snapshot() is snapshot
+
+    # La base vuelve con la misma versión: la copia es vigente, no se recarga
+    cold.supabase_factory = lambda: client
+    assert cold.refresh() is False
+    client.tables['catalog_version'][0]['version'] = 8
+    assert cold.refresh() is True and cold.snapshot().source == 'db'
+    assert CatalogCache(down, snapshot_path=path).snapshot().version == 8
+
+
+def test_unreadable_disk_snapshot_is_ignored(tmp_path):
+    """Test: un archivo corrupto o de otro formato no impide cargar desde la base"""
+    path = tmp_path / 'catalog_snapshot.json'
+    for content in ('{"format": 0}', '{"format": 1, "categ'):
+        path.write_text(content, encoding='utf-8')
+        snapshot = CatalogCache(make_client, snapshot_path=str(path)).snapshot()
+        assert snapshot.source == 'db' and snapshot.version == 7
+    assert json.loads(path.read_text(encoding='utf-8'))['version'] == 7
+
+
+def test_disk_copy_is_revalidated_without_sync_task(tmp_path):
+    """Test: sin tarea de fondo, la copia de disco se revalida en el primer uso y no se sirve para siempre"""
+    path = str(tmp_path / 'catalog_snapshot.json')
+    client = make_client()
+    CatalogCache(lambda: client, snapshot_path=path).snapshot()
+
+    client.tables['products'][0]['precio'] = 17000
+    client.tables['catalog_version'][0]['version'] = 8
+
+    snapshot = CatalogCache(lambda: client, snapshot_path=path).snapshot()
+    assert snapshot.source == 'db' and snapshot.version == 8
+    assert snapshot.product(1)['precio'] == 17000
@@ -0,0 +1,112 @@
+"""
+Tests de la importación masiva del catálogo
+"""
+import json
+
+from app.services.catalog_import import CatalogImporter, CategorySpec, parse_products, read_rows
+from app.services.export import Column, XlsxWriter
+from tests.fake_supabase import FakeSupabase
+
+
+def make_client():
+    return FakeSupabase({
+        'product_categories': [
+            {'category_id': 1, 'name': 'Tortas', 'icon_emoji': '🎂', 'display_order': 1, 'is_active': True},
+        ],
+        'products': [
+            {'product_id': 1, 'nombre': 'Cheese Cake', 'category_id': 1, 'categoria': 'Tortas',
+             'descripcion': 'Clásico', 'precio': 22000, 'activo': True, 'disponible': True},
+            {'product_id': 2, 'nombre': 'Torta de Queso', 'category_id': 1, 'categoria': 'Tortas',
+             'descripcion': None, 'precio': 16000, 'activo': True, 'disponible': True},
+            {'product_id': 3, 'nombre': 'Lonchero', 'category_id': 1, 'categoria': 'Tortas',
+             'descripcion': None, 'precio': 21000, 'activo': True, 'disponible': True},
+        ],
+    }, primary_keys={'product_categories': 'category_id', 'products': 'product_id'},
+        functions={'bump_catalog_version': lambda client, params: 2})
+
+
+ROWS = [
+    {'categoria': 'Tortas', 'nombre': 'Cheese Cake', 'precio': '22,000'},
+    {'categoria': 'Tortas', 'nombre': 'Torta de Queso', 'precio': 17000},
+    {'categoria': 'Hojaldres', 'nombre': 'Milhoja', 'precio': '15000', 'disponible': 'no'},
+    {'categoria': 'Hojaldres', 'nombre': 'Sin precio', 'precio': ''},
+] + [{'categoria': 'Galletería', 'nombre': f"Galleta {i}", 'precio': 1000 + i} for i in range(1200)]
+
+
+def test_diff_and_batched_apply():
+    """Test: el catálogo se lee una vez, el diff se aplica por lotes y una segunda corrida no cambia nada"""
+    client = make_client()
+    importer = CatalogImporter(client, batch_size=500)
+    importer.load_existing()
+
+    errors = []
+    diff = importer.diff(parse_products(ROWS, errors), deactivate_missing=True, errors=errors)
+    assert [c['name'] for c in diff.categories] == ['Hojaldres', 'Galletería']
+    assert len(diff.new_products) == 1201
+    assert [(old['precio'], new['precio']) for old, new in diff.changed_products] == [(16000, 17000.0)]
+    assert [row['nombre'] for row in diff.deactivated] == ['Lonchero']
+    assert diff.unchanged == 1
+    assert diff.errors == ["Fila 5: precio inválido ''"]
+
+    reads = client.count_queries()
+    assert reads == 2
+    importer.apply(diff)
+    # 1 lote de categorías + 3 de productos (1203 filas) + la versión
+    assert client.count_queries() - reads == 1 + 3 + 1
+
+    products = {p['nombre']: p for p in client.tables['products']}
+    assert len(products) == 1204
+    assert products['Cheese Cake']['descripcion'] == 'Clásico'
+    assert products['Milhoja']['disponible'] is False
+    assert products['Lonchero']['activo'] is False
+    hojaldres = next(c for c in client.tables['product_categories'] if c['name'] == 'Hojaldres')
+    assert products['Milhoja']['category_id'] == hojaldres['category_id']
+    assert hojaldres['display_order'] == 2
+
+    again = CatalogImporter(client)
+    again.load_existing()
+    assert not again.diff(parse_products(ROWS, []), deactivate_missing=True)
+
+
+def test_category_specs_update_emoji_and_order():
+    """Test: emoji y orden de las categorías dadas se actualizan sin tocar productos"""
+    client = make_client()
+    importer = CatalogImporter(client)
+    importer.load_existing()
+
+    diff = importer.diff([], [CategorySpec('Tortas', '🍰', 5)])
+    assert diff.categories == [{'name': 'Tortas', 'icon_emoji': '🍰', 'display_order': 5, 'is_active': True}]
+    assert not (diff.new_products or diff.changed_products or diff.deactivated)
+
+
+def test_readers_stream_csv_xlsx_jsonl(tmp_path):
+    """Test: CSV (con ;), XLSX y JSON Lines producen las mismas filas"""
+    csv_path = tmp_path / 'catalogo.csv'
+    csv_path.write_text("Categoria;Nombre;Precio;Disponible\nTortas;Cheese Cake;22000;si\n", encoding='utf-8-sig')
+
+    xlsx_path = tmp_path / 'catalogo.xlsx'
+    with open(xlsx_path, 'wb') as f:
+        writer = XlsxWriter(f, (Column('categoria'), Column('nombre'), Column('precio', 'float'),
+                                Column('disponible', 'bool')))
+        writer.write([{'categoria': 'Tortas', 'nombre': 'Cheese Cake', 'precio': 22000, 'disponible': True}])
+        writer.close()
+
+    jsonl_path = tmp_path / 'catalogo.jsonl'
+    jsonl_path.write_text(json.dumps({'categoria': 'Tortas', 'nombre': 'Cheese Cake', 'precio': 22000,
+                                      'disponible': True}) + "\n", encoding='utf-8')
+
+    parsed = [list(parse_products(read_rows(str(path)), [])) for path in (csv_path, xlsx_path, jsonl_path)]
+    assert parsed[0] == parsed[1] == parsed[2]
+    assert parsed[0][0].precio == 22000.0 and parsed[0][0].disponible is True
+
+
+def test_ambiguous_prices_are_row_errors():
+    """Test: un punto o una coma que pueden ser de miles o decimales no se importan"""
+    rows = [{'categoria': 'Tortas', 'nombre': f'P{i}', 'precio': precio}
+            for i, precio in enumerate(['22.000', '1.250.000', '22.000,50', '4500,50', '1,5',
+                                        '$22,000', '22,000.50', '1,250,000', '4500.5', 22000])]
+    errors = []
+    prices = [spec.precio for spec in parse_products(rows, errors)]
+
+    assert prices == [22000.0, 22000.5, 1250000.0, 4500.5, 22000.0]
+    assert [e.split(':')[0] for e in errors] == ['Fila 2', 'Fila 3', 'Fila 4', 'Fila 5', 'Fila 6']
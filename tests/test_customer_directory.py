@@ -0,0 +1,119 @@
+"""
+Tests del directorio de clientes (búsqueda y paginación keyset)
+"""
+import os
+from datetime import datetime, timedelta, timezone
+
+# Las páginas del panel importan config.database, que exige credenciales
+os.environ.setdefault('SUPABASE_URL', 'https://fake.supabase.co')
+os.environ.setdefault('SUPABASE_KEY', 'header.payload.signature')
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from app.services.customer_directory import CustomerDirectory
+from tests.fake_supabase import FakeSupabase
+
+BASE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def make_db(n_users):
+    rows = []
+    for i in range(1, n_users + 1):
+        nombre = f"Cliente {i}" if i % 10 else f"María 100%_{i}"
+        rows.append({
+            'user_id': i,
+            'nombre': nombre,
+            'telefono': f"300{i:07d}",
+            # Muchos empates en created_at y total_spent a propósito
+            'created_at': (BASE + timedelta(hours=i // 7)).isoformat(),
+            'order_count': i % 5,
+            'total_spent': float((i % 13) * 1500),
+            'search_text': f"{nombre} 300{i:07d}".lower(),
+        })
+    stats = [{'user_id': r['user_id'], 'order_count': r['order_count']} for r in rows]
+    users = [{'user_id': r['user_id'], 'created_at': r['created_at']} for r in rows]
+    return FakeSupabase({'customer_directory': rows, 'customer_stats': stats, 'users': users})
+
+
+def walk(db, **kwargs):
+    seen, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = CustomerDirectory.search_page(db, cursor=cursor, page_size=25, **kwargs)
+        seen.extend(rows)
+        pages += 1
+        if cursor is None:
+            return seen, pages
+
+
+@pytest.mark.parametrize("sort", ["recent", "value", "orders"])
+def test_keyset_walk_visits_everyone_once_in_order(sort):
+    """Test: recorrer todas las páginas devuelve a cada cliente una vez, en orden, aun con empates"""
+    db = make_db(260)
+    column = {'recent': 'created_at', 'value': 'total_spent', 'orders': 'order_count'}[sort]
+
+    seen, pages = walk(db, sort=sort)
+
+    assert len(seen) == 260
+    assert len({r['user_id'] for r in seen}) == 260
+    keys = [(r[column], r['user_id']) for r in seen]
+    assert keys == sorted(keys, reverse=True)
+    assert pages == 11
+
+
+def test_each_page_is_one_query():
+    """Test: cada página cuesta una consulta, sin importar cuántos clientes hay"""
+    db = make_db(2000)
+    _, cursor = CustomerDirectory.search_page(db, sort='value')
+    db.queries.clear()
+
+    CustomerDirectory.search_page(db, sort='value', cursor=cursor)
+
+    assert db.queries == [('customer_directory', 'select')]
+
+
+def test_search_matches_name_or_phone_literally():
+    """Test: la búsqueda cubre nombre y teléfono y no interpreta % ni _ como comodines"""
+    db = make_db(100)
+
+    by_phone, _ = CustomerDirectory.search_page(db, search="3000000042")
+    assert [r['user_id'] for r in by_phone] == [42]
+
+    literal, _ = CustomerDirectory.search_page(db, search="100%_")
+    assert {r['user_id'] for r in literal} == {10, 20, 30, 40, 50, 60, 70, 80, 90, 100}
+
+    wildcard, _ = CustomerDirectory.search_page(db, search="100_")
+    assert wildcard == []
+
+
+def test_counts_header():
+    """Test: los totales del encabezado salen de conteos, no de descargar filas"""
+    db = make_db(50)
+    counts = CustomerDirectory.get_counts(db, now=datetime(2025, 1, 2))
+
+    assert counts['total'] == 50
+    assert counts['active'] == 40
+    assert counts['new_this_month'] == 50
+
+
+def test_customers_page_paginates(monkeypatch):
+    """Test: la página muestra 25 clientes y 'Siguiente' avanza con el cursor"""
+    import admin.pages.customers as customers_page
+    db = make_db(60)
+    monkeypatch.setattr(customers_page, 'get_supabase', lambda: db)
+
+    def page():
+        from admin.pages.customers import show_customers
+        show_customers()
+
+    at = AppTest.from_function(page)
+    at.run(timeout=30)
+    assert not at.exception and not at.error
+    assert any("1–25" in md.value for md in at.markdown)
+
+    db.queries.clear()
+    next(b for b in at.button if b.label == "Siguiente ➡️").click().run(timeout=30)
+    assert any("26–50" in md.value for md in at.markdown)
+    # Encabezado (3 conteos) + una página
+    assert db.count_queries('customer_directory') == 1
+    assert len(db.queries) == 4
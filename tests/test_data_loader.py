@@ -0,0 +1,119 @@
+"""
+Tests de la carga por lotes y de las consultas por página del panel
+"""
+import os
+
+# Las páginas del panel importan config.database, que exige credenciales
+os.environ.setdefault('SUPABASE_URL', 'https://fake.supabase.co')
+os.environ.setdefault('SUPABASE_KEY', 'header.payload.signature')
+
+from streamlit.testing.v1 import AppTest
+
+from app.services.order_items import fetch_items_by_order
+from app.utils.data_loader import BatchLoader
+from tests.fake_supabase import FakeSupabase
+
+
+def make_db(n_orders, items_per_order=3, max_rows=None):
+    orders = [
+        {'order_id': i, 'user_id': 1 + i % 2, 'estado': 'pending' if i % 4 == 0 else 'delivered',
+         'total': 1000 * i, 'subtotal': 1000 * i, 'fecha_orden': f"2025-01-{1 + i % 28:02d}T10:00:00"}
+        for i in range(1, n_orders + 1)
+    ]
+    items = [
+        {'item_id': (o - 1) * items_per_order + k + 1, 'order_id': o, 'product_id': k, 'cantidad': 1,
+         'precio_unitario': 500, 'subtotal': 500, 'products': {'nombre': f'Producto {k}', 'precio': 500}}
+        for o in range(1, n_orders + 1) for k in range(items_per_order)
+    ]
+    return FakeSupabase({'orders': orders, 'order_items': items, 'discounts': []}, max_rows=max_rows)
+
+
+def test_loader_batches_primed_keys():
+    """Test: las claves registradas se cargan en una sola llamada"""
+    calls = []
+
+    def batch_fn(keys):
+        calls.append(list(keys))
+        return {k: k * 10 for k in keys if k != 3}
+
+    loader = BatchLoader(batch_fn, default=0).prime([1, 2, 3, 2])
+
+    assert [loader.load(k) for k in (1, 2, 3)] == [10, 20, 0]
+    assert calls == [[1, 2, 3]]
+    # En caché: no vuelve a consultar
+    assert loader.load_many([3, 1]) == [0, 10]
+    assert len(calls) == 1
+
+
+def test_loader_splits_large_batches():
+    """Test: más claves que max_batch_size se piden en trozos"""
+    loader = BatchLoader(lambda keys: {k: k for k in keys}, max_batch_size=40)
+
+    assert loader.load_many(range(100)) == list(range(100))
+    assert loader.batches == 3
+
+
+def test_loader_defaults_are_not_shared():
+    """Test: cada clave sin resultado recibe su propia lista vacía"""
+    loader = BatchLoader(lambda keys: {}, default=[])
+    a, b = loader.load_many([1, 2])
+    a.append('x')
+    assert b == []
+
+
+def test_fetch_items_paginates_past_row_cap():
+    """Test: los items de muchos pedidos se traen completos aunque superen max-rows"""
+    db = make_db(100, items_per_order=15, max_rows=1000)
+
+    grouped = fetch_items_by_order(db, range(1, 101))
+
+    assert sum(len(items) for items in grouped.values()) == 1500
+    assert all(len(grouped[o]) == 15 for o in range(1, 101))
+    assert db.count_queries('order_items', 'select') == 2
+
+
+def run_orders_page(monkeypatch, db):
+    import admin.pages.orders as orders_page
+    monkeypatch.setattr(orders_page, 'get_supabase', lambda: db)
+
+    def page():
+        from admin.pages.orders import show_orders_management
+        show_orders_management()
+
+    at = AppTest.from_function(page)
+    at.run(timeout=30)
+    at.number_input[0].set_value(100).run(timeout=30)
+    return at
+
+
+def test_orders_page_query_count(monkeypatch):
+    """Test: 100 pedidos en pantalla = 1 conteo + 1 lista + 1 consulta de items"""
+    db = make_db(120)
+    at = run_orders_page(monkeypatch, db)
+    db.queries.clear()
+    at.run(timeout=30)
+
+    assert not at.exception and not at.error
+    assert "100 pedidos encontrados" in at.success[0].value
+    assert db.count_queries('orders', 'select') == 2
+    assert db.count_queries('order_items', 'select') == 1
+    assert any("Producto 2 x1" in md.value for md in at.markdown)
+
+
+def test_customer_detail_query_count(monkeypatch):
+    """Test: el detalle de cliente pide pedidos, items y descuentos una vez cada uno"""
+    import admin.pages.customers as customers_page
+    db = make_db(40)
+    monkeypatch.setattr(customers_page, 'get_supabase', lambda: db)
+
+    def page():
+        from admin.pages.customers import show_customer_detail
+        show_customer_detail({'user_id': 1, 'nombre': 'Ana', 'created_at': '2025-01-01T00:00:00'})
+
+    at = AppTest.from_function(page)
+    at.run(timeout=30)
+
+    assert not at.exception
+    assert db.count_queries('orders', 'select') == 1
+    assert db.count_queries('order_items', 'select') == 1
+    assert db.count_queries('discounts', 'select') == 1
@@ -0,0 +1,191 @@
+"""
+Tests del gateway de Supabase (plazos, reintentos y circuit breaker)
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from telegram import CallbackQuery, Chat, Message, Update, User
+
+from app.handlers.errors import on_error
+from app.utils.db_gateway import CircuitBreaker, DatabaseUnavailable, GatewayTransport
+from app.utils.metrics import MetricsRegistry
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_gateway(handler, threshold=3, clock=None, **kwargs):
+    registry = MetricsRegistry()
+    breaker = CircuitBreaker("supabase", failure_threshold=threshold, reset_timeout=30,
+                             clock=clock or Clock(), registry=registry)
+    sleeps = []
+    gateway = GatewayTransport(httpx.MockTransport(handler), breaker, rng=lambda: 0.5,
+                               sleep=sleeps.append, registry=registry, **kwargs)
+    return httpx.Client(transport=gateway, base_url="https://fake.supabase.co"), registry, sleeps
+
+
+def test_reads_retry_with_backoff_and_writes_do_not():
+    """Test: una lectura se reintenta con backoff creciente; una escritura se intenta una sola vez"""
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        if len(calls) < 3:
+            raise httpx.ConnectError("conexión rechazada", request=request)
+        return httpx.Response(200, json=[{'ok': True}])
+
+    client, registry, sleeps = make_gateway(handler, read_retries=2, backoff=0.1)
+    assert client.get("/rest/v1/products").json() == [{'ok': True}]
+    assert calls == ['GET'] * 3
+    assert sleeps == [0.05, 0.1]
+    assert registry.get("supabase_retries_total").value == 2
+
+    calls.clear()
+    with pytest.raises(httpx.ConnectError):
+        client.post("/rest/v1/orders", json={'total': 1000})
+    assert calls == ['POST']
+
+
+def test_breaker_opens_fails_fast_and_recovers():
+    """Test: tras N fallos seguidos se rechaza sin tocar la red; pasado el reset una prueba exitosa lo cierra"""
+    clock = Clock()
+    healthy = {'up': False}
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if not healthy['up']:
+            return httpx.Response(503)
+        return httpx.Response(200, json=[])
+
+    client, registry, _ = make_gateway(handler, threshold=3, clock=clock, read_retries=0)
+    for _ in range(3):
+        assert client.get("/rest/v1/products").status_code == 503
+    state = registry.get("supabase_circuit_state")
+    assert state.value == CircuitBreaker.OPEN
+    assert registry.get("supabase_circuit_trips_total").value == 1
+
+    before = len(calls)
+    with pytest.raises(DatabaseUnavailable):
+        client.post("/rest/v1/orders", json={})
+    assert len(calls) == before
+    assert registry.get("supabase_rejected_total").value == 1
+
+    # Una prueba fallida reabre el circuito de inmediato
+    clock.now = 31
+    assert client.get("/rest/v1/products").status_code == 503
+    assert state.value == CircuitBreaker.OPEN
+
+    clock.now = 62
+    healthy['up'] = True
+    assert client.get("/rest/v1/products").status_code == 200
+    assert state.value == CircuitBreaker.CLOSED
+    assert client.post("/rest/v1/orders", json={}).status_code == 200
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(1.5)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"[]")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_deadline_covers_the_whole_read():
+    """Test: con la base colgada la lectura falla al vencer su plazo, no el timeout HTTP"""
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        registry = MetricsRegistry()
+        breaker = CircuitBreaker("supabase", registry=registry)
+        gateway = GatewayTransport(httpx.HTTPTransport(), breaker, read_deadline=0.3, read_retries=2,
+                                   registry=registry)
+        client = httpx.Client(transport=gateway, timeout=30)
+
+        started = time.monotonic()
+        with pytest.raises(httpx.TimeoutException):
+            client.get(f"http://127.0.0.1:{httpd.server_address[1]}/rest/v1/products")
+        assert time.monotonic() - started < 1.0
+        assert breaker.failures == 1
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+class TrickleHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "20")
+        self.end_headers()
+        for _ in range(20):
+            self.wfile.write(b"x")
+            self.wfile.flush()
+            time.sleep(0.1)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_deadline_cuts_a_trickling_response():
+    """Test: un servidor que manda bytes de a poco no estira la lectura más allá del plazo"""
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), TrickleHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        registry = MetricsRegistry()
+        gateway = GatewayTransport(httpx.HTTPTransport(), CircuitBreaker("supabase", registry=registry),
+                                   read_deadline=0.5, read_retries=0, registry=registry)
+        client = httpx.Client(transport=gateway, timeout=30)
+
+        started = time.monotonic()
+        with pytest.raises(httpx.ReadTimeout):
+            client.get(f"http://127.0.0.1:{httpd.server_address[1]}/rest/v1/products")
+        assert time.monotonic() - started < 1.0
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_error_handler_replies_on_callbacks():
+    """Test: con la base caída, un toque de botón recibe el aviso como mensaje y no con un segundo answer()"""
+    class FakeBot:
+        def __init__(self):
+            self.sent, self.answered = [], []
+
+        async def send_message(self, chat_id, text, **kwargs):
+            self.sent.append((chat_id, text))
+
+        async def answer_callback_query(self, *args, **kwargs):
+            self.answered.append(args)
+
+    bot = FakeBot()
+    message = Message(1, datetime.now(), Chat(42, "private"))
+    message.set_bot(bot)
+    query = CallbackQuery(id="1", from_user=User(42, "Ana", False), chat_instance="c", data="add_7", message=message)
+    query.set_bot(bot)
+    context = SimpleNamespace(error=DatabaseUnavailable("circuito abierto"))
+
+    asyncio.run(on_error(Update(update_id=1, callback_query=query), context))
+
+    assert bot.sent == [(42, DatabaseUnavailable.USER_MESSAGE)]
+    assert bot.answered == []
@@ -0,0 +1,146 @@
+"""
+Tests del motor de reglas de descuento compiladas
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+from app.services.discount_rules import CompiledRules, DiscountEngine
+from app.services.discount_service import DiscountService
+from tests.fake_supabase import FakeSupabase
+
+NOW = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def rule_row(discount_id, value, **kwargs):
+    row = {'discount_id': discount_id, 'name': f'Regla {discount_id}', 'code': None, 'discount_type': 'percentage',
+           'value': value, 'min_order_amount': 0, 'min_quantity': 0, 'user_id': None, 'category_id': None,
+           'start_date': None, 'end_date': None, 'max_uses': None, 'current_uses': 0, 'active': True}
+    row.update(kwargs)
+    return row
+
+
+def linear_discount(cart):
+    """Cálculo anterior: recorrer DISCOUNT_TIERS"""
+    subtotal = sum(i['precio'] * i['cantidad'] for i in cart)
+    quantity = sum(i['cantidad'] for i in cart)
+    pct = next((t['discount_percent'] for t in DiscountService.DISCOUNT_TIERS if quantity >= t['min_quantity']), 0)
+    return subtotal, pct, subtotal * pct / 100
+
+
+def test_fallback_tiers_match_previous_calculation():
+    """Test: sin reglas en la tabla, los tramos fijos dan lo mismo que antes"""
+    engine = DiscountEngine(lambda: FakeSupabase({'discounts': []}), fallback=DiscountService.engine().fallback)
+    rng = random.Random(3)
+    for _ in range(300):
+        cart = [{'precio': rng.choice([1000, 2500, 4000]), 'cantidad': rng.randint(1, 40)} for _ in range(rng.randint(1, 5))]
+        quote = engine.quote(cart)
+        assert (quote.subtotal, quote.percent, quote.amount) == linear_discount(cart)
+
+
+def test_scopes_pick_best_saving():
+    """Test: se aplica el mejor descuento entre global, cliente y categoría"""
+    compiled = CompiledRules.from_rows([
+        rule_row(1, 5, min_quantity=10),
+        rule_row(2, 10, min_quantity=50),
+        rule_row(3, 20000, discount_type='fixed', min_order_amount=100000),
+        rule_row(4, 12, user_id=7),
+        rule_row(5, 50, category_id=3, min_quantity=5),
+        rule_row(6, 30, min_quantity=5, min_order_amount=500000),
+    ], NOW)
+    cart = [{'precio': 2000, 'cantidad': 12, 'category_id': 1}, {'precio': 1000, 'cantidad': 4, 'category_id': 3}]
+
+    assert compiled.quote(cart).rule.discount_id == 1
+    assert compiled.quote(cart, user_id=7).rule.discount_id == 4
+    assert compiled.quote(cart, user_id=8).rule.discount_id == 1
+
+    # 5 unidades de la categoría 3: 50% de 5000 = 2500 gana al 5% de 29000
+    cart[1]['cantidad'] = 5
+    quote = compiled.quote(cart)
+    assert (quote.rule.discount_id, quote.amount) == (5, 2500)
+
+    big = [{'precio': 10000, 'cantidad': 60}]
+    assert compiled.quote(big).rule.discount_id == 6
+    assert compiled.quote([{'precio': 50000, 'cantidad': 3}]).amount == 20000
+
+
+def test_only_current_automatic_rules():
+    """Test: se ignoran cupones, reglas agotadas y fuera de vigencia"""
+    compiled = CompiledRules.from_rows([
+        rule_row(1, 10, code='NAVIDAD'),
+        rule_row(2, 10, max_uses=5, current_uses=5),
+        rule_row(3, 10, start_date=(NOW + timedelta(days=1)).isoformat()),
+        rule_row(4, 10, end_date=(NOW - timedelta(days=1)).isoformat()),
+        rule_row(5, 3, end_date=(NOW + timedelta(hours=2)).isoformat()),
+    ], NOW)
+
+    assert [r.discount_id for r in compiled.rules] == [5]
+    assert compiled.valid_until == NOW + timedelta(hours=2)
+
+
+def test_recompiles_only_on_changes():
+    """Test: releer la tabla sin cambios no recompila; un cambio o una vigencia sí"""
+    db = FakeSupabase({'discounts': [rule_row(1, 5, min_quantity=10)]})
+    clock = [NOW]
+    engine = DiscountEngine(lambda: db, ttl=0, clock=lambda: clock[0])
+    cart = [{'precio': 1000, 'cantidad': 10}]
+
+    for _ in range(5):
+        assert engine.quote(cart).percent == 5
+    assert engine.compilations == 1
+
+    db.table('discounts').update({'value': 8}).eq('discount_id', 1).execute()
+    assert engine.quote(cart).percent == 8
+    assert engine.compilations == 2
+
+    db.table('discounts').insert(rule_row(2, 20, start_date=(NOW + timedelta(hours=1)).isoformat())).execute()
+    assert engine.quote(cart).percent == 8
+    clock[0] = NOW + timedelta(hours=1)
+    assert engine.quote(cart).percent == 20
+    assert engine.compilations == 4
+
+
+def test_quote_many():
+    """Test: la cotización en lote da lo mismo que una por una"""
+    engine = DiscountEngine(lambda: FakeSupabase({'discounts': [rule_row(1, 5, min_quantity=10), rule_row(2, 9, user_id=1)]}))
+    carts = [[{'precio': 1000, 'cantidad': q}] for q in range(1, 30)]
+    users = [1 if q % 2 else None for q in range(1, 30)]
+
+    assert engine.quote_many(carts, users) == [engine.quote(c, u) for c, u in zip(carts, users)]
+
+
+def test_fallback_tiers_stay_global_until_a_global_rule_exists():
+    """Test: una regla de cliente o categoría no quita los tramos de respaldo; una global sí"""
+    db = FakeSupabase({'discounts': [rule_row(1, 50, category_id=3, min_quantity=5)]})
+    engine = DiscountEngine(lambda: db, ttl=0, fallback=DiscountService.engine().fallback)
+    cart = [{'precio': 1000, 'cantidad': 60, 'category_id': 1}]
+
+    assert engine.quote(cart).percent == 10
+    assert [r.min_quantity for r in engine.rules().quantity_tiers()] == [20, 50, 100]
+
+    db.table('discounts').insert(rule_row(2, 3, min_quantity=10)).execute()
+    assert engine.quote(cart).percent == 3
+    assert [r.min_quantity for r in engine.rules().quantity_tiers()] == [10]
+
+
+def test_record_usage_counts_until_max_uses(monkeypatch):
+    """Test: cada pedido con la regla suma un uso y deja su fila; al llegar a max_uses deja de aplicarse"""
+    from app.services import discount_service
+
+    db = FakeSupabase({'discounts': [rule_row(1, 10, min_quantity=5, max_uses=2)], 'discount_usage': []},
+                      primary_keys={'discount_usage': 'usage_id'})
+    monkeypatch.setattr(discount_service, 'supabase_client', lambda: db)
+    engine = DiscountEngine(lambda: db, fallback=DiscountService.engine().fallback)
+    monkeypatch.setattr(DiscountService, '_engine', engine)
+    cart = [{'precio': 1000, 'cantidad': 6}]
+
+    # Sin use_discount en la base se registra igual, leyendo y escribiendo las filas
+    for order_id in (1, 2):
+        quote = DiscountService.quote(cart, user_id=7)
+        assert quote.rule.discount_id == 1
+        assert DiscountService.record_usage(quote.rule.discount_id, 7, quote.amount, order_id=order_id)
+
+    assert db.tables['discounts'][0]['current_uses'] == 2
+    assert [(u['order_id'], u['user_id'], u['amount_saved']) for u in db.tables['discount_usage']] == \
+        [(1, 7, 600.0), (2, 7, 600.0)]
+    assert not DiscountService.record_usage(1, 7, 600.0)
+    assert DiscountService.quote(cart).rule is None
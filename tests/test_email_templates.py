@@ -0,0 +1,117 @@
+"""
+Tests de los templates de email (salida dorada y escapado)
+
+Para regenerar los archivos dorados tras un cambio intencional:
+    UPDATE_GOLDEN=1 python -m pytest tests/test_email_templates.py
+"""
+import os
+from pathlib import Path
+
+import pytest
+
+from app.services.email_service import EmailService
+from app.utils.email_templates import (
+    get_new_order_email_html,
+    get_order_confirmation_email_html
+)
+from app.utils.template_engine import TemplateEngine, templates
+
+GOLDEN_DIR = Path(__file__).parent / "golden" / "email"
+
+ITEMS = [
+    {'product_name': 'Milhoja de Arequipe', 'cantidad': 12, 'precio_unitario': 3500, 'subtotal': 42000},
+    {'product_name': 'Pastel de Pollo', 'cantidad': 3, 'precio_unitario': 4200, 'subtotal': 12600},
+]
+
+ORDER = {
+    'order_id': 1042,
+    'nombre_cliente': 'Ana Gómez',
+    'total': 54600,
+    'fecha': '2025-01-15 09:30',
+    'items': ITEMS
+}
+
+
+def render_cases():
+    return {
+        'pre_order.html': EmailService._render_pre_order_email({
+            'numero_cotizacion': 'COT-20250115-0007',
+            'total': 54600,
+            'nombre_cliente': 'Ana Gómez'
+        })[1],
+        'admin_order.html': EmailService._render_admin_order_email(ORDER)[1],
+        'admin_digest.html': EmailService._render_admin_digest_email([
+            ORDER,
+            {**ORDER, 'order_id': 1043, 'total': 7000, 'items': ITEMS[:1]}
+        ])[1],
+        'new_order.html': get_new_order_email_html(1042, 'Ana Gómez', 54600, items_count=2),
+        'order_confirmation.html': get_order_confirmation_email_html(1042, 'Ana Gómez', 54600),
+    }
+
+
+@pytest.fixture(autouse=True)
+def fixed_sender(monkeypatch):
+    monkeypatch.setattr(EmailService, "FROM_EMAIL", "pedidos@milhojaldres.com")
+
+
+@pytest.mark.parametrize("name", [
+    'pre_order.html',
+    'admin_order.html',
+    'admin_digest.html',
+    'new_order.html',
+    'order_confirmation.html'
+])
+def test_golden_output(name):
+    """Test: cada template produce exactamente la salida aprobada"""
+    html = render_cases()[name]
+    golden = GOLDEN_DIR / name
+
+    if os.getenv("UPDATE_GOLDEN"):
+        golden.parent.mkdir(parents=True, exist_ok=True)
+        golden.write_text(html, encoding="utf-8")
+
+    assert html == golden.read_text(encoding="utf-8")
+
+
+def test_values_are_escaped():
+    """Test: datos del cliente no pueden inyectar HTML"""
+    order = {**ORDER, 'nombre_cliente': '<script>alert(1)</script>', 'items': [
+        {**ITEMS[0], 'product_name': 'Torta "especial" & <b>grande</b>'}
+    ]}
+    _, html = EmailService._render_admin_order_email(order)
+
+    assert '<script>' not in html
+    assert '&lt;script&gt;alert(1)&lt;/script&gt;' in html
+    assert 'Torta &#34;especial&#34; &amp; &lt;b&gt;grande&lt;/b&gt;' in html
+
+
+def test_item_rows_rendered_by_loop():
+    """Test: una fila de tabla por producto"""
+    items = [{**ITEMS[0], 'product_name': f'Producto {i}'} for i in range(25)]
+    _, html = EmailService._render_admin_order_email({**ORDER, 'items': items})
+
+    assert html.count('<td style="padding: 8px; border: 1px solid #ddd; text-align: center;">') == 25
+
+
+def test_partial_items_render_with_defaults():
+    """Test: un item sin precio ni subtotal no impide enviar el email al admin"""
+    _, html = EmailService._render_admin_order_email({'order_id': 1, 'total': 5, 'items': [{'product_name': 'x'}]})
+    assert '>$0</td>' in html
+
+    _, html = EmailService._render_admin_digest_email([{'order_id': 2, 'items': [{}]}])
+    assert 'N/A x0' in html
+
+
+def test_css_partials_shared():
+    """Test: los estilos comunes vienen del mismo partial en todos los templates"""
+    for html in render_cases().values():
+        assert '.content { padding: 20px; background-color: #f9f9f9; }' in html
+
+
+def test_templates_precompiled():
+    """Test: todos los templates se compilan al crear el motor"""
+    engine = TemplateEngine()
+
+    assert 'email/admin_order.html' in engine._compiled
+    assert 'email/partials/base.css' in engine._compiled
+    assert templates.get('email/pre_order.html') is templates.get('email/pre_order.html')
@@ -0,0 +1,106 @@
+"""
+Tests del pool SMTP y del transporte asíncrono de emails
+"""
+import asyncio
+
+import pytest
+
+from app.services.email_service import EmailService
+from app.services.smtp_pool import AsyncMailTransport, SMTPConnectionPool
+from app.utils.local_smtp import LocalSMTPServer
+
+
+@pytest.fixture
+def smtp_server():
+    with LocalSMTPServer() as server:
+        yield server
+
+
+def make_pool(server, **kwargs):
+    return SMTPConnectionPool(
+        host=server.host,
+        port=server.port,
+        user="bot@test.com",
+        password="secret",
+        use_tls=False,
+        **kwargs
+    )
+
+
+def build_messages(n):
+    return [
+        EmailService._build_message(f"cliente{i}@test.com", f"Asunto {i}", "<p>Hola</p>")
+        for i in range(n)
+    ]
+
+
+def test_bulk_send_reuses_one_session(smtp_server):
+    """Test: varios mensajes viajan por una sola conexión autenticada"""
+    pool = make_pool(smtp_server)
+
+    results = pool.send_messages(build_messages(5))
+    results += pool.send_messages(build_messages(3))
+
+    assert results == [True] * 8
+    assert len(smtp_server.messages) == 8
+    assert smtp_server.connections == 1
+    assert smtp_server.logins == 1
+    pool.close()
+
+
+def test_reconnects_when_server_drops_session(smtp_server):
+    """Test: si el servidor cierra la sesión, el pool reconecta y reintenta"""
+    pool = make_pool(smtp_server)
+    pool.send_messages(build_messages(1))
+
+    smtp_server.disconnect_all()
+    results = pool.send_messages(build_messages(2))
+
+    assert results == [True, True]
+    assert len(smtp_server.messages) == 3
+    assert pool.reconnects == 1
+    pool.close()
+
+
+def test_keepalive_probes_idle_connections(smtp_server):
+    """Test: conexiones inactivas se validan con NOOP y se reemplazan si murieron"""
+    pool = make_pool(smtp_server, keepalive=0)
+    pool.send_messages(build_messages(1))
+
+    smtp_server.disconnect_all()
+    assert pool.send_messages(build_messages(1)) == [True]
+    assert smtp_server.connections == 2
+    pool.close()
+
+
+def test_async_transport_does_not_block(smtp_server):
+    """Test: el transporte async envía en paralelo hasta el tamaño del pool"""
+    transport = AsyncMailTransport(make_pool(smtp_server, size=2))
+
+    async def run():
+        return await asyncio.gather(*(transport.send(m) for m in build_messages(6)))
+
+    results = asyncio.run(run())
+    transport.close()
+
+    assert results == [True] * 6
+    assert len(smtp_server.messages) == 6
+    assert smtp_server.connections <= 2
+
+
+def test_email_service_send_bulk(smtp_server, monkeypatch):
+    """Test: EmailService.send_bulk usa el transporte compartido"""
+    monkeypatch.setattr(EmailService, "SMTP_USER", "bot@test.com")
+    monkeypatch.setattr(EmailService, "SMTP_PASSWORD", "secret")
+    monkeypatch.setattr(EmailService, "_transport", AsyncMailTransport(make_pool(smtp_server)))
+
+    emails = [
+        {'to_email': f"c{i}@test.com", 'subject': f"Pedido {i}", 'body_html': "<p>ok</p>"}
+        for i in range(4)
+    ]
+    results = asyncio.run(EmailService.send_bulk(emails))
+    EmailService.close_transport()
+
+    assert results == [True] * 4
+    assert [m['Subject'] for m in smtp_server.messages] == [f"Pedido {i}" for i in range(4)]
+    assert smtp_server.connections == 1
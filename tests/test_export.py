@@ -0,0 +1,99 @@
+"""
+Tests de la exportación en streaming (CSV, XLSX y Parquet)
+"""
+import csv
+import os
+import zipfile
+from datetime import date, datetime, timedelta, timezone
+from xml.etree import ElementTree
+
+import pandas as pd
+import pytest
+
+from app.services.export import export_range
+from tests.fake_supabase import FakeSupabase
+
+BASE = datetime(2025, 1, 1, 10, 0, tzinfo=timezone.utc)
+NS = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+
+def make_db(n_orders=50):
+    orders = [
+        {'order_id': i, 'user_id': 1, 'estado': 'delivered', 'subtotal': 100.0 * i, 'tax': 0, 'delivery_fee': 0,
+         'total': 100.0 * i, 'is_paid': i % 2 == 0, 'notas': 'Sin "azúcar", <gracias> & más' if i == 3 else None,
+         'fecha_orden': (BASE + timedelta(hours=12 * i)).isoformat()}
+        for i in range(1, n_orders + 1)
+    ]
+    items = [
+        {'item_id': 10 * i + k, 'order_id': i, 'product_id': k, 'cantidad': k, 'precio_unitario': 50.0,
+         'subtotal': 50.0 * k, 'products': {'nombre': f'Producto {k}', 'categoria': 'Hojaldres'}}
+        for i in range(1, n_orders + 1) for k in (1, 2)
+    ]
+    return FakeSupabase({'orders': orders, 'order_items': items}, max_rows=1000)
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_csv_pages_through_range(tmp_path):
+    """Test: el CSV tiene solo los pedidos del rango y se lee por páginas"""
+    db = make_db()
+    [path] = export_range(db, 'orders', 'csv', date(2025, 1, 3), date(2025, 1, 10), str(tmp_path), page_size=4)
+
+    rows = read_csv(path)
+    assert [int(r['order_id']) for r in rows] == list(range(4, 20))
+    assert rows[0].keys() >= {'order_id', 'total', 'fecha_orden', 'notas'}
+    assert db.count_queries('orders') == 5
+    assert os.path.basename(path) == 'pedidos_2025-01-03_2025-01-10.csv'
+
+
+def test_items_and_chunks(tmp_path):
+    """Test: los items llevan producto, categoría y fecha, y chunk_rows parte en archivos completos"""
+    db = make_db(10)
+    paths = export_range(db, 'items', 'csv', date(2025, 1, 1), date(2025, 12, 31), str(tmp_path),
+                         chunk_rows=7, page_size=3)
+
+    assert len(paths) == 3
+    parts = [read_csv(p) for p in paths]
+    assert [len(p) for p in parts] == [7, 7, 6]
+    rows = [r for part in parts for r in part]
+    assert [int(r['item_id']) for r in rows[:4]] == [11, 12, 21, 22]
+    assert (rows[0]['producto'], rows[0]['categoria']) == ('Producto 1', 'Hojaldres')
+    assert rows[0]['fecha_orden'].startswith('2025-01-01T22:00')
+
+
+def test_xlsx_is_valid_workbook(tmp_path):
+    """Test: el XLSX es un zip válido con textos escapados y números como números"""
+    [path] = export_range(make_db(5), 'orders', 'xlsx', date(2025, 1, 1), date(2025, 1, 31), str(tmp_path))
+
+    with zipfile.ZipFile(path) as book:
+        assert {'[Content_Types].xml', 'xl/workbook.xml', 'xl/worksheets/sheet1.xml'} <= set(book.namelist())
+        sheet = ElementTree.fromstring(book.read('xl/worksheets/sheet1.xml'))
+
+    rows = sheet.findall('.//s:row', NS)
+    assert len(rows) == 6
+    header = [c.findtext('.//s:t', namespaces=NS) for c in rows[0]]
+    assert header[0] == 'order_id'
+    notas = [c.findtext('.//s:t', namespaces=NS) for c in rows[3] if c.get('r').startswith('I')]
+    assert notas == ['Sin "azúcar", <gracias> & más']
+    assert rows[1][0].findtext('s:v', namespaces=NS) == '1'
+
+
+def test_parquet_has_typed_schema(tmp_path):
+    """Test: el Parquet conserva tipos (timestamp UTC, enteros, booleanos)"""
+    [path] = export_range(make_db(), 'orders', 'parquet', date(2025, 1, 1), date(2025, 1, 31), str(tmp_path),
+                          page_size=10)
+
+    df = pd.read_parquet(path)
+    assert len(df) == 50
+    assert str(df['fecha_orden'].dtype) == 'datetime64[us, UTC]'
+    assert df['is_paid'].sum() == 25
+    assert df['notas'].isna().sum() == 49
+
+
+def test_unknown_format(tmp_path):
+    """Test: formatos y tipos desconocidos fallan antes de consultar"""
+    with pytest.raises(ValueError):
+        export_range(make_db(), 'orders', 'json', date(2025, 1, 1), date(2025, 1, 2), str(tmp_path))
@@ -0,0 +1,123 @@
+"""
+Tests del registro de clientes HTTP (pool compartido y métricas)
+"""
+import importlib.util
+import json
+import sys
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.utils.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def ClientRegistry(monkeypatch):
+    """
+    ClientRegistry con los paquetes reales de supabase y openai
+
+    tests/test_ai_logic.py reemplaza esos paquetes por mocks en sys.modules;
+    aquí se quitan mientras dura el test y se carga una copia del módulo.
+    """
+    mocked = [m for m in sys.modules
+              if m.split('.')[0] in ('supabase', 'openai') and not isinstance(sys.modules[m], types.ModuleType)]
+    if not mocked:
+        from app.utils.http_clients import ClientRegistry as registry_class
+        return registry_class
+
+    for name in mocked:
+        monkeypatch.delitem(sys.modules, name)
+    spec = importlib.util.find_spec('app.utils.http_clients')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.ClientRegistry
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        # PostgREST manda un cuerpo "{}" incluso en GET; hay que consumirlo
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        body = json.dumps([{'path': self.path}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def value(registry, name):
+    return registry.get(name).value
+
+
+def test_clients_share_one_connection(server, ClientRegistry):
+    """Test: dos clientes del registro reutilizan la misma conexión keep-alive"""
+    stats = MetricsRegistry()
+    registry = ClientRegistry(stats)
+
+    a = registry.http_client(base_url=server)
+    b = registry.http_client(base_url=server)
+    for _ in range(3):
+        assert a.get("/a").status_code == 200
+        assert b.get("/b").status_code == 200
+
+    assert value(stats, "http_requests_total") == 6
+    assert value(stats, "http_connections_opened_total") == 1
+    assert value(stats, "http_connections_reused_total") == 5
+    assert value(stats, "http_tls_handshakes_total") == 0
+
+    # Cerrar un cliente no cierra el pool
+    a.close()
+    b.get("/b")
+    assert value(stats, "http_connections_opened_total") == 1
+    registry.close()
+
+
+def test_supabase_goes_through_shared_pool(server, ClientRegistry):
+    """Test: las consultas PostgREST del cliente de Supabase usan el pool compartido"""
+    stats = MetricsRegistry()
+    registry = ClientRegistry(stats)
+
+    client = registry.supabase(server, "header.payload.signature")
+    assert registry.supabase(server, "header.payload.signature") is client
+
+    rows = client.table("orders").select("order_id").execute().data
+    client.table("orders").select("order_id").execute()
+
+    assert rows[0]['path'].startswith("/rest/v1/orders")
+    assert value(stats, "http_requests_total") == 2
+    assert value(stats, "http_connections_opened_total") == 1
+    registry.close()
+
+
+def test_close_is_lazy_and_recreates(server, ClientRegistry):
+    """Test: después de close() el siguiente pedido crea un pool nuevo"""
+    stats = MetricsRegistry()
+    registry = ClientRegistry(stats)
+
+    first = registry.supabase(server, "header.payload.signature")
+    first.table("users").select("user_id").execute()
+    registry.close()
+
+    second = registry.supabase(server, "header.payload.signature")
+    second.table("users").select("user_id").execute()
+
+    assert second is not first
+    assert value(stats, "http_connections_opened_total") == 2
+    registry.close()
@@ -0,0 +1,60 @@
+"""
+Tests de la lectura completa por keyset
+"""
+from app.utils.keyset import fetch_all, iter_pages
+from tests.fake_supabase import FakeSupabase
+
+
+def make_db(n, max_rows=1000):
+    rows = [{'discount_id': i, 'type': 'rule' if i % 3 == 0 else 'massive', 'code': f"D{i}"}
+            for i in range(1, n + 1)]
+    return FakeSupabase({'discounts': rows}, max_rows=max_rows)
+
+
+def test_plain_select_is_truncated_by_cap():
+    """Test: sin paginar, el servidor devuelve solo max-rows filas"""
+    db = make_db(2500)
+    assert len(db.table('discounts').select('*').execute().data) == 1000
+
+
+def test_fetch_all_reads_past_row_cap():
+    """Test: fetch_all trae todas las filas aunque la tabla supere max-rows"""
+    db = make_db(2500)
+
+    rows = fetch_all(db, 'discounts', key='discount_id')
+
+    assert [r['discount_id'] for r in rows] == list(range(1, 2501))
+    assert db.count_queries('discounts', 'select') == 3
+
+
+def test_iter_pages_yields_batches_with_filter_and_projection():
+    """Test: páginas del tamaño pedido, con filtro y proyección (la clave se agrega sola)"""
+    db = make_db(2500)
+
+    pages = list(iter_pages(db, 'discounts', key='discount_id', columns='code',
+                            page_size=300, filters=lambda q: q.eq('type', 'rule')))
+
+    assert [len(p) for p in pages] == [300, 300, 233]
+    assert set(pages[0][0]) == {'discount_id', 'code'}
+    assert all(r['discount_id'] % 3 == 0 for p in pages for r in p)
+
+
+def test_iter_pages_descending_and_resume():
+    """Test: recorrido descendente y reanudación desde un cursor"""
+    db = make_db(50)
+
+    desc = fetch_all(db, 'discounts', key='discount_id', desc=True, page_size=20)
+    assert [r['discount_id'] for r in desc] == list(range(50, 0, -1))
+
+    resumed = fetch_all(db, 'discounts', key='discount_id', after=40, page_size=20)
+    assert [r['discount_id'] for r in resumed] == list(range(41, 51))
+
+
+def test_exact_multiple_of_page_size_ends_with_empty_query():
+    """Test: si la última página llega llena se confirma el final sin devolver páginas vacías"""
+    db = make_db(2000)
+
+    pages = list(iter_pages(db, 'discounts', key='discount_id'))
+
+    assert [len(p) for p in pages] == [1000, 1000]
+    assert db.count_queries('discounts', 'select') == 3
@@ -0,0 +1,250 @@
+"""
+Tests de la réplica local del panel (sincronización incremental y persistencia)
+"""
+import os
+from datetime import date, datetime, timedelta, timezone
+
+# admin.pages.dashboard importa config.database, que exige credenciales
+os.environ.setdefault('SUPABASE_URL', 'https://fake.supabase.co')
+os.environ.setdefault('SUPABASE_KEY', 'header.payload.signature')
+
+from postgrest.exceptions import APIError
+
+from app.services.local_mirror import LocalMirror, MirrorTable
+from tests.fake_supabase import FakeSupabase
+
+BASE = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+TABLES = (
+    MirrorTable('orders', 'order_id', dates=('fecha_orden', 'updated_at')),
+    MirrorTable('products', 'product_id', watermark=None),
+)
+
+
+def ts(minutes):
+    return (BASE + timedelta(minutes=minutes)).isoformat()
+
+
+def make_db(n_orders, same_stamp=False, max_rows=1000):
+    orders = [
+        {'order_id': i, 'estado': 'pending', 'total': 1000 * i, 'fecha_orden': ts(i),
+         'updated_at': ts(0) if same_stamp else ts(i)}
+        for i in range(1, n_orders + 1)
+    ]
+    products = [{'product_id': 1, 'nombre': 'Milhoja'}]
+    return FakeSupabase({'orders': orders, 'products': products}, max_rows=max_rows)
+
+
+def make_mirror(db, path, **kwargs):
+    kwargs.setdefault('page_size', 100)
+    kwargs.setdefault('max_age', 0)
+    return LocalMirror(db, str(path), tables=TABLES, **kwargs)
+
+
+def test_initial_sync_pages_through_everything(tmp_path):
+    """Test: la primera sincronización trae todo por páginas"""
+    db = make_db(250)
+    mirror = make_mirror(db, tmp_path)
+
+    assert mirror.sync() == {'orders': 250, 'products': 1}
+
+    orders = mirror.frame('orders')
+    assert len(orders) == 250
+    assert orders['order_id'].is_unique
+    assert str(orders['fecha_orden'].dtype) == 'datetime64[ns, UTC]'
+    assert mirror.status()['orders']['watermark'] == ts(250)
+
+
+def test_incremental_sync_reads_only_changes(tmp_path):
+    """Test: después de la carga inicial solo viajan las filas cambiadas"""
+    db = make_db(5000, max_rows=1000)
+    mirror = make_mirror(db, tmp_path, page_size=1000, overlap=0)
+    mirror.sync()
+
+    db.tables['orders'][9].update({'estado': 'delivered', 'updated_at': ts(6000)})
+    db.tables['orders'].append({'order_id': 5001, 'estado': 'pending', 'total': 1, 'fecha_orden': ts(6001), 'updated_at': ts(6001)})
+    db.queries.clear()
+
+    changed = mirror.sync()
+
+    # Los dos cambios más la fila de la marca de agua (el límite es inclusivo)
+    assert changed['orders'] == 3
+    assert db.count_queries('orders') == 1
+    orders = mirror.frame('orders').set_index('order_id')
+    assert len(orders) == 5001
+    assert orders.loc[10, 'estado'] == 'delivered'
+
+
+def test_ties_on_page_boundary_are_not_lost(tmp_path):
+    """Test: muchas filas con el mismo updated_at cruzan varias páginas sin perderse"""
+    db = make_db(350, same_stamp=True)
+    mirror = make_mirror(db, tmp_path)
+
+    mirror.sync()
+
+    assert len(mirror.frame('orders')) == 350
+
+
+def test_overlap_rereads_late_commits(tmp_path):
+    """Test: una fila confirmada tarde con updated_at anterior a la marca de agua se recupera"""
+    db = make_db(10)
+    mirror = make_mirror(db, tmp_path, overlap=120)
+    mirror.sync()
+
+    db.tables['orders'].append({'order_id': 11, 'estado': 'pending', 'total': 1, 'fecha_orden': ts(9), 'updated_at': ts(9)})
+    mirror.sync()
+
+    assert 11 in set(mirror.frame('orders')['order_id'])
+    assert mirror.status()['orders']['watermark'] == ts(10)
+
+
+def test_persists_and_is_shared_through_disk(tmp_path):
+    """Test: otra instancia con el mismo directorio arranca desde disco y solo pide cambios"""
+    db = make_db(300)
+    make_mirror(db, tmp_path).sync()
+
+    db.queries.clear()
+    second = make_mirror(db, tmp_path, overlap=0)
+    assert len(second.frame('orders')) == 300
+
+    second.sync()
+    # Una consulta vacía de cambios, no la tabla completa
+    assert db.count_queries('orders') == 1
+
+
+def test_max_age_reuses_recent_sync(tmp_path):
+    """Test: varias sesiones dentro de max_age no vuelven a consultar"""
+    db = make_db(10)
+    mirror = make_mirror(db, tmp_path, max_age=60)
+
+    mirror.sync()
+    db.queries.clear()
+
+    assert mirror.sync() == {}
+    assert db.queries == []
+    assert mirror.sync(force=True)['products'] == 1
+
+
+def test_falls_back_to_full_reload_without_watermark_column(tmp_path):
+    """Test: si falta updated_at (migración sin correr) la tabla se recarga completa"""
+    db = make_db(5)
+
+    original = db.table
+
+    def table(name):
+        query = original(name)
+        if name == 'orders':
+            def broken_order(column, **kwargs):
+                if column == 'updated_at':
+                    raise APIError({'code': '42703', 'message': "column orders.updated_at does not exist"})
+                return type(query).order(query, column, **kwargs)
+            query.order = broken_order
+        return query
+
+    db.table = table
+    mirror = make_mirror(db, tmp_path)
+
+    assert mirror.sync()['orders'] == 5
+    assert mirror.status()['orders']['mode'] == 'full'
+
+
+def test_transient_error_keeps_the_current_frame(tmp_path):
+    """Test: un plazo vencido al pedir cambios no dispara una recarga completa"""
+    db = make_db(50)
+    mirror = make_mirror(db, tmp_path)
+    mirror.sync()
+
+    original = db.table
+
+    def table(name):
+        query = original(name)
+        if name == 'orders':
+            execute = query.execute
+
+            def timing_out_on_changes():
+                # Solo la consulta de cambios falla; una recarga completa sí respondería
+                if any(column == 'updated_at' for column, _ in query.orders):
+                    raise TimeoutError("Plazo agotado para GET /rest/v1/orders")
+                return execute()
+            query.execute = timing_out_on_changes
+        return query
+
+    db.table = table
+    db.queries.clear()
+
+    assert mirror.sync()['orders'] == 0
+    assert len(mirror.frame('orders')) == 50
+    assert mirror.status()['orders']['mode'] == 'incremental'
+    assert db.count_queries('orders') == 0
+
+
+def test_dashboard_summary_from_mirror(tmp_path):
+    """Test: el dashboard calcula sus métricas sobre los DataFrames de la réplica"""
+    from admin.pages.dashboard import summarize_dashboard
+
+    today = date(2025, 3, 20)
+    db = FakeSupabase({
+        'orders': [
+            {'order_id': 1, 'estado': 'delivered', 'total': 100, 'fecha_orden': '2025-03-02T10:00:00+00:00', 'updated_at': ts(0)},
+            {'order_id': 2, 'estado': 'pending', 'total': 50, 'fecha_orden': '2025-03-05T10:00:00+00:00', 'updated_at': ts(0)},
+            {'order_id': 3, 'estado': 'delivered', 'total': 70, 'fecha_orden': '2025-02-10T10:00:00+00:00', 'updated_at': ts(0)},
+        ],
+        'users': [
+            {'user_id': 1, 'created_at': '2025-03-03T00:00:00+00:00', 'updated_at': ts(0)},
+            {'user_id': 2, 'created_at': '2025-02-03T00:00:00+00:00', 'updated_at': ts(0)},
+        ],
+        'order_items': [
+            {'item_id': 1, 'order_id': 1, 'product_id': 1, 'cantidad': 3, 'subtotal': 90, 'updated_at': ts(0)},
+            {'item_id': 2, 'order_id': 2, 'product_id': 2, 'cantidad': 1, 'subtotal': 50, 'updated_at': ts(0)},
+        ],
+        'products': [{'product_id': 1, 'nombre': 'Milhoja'}, {'product_id': 2, 'nombre': 'Pandebono'}],
+    })
+    mirror = LocalMirror(db, str(tmp_path), max_age=0)
+    mirror.sync()
+
+    summary = summarize_dashboard(
+        mirror.frame('orders'), mirror.frame('users'), mirror.frame('order_items'), mirror.frame('products'),
+        today=today, now=datetime(2025, 3, 20, tzinfo=timezone.utc)
+    )
+
+    assert summary['revenue_month'] == 150
+    assert summary['revenue_last_month'] == 70
+    assert summary['orders_month'] == 2
+    assert summary['delivered_month'] == 1
+    assert summary['total_pending'] == 1
+    assert (summary['new_customers'], summary['new_customers_last']) == (1, 1)
+    assert summary['product_sales'].index[0] == 'Milhoja'
+    assert summary['status_counts'] == {'delivered': 2, 'pending': 1}
+    assert list(summary['recent_orders']['order_id']) == [2, 1, 3]
+
+
+def test_reconcile_drops_rows_deleted_upstream(tmp_path):
+    """Test: la comparación de claves quita las filas borradas; dentro del intervalo no se repite"""
+    db = make_db(300)
+    mirror = make_mirror(db, tmp_path, overlap=0, reconcile_interval=3600)
+    mirror.sync()
+
+    db.tables['orders'] = [row for row in db.tables['orders'] if row['order_id'] not in (5, 250)]
+    mirror.sync()
+    assert len(mirror.frame('orders')) == 300
+
+    mirror.reconcile_interval = 0
+    db.queries.clear()
+    mirror.sync()
+    # Cambios más las claves en páginas de 100
+    assert db.count_queries('orders') == 4
+    orders = set(mirror.frame('orders')['order_id'])
+    assert len(orders) == 298 and not {5, 250} & orders
+
+    # Persistido: otra instancia arranca sin las filas borradas
+    assert len(make_mirror(db, tmp_path).frame('orders')) == 298
+
+
+def test_rebuild_reloads_everything(tmp_path):
+    """Test: rebuild() recarga las tablas completas y reporta las filas"""
+    db = make_db(10)
+    mirror = make_mirror(db, tmp_path)
+    mirror.sync()
+
+    db.tables['orders'].pop()
+    assert mirror.rebuild() == {'orders': 9, 'products': 1}
+    assert len(mirror.frame('orders')) == 9
@@ -0,0 +1,70 @@
+"""
+Tests de la numeración por bloques
+"""
+import threading
+
+import pytest
+from postgrest.exceptions import APIError
+
+from app.services.numbering import NumberAllocator
+from tests.fake_supabase import FakeSupabase
+
+
+def lease_numbers(client, params):
+    """Igual que la función SQL: avanza la secuencia p_count números y retorna el primero"""
+    rows = client.tables.setdefault('number_sequences', [])
+    row = next((r for r in rows if r['name'] == params['p_name']), None)
+    if row is None:
+        row = {'name': params['p_name'], 'next_value': 1}
+        rows.append(row)
+    start = row['next_value']
+    row['next_value'] += params['p_count']
+    return start
+
+
+def make_client():
+    return FakeSupabase(functions={'lease_numbers': lease_numbers})
+
+
+def test_one_round_trip_per_block():
+    """Test: los números son consecutivos y solo se consulta al agotar un bloque"""
+    client = make_client()
+    allocator = NumberAllocator(lambda: client, 'cotizacion-2025', block_size=10)
+
+    assert [allocator.next() for _ in range(25)] == list(range(1, 26))
+    assert client.count_queries('lease_numbers') == 3
+
+
+def test_restarts_and_replicas_never_repeat():
+    """Test: varias réplicas con muchos hilos y un reinicio no repiten números"""
+    client = make_client()
+    replicas = [NumberAllocator(lambda: client, 'pdf', block_size=7) for _ in range(3)]
+    taken = []
+
+    def worker(allocator):
+        numbers = [allocator.next() for _ in range(200)]
+        taken.extend(numbers)
+
+    threads = [threading.Thread(target=worker, args=(replicas[i % 3],)) for i in range(9)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Reinicio: un proceso nuevo continúa después del último bloque reservado
+    restarted = NumberAllocator(lambda: client, 'pdf', block_size=7)
+    taken.append(restarted.next())
+
+    assert len(taken) == len(set(taken)) == 1801
+    assert client.count_queries('lease_numbers') == sum(r.leases for r in replicas) + 1
+
+
+def test_lease_failure_is_raised_and_retried():
+    """Test: si la base no responde se propaga el error y el siguiente intento reserva"""
+    client = FakeSupabase()
+    allocator = NumberAllocator(lambda: client, 'pdf', block_size=5)
+    with pytest.raises(APIError):
+        allocator.next()
+
+    client.functions['lease_numbers'] = lease_numbers
+    assert allocator.next() == 1
@@ -0,0 +1,170 @@
+"""
+Tests del modo digest de notificaciones de pedidos al admin
+"""
+import asyncio
+import io
+import zipfile
+from email.header import decode_header, make_header
+
+from app.services.email_service import EmailService
+from app.services.order_digest import OrderDigest, zip_pdfs
+from app.services.smtp_pool import AsyncMailTransport, SMTPConnectionPool
+from app.utils.local_smtp import LocalSMTPServer
+
+
+def make_order(order_id, total=10000):
+    return {
+        'order_id': order_id,
+        'nombre_cliente': 'Ana',
+        'total': total,
+        'fecha': '2025-01-01 10:00',
+        'items': [{'product_name': 'Milhoja', 'cantidad': 2}]
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.digests = []
+        self.immediate = []
+
+    async def send_digest(self, batch):
+        self.digests.append([entry['order_data']['order_id'] for entry in batch])
+        return True
+
+    async def send_now(self, order_data, pdf_path=None):
+        self.immediate.append(order_data['order_id'])
+        return True
+
+
+def test_orders_within_window_share_one_email():
+    """Test: pedidos seguidos se agrupan y se envían al cerrar la ventana"""
+    rec = Recorder()
+
+    async def run():
+        digest = OrderDigest(rec.send_digest, rec.send_now, window=0.05, max_latency=5)
+        for i in range(3):
+            await digest.add(make_order(i))
+        assert rec.digests == []
+        await asyncio.sleep(0.15)
+
+    asyncio.run(run())
+    assert rec.digests == [[0, 1, 2]]
+    assert rec.immediate == []
+
+
+def test_max_latency_caps_waiting_time():
+    """Test: un flujo continuo de pedidos no retrasa el digest más allá de max_latency"""
+    rec = Recorder()
+
+    async def run():
+        digest = OrderDigest(rec.send_digest, rec.send_now, window=0.05, max_latency=0.12)
+        for i in range(8):
+            await digest.add(make_order(i))
+            await asyncio.sleep(0.03)
+        await digest.close()
+
+    asyncio.run(run())
+    assert len(rec.digests) >= 2
+    assert sum(rec.digests, []) == list(range(8))
+
+
+def test_urgent_orders_skip_the_queue():
+    """Test: pedidos sobre el umbral se envían de inmediato"""
+    rec = Recorder()
+
+    async def run():
+        digest = OrderDigest(
+            rec.send_digest, rec.send_now,
+            window=10, max_latency=10, urgent_total=100000
+        )
+        await digest.add(make_order(1))
+        await digest.add(make_order(2, total=250000))
+        assert rec.immediate == [2]
+        assert digest.pending == 1
+        await digest.close()
+
+    asyncio.run(run())
+    assert rec.digests == [[1]]
+
+
+def test_max_orders_flushes_early():
+    """Test: al llegar a max_orders el lote se envía sin esperar la ventana"""
+    rec = Recorder()
+
+    async def run():
+        digest = OrderDigest(rec.send_digest, rec.send_now, window=10, max_latency=10, max_orders=2)
+        for i in range(5):
+            await digest.add(make_order(i))
+        await digest.close()
+
+    asyncio.run(run())
+    assert rec.digests == [[0, 1], [2, 3], [4]]
+
+
+def test_failed_digest_is_retried():
+    """Test: si el envío falla, los pedidos vuelven a la cola"""
+    calls = []
+
+    async def flaky(batch):
+        calls.append(len(batch))
+        return len(calls) > 1
+
+    async def run():
+        digest = OrderDigest(flaky, None, window=10, max_latency=10)
+        await digest.add(make_order(1))
+        assert await digest.flush() is False
+        assert digest.pending == 1
+        assert await digest.flush() is True
+        assert digest.pending == 0
+
+    asyncio.run(run())
+    assert calls == [1, 1]
+
+
+def test_zip_pdfs(tmp_path):
+    """Test: los PDFs existentes se comprimen y los inexistentes se ignoran"""
+    pdf = tmp_path / "Pedido_1.pdf"
+    pdf.write_bytes(b"%PDF-1.4 prueba")
+
+    content = zip_pdfs([str(pdf), str(tmp_path / "no_existe.pdf"), None])
+    names = zipfile.ZipFile(io.BytesIO(content)).namelist()
+
+    assert names == ["Pedido_1.pdf"]
+    assert zip_pdfs([None]) is None
+
+
+def test_email_service_sends_single_digest_email(tmp_path, monkeypatch):
+    """Test: EmailService agrupa pedidos en un email con un ZIP de PDFs"""
+    pdfs = []
+    for i in range(3):
+        pdf = tmp_path / f"Pedido_{i}.pdf"
+        pdf.write_bytes(b"%PDF-1.4")
+        pdfs.append(str(pdf))
+
+    with LocalSMTPServer() as server:
+        pool = SMTPConnectionPool(server.host, server.port, "bot@test.com", "secret", use_tls=False)
+        monkeypatch.setattr(EmailService, "SMTP_USER", "bot@test.com")
+        monkeypatch.setattr(EmailService, "SMTP_PASSWORD", "secret")
+        monkeypatch.setattr(EmailService, "ADMIN_EMAIL", "admin@test.com")
+        monkeypatch.setattr(EmailService, "DIGEST_ENABLED", True)
+        monkeypatch.setattr(EmailService, "DIGEST_WINDOW", 60)
+        monkeypatch.setattr(EmailService, "DIGEST_URGENT_TOTAL", 1000000)
+        monkeypatch.setattr(EmailService, "_transport", AsyncMailTransport(pool))
+        monkeypatch.setattr(EmailService, "_digest", None)
+
+        async def run():
+            for i in range(3):
+                assert await EmailService.notify_admin_new_order(make_order(i), pdfs[i])
+            assert server.messages == []
+            await EmailService.close_digest()
+
+        asyncio.run(run())
+        EmailService.close_transport()
+
+    assert len(server.messages) == 1
+    msg = server.messages[0]
+    assert str(make_header(decode_header(msg['Subject']))) == "🔔 3 Pedidos Nuevos - $30,000"
+    attachments = [p for p in msg.walk() if p.get_filename()]
+    assert len(attachments) == 1
+    archive = zipfile.ZipFile(io.BytesIO(attachments[0].get_payload(decode=True)))
+    assert sorted(archive.namelist()) == ["Pedido_0.pdf", "Pedido_1.pdf", "Pedido_2.pdf"]
@@ -0,0 +1,98 @@
+"""
+Tests del resumen de estadísticas de pedidos
+"""
+from datetime import datetime, timedelta, timezone
+
+from app.services.order_stats import BOGOTA_TZ, OrderStatsService
+from tests.fake_supabase import FakeSupabase
+
+
+def make_orders():
+    now = datetime.now(BOGOTA_TZ)
+    old = (now - timedelta(days=3)).astimezone(timezone.utc).isoformat()
+    today = now.astimezone(timezone.utc).isoformat()
+    return [
+        {'order_id': 1, 'estado': 'pending', 'total': 10000, 'fecha_orden': today},
+        {'order_id': 2, 'estado': 'pending', 'total': 5000, 'fecha_orden': old},
+        {'order_id': 3, 'estado': 'confirmed', 'total': 20000, 'fecha_orden': old},
+        {'order_id': 4, 'estado': 'cancelled', 'total': 7000, 'fecha_orden': today},
+    ]
+
+
+def summary_row(**overrides):
+    row = {
+        'total_orders': 4,
+        'total_revenue': 42000,
+        'by_state': {
+            'pending': {'count': 2, 'revenue': 15000},
+            'confirmed': {'count': 1, 'revenue': 20000},
+            'cancelled': {'count': 1, 'revenue': 7000},
+        },
+        'today_orders': 2,
+        'today_revenue': 17000,
+    }
+    row.update(overrides)
+    return row
+
+
+def test_summary_is_one_query():
+    """Test: el panel lee el resumen con una sola consulta, sin tocar orders"""
+    db = FakeSupabase({'orders': make_orders(), 'order_stats_summary': [summary_row()]})
+
+    stats = OrderStatsService.get_stats(db)
+
+    assert db.queries == [('order_stats_summary', 'select')]
+    assert stats['total_orders'] == 4
+    assert stats['by_state']['pending']['count'] == 2
+    assert stats['total_revenue'] == 42000
+
+
+def test_slow_path_matches_summary():
+    """Test: la ruta lenta calcula lo mismo que el resumen"""
+    db = FakeSupabase({'orders': make_orders(), 'order_stats_summary': [summary_row()]})
+
+    assert OrderStatsService.compute_from_orders(db) == OrderStatsService.get_summary(db)
+    assert OrderStatsService.check_consistency(db) == []
+
+
+def test_slow_path_pages_through_orders(monkeypatch):
+    """Test: la ruta lenta recorre por páginas aunque haya tope de filas"""
+    orders = [
+        {'order_id': i, 'estado': 'delivered', 'total': 1000, 'fecha_orden': '2024-01-01T12:00:00+00:00'}
+        for i in range(1, 2501)
+    ]
+    db = FakeSupabase({'orders': orders}, max_rows=1000)
+
+    stats = OrderStatsService.compute_from_orders(db)
+
+    assert stats['total_orders'] == 2500
+    assert stats['by_state']['delivered']['revenue'] == 2_500_000
+
+
+def test_consistency_checker_reports_drift():
+    """Test: si el resumen se desvía de los pedidos, el verificador lo reporta"""
+    drifted = summary_row(total_orders=5, by_state={
+        'pending': {'count': 3, 'revenue': 15000},
+        'confirmed': {'count': 1, 'revenue': 20000},
+        'cancelled': {'count': 1, 'revenue': 7000},
+    })
+    db = FakeSupabase({'orders': make_orders(), 'order_stats_summary': [drifted]})
+
+    problems = OrderStatsService.check_consistency(db)
+
+    assert any(p.startswith("total_orders") for p in problems)
+    assert any(p.startswith("pending") for p in problems)
+
+
+def test_falls_back_when_view_missing():
+    """Test: sin la vista instalada se usa la ruta lenta"""
+    class NoView(FakeSupabase):
+        def table(self, name):
+            if name == 'order_stats_summary':
+                raise RuntimeError('relation "order_stats_summary" does not exist')
+            return super().table(name)
+
+    stats = OrderStatsService.get_stats(NoView({'orders': make_orders()}))
+
+    assert stats['total_orders'] == 4
+    assert stats['today_orders'] == 2
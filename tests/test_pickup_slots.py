@@ -0,0 +1,198 @@
+"""
+Tests de puntos de recogida y cupos por franja
+"""
+import asyncio
+import os
+import threading
+from datetime import date, time, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+# app.handlers.preorders importa config.database, que exige credenciales
+os.environ.setdefault('SUPABASE_URL', 'https://fake.supabase.co')
+os.environ.setdefault('SUPABASE_KEY', 'header.payload.signature')
+
+from app.services.pickup_slots import LocationRegistry, PickupLocation, PickupService, SlotBook
+from tests.fake_supabase import FakeSupabase
+
+TODAY = date(2025, 3, 10)
+TOMORROW = TODAY + timedelta(days=1)
+
+
+def reserve_pickup_slot(client, params):
+    """Igual que la función SQL: suma una reserva solo si queda cupo"""
+    location = next(l for l in client.tables['pickup_locations'] if l['location_id'] == params['p_location_id'])
+    key = (params['p_location_id'], params['p_fecha'], params['p_hora'])
+    row = next((r for r in client.tables['pickup_slot_counts']
+                if (r['location_id'], r['fecha'], r['hora']) == key), None)
+    if row is None:
+        row = {'location_id': key[0], 'fecha': key[1], 'hora': key[2], 'reservados': 0}
+        client.tables['pickup_slot_counts'].append(row)
+    if row['reservados'] >= location['capacidad_por_hora']:
+        return None
+    row['reservados'] += 1
+    return row['reservados']
+
+
+def make_client(capacity=2):
+    return FakeSupabase({
+        'pickup_locations': [
+            {'location_id': 1, 'nombre': 'Norte', 'direccion': 'Calle 96b', 'barrio': 'Chicó', 'activo': True,
+             'orden_display': 2, 'capacidad_por_hora': capacity, 'hora_apertura': 8, 'hora_cierre': 11},
+            {'location_id': 2, 'nombre': 'Sur', 'direccion': 'Cra 81b', 'barrio': 'Kennedy', 'activo': True,
+             'orden_display': 1},
+            {'location_id': 3, 'nombre': 'Cerrado', 'activo': False, 'orden_display': 0},
+        ],
+        'pickup_slot_counts': [
+            {'location_id': 1, 'fecha': TOMORROW.isoformat(), 'hora': 9, 'reservados': 2},
+        ],
+    }, functions={'reserve_pickup_slot': reserve_pickup_slot})
+
+
+def test_registry_is_cached_and_ordered():
+    """Test: los puntos se leen una vez, en orden, con valores por defecto sin la migración"""
+    client = make_client()
+    registry = LocationRegistry(lambda: client, ttl=300)
+
+    assert [loc.nombre for loc in registry.all()] == ['Sur', 'Norte']
+    assert registry.get(2) == PickupLocation(2, 'Sur', 'Cra 81b', 'Kennedy')
+    assert registry.get(3) is None
+    registry.all()
+    assert client.count_queries('pickup_locations') == 1
+
+    registry.invalidate()
+    registry.all()
+    assert client.count_queries('pickup_locations') == 2
+
+
+def test_only_free_slots_are_offered():
+    """Test: las franjas llenas no se ofrecen y las consultas de cupo no van a la base"""
+    client = make_client()
+    location = LocationRegistry(lambda: client).get(1)
+    slots = SlotBook(lambda: client, clock=lambda: TODAY)
+
+    assert slots.available_hours(location, TOMORROW) == [(8, 2), (10, 2)]
+    assert slots.is_bookable(location, TOMORROW, 8)
+    assert not slots.is_bookable(location, TOMORROW, 9)
+    assert not slots.is_bookable(location, TOMORROW, 12)
+    assert not slots.is_bookable(location, TODAY, 8)
+    assert slots.available_days(location) == [TODAY + timedelta(days=i) for i in range(1, 8)]
+    assert client.count_queries('pickup_slot_counts') == 1
+
+
+def test_concurrent_confirmations_never_overbook():
+    """Test: muchas confirmaciones a la vez sobre la misma franja no pasan de la capacidad"""
+    client = make_client(capacity=3)
+    location = LocationRegistry(lambda: client).get(1)
+    # Dos procesos del bot con su propia copia de los contadores
+    books = [SlotBook(lambda: client, clock=lambda: TODAY) for _ in range(2)]
+
+    results = []
+    threads = [threading.Thread(target=lambda b=books[i % 2]: results.append(b.reserve(location, TOMORROW, 10)))
+               for i in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results.count(True) == 3
+    row = next(r for r in client.tables['pickup_slot_counts'] if r['hora'] == 10)
+    assert row['reservados'] == 3
+    assert all(not b.is_bookable(location, TOMORROW, 10) for b in books)
+
+
+def test_confirm_preorder_reoffers_hours_when_slot_filled(monkeypatch):
+    """Test: si la franja se llenó antes de confirmar se vuelven a mostrar solo las horas libres"""
+    from app.handlers import preorders
+
+    client = make_client(capacity=1)
+    monkeypatch.setattr(PickupService, '_registry', LocationRegistry(lambda: client))
+    monkeypatch.setattr(PickupService, '_slots', SlotBook(lambda: client, clock=lambda: TODAY))
+
+    update = MagicMock()
+    update.callback_query.answer = AsyncMock()
+    update.callback_query.edit_message_text = AsyncMock()
+    context = MagicMock()
+    context.user_data = {'preorder_location_id': 1, 'preorder_fecha': TOMORROW, 'preorder_hora': time(8, 0)}
+
+    # Otro cliente toma el único cupo de las 8
+    client.tables['pickup_slot_counts'].append(
+        {'location_id': 1, 'fecha': TOMORROW.isoformat(), 'hora': 8, 'reservados': 1})
+
+    state = asyncio.run(preorders.confirm_preorder(update, context))
+    assert state == preorders.SELECTING_TIME
+    markup = update.callback_query.edit_message_text.call_args.kwargs['reply_markup']
+    times = [row[0].callback_data for row in markup.inline_keyboard if row[0].callback_data.startswith('preorder_time_')]
+    assert times == ['preorder_time_10:00:00']
+
+
+def test_registry_falls_back_to_catalog_copy():
+    """Test: sin base y sin lectura previa, los puntos salen de la copia del catálogo"""
+    def down():
+        raise ConnectionError("Supabase no responde")
+
+    rows = [{'location_id': 3, 'nombre': 'Sur', 'activo': True, 'capacidad_por_hora': 4}]
+    registry = LocationRegistry(down, fallback=lambda: rows)
+    assert [loc.nombre for loc in registry.all()] == ['Sur']
+    assert registry.get(3).capacidad_por_hora == 4
+
+
+def release_pickup_slot(client, params):
+    """Igual que la función SQL: resta una reserva si la franja tiene alguna"""
+    key = (params['p_location_id'], params['p_fecha'], params['p_hora'])
+    row = next((r for r in client.tables['pickup_slot_counts']
+                if (r['location_id'], r['fecha'], r['hora']) == key and r['reservados'] > 0), None)
+    if row is None:
+        return None
+    row['reservados'] -= 1
+    return row['reservados']
+
+
+def test_reserve_falls_back_only_when_function_is_missing():
+    """Test: sin la función se reserva localmente; un timeout de la base no toma el cupo"""
+    client = make_client(capacity=1)
+    client.functions.clear()
+    location = LocationRegistry(lambda: client).get(1)
+    slots = SlotBook(lambda: client, clock=lambda: TODAY)
+    assert slots.reserve(location, TOMORROW, 8)
+    assert not slots.reserve(location, TOMORROW, 8)
+
+    def timeout(client, params):
+        raise httpx.ReadTimeout("Plazo agotado")
+
+    client.functions['reserve_pickup_slot'] = timeout
+    with pytest.raises(httpx.ReadTimeout):
+        slots.reserve(location, TOMORROW, 10)
+    assert slots.free(location, TOMORROW, 10) == 1
+
+
+def test_cancelled_preorder_releases_its_slot(monkeypatch):
+    """Test: confirmar toma el cupo y cancelar la pre-orden lo devuelve, una sola vez"""
+    from app.handlers import preorders
+
+    client = make_client(capacity=1)
+    client.functions['release_pickup_slot'] = release_pickup_slot
+    monkeypatch.setattr(PickupService, '_registry', LocationRegistry(lambda: client))
+    monkeypatch.setattr(PickupService, '_slots', SlotBook(lambda: client, clock=lambda: TODAY))
+
+    update = MagicMock()
+    update.callback_query.answer = AsyncMock()
+    update.callback_query.edit_message_text = AsyncMock()
+    context = MagicMock()
+    context.user_data = {'preorder_location_id': 1, 'preorder_fecha': TOMORROW, 'preorder_hora': time(8, 0)}
+
+    asyncio.run(preorders.confirm_preorder(update, context))
+    markup = update.callback_query.edit_message_text.call_args.kwargs['reply_markup']
+    assert markup.inline_keyboard[0][0].callback_data == f"preorder_release_1_{TOMORROW.isoformat()}_8"
+    location = PickupService.registry().get(1)
+    assert not PickupService.slots().is_bookable(location, TOMORROW, 8)
+
+    context.args = [1, TOMORROW, 8]
+    asyncio.run(preorders.release_preorder(update, context))
+    asyncio.run(preorders.release_preorder(update, context))
+    row = next(r for r in client.tables['pickup_slot_counts'] if r['hora'] == 8)
+    assert row['reservados'] == 0
+    assert PickupService.slots().is_bookable(location, TOMORROW, 8)
+    update.callback_query.answer.assert_awaited_with("Esta pre-orden ya no está activa")
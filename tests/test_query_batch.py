@@ -0,0 +1,86 @@
+"""
+Tests del lote de consultas concurrentes
+"""
+import asyncio
+import time
+
+from app.utils.query_batch import QueryBatch, run_queries
+
+
+def slow(value, seconds):
+    def fn():
+        time.sleep(seconds)
+        return value
+    return fn
+
+
+def test_runs_queries_concurrently():
+    """Test: el tiempo total es el de la consulta más lenta, no la suma"""
+    batch = QueryBatch(timeout=2)
+    for i in range(6):
+        batch.add(f"q{i}", slow(i, 0.1))
+
+    result = batch.run()
+
+    assert result.ok
+    assert [result[f"q{i}"] for i in range(6)] == list(range(6))
+    assert result.elapsed < 0.3
+    assert all(t >= 0.09 for t in result.timings.values())
+
+
+def test_deadline_returns_partial_results():
+    """Test: lo que supera el plazo queda con su default y el resto llega"""
+    batch = QueryBatch(timeout=0.2)
+    batch.add("fast", slow("ok", 0.01))
+    batch.add("stuck", slow("tarde", 1.0), default=[])
+
+    start = time.perf_counter()
+    result = batch.run()
+
+    assert time.perf_counter() - start < 0.5
+    assert result["fast"] == "ok"
+    assert result["stuck"] == []
+    assert result.timed_out == ["stuck"]
+    assert not result.ok
+
+
+def test_errors_are_isolated():
+    """Test: una consulta que falla no tumba a las demás"""
+    def broken():
+        raise RuntimeError("relation does not exist")
+
+    result = run_queries({"good": lambda: 1, "bad": broken}, default=0)
+
+    assert result["good"] == 1
+    assert result["bad"] == 0
+    assert isinstance(result.errors["bad"], RuntimeError)
+    assert result.failed == ["bad"]
+
+
+def test_duplicate_name_rejected():
+    """Test: dos consultas con el mismo nombre son un error de programación"""
+    batch = QueryBatch().add("a", lambda: 1)
+    try:
+        batch.add("a", lambda: 2)
+    except ValueError:
+        return
+    raise AssertionError("se esperaba ValueError")
+
+
+def test_run_async_does_not_block_loop():
+    """Test: run_async deja correr otras tareas mientras espera"""
+    batch = QueryBatch(timeout=1).add("q", slow(1, 0.1))
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(1)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        result, _ = await asyncio.gather(batch.run_async(), ticker())
+        return result
+
+    assert asyncio.run(main())["q"] == 1
+    assert len(ticks) == 5
+
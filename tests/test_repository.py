@@ -0,0 +1,76 @@
+"""
+Tests del repositorio y de las lecturas tipadas
+"""
+import os
+
+# config.database exige credenciales al importar
+os.environ.setdefault('SUPABASE_URL', 'https://fake.supabase.co')
+os.environ.setdefault('SUPABASE_KEY', 'header.payload.signature')
+
+import dataclasses
+
+import pytest
+
+from app.services.repository import AdminOrder, DatabaseService, OrderItemLine, OrderSummary, UserContact
+from tests.fake_supabase import FakeSupabase
+
+
+def make_db():
+    users = [{'user_id': 1, 'telegram_id': 111, 'nombre': 'Ana', 'telefono': '3001', 'direccion': 'Calle 1'},
+             {'user_id': 2, 'telegram_id': 222, 'nombre': 'Luis', 'telefono': None, 'direccion': 'Calle 2'}]
+    orders = [
+        {'order_id': i, 'user_id': 1 + i % 2, 'estado': 'pending' if i % 3 == 0 else 'delivered',
+         'total': 1000.0 * i, 'notas': 'x' * 50, 'productos': [{'nombre': 'Milhoja'}],
+         'fecha_orden': f"2025-01-{i:02d}T10:00:00", 'created_at': f"2025-01-{i:02d}T10:00:00",
+         'users': {'nombre': 'Luis' if i % 2 else 'Ana', 'telegram_id': 222 if i % 2 else 111}}
+        for i in range(1, 13)
+    ]
+    items = [{'item_id': k, 'order_id': 5, 'product_id': k, 'cantidad': 2, 'precio_unitario': 500.0,
+              'subtotal': 1000.0, 'notas': None, 'products': {'nombre': f"Producto {k}"}} for k in (2, 1)]
+    return FakeSupabase({'users': users, 'orders': orders, 'order_items': items})
+
+
+def test_projection_comes_from_model_fields():
+    """Test: la proyección de cada modelo son sus campos, con los embebidos como recurso"""
+    assert OrderSummary.columns() == "order_id, estado, total, fecha_orden"
+    assert UserContact.columns() == "user_id, nombre, telefono"
+    assert AdminOrder.columns() == "order_id, estado, total, created_at, users(nombre, telegram_id)"
+    assert OrderItemLine.columns() == "item_id, cantidad, precio_unitario, subtotal, products(nombre)"
+
+
+def test_models_are_slotted_and_frozen():
+    """Test: las filas no llevan __dict__ y no se pueden modificar"""
+    order = OrderSummary.from_row({'order_id': 1, 'estado': 'pending', 'total': 10, 'notas': 'ignorada'})
+
+    assert not hasattr(order, '__dict__')
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        order.total = 0
+
+
+def test_typed_reads():
+    """Test: las lecturas tipadas devuelven modelos con lo que usa cada handler"""
+    service = DatabaseService(make_db())
+
+    assert service.get_user_id(222) == 2
+    assert service.get_user_id(999) is None
+    assert service.get_user_contact(111) == UserContact(user_id=1, nombre='Ana', telefono='3001')
+
+    recent = service.get_recent_orders(1, limit=3)
+    assert [o.order_id for o in recent] == [12, 10, 8]
+
+    pending = service.list_admin_orders('pending', limit=10)
+    assert [o.order_id for o in pending] == [12, 9, 6, 3]
+    assert pending[1].cliente['nombre'] == 'Luis'
+
+    lines = service.get_order_lines(5)
+    assert [(line.item_id, line.nombre) for line in lines] == [(1, 'Producto 1'), (2, 'Producto 2')]
+    assert service.get_admin_order(404) is None
+
+
+def test_single_service_shares_global_client():
+    """Test: ambos módulos exponen la misma clase y db usa el cliente global"""
+    import config.database
+    from app.services import database
+
+    assert database.DatabaseService is DatabaseService
+    assert config.database.db.client is config.database.supabase
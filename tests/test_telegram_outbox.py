@@ -0,0 +1,222 @@
+"""
+Tests de la cola de Telegram y del notificador de estados de pedidos
+"""
+import asyncio
+import time
+
+from telegram.error import Forbidden, RetryAfter, TimedOut
+
+from app.services.order_notifier import OrderStatusNotifier, build_status_message
+from app.services.telegram_outbox import TelegramOutbox
+from app.utils.metrics import MetricsRegistry, metrics
+from tests.fake_supabase import FakeSupabase
+
+
+class FakeBot:
+    def __init__(self, errors=None):
+        self.sent = []
+        self.errors = list(errors or [])
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((time.monotonic(), chat_id, text))
+
+
+async def drain(outbox, timeout=3):
+    deadline = time.monotonic() + timeout
+    while outbox.depth and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.02)
+
+
+def test_coalesces_pending_messages_with_same_key():
+    """Test: cambios seguidos del mismo pedido salen como un solo mensaje"""
+    bot = FakeBot()
+
+    async def run():
+        outbox = TelegramOutbox(bot, per_chat_interval=0)
+        outbox.enqueue(1, "confirmado", key=("order_status", 7))
+        outbox.enqueue(1, "preparando", key=("order_status", 7))
+        outbox.enqueue(1, "listo", key=("order_status", 7))
+        assert outbox.depth == 1
+        outbox.start()
+        await drain(outbox)
+        await outbox.stop()
+
+    asyncio.run(run())
+    assert [text for _, _, text in bot.sent] == ["listo"]
+
+
+def test_per_chat_interval_spaces_messages():
+    """Test: dos mensajes al mismo chat respetan el intervalo; otros chats no esperan"""
+    bot = FakeBot()
+
+    async def run():
+        outbox = TelegramOutbox(bot, per_chat_interval=0.2)
+        outbox.enqueue(1, "a")
+        outbox.enqueue(1, "b")
+        outbox.enqueue(2, "c")
+        outbox.start()
+        await drain(outbox)
+        await outbox.stop()
+
+    asyncio.run(run())
+    times = {text: t for t, _, text in bot.sent}
+    assert [text for _, _, text in bot.sent] == ["a", "c", "b"]
+    assert times["b"] - times["a"] >= 0.19
+    assert times["c"] - times["a"] < 0.1
+
+
+def test_global_rate_limit():
+    """Test: nunca se supera la tasa global"""
+    bot = FakeBot()
+
+    async def run():
+        outbox = TelegramOutbox(bot, global_rate=50, per_chat_interval=0)
+        outbox.bucket._tokens = 1  # sin ráfaga inicial
+        for chat in range(11):
+            outbox.enqueue(chat, "hola")
+        outbox.start()
+        await drain(outbox)
+        await outbox.stop()
+
+    asyncio.run(run())
+    elapsed = bot.sent[-1][0] - bot.sent[0][0]
+    assert len(bot.sent) == 11
+    assert elapsed >= 10 / 50 * 0.9
+
+
+def test_retry_after_pauses_and_retries():
+    """Test: RetryAfter pausa la cola y el mensaje se reintenta"""
+    bot = FakeBot(errors=[RetryAfter(0.2)])
+
+    async def run():
+        outbox = TelegramOutbox(bot, per_chat_interval=0)
+        start = time.monotonic()
+        outbox.enqueue(1, "hola")
+        outbox.start()
+        await drain(outbox)
+        await outbox.stop()
+        return start
+
+    start = asyncio.run(run())
+    assert [text for _, _, text in bot.sent] == ["hola"]
+    assert bot.sent[0][0] - start >= 0.19
+
+
+def test_network_errors_retry_and_forbidden_drops():
+    """Test: errores de red se reintentan; usuario que bloqueó el bot se descarta"""
+    bot = FakeBot(errors=[TimedOut(), Forbidden("bot was blocked by the user")])
+
+    async def run():
+        outbox = TelegramOutbox(bot, per_chat_interval=0, retry_backoff=0.05)
+        outbox.enqueue(1, "uno")
+        outbox.enqueue(2, "dos")
+        outbox.start()
+        await drain(outbox)
+        await outbox.stop()
+
+    asyncio.run(run())
+    # "uno" falla por timeout, "dos" choca con Forbidden, luego "uno" sale
+    assert [text for _, _, text in bot.sent] == ["uno"]
+
+
+def test_metrics_exposed():
+    """Test: profundidad de cola y latencia aparecen en /metrics"""
+    bot = FakeBot()
+
+    async def run():
+        outbox = TelegramOutbox(bot, per_chat_interval=0)
+        outbox.enqueue(1, "hola")
+        assert metrics.get("telegram_outbox_depth").value == 1
+        outbox.start()
+        await drain(outbox)
+        await outbox.stop()
+
+    before = metrics.get("telegram_outbox_send_latency_seconds")
+    count = before.count if before else 0
+    asyncio.run(run())
+
+    text = metrics.render()
+    assert "telegram_outbox_depth 0" in text
+    assert metrics.get("telegram_outbox_send_latency_seconds").count == count + 1
+    assert 'telegram_outbox_send_latency_seconds_bucket{le="+Inf"}' in text
+
+
+def test_metrics_registry_histogram():
+    """Test: los buckets del histograma son acumulados"""
+    registry = MetricsRegistry()
+    hist = registry.histogram("demo_seconds", buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        hist.observe(value)
+
+    lines = registry.render().splitlines()
+    assert 'demo_seconds_bucket{le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{le="1"} 2' in lines
+    assert 'demo_seconds_bucket{le="+Inf"} 3' in lines
+    assert registry.histogram("demo_seconds") is hist
+
+
+def test_notifier_enqueues_latest_status_per_order():
+    """Test: el notificador fusiona eventos del mismo pedido y los marca procesados"""
+    db = FakeSupabase({'order_status_events': [
+        {'event_id': 1, 'order_id': 10, 'telegram_id': 111, 'new_estado': 'confirmed', 'processed_at': None},
+        {'event_id': 2, 'order_id': 10, 'telegram_id': 111, 'new_estado': 'ready', 'processed_at': None},
+        {'event_id': 3, 'order_id': 11, 'telegram_id': 222, 'new_estado': 'cancelled', 'processed_at': None},
+        {'event_id': 4, 'order_id': 12, 'telegram_id': None, 'new_estado': 'ready', 'processed_at': None},
+        {'event_id': 0, 'order_id': 9, 'telegram_id': 333, 'new_estado': 'ready', 'processed_at': '2025-01-01'},
+    ]})
+    bot = FakeBot()
+
+    def processed():
+        return sorted(e['event_id'] for e in db.tables['order_status_events'] if e['processed_at'])
+
+    async def run():
+        outbox = TelegramOutbox(bot, per_chat_interval=0)
+        notifier = OrderStatusNotifier(db, outbox)
+        assert await notifier.poll_once() == 4
+        assert await notifier.poll_once() == 0
+        # Encolados pero sin enviar: solo el evento sin chat queda procesado
+        assert processed() == [0, 4]
+        outbox.start()
+        await drain(outbox)
+        await outbox.stop()
+        await notifier.stop()
+
+    asyncio.run(run())
+    assert sorted((chat, text) for _, chat, text in bot.sent) == [
+        (111, build_status_message(10, 'ready')),
+        (222, build_status_message(11, 'cancelled')),
+    ]
+    assert all(e['processed_at'] for e in db.tables['order_status_events'])
+
+
+def test_notifier_keeps_events_pending_until_delivered():
+    """Test: si el bot se detiene con mensajes en cola, sus eventos se notifican al reiniciar"""
+    db = FakeSupabase({'order_status_events': [
+        {'event_id': 1, 'order_id': 10, 'telegram_id': 111, 'new_estado': 'ready', 'processed_at': None},
+        {'event_id': 2, 'order_id': 11, 'telegram_id': 222, 'new_estado': 'ready', 'processed_at': None},
+    ]})
+    bot = FakeBot(errors=[Forbidden("bot was blocked by the user")])
+
+    async def run():
+        # La cola se detiene sin haber enviado nada
+        outbox = TelegramOutbox(bot, per_chat_interval=0)
+        notifier = OrderStatusNotifier(db, outbox)
+        assert await notifier.poll_once() == 2
+        await notifier.stop()
+        assert not any(e['processed_at'] for e in db.tables['order_status_events'])
+
+        # Reinicio: el primero se descarta (bloqueado) y el segundo se entrega; ambos quedan procesados
+        outbox = TelegramOutbox(bot, per_chat_interval=0)
+        notifier = OrderStatusNotifier(db, outbox)
+        assert await notifier.poll_once() == 2
+        outbox.start()
+        await drain(outbox)
+        assert await notifier.poll_once() == 0
+        await outbox.stop()
+
+    asyncio.run(run())
+    assert [chat for _, chat, _ in bot.sent] == [222]
+    assert all(e['processed_at'] for e in db.tables['order_status_events'])
@@ -51,6 +51,7 @@ async def run_tests():
     print("\n3. Ver Productos por Categoría")
     update_cb.callback_query.message.reply_text = AsyncMock()
     update_cb.callback_query.data = "cat_1"
+    context.args = [1]
     # Mock category products logic if needed, usually calls db
     await show_products_by_category(update_cb, context)
     # This might fail if db mock isn't sufficient for specific category calls
@@ -60,9 +61,10 @@ async def run_tests():
     # 4. TEST AGREGAR AL CARRITO (Smart)
     print("\n4. Agregar al Carrito (Smart Mode)")
     update_cb.callback_query.data = "smart_add_62_5"
+    context.args = [62, 5]
     await smart_add_to_cart(update_cb, context)
     cart = context.user_data['cart']
-    if len(cart) == 1 and cart[0]['cantidad'] == 5:
+    if len(cart) == 1 and cart.quantity == 5:
         print("   ✅ Producto agregado correctamente (x5)")
     else:
         print("   ❌ Fallo al agregar producto")